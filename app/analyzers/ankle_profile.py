@@ -40,6 +40,7 @@ from typing import Dict, Any, Tuple, Optional
 
 # Importar instancia compartida de MediaPipe Pose (singleton)
 from app.core.pose_singleton import get_shared_pose
+from app.core.compensation_detector import landmarks_to_array, get_compensation_detector
 
 # Inicializar MediaPipe Pose
 mp_pose = mp.solutions.pose
@@ -127,6 +128,8 @@ class AnkleProfileAnalyzer:
         # Estado de postura
         self.posture_valid = False
         self.landmarks_detected = False
+        self.landmarks_array = None
+        self.compensation = None
         
         # Orientación real verificada
         self.is_profile_position = False
@@ -365,6 +368,7 @@ class AnkleProfileAnalyzer:
         if results.pose_landmarks:
             h, w = original_h, original_w
             landmarks = results.pose_landmarks.landmark
+            self.landmarks_array = landmarks_to_array(landmarks)
             
             self.landmarks_detected = True
             
@@ -386,6 +390,9 @@ class AnkleProfileAnalyzer:
             self.confidence = detection_confidence
             self.orientation_quality = profile_quality
             
+            # Compensaciones en la misma pasada que el ángulo: mismo array, vista detectada
+            self.compensation = get_compensation_detector().measure(self.landmarks_array, self.orientation)
+            
             # Dibujar skeleton si está habilitado
             if self.show_skeleton:
                 mp_drawing.draw_landmarks(
@@ -400,6 +407,8 @@ class AnkleProfileAnalyzer:
             
         else:
             self.landmarks_detected = False
+            self.landmarks_array = None
+            self.compensation = None
             self.posture_valid = False
             cv2.putText(
                 image, "No se detecta persona", (50, 50),
@@ -684,6 +693,8 @@ class AnkleProfileAnalyzer:
         self.frame_count = 0
         self.posture_valid = False
         self.landmarks_detected = False
+        self.landmarks_array = None
+        self.compensation = None
         self.is_profile_position = False
         self.orientation_quality = 0.0
         logger.info("[AnkleProfileAnalyzer] Estadísticas reiniciadas")
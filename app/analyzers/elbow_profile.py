@@ -30,6 +30,7 @@ from typing import Dict, Any, Tuple, Optional
 
 # Importar instancia compartida de MediaPipe Pose (singleton)
 from app.core.pose_singleton import get_shared_pose
+from app.core.compensation_detector import landmarks_to_array, get_compensation_detector
 
 # Inicializar MediaPipe Pose
 mp_pose = mp.solutions.pose
@@ -113,6 +114,8 @@ class ElbowProfileAnalyzer:
         # Estado de postura
         self.posture_valid = False
         self.landmarks_detected = False
+        self.landmarks_array = None
+        self.compensation = None
         
         # Orientación real verificada
         self.is_profile_position = False  # True solo si está realmente de perfil
@@ -389,6 +392,7 @@ class ElbowProfileAnalyzer:
         if results.pose_landmarks:
             h, w = original_h, original_w
             landmarks = results.pose_landmarks.landmark
+            self.landmarks_array = landmarks_to_array(landmarks)
             
             self.landmarks_detected = True
             
@@ -415,6 +419,9 @@ class ElbowProfileAnalyzer:
             self.confidence = detection_confidence  # Confianza de que hay persona
             self.orientation_quality = profile_quality  # Calidad de perfil por separado
             
+            # Compensaciones en la misma pasada que el ángulo: mismo array, vista detectada
+            self.compensation = get_compensation_detector().measure(self.landmarks_array, self.orientation)
+            
             # Dibujar skeleton completo si está habilitado
             if self.show_skeleton:
                 mp_drawing.draw_landmarks(
@@ -432,6 +439,8 @@ class ElbowProfileAnalyzer:
             
         else:
             self.landmarks_detected = False
+            self.landmarks_array = None
+            self.compensation = None
             self.posture_valid = False
             cv2.putText(
                 image, "No se detecta persona", (50, 50),
@@ -893,6 +902,8 @@ class ElbowProfileAnalyzer:
         self.frame_count = 0
         self.posture_valid = False
         self.landmarks_detected = False
+        self.landmarks_array = None
+        self.compensation = None
         self.is_profile_position = False
         self.orientation_quality = 0.0
         logger.info("[ElbowProfileAnalyzer] Estadísticas reiniciadas")
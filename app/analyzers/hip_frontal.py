@@ -34,6 +34,7 @@ from typing import Dict, Any, Tuple, Optional
 
 # Importar instancia compartida de MediaPipe Pose (singleton)
 from app.core.pose_singleton import get_shared_pose
+from app.core.compensation_detector import landmarks_to_array, get_compensation_detector
 
 # Inicializar MediaPipe Pose
 mp_pose = mp.solutions.pose
@@ -123,6 +124,8 @@ class HipFrontalAnalyzer:
         # Estado de postura
         self.posture_valid = False
         self.landmarks_detected = False
+        self.landmarks_array = None
+        self.compensation = None
         
         # Orientacion frontal verificada
         self.is_frontal_position = False
@@ -269,6 +272,7 @@ class HipFrontalAnalyzer:
             self.landmarks_detected = True
             h, w = image.shape[:2]
             landmarks = results.pose_landmarks.landmark
+            self.landmarks_array = landmarks_to_array(landmarks)
             
             # Verificar orientacion frontal
             is_frontal, frontal_quality = self.detect_frontal_orientation(landmarks)
@@ -287,6 +291,9 @@ class HipFrontalAnalyzer:
             avg_vis = sum(l.visibility for l in landmarks) / len(landmarks)
             self.confidence = min(avg_vis * 1.2, 1.0)
             
+            # Compensaciones en la misma pasada que el ángulo: mismo array, vista detectada
+            self.compensation = get_compensation_detector().measure(self.landmarks_array, self.orientation)
+            
             # Dibujar skeleton si esta habilitado
             if self.show_skeleton:
                 mp_drawing.draw_landmarks(
@@ -316,6 +323,8 @@ class HipFrontalAnalyzer:
             
         else:
             self.landmarks_detected = False
+            self.landmarks_array = None
+            self.compensation = None
             self.posture_valid = False
             cv2.putText(
                 image, 
@@ -541,6 +550,8 @@ class HipFrontalAnalyzer:
         self.frame_count = 0
         self.posture_valid = False
         self.landmarks_detected = False
+        self.landmarks_array = None
+        self.compensation = None
         self.is_frontal_position = False
         self.orientation_quality = 0.0
         logger.info("[HipFrontalAnalyzer] Estadisticas reiniciadas")
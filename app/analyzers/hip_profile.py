@@ -36,6 +36,7 @@ from typing import Dict, Any, Tuple, Optional
 
 # Importar instancia compartida de MediaPipe Pose (singleton)
 from app.core.pose_singleton import get_shared_pose
+from app.core.compensation_detector import landmarks_to_array, get_compensation_detector
 
 # Inicializar MediaPipe Pose
 mp_pose = mp.solutions.pose
@@ -117,6 +118,8 @@ class HipProfileAnalyzer:
         # Estado de postura
         self.posture_valid = False
         self.landmarks_detected = False
+        self.landmarks_array = None
+        self.compensation = None
         
         # Orientación real verificada
         self.is_profile_position = False
@@ -336,6 +339,7 @@ class HipProfileAnalyzer:
             self.landmarks_detected = True
             h, w = image.shape[:2]
             landmarks = results.pose_landmarks.landmark
+            self.landmarks_array = landmarks_to_array(landmarks)
             
             # Detectar lado visible
             side, detection_confidence, orientation = self.detect_side(landmarks)
@@ -357,6 +361,9 @@ class HipProfileAnalyzer:
             self.confidence = detection_confidence
             self.orientation_quality = profile_quality
             
+            # Compensaciones en la misma pasada que el ángulo: mismo array, vista detectada
+            self.compensation = get_compensation_detector().measure(self.landmarks_array, self.orientation)
+            
             # Dibujar skeleton si está habilitado
             if self.show_skeleton:
                 mp_drawing.draw_landmarks(
@@ -374,6 +381,8 @@ class HipProfileAnalyzer:
             
         else:
             self.landmarks_detected = False
+            self.landmarks_array = None
+            self.compensation = None
             self.posture_valid = False
             cv2.putText(
                 image, 
@@ -700,6 +709,8 @@ class HipProfileAnalyzer:
         self.frame_count = 0
         self.posture_valid = False
         self.landmarks_detected = False
+        self.landmarks_array = None
+        self.compensation = None
         self.is_profile_position = False
         self.orientation_quality = 0.0
         logger.info("[HipProfileAnalyzer] Estadísticas reiniciadas")
@@ -23,6 +23,7 @@ from typing import Dict, Any, Tuple, Optional
 
 # Importar instancia compartida de MediaPipe Pose (singleton)
 from app.core.pose_singleton import get_shared_pose
+from app.core.compensation_detector import landmarks_to_array, get_compensation_detector
 
 # Inicializar MediaPipe Pose
 mp_pose = mp.solutions.pose
@@ -104,6 +105,8 @@ class ShoulderFrontalAnalyzer:
         # Estado de postura
         self.posture_valid = False
         self.landmarks_detected = False
+        self.landmarks_array = None
+        self.compensation = None
         self.orientation_frontal = False
         
         # Histéresis para detección frontal (evita parpadeo durante movimiento)
@@ -326,6 +329,7 @@ class ShoulderFrontalAnalyzer:
             self.landmarks_detected = True
             h, w = image.shape[:2]
             landmarks = results.pose_landmarks.landmark
+            self.landmarks_array = landmarks_to_array(landmarks)
             
             # Detectar orientación frontal
             is_frontal, detection_confidence = self.detect_frontal_orientation(landmarks)
@@ -337,6 +341,9 @@ class ShoulderFrontalAnalyzer:
             self.orientation_quality = detection_confidence if is_frontal else 0.3
             self.orientation = "frontal" if is_frontal else "profile"  # Invertido: reportar qué ES
             
+            # Compensaciones en la misma pasada que el ángulo: mismo array, vista detectada
+            self.compensation = get_compensation_detector().measure(self.landmarks_array, self.orientation)
+            
             # Dibujar skeleton solo si está habilitado
             if self.show_skeleton:
                 mp_drawing.draw_landmarks(
@@ -364,6 +371,8 @@ class ShoulderFrontalAnalyzer:
                 )
         else:
             self.landmarks_detected = False
+            self.landmarks_array = None
+            self.compensation = None
             self.posture_valid = False
             cv2.putText(
                 image, 
@@ -787,6 +796,8 @@ class ShoulderFrontalAnalyzer:
         self.frame_count = 0
         self.posture_valid = False
         self.landmarks_detected = False
+        self.landmarks_array = None
+        self.compensation = None
         self.orientation_frontal = False
         self.confidence = 0.0
         self.is_frontal_position = False
@@ -23,6 +23,7 @@ from typing import Dict, Any, Tuple, Optional
 
 # Importar instancia compartida de MediaPipe Pose (singleton)
 from app.core.pose_singleton import get_shared_pose
+from app.core.compensation_detector import landmarks_to_array, get_compensation_detector
 
 # Inicializar MediaPipe Pose
 mp_pose = mp.solutions.pose
@@ -103,6 +104,8 @@ class ShoulderProfileAnalyzer:
         # Estado de postura
         self.posture_valid = False
         self.landmarks_detected = False
+        self.landmarks_array = None
+        self.compensation = None
         
         # Orientación real verificada
         self.is_profile_position = False  # True solo si está realmente de perfil
@@ -357,6 +360,7 @@ class ShoulderProfileAnalyzer:
             self.landmarks_detected = True
             h, w = image.shape[:2]
             landmarks = results.pose_landmarks.landmark
+            self.landmarks_array = landmarks_to_array(landmarks)
             
             # Detectar lado visible
             side, detection_confidence, orientation = self.detect_side(landmarks)
@@ -379,6 +383,9 @@ class ShoulderProfileAnalyzer:
             self.confidence = detection_confidence  # Solo confianza de que hay persona
             self.orientation_quality = profile_quality  # Calidad de perfil por separado
             
+            # Compensaciones en la misma pasada que el ángulo: mismo array, vista detectada
+            self.compensation = get_compensation_detector().measure(self.landmarks_array, self.orientation)
+            
             # Dibujar skeleton solo si está habilitado
             if self.show_skeleton:
                 mp_drawing.draw_landmarks(
@@ -392,6 +399,8 @@ class ShoulderProfileAnalyzer:
             self._process_profile_view(image, landmarks, w, h, side, self.orientation, detection_confidence)
         else:
             self.landmarks_detected = False
+            self.landmarks_array = None
+            self.compensation = None
             self.posture_valid = False
             cv2.putText(
                 image, 
@@ -709,6 +718,8 @@ class ShoulderProfileAnalyzer:
         self.frame_count = 0
         self.posture_valid = False
         self.landmarks_detected = False
+        self.landmarks_array = None
+        self.compensation = None
         self.is_profile_position = False
         self.orientation_quality = 0.0
     
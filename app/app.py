@@ -85,6 +85,23 @@ def create_app(config_name='development'):
     # 4. INICIALIZAR DATABASE MANAGER
     # ========================================================================
     
+    # Aplicar migraciones pendientes antes de mapear los modelos. Un fallo
+    # detiene el arranque: no se sirve sobre un esquema a medio migrar.
+    # Una base en memoria (testing) o aún no creada (init_database.py) no
+    # tiene esquema que migrar
+    database_path = app.config['DATABASE_PATH']
+    if database_path != ':memory:' and os.path.exists(database_path):
+        from migrations.migrate import apply_migrations
+        try:
+            applied = apply_migrations(database_path)
+        except Exception as e:
+            app.logger.critical(f"❌ Error al aplicar migraciones: {e}")
+            raise
+        if applied:
+            app.logger.info(f"🔄 Migraciones aplicadas: {', '.join(applied)}")
+    else:
+        app.logger.warning(f"⚠️  Migraciones omitidas: base de datos no disponible ({database_path})")
+
     try:
         db_manager = get_db_manager(app.config['DATABASE_PATH'])
         
@@ -98,7 +115,18 @@ def create_app(config_name='development'):
             
     except Exception as e:
         app.logger.error(f"❌ Error al inicializar database manager: {e}")
-    
+
+    try:
+        # Caché de reportes PDF: se borra al cambiar los análisis que contiene
+        from app.services.report_cache import get_report_cache, install_invalidation_hooks
+        get_report_cache(
+            os.path.join(app.config['PDF_EXPORT_DIR'], 'cache'),
+            {'max_size_mb': app.config.get('PDF_CACHE_MAX_MB', 100)}
+        )
+        install_invalidation_hooks()
+    except Exception as e:
+        app.logger.warning(f"⚠️  Caché de reportes PDF no disponible: {e}")
+
     # ========================================================================
     # 5. REGISTRAR BLUEPRINTS
     # ========================================================================
@@ -196,8 +196,25 @@ class Config:
     # Habilitar sistema de voz
     VOICE_ENABLED = True
     
-    # Motor TTS (pyttsx3 o gTTS)
-    TTS_ENGINE = 'pyttsx3'  # Offline por defecto
+    # Motor TTS: 'pyttsx3' o 'espeak' (offline) o 'edge' (voz neuronal, requiere red)
+    # Si no está disponible se usa el siguiente motor offline instalado
+    TTS_ENGINE = os.environ.get('TTS_ENGINE', 'pyttsx3')  # Offline por defecto
+    
+    # Reproducción: 'browser' (el navegador reproduce los cues de audio_cache,
+    # sirve en VPS y en el PC del laboratorio) o 'server' (pygame en el servidor)
+    TTS_PLAYBACK = os.environ.get('TTS_PLAYBACK', 'browser')
+    
+    # Caché de audio TTS: tamaño máximo en disco (LRU; el banco de frases no se desaloja)
+    # y cuánto de lo fijado se mantiene en memoria
+    TTS_CACHE_MAX_MB = 50
+    TTS_CACHE_WARM_MB = 16
+    
+    # Síntesis simultáneas al pre-generar la caché (pyttsx3 igual sintetiza de a una)
+    TTS_CACHE_CONCURRENCY = 4
+    
+    # Paquete .zip con la caché de arranque (scripts/tts_cache_bundle.py export);
+    # si existe se importa al iniciar en vez de sintetizar todo
+    TTS_CACHE_BUNDLE = os.environ.get('TTS_CACHE_BUNDLE')
     
     # Velocidad de habla (palabras por minuto)
     TTS_RATE = 150
@@ -242,7 +259,22 @@ class Config:
     
     # Formato de nombre de archivo PDF
     PDF_FILENAME_FORMAT = 'ROM_Report_{student_id}_{date}.pdf'
-    
+
+    # Cola de reportes en segundo plano (app/services/report_jobs.py)
+    PDF_JOB_WORKERS = 2            # PDFs renderizándose a la vez por proceso
+    PDF_JOB_MAX_PENDING = 20       # Trabajos en cola + en curso por proceso
+    PDF_JOB_MAX_PER_USER = 3       # Trabajos activos por usuario
+    PDF_JOB_NICE = 10              # Prioridad de CPU de los hilos de render (Linux)
+    PDF_EXPORT_TTL = 3600          # Segundos que se conserva un PDF generado
+    PDF_EXPORT_QUOTA_MB = 200      # Tamaño máximo de instance/exports
+
+    # Caché de reportes por contenido (app/services/report_cache.py)
+    PDF_CACHE_MAX_MB = 100         # Presupuesto de instance/exports/cache
+
+    # Reportes de clase en lote (app/services/batch_reports.py)
+    PDF_BATCH_WORKERS = 2          # Procesos que renderizan en paralelo
+    PDF_BATCH_MAX_STUDENTS = 500   # Estudiantes máximos por ZIP
+
     # ========================================================================
     # CONFIGURACIÓN DE PAGINACIÓN
     # ========================================================================
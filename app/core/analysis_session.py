@@ -16,8 +16,12 @@ NO crea hilos adicionales. Usa singletons existentes.
 
 from enum import Enum, auto
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any, Tuple, Callable
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List, Tuple, Callable, Mapping
 from datetime import datetime
+import json
+import threading
 import time
 import numpy as np
 import logging
@@ -27,11 +31,17 @@ logger = logging.getLogger(__name__)
 
 # Usar singletons existentes
 from app.core.pose_singleton import get_shared_pose
-from app.utils.rom_statistics import ROMStatisticsCalculator
+from app.utils.rom_statistics import MultiChannelROMStatistics
+from app.core.compensation_detector import CompensationDetector, get_compensation_detector
 
 # Servicio TTS (singleton) para guía de voz
 from app.services.tts_service import get_tts_service, TTSMessages
 
+# Configuración de ejercicios (overrides de la máquina de estados)
+from app.config import APP_DIR
+
+EXERCISES_CONFIG_PATH = APP_DIR / 'config' / 'exercises.json'
+
 
 class AnalysisState(Enum):
     """Estados de la sesión de análisis."""
@@ -82,6 +92,10 @@ class AnalysisResult:
     right_max_rom: Optional[float] = None
     is_bilateral: bool = False
     
+    # Compensaciones (percentil 95 por canal) y muestras descartadas por compensar
+    compensations: Optional[Dict[str, Optional[float]]] = None
+    rejected_samples: int = 0
+    
     # Timestamp
     timestamp: datetime = field(default_factory=datetime.now)
     
@@ -111,6 +125,13 @@ class AnalysisResult:
             result['left_max_rom'] = round(self.left_max_rom, 1) if self.left_max_rom is not None else None
             result['right_max_rom'] = round(self.right_max_rom, 1) if self.right_max_rom is not None else None
         
+        if self.compensations is not None:
+            result['compensations'] = {
+                name: round(value, 1) if value is not None else None
+                for name, value in self.compensations.items()
+            }
+        result['rejected_samples'] = self.rejected_samples
+        
         # =====================================================================
         # VERIFICACIÓN DE MEDICIÓN SOSPECHOSA
         # Advierte al usuario si la medición parece ser un error
@@ -133,6 +154,182 @@ class AnalysisResult:
         return result
 
 
+@dataclass
+class AnalysisFrame:
+    """
+    Datos de un frame de inferencia, normalizados para la máquina de estados.
+    
+    Se construye en el loop de inferencia (video_feed / VPS) a partir del
+    analyzer activo y se empuja a la sesión con AnalysisSession.push_frame().
+    """
+    landmarks_detected: bool
+    angle: Optional[float] = None          # Valor ABSOLUTO (el signo indica dirección)
+    orientation: Optional[str] = None      # 'profile' o 'frontal'
+    confidence: float = 0.0
+    side: Optional[str] = None             # 'left', 'right' o 'bilateral'
+    left_angle: Optional[float] = None     # Solo analyzers frontales (bilateral)
+    right_angle: Optional[float] = None
+    # Canales de compensación (orden de CompensationDetector.CHANNELS, NaN si no medible)
+    compensation: Optional[np.ndarray] = None
+    compensating: bool = False             # True invalida la muestra (además de los umbrales de la sesión)
+    # Visibilidad por landmark (33,) del pose result, para ponderar la muestra
+    visibility: Optional[np.ndarray] = None
+    # Landmarks (33, 4) del frame; se persisten con la medición (landmarks_blob)
+    landmarks: Optional[np.ndarray] = None
+    timestamp: float = field(default_factory=time.time)
+    
+    @classmethod
+    def from_analyzer(cls, analyzer: Any) -> 'AnalysisFrame':
+        """
+        Construye el frame desde el estado actual de un analyzer.
+        
+        Args:
+            analyzer: Analyzer con get_current_data() (y left_angle/right_angle si es frontal)
+        
+        Returns:
+            AnalysisFrame normalizado
+        """
+        data = analyzer.get_current_data() if hasattr(analyzer, 'get_current_data') else {}
+        
+        # Usar valor ABSOLUTO para ROM (el signo indica dirección, no magnitud)
+        raw_angle = data.get('angle') or data.get('current_angle')
+        angle = abs(raw_angle) if raw_angle is not None else None
+        
+        # Los analyzers devuelven 'profile' o 'frontal' directamente
+        raw_orientation = data.get('orientation', '')
+        orientation = raw_orientation.lower() if raw_orientation else None
+        
+        # Fallback para valores legacy ("mirando izquierda", etc.)
+        if orientation and orientation not in ('profile', 'frontal'):
+            if 'mirando' in orientation or 'izquierda' in orientation or 'derecha' in orientation:
+                orientation = 'profile'
+            elif 'frente' in orientation:
+                orientation = 'frontal'
+        
+        # Ignorar valores de lado como "Detectando..."
+        side = data.get('side', None)
+        if side not in ('left', 'right', 'bilateral'):
+            side = None
+        
+        # Compensaciones medidas por el analyzer en la misma pasada que el ángulo;
+        # la sesión las evalúa con los umbrales de su ejercicio y vista
+        compensation = None
+        visibility = None
+        points = getattr(analyzer, 'landmarks_array', None)
+        if points is not None and data.get('landmarks_detected', False):
+            compensation = getattr(analyzer, 'compensation', None)
+            visibility = points[:, 3]
+        
+        return cls(
+            landmarks_detected=bool(data.get('landmarks_detected', False)),
+            angle=angle,
+            orientation=orientation,
+            confidence=data.get('confidence', 0.0),
+            side=side,
+            left_angle=getattr(analyzer, 'left_angle', None),
+            right_angle=getattr(analyzer, 'right_angle', None),
+            compensation=compensation,
+            visibility=visibility,
+            landmarks=points if visibility is not None else None
+        )
+
+
+# Marcador de campo no asignado en FrameResult (None es un valor válido)
+_UNSET = object()
+
+
+class FrameResult:
+    """
+    Resultado por frame de la máquina de estados.
+    
+    Usa __slots__ y es reutilizado por la sesión: cada frame llama a reset()
+    en lugar de construir un diccionario nuevo. Los campos opcionales que no
+    se asignan en el frame no aparecen en to_dict().
+    """
+    
+    _OPTIONAL_FIELDS = (
+        'confidence', 'orientation', 'current_orientation', 'required_orientation',
+        'error', 'countdown', 'phase', 'result', 'early_completion',
+        'current_angle', 'samples_collected', 'time_remaining', 'compensating'
+    )
+    
+    __slots__ = ('state', 'message', 'progress', 'can_proceed') + _OPTIONAL_FIELDS
+    
+    def __init__(self):
+        self.reset(AnalysisState.IDLE.name, "")
+    
+    def reset(
+        self,
+        state: str,
+        message: str,
+        progress: float = 0.0,
+        can_proceed: bool = False
+    ) -> 'FrameResult':
+        """Reinicia el resultado para un nuevo frame y lo retorna."""
+        self.state = state
+        self.message = message
+        self.progress = progress
+        self.can_proceed = can_proceed
+        for name in self._OPTIONAL_FIELDS:
+            setattr(self, name, _UNSET)
+        return self
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte el resultado a diccionario (solo campos asignados)."""
+        data = {
+            'state': self.state,
+            'message': self.message,
+            'progress': self.progress,
+            'can_proceed': self.can_proceed
+        }
+        for name in self._OPTIONAL_FIELDS:
+            value = getattr(self, name)
+            if value is not _UNSET:
+                data[name] = value
+        return data
+
+
+@dataclass(frozen=True)
+class StateSpec:
+    """
+    Entrada de la tabla de transiciones para un estado.
+    
+    `handler` es el método de AnalysisSession que procesa el estado (None para
+    estados terminales). Los umbrales (frames, permanencia, timeouts, mínimos
+    de muestras) se resuelven una sola vez en compile_transition_table().
+    """
+    state: AnalysisState
+    message: str
+    handler: Optional[Callable[..., FrameResult]] = None
+    guard: Optional[Callable[[Any, Optional[str], float], bool]] = None
+    on_fail: Optional[Callable[..., FrameResult]] = None
+    
+    # Permanencia requerida para avanzar
+    frames_required: int = 1
+    min_dwell: float = 0.0
+    
+    # Transición al cumplir la condición del estado
+    next_state: Optional[AnalysisState] = None
+    pass_reason: str = ""
+    pass_message: Optional[str] = None  # None = mensaje del nuevo estado
+    pending_message: str = ""           # Formato con {count} y {required}
+    retry_message: str = ""
+    
+    # Campos del frame que se devuelven mientras el guard se cumple
+    echo_confidence: bool = False
+    echo_orientation: bool = False
+    
+    # Timeout del estado
+    timeout: Optional[float] = None
+    timeout_state: Optional[AnalysisState] = None
+    timeout_reason: str = ""
+    timeout_error: Optional[str] = None
+    
+    # Mínimos de muestras (ANALYZING)
+    min_samples: int = 0
+    min_bilateral_samples: int = 0
+
+
 class AnalysisSession:
     """
     Controlador de sesión de análisis ROM.
@@ -144,18 +341,43 @@ class AnalysisSession:
     - get_shared_pose() para MediaPipe
     - get_person_detector() para detección de persona
     - get_posture_verifier() para verificación de postura
+    
+    La sesión avanza desde el loop de inferencia (push_frame) a la tasa de la
+    cámara; el polling de estado (get_status) es de solo lectura.
     """
     
     # Configuración de tiempos
     COUNTDOWN_DURATION = 3.0  # Segundos de cuenta regresiva
     ANALYSIS_DURATION = 10.0  # Segundos de captura ROM (antes 5s, ahora 10s)
     MIN_SAMPLES_REQUIRED = 15  # Mínimo de muestras para resultado válido
+    MIN_BILATERAL_SAMPLES = 5  # Mínimo de muestras por lado para plateau bilateral
     
     # Tiempos mínimos por estado (para dar feedback visual al usuario)
     # IMPORTANTE: Estos tiempos aseguran que el usuario tenga tiempo de posicionarse
     MIN_DETECTING_TIME = 2.0   # Mínimo 2 segundos buscando persona (para confirmar detección estable)
     MIN_ORIENTATION_TIME = 2.0  # Mínimo 2 segundos verificando orientación (debe mantenerse)
     MIN_POSTURE_TIME = 1.5     # Mínimo 1.5 segundos verificando postura
+    MIN_INSTRUCTION_TIME = 4.0  # Mínimo 4 segundos para la instrucción antes del 3-2-1
+    
+    # Frames consecutivos requeridos por estado de verificación
+    DETECTING_FRAMES_REQUIRED = 4    # ~2 segundos a 2Hz de polling
+    ORIENTATION_FRAMES_REQUIRED = 4
+    POSTURE_FRAMES_REQUIRED = 3
+    
+    # Canales del motor de estadísticas ROM (columnas del array multicanal):
+    # ángulos + canales de compensación medidos en el mismo frame
+    ANGLE_CHANNELS = ('primary', 'left', 'right')
+    ROM_CHANNELS = ANGLE_CHANNELS + CompensationDetector.CHANNELS
+    
+    # Landmarks MediaPipe que definen el ángulo de cada articulación
+    # (lado izquierdo, lado derecho). Su visibilidad mínima es el peso de la muestra.
+    JOINT_LANDMARKS = {
+        'shoulder': ((23, 11, 13), (24, 12, 14)),  # cadera - hombro - codo
+        'elbow': ((11, 13, 15), (12, 14, 16)),     # hombro - codo - muñeca
+        'hip': ((11, 23, 25), (12, 24, 26)),       # hombro - cadera - rodilla
+        'knee': ((23, 25, 27), (24, 26, 28)),      # cadera - rodilla - tobillo
+        'ankle': ((25, 27, 31), (26, 28, 32)),     # rodilla - tobillo - pie
+    }
     
     # Umbrales de confianza
     MIN_CONFIDENCE = 0.6       # Confianza mínima para considerar detección válida
@@ -164,6 +386,9 @@ class AnalysisSession:
     MAX_DETECTION_RETRIES = 3
     POSTURE_TIMEOUT = 10.0  # Segundos máximos esperando postura correcta
     
+    # Segundos sin frames del servidor tras los cuales se aceptan frames del cliente
+    SERVER_FEED_TIMEOUT = 1.0
+    
     def __init__(
         self,
         joint_type: str,
@@ -195,12 +420,29 @@ class AnalysisSession:
         self._state_start_time: Optional[float] = None
         self._analysis_start_time: Optional[float] = None
         
-        # Calculadora de estadísticas ROM (usa config por defecto)
-        self._rom_calculator = ROMStatisticsCalculator()
+        # Motor de estadísticas ROM multicanal (usa config por defecto):
+        # canal principal + izquierdo/derecho para análisis frontal (percentil 95 por lado)
+        self._rom_stats = MultiChannelROMStatistics(self.ROM_CHANNELS)
+        
+        # Ángulos bilaterales del frame actual, se agregan junto al principal
+        self._pending_bilateral: Tuple[Optional[float], Optional[float]] = (None, None)
+        
+        # Compensaciones del frame actual; si compensa, los ángulos no se agregan
+        self._pending_compensation: Optional[np.ndarray] = None
+        self._pending_compensating = False
+        self._rejected_samples = 0
+        # Umbrales de compensación del ejercicio y vista (inf = canal que no invalida)
+        self._compensation_thresholds = get_compensation_detector().thresholds_for(
+            joint_type, movement_type, required_orientation.lower()
+        )
+        
+        # Pesos (confianza) del frame actual para los canales de ángulo
+        self._pending_weights: Optional[Tuple[float, float, float]] = None
         
-        # Calculadores bilaterales para análisis frontal (percentil 95 por lado)
-        self._left_rom_calculator = ROMStatisticsCalculator()
-        self._right_rom_calculator = ROMStatisticsCalculator()
+        # Landmarks del frame actual y de cada fila admitida del canal principal
+        # (índice de fila del motor -> array (33, 4)), para get_measurement_series()
+        self._pending_landmarks: Optional[np.ndarray] = None
+        self._sample_landmarks: Dict[int, np.ndarray] = {}
         
         # Resultado
         self._result: Optional[AnalysisResult] = None
@@ -217,10 +459,8 @@ class AnalysisSession:
         # Lado detectado (para perfil: 'left' o 'right', para frontal: 'bilateral')
         self._detected_side: str = 'bilateral' if self._is_bilateral else 'right'
         
-        # Contadores de frames consecutivos exitosos (para verificar estabilidad)
-        self._consecutive_detections = 0
-        self._consecutive_orientation_ok = 0
-        self._consecutive_posture_ok = 0
+        # Frames consecutivos con el guard del estado cumplido (se resetea en cada transición)
+        self._consecutive_ok = 0
         self._last_confidence: float = 0.0
         
         # 🔊 TTS: Tracking del último countdown hablado (para no repetir)
@@ -241,6 +481,20 @@ class AnalysisSession:
         # 🦵 Modo bilateral secuencial: Suprimir TTS hasta resultado final
         self.suppress_tts_result: bool = False
         
+        # 🔊 TTS: Cues de audio para el navegador publicados desde esta secuencia
+        self._audio_cue_start: int = 0
+        
+        # Tabla de transiciones precompilada (compartida entre sesiones del mismo ejercicio)
+        self._transition_table = compile_transition_table(joint_type, movement_type, required_orientation)
+        
+        # Resultado por frame reutilizado (evita construir un dict nuevo en cada frame)
+        self._frame_result = FrameResult()
+        
+        # El loop de inferencia y los endpoints HTTP acceden desde hilos distintos
+        self._lock = threading.RLock()
+        self._last_push_time: Optional[float] = None
+        self._frames_pushed = 0
+        
         # Callbacks (opcionales)
         self._on_state_change: Optional[Callable[[AnalysisState, str], None]] = None
         self._on_countdown: Optional[Callable[[int], None]] = None
@@ -271,6 +525,14 @@ class AnalysisSession:
         """Indica si hay una sesión activa."""
         return self._state not in (AnalysisState.IDLE, AnalysisState.COMPLETED, AnalysisState.ERROR)
     
+    @property
+    def is_server_fed(self) -> bool:
+        """Indica si el loop de inferencia del servidor está empujando frames."""
+        return (
+            self._last_push_time is not None
+            and time.time() - self._last_push_time < self.SERVER_FEED_TIMEOUT
+        )
+    
     def set_callbacks(
         self,
         on_state_change: Optional[Callable[[AnalysisState, str], None]] = None,
@@ -285,7 +547,9 @@ class AnalysisSession:
     def update_bilateral_data(self, left_angle: float, right_angle: float):
         """
         Actualiza los datos de ROM bilateral (para análisis frontal).
-        Ahora usa calculadores de estadísticas para percentil 95.
+        
+        Los ángulos quedan pendientes y se agregan al motor multicanal en la
+        misma fila que el ángulo principal durante el siguiente process_frame.
         
         Args:
             left_angle: Ángulo ACTUAL del lado izquierdo (no el máximo)
@@ -293,11 +557,11 @@ class AnalysisSession:
         """
         self._is_bilateral = True
         
-        # Agregar a calculadores de estadísticas (para percentil 95)
-        if left_angle > 0:
-            self._left_rom_calculator.add_measurement(left_angle)
-        if right_angle > 0:
-            self._right_rom_calculator.add_measurement(right_angle)
+        # Solo ángulos positivos cuentan como muestra (para percentil 95)
+        self._pending_bilateral = (
+            left_angle if left_angle > 0 else None,
+            right_angle if right_angle > 0 else None
+        )
         
         # Mantener tracking del máximo instantáneo (para display en tiempo real)
         if left_angle > self._left_max_rom:
@@ -330,6 +594,7 @@ class AnalysisSession:
         self._state = new_state
         self._state_start_time = time.time()
         self._state_progress = 0.0
+        self._consecutive_ok = 0
         
         # Reset de variables de countdown cuando se entra al estado COUNTDOWN
         if new_state == AnalysisState.COUNTDOWN:
@@ -459,19 +724,20 @@ class AnalysisSession:
             print(f"\n🔊 [_speak_result] rom={rom_value}, class={classification}, left={left_rom}, right={right_rom}, bilateral={self._is_bilateral}")
             
             # Para bilateral, decir ambos valores
+            # (fragmentos del banco de frases: no requiere síntesis en el momento)
             if left_rom is not None and right_rom is not None:
-                message = TTSMessages.completed_result(
+                fragments = TTSMessages.completed_result_fragments(
                     rom_value, 
                     classification,
                     left_rom=left_rom,
                     right_rom=right_rom
                 )
-                print(f"🔊 [_speak_result] Mensaje bilateral: {message}")
+                print(f"🔊 [_speak_result] Mensaje bilateral: {' '.join(fragments)}")
             else:
-                message = TTSMessages.completed_result(rom_value, classification)
-                print(f"🔊 [_speak_result] Mensaje unilateral: {message}")
+                fragments = TTSMessages.completed_result_fragments(rom_value, classification)
+                print(f"🔊 [_speak_result] Mensaje unilateral: {' '.join(fragments)}")
             
-            tts.speak(message)
+            tts.speak(fragments)
         except Exception as e:
             logger.warning(f"[TTS] Error en resultado: {e}")
             print(f"🔊 [_speak_result] ERROR: {e}")
@@ -485,18 +751,9 @@ class AnalysisSession:
             logger.warning(f"[TTS] Error en plateau: {e}")
     
     def _update_state_message(self):
-        """Actualiza el mensaje según el estado actual."""
-        messages = {
-            AnalysisState.IDLE: "Sesión no iniciada",
-            AnalysisState.DETECTING_PERSON: "Buscando persona...",
-            AnalysisState.CHECKING_ORIENTATION: f"Posiciónese de {self.required_orientation}",
-            AnalysisState.CHECKING_POSTURE: "Ajuste su postura",
-            AnalysisState.COUNTDOWN: "Comenzamos en...",
-            AnalysisState.ANALYZING: "Capturando movimiento...",
-            AnalysisState.COMPLETED: "Análisis completado",
-            AnalysisState.ERROR: "Error en el análisis"
-        }
-        self._state_message = messages.get(self._state, "Estado desconocido")
+        """Actualiza el mensaje según el estado actual (precompilado en la tabla)."""
+        spec = self._transition_table.get(self._state)
+        self._state_message = spec.message if spec else "Estado desconocido"
     
     def start(self) -> bool:
         """
@@ -505,16 +762,22 @@ class AnalysisSession:
         Returns:
             True si se inició correctamente
         """
-        if self._state != AnalysisState.IDLE:
-            return False
-        
-        self._session_start_time = time.time()
-        self._detection_retries = 0
-        self._rom_calculator.reset()
-        self._result = None
-        
-        self._transition_to(AnalysisState.DETECTING_PERSON, "Sesión iniciada")
-        return True
+        with self._lock:
+            if self._state != AnalysisState.IDLE:
+                return False
+            
+            self._session_start_time = time.time()
+            self._detection_retries = 0
+            try:
+                self._audio_cue_start = get_tts_service().cue_seq
+            except Exception as e:
+                logger.warning(f"[TTS] Error obteniendo secuencia de cues: {e}")
+            self._rom_stats.reset()
+            self._sample_landmarks = {}
+            self._result = None
+            
+            self._transition_to(AnalysisState.DETECTING_PERSON, "Sesión iniciada")
+            return True
     
     def stop(self) -> Dict[str, Any]:
         """
@@ -523,19 +786,102 @@ class AnalysisSession:
         Returns:
             Diccionario con información del estado final
         """
-        final_state = self._state
+        with self._lock:
+            final_state = self._state
+            
+            if self._state == AnalysisState.ANALYZING:
+                # Si estábamos analizando, intentar generar resultado parcial
+                self._try_generate_partial_result()
+            
+            self._transition_to(AnalysisState.IDLE, "Sesión detenida por usuario")
+            
+            return {
+                'stopped_from_state': final_state.name,
+                'session_duration': time.time() - self._session_start_time if self._session_start_time else 0,
+                'result': self._result.to_dict() if self._result else None
+            }
+    
+    def push_frame(self, frame: AnalysisFrame) -> 'FrameResult':
+        """
+        Empuja un frame del loop de inferencia y avanza la máquina de estados.
         
-        if self._state == AnalysisState.ANALYZING:
-            # Si estábamos analizando, intentar generar resultado parcial
-            self._try_generate_partial_result()
+        Punto de entrada del servidor: se llama una vez por frame procesado por
+        el analyzer, de modo que las muestras de ROM llegan a la tasa de la cámara.
         
-        self._transition_to(AnalysisState.IDLE, "Sesión detenida por usuario")
+        Args:
+            frame: Datos normalizados del frame
         
-        return {
-            'stopped_from_state': final_state.name,
-            'session_duration': time.time() - self._session_start_time if self._session_start_time else 0,
-            'result': self._result.to_dict() if self._result else None
-        }
+        Returns:
+            FrameResult reutilizado por la sesión
+        """
+        with self._lock:
+            self._last_push_time = frame.timestamp
+            self._frames_pushed += 1
+            
+            # Actualizar datos bilaterales si es frontal (usar ángulos ACTUALES, no máximos)
+            if self._state == AnalysisState.ANALYZING:
+                if frame.left_angle is not None and frame.right_angle is not None:
+                    self.update_bilateral_data(frame.left_angle, frame.right_angle)
+                self._pending_compensation = frame.compensation
+                self._pending_compensating = frame.compensating or CompensationDetector.is_compensating(
+                    frame.compensation, self._compensation_thresholds
+                )
+                self._pending_weights = self._sample_weights(frame)
+                self._pending_landmarks = frame.landmarks
+            
+            return self.process_frame(
+                landmarks=True if frame.landmarks_detected else None,
+                current_angle=frame.angle,
+                detected_orientation=frame.orientation,
+                confidence=frame.confidence,
+                side=frame.side
+            )
+    
+    def get_measurement_series(self) -> List[Tuple[float, int, float, float, Optional[np.ndarray]]]:
+        """
+        Mediciones frame a frame del canal principal para persistirlas.
+        
+        Returns:
+            Filas (timestamp, frame_number, angle, confidence, landmarks)
+            (confidence = peso de la muestra; landmarks = array (33, 4) del
+            frame o None), listas para DatabaseManager.add_angle_measurements()
+        """
+        with self._lock:
+            timestamps, rows, angles, weights = self._rom_stats.channel_series('primary')
+            landmarks = self._sample_landmarks
+            return [
+                (float(t), int(row), float(angle), float(weight), landmarks.get(int(row)))
+                for t, row, angle, weight in zip(timestamps, rows, angles, weights)
+            ]
+    
+    def _sample_weights(self, frame: AnalysisFrame) -> Optional[Tuple[float, float, float]]:
+        """
+        Pesos de las muestras de ángulo (principal, izquierdo, derecho).
+        
+        El peso de cada lado es la visibilidad mínima de los landmarks que
+        definen el ángulo; frames con landmarks ocluidos quedan por debajo de
+        `min_sample_weight` y no se admiten en el motor de estadísticas.
+        
+        Returns:
+            Tupla de pesos o None si el frame no trae visibilidad (peso 1.0)
+        """
+        joint_landmarks = self.JOINT_LANDMARKS.get(self.joint_type)
+        if frame.visibility is None or joint_landmarks is None:
+            return None
+        
+        left_weight = float(frame.visibility[list(joint_landmarks[0])].min())
+        right_weight = float(frame.visibility[list(joint_landmarks[1])].min())
+        
+        if frame.side == 'left':
+            primary_weight = left_weight
+        elif frame.side == 'right':
+            primary_weight = right_weight
+        elif frame.side == 'bilateral':
+            primary_weight = min(left_weight, right_weight)
+        else:
+            primary_weight = max(left_weight, right_weight)
+        
+        return (primary_weight, left_weight, right_weight)
     
     def process_frame(
         self,
@@ -544,13 +890,16 @@ class AnalysisSession:
         detected_orientation: Optional[str] = None,
         confidence: float = 0.0,
         side: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> 'FrameResult':
         """
         Procesa un frame y avanza la máquina de estados.
         
         Este método debe ser llamado por cada frame capturado.
         NO crea hilos - es síncrono y debe ser llamado desde el loop principal.
         
+        El despacho se hace contra la tabla de transiciones precompilada para
+        (joint, movement, orientation); no hay cadena if/elif por estado.
+        
         Args:
             landmarks: Landmarks de MediaPipe (True/False o objeto)
             current_angle: Ángulo actual medido (si aplica)
@@ -559,232 +908,140 @@ class AnalysisSession:
             side: Lado detectado ('left', 'right', o 'bilateral')
         
         Returns:
-            Diccionario con estado actual y datos relevantes
+            FrameResult reutilizado por la sesión (usar .to_dict() para serializar;
+            su contenido se sobrescribe en el siguiente frame)
         """
-        # Guardar confianza
-        self._last_confidence = confidence
-        
-        # Actualizar lado detectado (si se proporciona y es válido)
-        if side and side in ('left', 'right', 'bilateral'):
-            self._detected_side = side
-        
-        result = {
-            'state': self._state.name,
-            'message': self._state_message,
-            'progress': self._state_progress,
-            'can_proceed': False
-        }
-        
-        if self._state == AnalysisState.IDLE:
-            return result
-        
-        # Procesar según estado actual
-        if self._state == AnalysisState.DETECTING_PERSON:
-            result = self._process_detecting_person(landmarks, confidence)
+        with self._lock:
+            # Guardar confianza
+            self._last_confidence = confidence
             
-        elif self._state == AnalysisState.CHECKING_ORIENTATION:
-            result = self._process_checking_orientation(landmarks, detected_orientation, confidence)
+            # Actualizar lado detectado (si se proporciona y es válido)
+            if side and side in ('left', 'right', 'bilateral'):
+                self._detected_side = side
             
-        elif self._state == AnalysisState.CHECKING_POSTURE:
-            result = self._process_checking_posture(landmarks, confidence)
+            spec = self._transition_table[self._state]
             
-        elif self._state == AnalysisState.COUNTDOWN:
-            result = self._process_countdown(landmarks)
+            # Estados terminales (IDLE, COMPLETED, ERROR): solo reportar estado
+            if spec.handler is None:
+                return self._frame_result.reset(self._state.name, self._state_message, self._state_progress)
             
-        elif self._state == AnalysisState.ANALYZING:
-            result = self._process_analyzing(landmarks, current_angle)
-        
-        return result
+            return spec.handler(self, spec, landmarks, current_angle, detected_orientation, confidence)
     
-    def _process_detecting_person(self, landmarks: Any, confidence: float = 0.0) -> Dict[str, Any]:
-        """Procesa el estado DETECTING_PERSON."""
-        elapsed = time.time() - self._state_start_time if self._state_start_time else 0
+    def _process_hold(
+        self,
+        spec: 'StateSpec',
+        landmarks: Any,
+        current_angle: Optional[float],
+        detected_orientation: Optional[str],
+        confidence: float
+    ) -> 'FrameResult':
+        """
+        Procesa un estado de verificación con permanencia.
         
-        # Verificar detección válida (landmarks + confianza mínima)
-        detection_valid = landmarks is not None and landmarks and confidence >= self.MIN_CONFIDENCE
+        Usado por DETECTING_PERSON, CHECKING_ORIENTATION y CHECKING_POSTURE:
+        el guard del estado debe cumplirse durante `frames_required` frames
+        consecutivos Y al menos `min_dwell` segundos para avanzar.
+        """
+        elapsed = time.time() - self._state_start_time if self._state_start_time else 0
+        out = self._frame_result
         
-        if detection_valid:
-            self._consecutive_detections += 1
-            
-            # Calcular progreso basado en tiempo Y frames consecutivos
-            time_progress = elapsed / self.MIN_DETECTING_TIME
-            frames_required = 4  # Mínimo 4 frames consecutivos (~2 segundos a 2Hz de polling)
-            frames_progress = self._consecutive_detections / frames_required
+        if spec.guard(landmarks, detected_orientation, confidence):
+            self._consecutive_ok += 1
             
             # Ambos deben cumplirse
-            if elapsed >= self.MIN_DETECTING_TIME and self._consecutive_detections >= frames_required:
-                self._detection_retries = 0
-                self._consecutive_detections = 0  # Reset para siguiente estado
-                self._transition_to(AnalysisState.CHECKING_ORIENTATION, "Persona detectada")
-                return {
-                    'state': self._state.name,
-                    'message': self._state_message,
-                    'progress': 1.0,
-                    'can_proceed': True
-                }
+            if elapsed >= spec.min_dwell and self._consecutive_ok >= spec.frames_required:
+                self._transition_to(spec.next_state, spec.pass_reason)
+                out.reset(self._state.name, spec.pass_message or self._state_message, 1.0, True)
             else:
-                # Persona detectada pero esperando estabilidad
-                progress = min(time_progress, frames_progress)
-                return {
-                    'state': self._state.name,
-                    'message': f"Persona detectada, verificando... ({self._consecutive_detections}/{frames_required})",
-                    'progress': progress,
-                    'can_proceed': False,
-                    'confidence': confidence
-                }
-        else:
-            # No hay detección válida - resetear contador consecutivo
-            self._consecutive_detections = 0
-            self._state_message = "Buscando persona... Asegúrese de estar visible"
-            
-            # 🔊 TTS: Repetir recordatorio cada X segundos si no detecta persona
-            current_time = time.time()
-            if current_time - self._last_detection_reminder >= self._detection_reminder_interval:
-                self._last_detection_reminder = current_time
-                try:
-                    tts = get_tts_service()
-                    tts.speak(TTSMessages.DETECTING_RETRY)
-                except Exception as e:
-                    logger.warning(f"[TTS] Error en recordatorio detección: {e}")
+                time_progress = elapsed / spec.min_dwell if spec.min_dwell > 0 else 1.0
+                frames_progress = self._consecutive_ok / spec.frames_required
+                out.reset(
+                    self._state.name,
+                    spec.pending_message.format(count=self._consecutive_ok, required=spec.frames_required),
+                    min(time_progress, frames_progress)
+                )
             
-            return {
-                'state': self._state.name,
-                'message': self._state_message,
-                'progress': 0.0,
-                'can_proceed': False,
-                'confidence': confidence
-            }
-
+            if spec.echo_confidence:
+                out.confidence = confidence
+            if spec.echo_orientation:
+                out.orientation = detected_orientation
+            return out
+        
+        # Guard no cumplido - resetear contador consecutivo
+        self._consecutive_ok = 0
+        
+        if spec.timeout is not None and elapsed > spec.timeout:
+            self._transition_to(spec.timeout_state, spec.timeout_reason)
+            out.reset(self._state.name, "Tiempo agotado. Por favor reintente.", 0.0)
+            out.error = spec.timeout_error
+            return out
+        
+        return spec.on_fail(self, spec, elapsed, landmarks, detected_orientation, confidence)
     
-    def _process_checking_orientation(
+    def _fail_detecting_person(
         self,
+        spec: 'StateSpec',
+        elapsed: float,
         landmarks: Any,
         detected_orientation: Optional[str],
-        confidence: float = 0.0
-    ) -> Dict[str, Any]:
-        """Procesa el estado CHECKING_ORIENTATION."""
-        elapsed = time.time() - self._state_start_time if self._state_start_time else 0
-        frames_required = 4  # Mínimo 4 frames consecutivos con orientación correcta
+        confidence: float
+    ) -> 'FrameResult':
+        """Sin detección válida en DETECTING_PERSON."""
+        self._state_message = spec.retry_message
+        
+        # 🔊 TTS: Repetir recordatorio cada X segundos si no detecta persona
+        current_time = time.time()
+        if current_time - self._last_detection_reminder >= self._detection_reminder_interval:
+            self._last_detection_reminder = current_time
+            try:
+                tts = get_tts_service()
+                tts.speak(TTSMessages.DETECTING_RETRY)
+            except Exception as e:
+                logger.warning(f"[TTS] Error en recordatorio detección: {e}")
         
-        # Si no hay orientación detectada, resetear contador
+        out = self._frame_result.reset(self._state.name, self._state_message, 0.0)
+        out.confidence = confidence
+        return out
+    
+    def _fail_checking_orientation(
+        self,
+        spec: 'StateSpec',
+        elapsed: float,
+        landmarks: Any,
+        detected_orientation: Optional[str],
+        confidence: float
+    ) -> 'FrameResult':
+        """Orientación ausente o incorrecta en CHECKING_ORIENTATION."""
+        # Sin orientación detectada
         if detected_orientation is None or not landmarks:
-            self._consecutive_orientation_ok = 0
-            return {
-                'state': self._state.name,
-                'message': f"Posiciónese de {self.required_orientation}",
-                'progress': 0.0,
-                'can_proceed': False
-            }
-        
-        # Verificar si la orientación coincide con la requerida
-        orientation_matches = detected_orientation.lower() == self.required_orientation.lower()
+            return self._frame_result.reset(self._state.name, spec.message, 0.0)
         
-        if orientation_matches and confidence >= self.MIN_CONFIDENCE:
-            self._consecutive_orientation_ok += 1
-            
-            # Calcular progreso
-            time_progress = elapsed / self.MIN_ORIENTATION_TIME
-            frames_progress = self._consecutive_orientation_ok / frames_required
-            
-            # Ambos deben cumplirse
-            if elapsed >= self.MIN_ORIENTATION_TIME and self._consecutive_orientation_ok >= frames_required:
-                self._consecutive_orientation_ok = 0  # Reset para siguiente estado
-                self._transition_to(AnalysisState.CHECKING_POSTURE, "Orientación correcta")
-                return {
-                    'state': self._state.name,
-                    'message': "Orientación correcta",
-                    'progress': 1.0,
-                    'can_proceed': True,
-                    'orientation': detected_orientation
-                }
-            else:
-                progress = min(time_progress, frames_progress)
-                return {
-                    'state': self._state.name,
-                    'message': f"Orientación correcta, mantenga posición... ({self._consecutive_orientation_ok}/{frames_required})",
-                    'progress': progress,
-                    'can_proceed': False,
-                    'orientation': detected_orientation
-                }
-        else:
-            # Orientación incorrecta - resetear contador
-            self._consecutive_orientation_ok = 0
-            
-            if self.required_orientation == "profile":
-                instruction = "Gire hacia un lado para quedar de perfil"
-            else:
-                instruction = "Gire hacia la cámara para quedar de frente"
-        
-            return {
-                'state': self._state.name,
-                'message': instruction,
-                'progress': 0.3,
-                'can_proceed': False,
-                'current_orientation': detected_orientation,
-                'required_orientation': self.required_orientation
-            }
+        # Orientación incorrecta
+        out = self._frame_result.reset(self._state.name, spec.retry_message, 0.3)
+        out.current_orientation = detected_orientation
+        out.required_orientation = self.required_orientation
+        return out
     
-    def _process_checking_posture(self, landmarks: Any, confidence: float = 0.0) -> Dict[str, Any]:
-        """
-        Procesa el estado CHECKING_POSTURE.
-        
-        Verifica que tengamos landmarks estables antes de iniciar el countdown.
-        """
-        elapsed = time.time() - self._state_start_time if self._state_start_time else 0
-        frames_required = 3  # Mínimo 3 frames consecutivos con postura correcta
-        
-        # Verificar postura válida
-        posture_valid = landmarks and confidence >= self.MIN_CONFIDENCE
-        
-        if posture_valid:
-            self._consecutive_posture_ok += 1
-            
-            # Calcular progreso
-            time_progress = elapsed / self.MIN_POSTURE_TIME
-            frames_progress = self._consecutive_posture_ok / frames_required
-            
-            # Ambos deben cumplirse
-            if elapsed >= self.MIN_POSTURE_TIME and self._consecutive_posture_ok >= frames_required:
-                self._consecutive_posture_ok = 0  # Reset
-                self._transition_to(AnalysisState.COUNTDOWN, "Postura correcta")
-                return {
-                    'state': self._state.name,
-                    'message': "Postura correcta - Prepárese",
-                    'progress': 1.0,
-                    'can_proceed': True
-                }
-            else:
-                progress = min(time_progress, frames_progress)
-                return {
-                    'state': self._state.name,
-                    'message': f"Verificando postura... ({self._consecutive_posture_ok}/{frames_required})",
-                    'progress': progress,
-                    'can_proceed': False
-                }
-        else:
-            # Postura no válida - resetear contador
-            self._consecutive_posture_ok = 0
-        
-        # Timeout de postura
-        if elapsed > self.POSTURE_TIMEOUT:
-            self._transition_to(AnalysisState.ERROR, "Timeout de postura")
-            return {
-                'state': self._state.name,
-                'message': "Tiempo agotado. Por favor reintente.",
-                'progress': 0.0,
-                'can_proceed': False,
-                'error': 'posture_timeout'
-            }
-        
-        # Sin postura válida - esperar
-        return {
-            'state': self._state.name,
-            'message': "Mantenga la posición...",
-            'progress': min(elapsed / self.POSTURE_TIMEOUT, 0.9),
-            'can_proceed': False
-        }
+    def _fail_checking_posture(
+        self,
+        spec: 'StateSpec',
+        elapsed: float,
+        landmarks: Any,
+        detected_orientation: Optional[str],
+        confidence: float
+    ) -> 'FrameResult':
+        """Postura no válida en CHECKING_POSTURE (antes del timeout)."""
+        progress = min(elapsed / spec.timeout, 0.9) if spec.timeout else 0.0
+        return self._frame_result.reset(self._state.name, spec.retry_message, progress)
     
-    def _process_countdown(self, landmarks: Any) -> Dict[str, Any]:
+    def _process_countdown(
+        self,
+        spec: 'StateSpec',
+        landmarks: Any,
+        current_angle: Optional[float],
+        detected_orientation: Optional[str],
+        confidence: float
+    ) -> 'FrameResult':
         """
         Procesa el estado COUNTDOWN.
         
@@ -793,6 +1050,7 @@ class AnalysisSession:
         2. PHASE 'waiting': Esperar a que termine la instrucción (visual sigue en "3")
         3. PHASE 'counting': Countdown 3 → 2 → 1 sincronizado voz + visual
         """
+        out = self._frame_result
         
         # === FASE 1: INSTRUCTION - Decir la instrucción (una sola vez) ===
         if self._countdown_phase == 'instruction':
@@ -815,14 +1073,10 @@ class AnalysisSession:
             self._current_countdown_value = 3  # Visual siempre en 3 durante instrucción
             print(f"🔊 [COUNTDOWN] Transición a FASE 2: waiting")
             
-            return {
-                'state': self._state.name,
-                'message': "Escucha la instrucción...",
-                'progress': 0.0,
-                'can_proceed': False,
-                'countdown': 3,
-                'phase': 'instruction'
-            }
+            out.reset(self._state.name, "Escucha la instrucción...", 0.0)
+            out.countdown = 3
+            out.phase = 'instruction'
+            return out
         
         # === FASE 2: WAITING - Esperar a que termine la instrucción ===
         if self._countdown_phase == 'waiting':
@@ -836,21 +1090,17 @@ class AnalysisSession:
                 tts_busy = False
             
             time_since_instruction = time.time() - self._instruction_start_time
-            min_instruction_time = 4.0  # Mínimo 4 segundos para la instrucción
+            min_instruction_time = spec.min_dwell  # Mínimo para la instrucción
             
             # Esperar hasta que: (TTS no esté hablando) Y (haya pasado tiempo mínimo)
             if tts_busy or time_since_instruction < min_instruction_time:
-                wait_progress = min(time_since_instruction / min_instruction_time, 0.95)
-                print(f"🔊 [COUNTDOWN] FASE 2 ESPERANDO: time={time_since_instruction:.1f}s, min={min_instruction_time}s, tts_busy={tts_busy}")
+                wait_progress = min(time_since_instruction / min_instruction_time, 0.95) if min_instruction_time > 0 else 0.95
+                logger.debug(f"[COUNTDOWN] FASE 2 ESPERANDO: time={time_since_instruction:.1f}s, min={min_instruction_time}s, tts_busy={tts_busy}")
                 self._current_countdown_value = 3  # Visual siempre en 3 durante espera
-                return {
-                    'state': self._state.name,
-                    'message': "Prepárate...",
-                    'progress': wait_progress * 0.2,
-                    'can_proceed': False,
-                    'countdown': 3,
-                    'phase': 'waiting_instruction'
-                }
+                out.reset(self._state.name, "Prepárate...", wait_progress * 0.2)
+                out.countdown = 3
+                out.phase = 'waiting_instruction'
+                return out
             
             # Condiciones cumplidas -> pasar a counting
             self._countdown_phase = 'counting'
@@ -877,28 +1127,20 @@ class AnalysisSession:
                 self._current_countdown_value = 3
                 self._speak_countdown(3)
                 print(f"🔊 [COUNTDOWN] >>> DICIENDO: 3 <<<")
-                return {
-                    'state': self._state.name,
-                    'message': "Comenzamos en... 3",
-                    'progress': 0.3,
-                    'can_proceed': False,
-                    'countdown': 3,
-                    'phase': 'countdown'
-                }
+                out.reset(self._state.name, "Comenzamos en... 3", 0.3)
+                out.countdown = 3
+                out.phase = 'countdown'
+                return out
             
             # Si TTS está ocupado, mantener el número actual
             if tts_busy:
-                print(f"🔊 [COUNTDOWN] Esperando TTS... mostrando {current_display}")
+                logger.debug(f"[COUNTDOWN] Esperando TTS... mostrando {current_display}")
                 self._current_countdown_value = current_display
                 progress = 0.2 + ((4 - current_display) / 3.0) * 0.6
-                return {
-                    'state': self._state.name,
-                    'message': f"Prepárese... {current_display}",
-                    'progress': progress,
-                    'can_proceed': False,
-                    'countdown': current_display,
-                    'phase': 'countdown'
-                }
+                out.reset(self._state.name, f"Prepárese... {current_display}", progress)
+                out.countdown = current_display
+                out.phase = 'countdown'
+                return out
             
             # TTS libre - pasar al siguiente número
             next_number = self._last_spoken_countdown - 1
@@ -911,14 +1153,10 @@ class AnalysisSession:
                 self._speak_countdown(next_number)
                 print(f"🔊 [COUNTDOWN] >>> DICIENDO: {next_number} <<<")
                 progress = 0.2 + ((4 - next_number) / 3.0) * 0.6
-                return {
-                    'state': self._state.name,
-                    'message': f"Prepárese... {next_number}",
-                    'progress': progress,
-                    'can_proceed': False,
-                    'countdown': next_number,
-                    'phase': 'countdown'
-                }
+                out.reset(self._state.name, f"Prepárese... {next_number}", progress)
+                out.countdown = next_number
+                out.phase = 'countdown'
+                return out
             else:
                 # Countdown terminado (next_number = 0)
                 print(f"🔊 [COUNTDOWN] ====== COUNTDOWN TERMINADO ======")
@@ -931,118 +1169,135 @@ class AnalysisSession:
                 self._countdown_start_time = None
                 self._countdown_phase = 'instruction'
                 
-                # Resetear calculadores
-                self._rom_calculator.reset()
-                self._left_rom_calculator.reset()
-                self._right_rom_calculator.reset()
+                # Resetear estadísticas
+                self._rom_stats.reset()
+                self._sample_landmarks = {}
+                self._pending_bilateral = (None, None)
+                self._pending_compensation = None
+                self._pending_compensating = False
+                self._pending_weights = None
+                self._pending_landmarks = None
+                self._rejected_samples = 0
                 self._left_max_rom = 0.0
                 self._right_max_rom = 0.0
                 
-                self._transition_to(AnalysisState.ANALYZING, "Cuenta regresiva completada")
-                return {
-                    'state': self._state.name,
-                    'message': "¡Comenzando análisis!",
-                    'progress': 1.0,
-                    'can_proceed': True,
-                    'countdown': 0,
-                    'phase': 'done'
-                }
+                self._transition_to(spec.next_state, spec.pass_reason)
+                out.reset(self._state.name, "¡Comenzando análisis!", 1.0, True)
+                out.countdown = 0
+                out.phase = 'done'
+                return out
         
         # Fallback (no debería llegar aquí)
         self._current_countdown_value = 3
-        return {
-            'state': self._state.name,
-            'message': "Preparando...",
-            'progress': 0.0,
-            'can_proceed': False,
-            'countdown': 3,
-            'phase': 'unknown'
-        }
+        out.reset(self._state.name, "Preparando...", 0.0)
+        out.countdown = 3
+        out.phase = 'unknown'
+        return out
     
     def _process_analyzing(
         self,
+        spec: 'StateSpec',
         landmarks: Any,
-        current_angle: Optional[float]
-    ) -> Dict[str, Any]:
+        current_angle: Optional[float],
+        detected_orientation: Optional[str],
+        confidence: float
+    ) -> 'FrameResult':
         """Procesa el estado ANALYZING."""
         elapsed = time.time() - self._analysis_start_time if self._analysis_start_time else 0
-        progress = min(elapsed / self.ANALYSIS_DURATION, 1.0)
+        progress = min(elapsed / spec.timeout, 1.0) if spec.timeout > 0 else 1.0
         self._state_progress = progress
+        out = self._frame_result
         
         # Callback de progreso
         if self._on_progress:
             self._on_progress(progress)
         
-        # Agregar medición si hay ángulo
-        if current_angle is not None:
+        # Agregar medición (principal + bilateral + compensaciones en una sola fila)
+        left_angle, right_angle = self._pending_bilateral
+        compensation = self._pending_compensation
+        compensating = self._pending_compensating
+        weights = self._pending_weights
+        landmarks = self._pending_landmarks
+        self._pending_bilateral = (None, None)
+        self._pending_compensation = None
+        self._pending_compensating = False
+        self._pending_weights = None
+        self._pending_landmarks = None
+        
+        angles = (current_angle, left_angle, right_angle)
+        if compensating and any(a is not None for a in angles):
+            # Muestra inválida: el paciente compensa, no entra al percentil 95
+            self._rejected_samples += 1
+            angles = (None, None, None)
+        elif current_angle is not None:
             self._last_angle = current_angle
-            self._rom_calculator.add_measurement(current_angle)
+        
+        if compensation is None:
+            compensation = (None,) * len(CompensationDetector.CHANNELS)
+        row = angles + tuple(compensation)
+        if any(v is not None and v == v for v in row):
+            if landmarks is not None and angles[0] is not None:
+                self._sample_landmarks[self._rom_stats.sample_count] = landmarks
+            # Canales de compensación con peso 1.0 (su visibilidad ya se validó al medirlos)
+            self._rom_stats.add_sample(row, weights=weights)
         
         # Verificar si completamos el análisis
-        if elapsed >= self.ANALYSIS_DURATION:
+        if elapsed >= spec.timeout:
             self._generate_result()
-            self._transition_to(AnalysisState.COMPLETED, "Análisis completado")
-            return {
-                'state': self._state.name,
-                'message': "Análisis completado",
-                'progress': 1.0,
-                'can_proceed': True,
-                'result': self._result.to_dict() if self._result else None
-            }
+            self._transition_to(spec.timeout_state, spec.timeout_reason)
+            out.reset(self._state.name, "Análisis completado", 1.0, True)
+            out.result = self._result.to_dict() if self._result else None
+            return out
         
         # Verificar plateau (podemos terminar antes si hay plateau estable)
         # Para perfil: verificar calculador principal
         # Para frontal: verificar AMBOS calculadores bilaterales
-        plateau_detected = False
+        rom_stats = self._rom_stats
         
         if self._is_bilateral:
-            # Frontal: ambos lados deben estar estables
-            left_plateau = self._left_rom_calculator.detect_plateau()
-            right_plateau = self._right_rom_calculator.detect_plateau()
-            left_samples = len(self._left_rom_calculator._measurements)
-            right_samples = len(self._right_rom_calculator._measurements)
-            
-            # Plateau bilateral: ambos estables Y suficientes muestras en cada uno
-            if left_plateau and right_plateau and left_samples >= 5 and right_samples >= 5:
-                plateau_detected = True
+            # Frontal: ambos lados deben estar estables Y suficientes muestras en cada uno
+            plateau_detected = (
+                rom_stats.is_plateau_detected('left')
+                and rom_stats.is_plateau_detected('right')
+                and rom_stats.channel_count('left') >= spec.min_bilateral_samples
+                and rom_stats.channel_count('right') >= spec.min_bilateral_samples
+            )
         else:
-            # Perfil: solo calculador principal
-            if self._rom_calculator.detect_plateau():
-                samples = len(self._rom_calculator._measurements)
-                if samples >= self.MIN_SAMPLES_REQUIRED:
-                    plateau_detected = True
+            # Perfil: solo canal principal
+            plateau_detected = (
+                rom_stats.is_plateau_detected('primary')
+                and rom_stats.channel_count('primary') >= spec.min_samples
+            )
         
         if plateau_detected:
             self._generate_result()
-            self._transition_to(AnalysisState.COMPLETED, "Plateau detectado")
-            return {
-                'state': self._state.name,
-                'message': "Medición estabilizada",
-                'progress': 1.0,
-                'can_proceed': True,
-                'result': self._result.to_dict() if self._result else None,
-                'early_completion': True
-            }
+            self._transition_to(spec.next_state, spec.pass_reason)
+            out.reset(self._state.name, spec.pass_message, 1.0, True)
+            out.result = self._result.to_dict() if self._result else None
+            out.early_completion = True
+            return out
         
         # Mostrar ángulo actual
         angle_display = f"{current_angle:.1f}°" if current_angle else "---"
         
-        return {
-            'state': self._state.name,
-            'message': f"Capturando... {angle_display}",
-            'progress': progress,
-            'can_proceed': False,
-            'current_angle': current_angle,
-            'samples_collected': len(self._rom_calculator._measurements),
-            'time_remaining': self.ANALYSIS_DURATION - elapsed
-        }
+        if compensating:
+            out.reset(self._state.name, "Mantén el tronco recto", progress)
+        else:
+            out.reset(self._state.name, f"Capturando... {angle_display}", progress)
+        out.compensating = compensating
+        out.current_angle = current_angle
+        out.samples_collected = rom_stats.channel_count('primary')
+        out.time_remaining = spec.timeout - elapsed
+        return out
     
     def _generate_result(self):
         """Genera el resultado final del análisis usando percentil 95."""
-        stats = self._rom_calculator.get_capture_window_stats()
+        # Todas las estadísticas (principal + bilateral) en una sola pasada
+        channel_stats = self._rom_stats.get_all_channel_stats()
+        stats = channel_stats['primary']
         
         # Log para debugging
-        logger.info(f"[GENERATE_RESULT] stats={stats}, last_angle={self._last_angle}, samples={len(self._rom_calculator._measurements)}")
+        logger.info(f"[GENERATE_RESULT] stats={stats}, last_angle={self._last_angle}, samples={self._rom_stats.channel_count('primary')}")
         logger.info(f"[GENERATE_RESULT] bilateral={self._is_bilateral}, left_max={self._left_max_rom}, right_max={self._right_max_rom}")
         
         # Si no hay stats pero tenemos un último ángulo, crear resultado mínimo
@@ -1066,8 +1321,8 @@ class AnalysisSession:
         final_right_rom = None
         
         if self._is_bilateral:
-            left_stats = self._left_rom_calculator.get_capture_window_stats()
-            right_stats = self._right_rom_calculator.get_capture_window_stats()
+            left_stats = channel_stats['left']
+            right_stats = channel_stats['right']
             
             logger.info(f"[GENERATE_RESULT] left_stats={left_stats}")
             logger.info(f"[GENERATE_RESULT] right_stats={right_stats}")
@@ -1123,7 +1378,12 @@ class AnalysisSession:
             # Datos bilaterales con percentil 95 (para frontal)
             left_max_rom=final_left_rom if self._is_bilateral else None,
             right_max_rom=final_right_rom if self._is_bilateral else None,
-            is_bilateral=self._is_bilateral
+            is_bilateral=self._is_bilateral,
+            compensations={
+                name: channel_stats[name]['percentile_95'] if channel_stats[name] else None
+                for name in CompensationDetector.CHANNELS
+            },
+            rejected_samples=self._rejected_samples + self._rom_stats.rejected_count('primary')
         )
         
         # 🔊 TTS: El resultado se anuncia desde _speak_state_message(COMPLETED)
@@ -1133,7 +1393,7 @@ class AnalysisSession:
     
     def _try_generate_partial_result(self):
         """Intenta generar un resultado parcial con los datos disponibles."""
-        stats = self._rom_calculator.get_capture_window_stats()
+        stats = self._rom_stats.get_channel_stats('primary')
         
         if stats and stats['samples'] >= 10:  # Mínimo para resultado parcial
             self._generate_result()
@@ -1145,24 +1405,239 @@ class AnalysisSession:
         Returns:
             Diccionario con estado completo
         """
-        # Usar el valor de countdown guardado por _process_countdown
-        countdown = None
-        if self._state == AnalysisState.COUNTDOWN:
-            countdown = self._current_countdown_value
-        
-        return {
-            'state': self._state.name,
-            'message': self._state_message,
-            'progress': self._state_progress,
-            'is_active': self.is_active,
-            'joint_type': self.joint_type,
-            'movement_type': self.movement_type,
-            'required_orientation': self.required_orientation,
-            'session_duration': time.time() - self._session_start_time if self._session_start_time else 0,
-            'transitions_count': len(self._transitions),
-            'countdown': countdown,
-            'result': self._result.to_dict() if self._result else None
+        with self._lock:
+            # Usar el valor de countdown guardado por _process_countdown
+            countdown = None
+            if self._state == AnalysisState.COUNTDOWN:
+                countdown = self._current_countdown_value
+            
+            return {
+                'state': self._state.name,
+                'message': self._state_message,
+                'progress': self._state_progress,
+                'is_active': self.is_active,
+                'joint_type': self.joint_type,
+                'movement_type': self.movement_type,
+                'required_orientation': self.required_orientation,
+                'session_duration': time.time() - self._session_start_time if self._session_start_time else 0,
+                'transitions_count': len(self._transitions),
+                'countdown': countdown,
+                'frames_processed': self._frames_pushed,
+                'samples_collected': self._rom_stats.channel_count('primary'),
+                'result': self._result.to_dict() if self._result else None,
+                # 🔊 Cues de audio de esta sesión (el navegador reproduce los de seq nuevo)
+                'audio_cues': self._get_audio_cues()
+            }
+    
+    def _get_audio_cues(self) -> list:
+        """Cues de audio publicados desde que inició la sesión."""
+        try:
+            return get_tts_service().get_cues(since=self._audio_cue_start)
+        except Exception as e:
+            logger.warning(f"[TTS] Error obteniendo cues: {e}")
+            return []
+
+
+# -----------------------------------------------------------------------------
+# Tabla de transiciones - compilada una vez por (joint, movement, orientation)
+# -----------------------------------------------------------------------------
+
+def _load_state_machine_overrides(joint_type: str, movement_type: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Lee los overrides de la máquina de estados desde exercises.json.
+    
+    Combina 'system_config.session_state_machine' (global) con la sección
+    'state_machine' del ejercicio, que tiene prioridad. Ejemplo:
+    
+        "state_machine": {
+            "CHECKING_POSTURE": {"frames_required": 5, "timeout": 15.0},
+            "ANALYZING": {"timeout": 12.0}
         }
+    
+    Returns:
+        {nombre_estado: {parámetro: valor}} (vacío si no hay overrides)
+    """
+    try:
+        with open(EXERCISES_CONFIG_PATH, 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"[STATE_MACHINE] No se pudo leer {EXERCISES_CONFIG_PATH}: {e}")
+        return {}
+    
+    overrides: Dict[str, Dict[str, Any]] = {}
+    for state_name, params in configs.get('system_config', {}).get('session_state_machine', {}).items():
+        overrides[state_name] = dict(params)
+    
+    segment_config = configs.get('segments', {}).get(joint_type) or {}
+    exercise_config = segment_config.get('exercises', {}).get(movement_type) or {}
+    for state_name, params in exercise_config.get('state_machine', {}).items():
+        overrides.setdefault(state_name, {}).update(params)
+    
+    return overrides
+
+
+@lru_cache(maxsize=None)
+def compile_transition_table(
+    joint_type: str,
+    movement_type: str,
+    required_orientation: str
+) -> Mapping[AnalysisState, StateSpec]:
+    """
+    Compila la tabla de transiciones para un ejercicio.
+    
+    Los valores por defecto salen de las constantes de AnalysisSession y se
+    pueden sobrescribir por ejercicio en exercises.json. El resultado se
+    cachea: todas las sesiones del mismo ejercicio comparten la tabla.
+    
+    Args:
+        joint_type: Tipo de articulación
+        movement_type: Tipo de movimiento
+        required_orientation: Orientación requerida ('frontal' o 'profile')
+    
+    Returns:
+        Mapeo inmutable {AnalysisState: StateSpec}
+    """
+    cls = AnalysisSession
+    
+    params = {
+        AnalysisState.DETECTING_PERSON: {
+            'frames_required': cls.DETECTING_FRAMES_REQUIRED,
+            'min_dwell': cls.MIN_DETECTING_TIME,
+            'min_confidence': cls.MIN_CONFIDENCE,
+        },
+        AnalysisState.CHECKING_ORIENTATION: {
+            'frames_required': cls.ORIENTATION_FRAMES_REQUIRED,
+            'min_dwell': cls.MIN_ORIENTATION_TIME,
+            'min_confidence': cls.MIN_CONFIDENCE,
+        },
+        AnalysisState.CHECKING_POSTURE: {
+            'frames_required': cls.POSTURE_FRAMES_REQUIRED,
+            'min_dwell': cls.MIN_POSTURE_TIME,
+            'timeout': cls.POSTURE_TIMEOUT,
+            'min_confidence': cls.MIN_CONFIDENCE,
+        },
+        AnalysisState.COUNTDOWN: {
+            'min_dwell': cls.MIN_INSTRUCTION_TIME,
+        },
+        AnalysisState.ANALYZING: {
+            'timeout': cls.ANALYSIS_DURATION,
+            'min_samples': cls.MIN_SAMPLES_REQUIRED,
+            'min_bilateral_samples': cls.MIN_BILATERAL_SAMPLES,
+        },
+    }
+    
+    for state_name, values in _load_state_machine_overrides(joint_type, movement_type).items():
+        state = AnalysisState.__members__.get(state_name)
+        if state not in params:
+            logger.warning(f"[STATE_MACHINE] Estado '{state_name}' no configurable, se ignora")
+            continue
+        for key, value in values.items():
+            if key in params[state]:
+                params[state][key] = value
+            else:
+                logger.warning(f"[STATE_MACHINE] Parámetro '{key}' desconocido para {state_name}, se ignora")
+    
+    detecting = params[AnalysisState.DETECTING_PERSON]
+    orientation = params[AnalysisState.CHECKING_ORIENTATION]
+    posture = params[AnalysisState.CHECKING_POSTURE]
+    countdown = params[AnalysisState.COUNTDOWN]
+    analyzing = params[AnalysisState.ANALYZING]
+    
+    # Guards: (landmarks, detected_orientation, confidence) -> bool
+    detecting_conf = detecting['min_confidence']
+    orientation_conf = orientation['min_confidence']
+    posture_conf = posture['min_confidence']
+    required = required_orientation.lower()
+    
+    def person_guard(landmarks, detected_orientation, confidence):
+        return bool(landmarks) and confidence >= detecting_conf
+    
+    def orientation_guard(landmarks, detected_orientation, confidence):
+        return (
+            bool(landmarks)
+            and detected_orientation is not None
+            and detected_orientation.lower() == required
+            and confidence >= orientation_conf
+        )
+    
+    def posture_guard(landmarks, detected_orientation, confidence):
+        return bool(landmarks) and confidence >= posture_conf
+    
+    if required_orientation == "profile":
+        orientation_instruction = "Gire hacia un lado para quedar de perfil"
+    else:
+        orientation_instruction = "Gire hacia la cámara para quedar de frente"
+    
+    table = {
+        AnalysisState.IDLE: StateSpec(AnalysisState.IDLE, "Sesión no iniciada"),
+        AnalysisState.DETECTING_PERSON: StateSpec(
+            AnalysisState.DETECTING_PERSON, "Buscando persona...",
+            handler=cls._process_hold,
+            guard=person_guard,
+            on_fail=cls._fail_detecting_person,
+            frames_required=max(1, int(detecting['frames_required'])),
+            min_dwell=float(detecting['min_dwell']),
+            next_state=AnalysisState.CHECKING_ORIENTATION,
+            pass_reason="Persona detectada",
+            pending_message="Persona detectada, verificando... ({count}/{required})",
+            retry_message="Buscando persona... Asegúrese de estar visible",
+            echo_confidence=True
+        ),
+        AnalysisState.CHECKING_ORIENTATION: StateSpec(
+            AnalysisState.CHECKING_ORIENTATION, f"Posiciónese de {required_orientation}",
+            handler=cls._process_hold,
+            guard=orientation_guard,
+            on_fail=cls._fail_checking_orientation,
+            frames_required=max(1, int(orientation['frames_required'])),
+            min_dwell=float(orientation['min_dwell']),
+            next_state=AnalysisState.CHECKING_POSTURE,
+            pass_reason="Orientación correcta",
+            pass_message="Orientación correcta",
+            pending_message="Orientación correcta, mantenga posición... ({count}/{required})",
+            retry_message=orientation_instruction,
+            echo_orientation=True
+        ),
+        AnalysisState.CHECKING_POSTURE: StateSpec(
+            AnalysisState.CHECKING_POSTURE, "Ajuste su postura",
+            handler=cls._process_hold,
+            guard=posture_guard,
+            on_fail=cls._fail_checking_posture,
+            frames_required=max(1, int(posture['frames_required'])),
+            min_dwell=float(posture['min_dwell']),
+            next_state=AnalysisState.COUNTDOWN,
+            pass_reason="Postura correcta",
+            pass_message="Postura correcta - Prepárese",
+            pending_message="Verificando postura... ({count}/{required})",
+            retry_message="Mantenga la posición...",
+            timeout=float(posture['timeout']),
+            timeout_state=AnalysisState.ERROR,
+            timeout_reason="Timeout de postura",
+            timeout_error='posture_timeout'
+        ),
+        AnalysisState.COUNTDOWN: StateSpec(
+            AnalysisState.COUNTDOWN, "Comenzamos en...",
+            handler=cls._process_countdown,
+            min_dwell=float(countdown['min_dwell']),
+            next_state=AnalysisState.ANALYZING,
+            pass_reason="Cuenta regresiva completada"
+        ),
+        AnalysisState.ANALYZING: StateSpec(
+            AnalysisState.ANALYZING, "Capturando movimiento...",
+            handler=cls._process_analyzing,
+            next_state=AnalysisState.COMPLETED,
+            pass_reason="Plateau detectado",
+            pass_message="Medición estabilizada",
+            timeout=float(analyzing['timeout']),
+            timeout_state=AnalysisState.COMPLETED,
+            timeout_reason="Análisis completado",
+            min_samples=int(analyzing['min_samples']),
+            min_bilateral_samples=int(analyzing['min_bilateral_samples'])
+        ),
+        AnalysisState.COMPLETED: StateSpec(AnalysisState.COMPLETED, "Análisis completado"),
+        AnalysisState.ERROR: StateSpec(AnalysisState.ERROR, "Error en el análisis"),
+    }
+    
+    return MappingProxyType(table)
 
 
 # -----------------------------------------------------------------------------
@@ -1215,6 +1690,25 @@ def get_current_session() -> Optional[AnalysisSession]:
     return _current_session
 
 
+def push_analyzer_frame(analyzer: Any) -> Optional[FrameResult]:
+    """
+    Empuja el estado actual de un analyzer a la sesión activa.
+    
+    Llamado desde el loop de inferencia justo después de analyzer.process_frame().
+    No hace nada si no hay sesión activa.
+    
+    Args:
+        analyzer: Analyzer que acaba de procesar el frame
+    
+    Returns:
+        FrameResult de la sesión, o None si no hay sesión activa
+    """
+    session = _current_session
+    if session is None or not session.is_active:
+        return None
+    return session.push_frame(AnalysisFrame.from_analyzer(analyzer))
+
+
 def clear_current_session():
     """Limpia la sesión actual."""
     global _current_session
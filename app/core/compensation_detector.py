@@ -0,0 +1,255 @@
+"""
+🧍 COMPENSATION DETECTOR - Detección de Compensaciones Posturales
+===================================================================
+
+Mide, en cada frame, las compensaciones típicas que inflan el ROM:
+- Inclinación del tronco (trunk_lean): eje cadera→hombro vs vertical
+- Inclinación pélvica (pelvic_tilt): línea de caderas vs horizontal
+- Elevación de hombro (shoulder_hike): línea de hombros vs línea de caderas
+
+Cada analyzer llama a measure() en su process_frame, sobre el mismo array
+de landmarks (33, 4) y en la misma pasada en que calcula el ángulo
+principal. En perfil solo se mide la inclinación del tronco: las líneas de
+hombros y caderas quedan de canto y sus ángulos no son observables.
+
+La sesión compara los valores con los umbrales de su ejercicio y vista
+(thresholds_for) y marca como inválidas las muestras de ROM tomadas
+mientras el paciente compensa, antes de llegar al percentil 95.
+
+Autor: BIOTRACK Team
+Fecha: 2025-11-26
+"""
+
+from typing import Dict, Any, Optional, Tuple
+import numpy as np
+
+
+# Índices MediaPipe Pose usados por el detector
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_HIP = 23
+RIGHT_HIP = 24
+
+
+def landmarks_to_array(landmarks: Any) -> np.ndarray:
+    """
+    Convierte landmarks de MediaPipe a un array (N, 4) de x, y, z, visibility.
+
+    Args:
+        landmarks: results.pose_landmarks.landmark
+
+    Returns:
+        np.ndarray float32 de forma (N, 4) en coordenadas normalizadas
+    """
+    return np.array(
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks],
+        dtype=np.float32
+    )
+
+
+class CompensationDetector:
+    """
+    🧍 Detector de compensaciones posturales por frame
+
+    Calcula los tres canales de compensación a partir del array de
+    landmarks y decide si la muestra actual es válida para el ROM.
+    """
+
+    # Canales de compensación (mismo orden que compute())
+    CHANNELS = ('trunk_lean', 'pelvic_tilt', 'shoulder_hike')
+
+    DEFAULT_CONFIG = {
+        'max_trunk_lean': 15.0,       # Grados máximos de inclinación de tronco
+        'max_pelvic_tilt': 10.0,      # Grados máximos de inclinación pélvica
+        'max_shoulder_hike': 10.0,    # Grados máximos de elevación de hombro
+        'min_visibility': 0.5,        # Visibilidad mínima de landmarks
+        # Ancho mínimo de la línea (hombros/caderas) relativo al tronco.
+        # Con el paciente girado las líneas colapsan y su ángulo no es medible.
+        'min_line_ratio': 0.25,
+    }
+
+    # Canales observables por vista (orden de CHANNELS). En perfil solo se
+    # ve la inclinación sagital del tronco.
+    OBSERVABLE = {
+        'frontal': (True, True, True),
+        'profile': (True, False, False),
+    }
+
+    # Umbrales por ejercicio y vista: (trunk_lean, pelvic_tilt, shoulder_hike).
+    # Claves (joint, movement, orientation) o (joint, None, orientation);
+    # None en un canal = se mide pero no invalida la muestra.
+    # Sin entrada: umbrales de DEFAULT_CONFIG para los canales observables.
+    EXERCISE_THRESHOLDS = {
+        # Hombro: arquear la espalda en flexión/extensión; inclinarse o
+        # subir el hombro en abducción
+        ('shoulder', None, 'profile'): (10.0, None, None),
+        ('shoulder', 'abduction', 'frontal'): (10.0, None, 15.0),
+        ('shoulder', 'adduction', 'frontal'): (10.0, None, 15.0),
+        # Codo: el tronco apenas influye en el ángulo
+        ('elbow', None, 'profile'): (20.0, None, None),
+        # Cadera: retroversión/anteversión del tronco en el plano sagital;
+        # en abducción se tolera algo de báscula pélvica
+        ('hip', None, 'profile'): (10.0, None, None),
+        ('hip', 'abduction', 'frontal'): (10.0, 15.0, None),
+        ('hip', 'adduction', 'frontal'): (10.0, 15.0, None),
+        # Rodilla y tobillo: solo inclinaciones grandes del tronco
+        ('knee', None, 'profile'): (20.0, None, None),
+        ('ankle', None, 'profile'): (20.0, None, None),
+    }
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        Inicializa el detector.
+
+        Args:
+            config: Configuración opcional (sobrescribe DEFAULT_CONFIG)
+        """
+        self.config = {**self.DEFAULT_CONFIG, **(config or {})}
+        self._default_thresholds = (
+            self.config['max_trunk_lean'],
+            self.config['max_pelvic_tilt'],
+            self.config['max_shoulder_hike'],
+        )
+        self._thresholds_cache: Dict[Tuple, np.ndarray] = {}
+
+    def thresholds_for(self, joint_type: Optional[str] = None, movement_type: Optional[str] = None,
+                       orientation: Optional[str] = None) -> np.ndarray:
+        """
+        Umbrales por canal para un ejercicio y vista.
+
+        Args:
+            joint_type: Articulación ('shoulder', 'hip', ...)
+            movement_type: Movimiento ('flexion', 'abduction', ...)
+            orientation: Vista ('frontal' o 'profile'; None = todos los canales)
+
+        Returns:
+            Array (3,) en grados; inf en los canales que no invalidan la muestra
+        """
+        key = (joint_type, movement_type, orientation)
+        thresholds = self._thresholds_cache.get(key)
+        if thresholds is None:
+            values = (self.EXERCISE_THRESHOLDS.get(key)
+                      or self.EXERCISE_THRESHOLDS.get((joint_type, None, orientation))
+                      or self._default_thresholds)
+            observable = self.OBSERVABLE.get(orientation, (True, True, True))
+            thresholds = np.array([
+                value if (value is not None and seen) else np.inf
+                for value, seen in zip(values, observable)
+            ], dtype=np.float64)
+            self._thresholds_cache[key] = thresholds
+        return thresholds
+
+    @staticmethod
+    def is_compensating(values: Optional[np.ndarray], thresholds: np.ndarray) -> bool:
+        """True si algún canal medible supera su umbral (NaN nunca lo supera)"""
+        if values is None:
+            return False
+        return bool(np.any(values > thresholds))
+
+    def compute(self, points: np.ndarray, joint_type: Optional[str] = None,
+                movement_type: Optional[str] = None,
+                orientation: Optional[str] = None) -> Tuple[np.ndarray, bool]:
+        """
+        Calcula los canales de compensación de un frame y los evalúa.
+
+        Args:
+            points: Array (N, 4) de landmarks (ver landmarks_to_array)
+            joint_type, movement_type, orientation: Ejercicio y vista (ver thresholds_for)
+
+        Returns:
+            Tupla (valores, compensando):
+            - valores: array (3,) en grados, NaN si el canal no es medible
+            - compensando: True si algún canal supera su umbral
+        """
+        values = self.measure(points, orientation)
+        thresholds = self.thresholds_for(joint_type, movement_type, orientation)
+        return values, self.is_compensating(values, thresholds)
+
+    def measure(self, points: np.ndarray, orientation: Optional[str] = None) -> np.ndarray:
+        """
+        Mide los canales de compensación de un frame.
+
+        Args:
+            points: Array (N, 4) de landmarks (ver landmarks_to_array)
+            orientation: Vista del analyzer; los canales no observables en
+                         ella quedan en NaN ('profile': solo tronco)
+
+        Returns:
+            Array (3,) en grados, NaN si el canal no es medible
+        """
+        torso = points[[LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP]].astype(np.float64)
+        xy = torso[:, :2]
+        visible = torso[:, 3] >= self.config['min_visibility']
+
+        mid_shoulder = (xy[0] + xy[1]) * 0.5
+        mid_hip = (xy[2] + xy[3]) * 0.5
+
+        # Vectores: tronco (cadera→hombro), caderas (izq→der), hombros (izq→der)
+        vectors = np.stack((mid_shoulder - mid_hip, xy[3] - xy[2], xy[1] - xy[0]))
+        dx, dy = vectors[:, 0], vectors[:, 1]
+
+        # Una sola llamada a arctan2 para los tres canales:
+        # - tronco: ángulo respecto a la vertical (magnitud)
+        # - líneas: inclinación con signo respecto a la horizontal,
+        #   independiente de si la línea apunta a izquierda o derecha
+        line_sign = np.where(dx[1:] < 0, -1.0, 1.0)
+        numerators = np.concatenate(([abs(dx[0])], dy[1:] * line_sign))
+        denominators = np.concatenate(([abs(dy[0])], np.abs(dx[1:])))
+        angles = np.degrees(np.arctan2(numerators, denominators))
+
+        trunk_length = np.hypot(dx[0], dy[0])
+        min_line = self.config['min_line_ratio'] * trunk_length
+
+        values = np.array([
+            angles[0],
+            abs(angles[1]),
+            abs(angles[2] - angles[1]),
+        ])
+
+        # Validez por canal: el tronco necesita al menos un hombro y una cadera
+        # visibles; las líneas necesitan ambos extremos y ancho suficiente.
+        hips_valid = visible[2] and visible[3] and abs(dx[1]) >= min_line
+        shoulders_valid = visible[0] and visible[1] and abs(dx[2]) >= min_line
+        valid = np.array([
+            (visible[0] or visible[1]) and (visible[2] or visible[3]) and trunk_length > 0,
+            hips_valid,
+            hips_valid and shoulders_valid,
+        ]) & self.OBSERVABLE.get(orientation, (True, True, True))
+        values[~valid] = np.nan
+        return values
+
+    def analyze(self, points: np.ndarray, joint_type: Optional[str] = None,
+                movement_type: Optional[str] = None,
+                orientation: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Variante legible de compute() para reportes y debugging.
+
+        Returns:
+            Dict con un valor por canal (None si no es medible) y 'compensating'
+        """
+        values, compensating = self.compute(points, joint_type, movement_type, orientation)
+        result = {
+            name: (None if np.isnan(value) else round(float(value), 1))
+            for name, value in zip(self.CHANNELS, values)
+        }
+        result['compensating'] = compensating
+        return result
+
+
+# Instancia global (singleton)
+_compensation_detector_instance: Optional[CompensationDetector] = None
+
+
+def get_compensation_detector() -> CompensationDetector:
+    """
+    Obtiene la instancia global del detector de compensaciones.
+
+    Returns:
+        Instancia de CompensationDetector
+    """
+    global _compensation_detector_instance
+
+    if _compensation_detector_instance is None:
+        _compensation_detector_instance = CompensationDetector()
+
+    return _compensation_detector_instance
@@ -7,6 +7,7 @@ ENDPOINTS:
 - /api/user/stats: Estadísticas del usuario
 - /api/sessions/<id>: Obtener sesión ROM
 - /api/subjects: CRUD de sujetos
+- /api/subjects/search: Búsqueda por prefijo (typeahead, FTS5)
 - /api/rom-session: Crear/actualizar sesión ROM
 - /api/video_feed: Stream MJPEG de video procesado (NUEVO)
 - /api/analysis/start: Iniciar análisis (NUEVO)
@@ -20,12 +21,14 @@ Fecha: 2025-11-14
 """
 
 from flask import (
-    Blueprint, jsonify, request, session, current_app, Response
+    Blueprint, jsonify, request, session, current_app, Response, send_from_directory, abort
 )
+from werkzeug.exceptions import NotFound
 from app.routes.auth import login_required
 import cv2
 import numpy as np
 import logging
+import re
 import time
 
 # Import de camera_manager a nivel de módulo para evitar problemas con closures
@@ -128,6 +131,47 @@ def get_user_stats():
         }), 500
 
 
+# ============================================================================
+# BÚSQUEDA
+# ============================================================================
+
+@api_bp.route('/subjects/search', methods=['GET'])
+@login_required
+def search_subjects():
+    """
+    Búsqueda de sujetos por nombre o código (typeahead)
+    
+    Admin busca en todos los sujetos; un estudiante solo en los suyos.
+    
+    Query params:
+        q: str - Texto a buscar (prefijos: "jua per")
+        limit: int - Máximo de resultados (default 50, máx 500)
+    
+    Returns:
+        JSON con los sujetos más relevantes primero
+    """
+    
+    db_manager = current_app.config.get('DB_MANAGER')
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    
+    try:
+        created_by = None if session.get('role') == 'admin' else session.get('user_id')
+        results = db_manager.search_subjects(query, created_by=created_by, limit=limit)
+        return jsonify({
+            'success': True,
+            'count': len(results),
+            'results': results
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Error al buscar sujetos: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 # ============================================================================
 # SESIONES ROM
 # ============================================================================
@@ -392,11 +436,12 @@ def tts_speak():
             }), 400
         
         tts = get_tts_service()
-        tts.speak(message)
+        cue = tts.speak(message)
         
         return jsonify({
             'success': True,
-            'message': 'Mensaje enviado a reproducción'
+            'message': 'Mensaje enviado a reproducción',
+            'audio_cue': cue
         }), 200
     except Exception as e:
         logger.error(f"[TTS] Error en speak: {e}")
@@ -436,21 +481,19 @@ def tts_speak_result():
         
         # Construir mensaje según si es bilateral o no
         if is_bilateral and left_rom is not None and right_rom is not None:
-            message = TTSMessages.completed_result(
-                rom_value, 
-                classification,
-                left_rom=left_rom,
-                right_rom=right_rom
-            )
+            result_args = dict(left_rom=left_rom, right_rom=right_rom)
         else:
-            message = TTSMessages.completed_result(rom_value, classification)
+            result_args = {}
+        message = TTSMessages.completed_result(rom_value, classification, **result_args)
         
         current_app.logger.info(f"[TTS] Hablando resultado: {message}")
-        tts.speak(message)
+        # Fragmentos pre-generados (banco de frases) en lugar de sintetizar la frase
+        cue = tts.speak(TTSMessages.completed_result_fragments(rom_value, classification, **result_args))
         
         return jsonify({
             'success': True,
-            'message': message
+            'message': message,
+            'audio_cue': cue     # Modo 'browser': el cliente lo reproduce
         }), 200
     except Exception as e:
         logger.error(f"[TTS] Error en speak_result: {e}")
@@ -487,6 +530,80 @@ def tts_stop():
         }), 500
 
 
+# Los nombres de audio son hash del contenido (motor + voz + texto): inmutables
+TTS_AUDIO_MAX_AGE = 365 * 24 * 3600
+TTS_AUDIO_NAME = re.compile(r'^tts_[0-9a-f]{12}\.(mp3|wav)$')
+
+
+@api_bp.route('/tts/manifest', methods=['GET'])
+@login_required
+def tts_manifest():
+    """
+    Manifiesto de precarga de audio para el navegador
+    
+    Returns:
+        JSON con playback, base_url y cues {mensaje: archivo} de los mensajes
+        fijos y del banco de frases ya generados
+    """
+    try:
+        from app.services.tts_service import get_tts_service
+        
+        tts = get_tts_service()
+        manifest = tts.get_manifest()
+        manifest.update({
+            'success': True,
+            'playback': tts.get_status()['playback'],
+            # Mismo prefijo que este endpoint: .../tts/manifest -> .../tts/audio/
+            'base_url': request.script_root + request.path.rsplit('/', 1)[0] + '/audio/'
+        })
+        return jsonify(manifest), 200
+    except Exception as e:
+        logger.error(f"[TTS] Error en manifiesto: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api_bp.route('/tts/audio/<cue_id>', methods=['GET'])
+@login_required
+def tts_audio(cue_id):
+    """
+    Sirve un audio de app/static/audio_cache con caché larga (inmutable)
+    
+    Args:
+        cue_id: Nombre del archivo (id del cue)
+    """
+    if not TTS_AUDIO_NAME.match(cue_id):
+        abort(404)
+    
+    from app.services.tts_service import get_tts_service
+    audio_cache = get_tts_service().audio_cache
+    
+    # Audios precargados (banco de frases): desde memoria, sin abrir el archivo
+    data = audio_cache.get_bytes(cue_id) if audio_cache else None
+    if data is not None:
+        mimetype = 'audio/mpeg' if cue_id.endswith('.mp3') else 'audio/wav'
+        response = Response(data, mimetype=mimetype)
+        response.set_etag(cue_id)       # El nombre ya es un hash del contenido
+        response.cache_control.max_age = TTS_AUDIO_MAX_AGE
+        response.make_conditional(request)
+    else:
+        try:
+            response = send_from_directory(
+                current_app.config['AUDIO_CACHE_DIR'], cue_id,
+                max_age=TTS_AUDIO_MAX_AGE, conditional=True
+            )
+        except NotFound:
+            # Desalojado (LRU) o borrado: que el índice no lo vuelva a anunciar
+            if audio_cache:
+                audio_cache.discard(cue_id)
+            raise
+    response.cache_control.immutable = True
+    response.cache_control.private = True
+    return response
+
+
 @api_bp.route('/camera/release', methods=['POST'])
 @login_required
 def camera_release():
@@ -1069,6 +1186,7 @@ def video_feed():
         KneeProfileAnalyzer,
         AnkleProfileAnalyzer
     )
+    from app.core.analysis_session import push_analyzer_frame
     
     # ⚠️ CRÍTICO: Capturar valores de session ANTES del generador
     # (el generador se ejecuta fuera del request context)
@@ -1161,6 +1279,7 @@ def video_feed():
                         break
                     
                     frame_count += 1
+                    frame_processed = False  # True solo si process_frame terminó sin error
                     
                     # Verificar si MediaPipe está listo
                     if not mediapipe_ready:
@@ -1203,6 +1322,7 @@ def video_feed():
                             print(f"✅ MediaPipe listo! Iniciando procesamiento con skeleton")
                             t_first = time_module.time()
                             processed_frame = current_analyzer.process_frame(frame)
+                            frame_processed = True
                             t_first_end = time_module.time()
                             print(f"📍 TIMING: Primer process_frame: {t_first_end-t_first:.2f}s")
                     else:
@@ -1217,10 +1337,20 @@ def video_feed():
                                     first_process_logged = True
                             else:
                                 processed_frame = current_analyzer.process_frame(frame)
+                            frame_processed = True
                         except Exception as e:
                             logger.error(f"Error al procesar frame: {e}")
                             processed_frame = _create_error_frame(f"Error en procesamiento: {str(e)}")
                     
+                    # ⚡ Avanzar la sesión de análisis con este frame (a la tasa de la cámara).
+                    # Si process_frame falló, el analyzer conserva el estado del frame
+                    # anterior: no empujarlo como una muestra nueva
+                    if frame_processed:
+                        try:
+                            push_analyzer_frame(current_analyzer)
+                        except Exception as e:
+                            logger.error(f"Error al avanzar sesión de análisis: {e}")
+                    
                     # Codificar frame como JPEG (calidad desde session o config)
                     try:
                         ret_encode, buffer = cv2.imencode(
@@ -1532,8 +1662,8 @@ def save_analysis_to_history():
         subject_id = data.get('subject_id')
         
         # Importar database manager
-        from database.database_manager import DatabaseManager
-        db_manager = DatabaseManager()
+        from database.database_manager import get_db_manager
+        db_manager = get_db_manager()
         
         # ============================================================
         # RUTA 1: Análisis de Sujeto -> Guardar en rom_session
@@ -1574,6 +1704,20 @@ def save_analysis_to_history():
                     notes=data.get('notes', '')
                 )
                 
+                # Persistir las mediciones frame a frame de la sesión de análisis
+                # (si corresponde a este resultado) en bloque, no una fila por commit
+                try:
+                    from app.core.analysis_session import get_current_session
+                    analysis_session = get_current_session()
+                    if (analysis_session is not None
+                            and analysis_session.joint_type == data.get('segment')
+                            and analysis_session.movement_type == data.get('exercise_type')):
+                        with db_manager.angle_measurement_buffer(rom_session['id']) as buffer:
+                            buffer.extend(analysis_session.get_measurement_series())
+                        logger.info(f"📈 {buffer.total_written} mediciones guardadas para session_id={rom_session['id']}")
+                except Exception as e:
+                    logger.warning(f"No se pudieron guardar las mediciones frame a frame: {e}")
+                
                 # rom_session es ahora un diccionario, acceder con ['id']
                 logger.info(f"✅ Análisis de SUJETO guardado en rom_session: subject={subject_id}, session_id={rom_session['id']}")
                 return jsonify({
@@ -1682,11 +1826,12 @@ def get_analysis_history():
     Query params:
         segment: str - Filtrar por segmento
         exercise_type: str - Filtrar por tipo de ejercicio
-        limit: int - Límite de resultados (default 50)
-        offset: int - Offset para paginación (default 0)
+        limit: int - Límite de resultados (default 50, máx 200)
+        cursor: str - next_cursor de la respuesta anterior (paginación)
         
     Returns:
-        JSON con lista de análisis históricos
+        JSON con lista de análisis históricos y next_cursor
+        (null en la última página)
     """
     try:
         user_id = session.get('user_id')
@@ -1700,25 +1845,33 @@ def get_analysis_history():
         # Obtener parámetros de filtro
         segment = request.args.get('segment')
         exercise_type = request.args.get('exercise_type')
-        limit = int(request.args.get('limit', 50))
-        offset = int(request.args.get('offset', 0))
+        limit = max(1, min(int(request.args.get('limit', 50)), 200))
+        cursor = request.args.get('cursor') or None
         
         # Obtener historial
-        from database.database_manager import DatabaseManager
-        db_manager = DatabaseManager()
+        from database.database_manager import get_db_manager
+        db_manager = get_db_manager()
         
-        history = db_manager.get_user_analysis_history(
-            user_id=user_id,
-            segment=segment,
-            exercise_type=exercise_type,
-            limit=limit,
-            offset=offset
-        )
+        try:
+            page = db_manager.get_user_analysis_history_page(
+                user_id=user_id,
+                segment=segment,
+                exercise_type=exercise_type,
+                limit=limit,
+                cursor=cursor
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         
         return jsonify({
             'success': True,
-            'count': len(history),
-            'history': history
+            'count': len(page['items']),
+            'history': page['items'],
+            'next_cursor': page['next_cursor'],
+            'has_next': page['has_next']
         }), 200
         
     except Exception as e:
@@ -1768,8 +1921,8 @@ def get_recent_analysis():
                 'error': 'Se requiere segment y exercise_type'
             }), 400
         
-        from database.database_manager import DatabaseManager
-        db_manager = DatabaseManager()
+        from database.database_manager import get_db_manager
+        db_manager = get_db_manager()
         
         # ============================================================
         # RUTA 1: Historial de SUJETO -> Buscar en rom_session
@@ -1993,11 +2146,11 @@ def set_selected_leg():
 @login_required
 def get_session_status():
     """
-    Obtiene el estado actual de la sesión de análisis Y procesa el frame actual.
+    Obtiene el estado actual de la sesión de análisis (SOLO LECTURA).
     
-    Este endpoint hace doble función:
-    1. Procesa el frame actual del analyzer para avanzar la máquina de estados
-    2. Retorna el estado actualizado
+    La máquina de estados avanza desde el loop de inferencia (video_feed /
+    vps/process_frame) con push_analyzer_frame(); este endpoint no procesa
+    frames, así que varias pestañas pueden hacer polling sin afectar la sesión.
     
     Endpoint de polling - el frontend llama cada 300-500ms.
     
@@ -2016,80 +2169,9 @@ def get_session_status():
                 'session': None
             }), 200
         
-        # Obtener analyzer actual del cache
+        # Obtener analyzer actual del cache (solo para enriquecer el mensaje)
         current_analyzer = get_current_analyzer()
         
-        # DEBUG: Verificar estado del analyzer
-        current_state = analysis_session.state.name
-        if current_state in ['ANALYZING', 'CHECKING_ORIENTATION', 'DETECTING_PERSON']:
-            import random
-            if random.random() < 0.2:  # 20% de las veces
-                logger.info(f"[SESSION_STATUS] state={current_state}, analyzer={'EXISTS' if current_analyzer else 'NONE'}, analyzer_type={_current_analyzer_type}")
-        
-        # Si la sesión está activa, procesar con datos del analyzer actual
-        if analysis_session.is_active and current_analyzer is not None:
-            # Obtener datos del analyzer
-            analyzer_data = current_analyzer.get_current_data() if hasattr(current_analyzer, 'get_current_data') else {}
-            
-            # Extraer datos relevantes
-            landmarks_detected = analyzer_data.get('landmarks_detected', False)
-            landmarks = True if landmarks_detected else None
-            
-            # Obtener ángulo - usar valor ABSOLUTO para ROM (el signo indica dirección, no magnitud)
-            raw_angle = analyzer_data.get('angle') or analyzer_data.get('current_angle')
-            current_angle = abs(raw_angle) if raw_angle is not None else None
-            
-            raw_orientation = analyzer_data.get('orientation', '')
-            confidence = analyzer_data.get('confidence', 0.0)
-            is_profile = analyzer_data.get('is_profile_position', False)
-            orientation_quality = analyzer_data.get('orientation_quality', 0.0)
-            
-            # DEBUG: Log más frecuente para CHECKING_ORIENTATION
-            current_state = analysis_session.state.name
-            if current_state == 'CHECKING_ORIENTATION':
-                import random
-                if random.random() < 0.3:  # 30% de las veces
-                    logger.info(f"[ORIENTATION_DEBUG] orientation='{raw_orientation}', is_profile={is_profile}, quality={orientation_quality:.2f}, confidence={confidence:.2f}")
-            
-            # DEBUG: Log para ANALYZING
-            if current_state == 'ANALYZING':
-                import random
-                if random.random() < 0.2:  # 20% de las veces
-                    logger.info(f"[ANALYZING_DEBUG] angle={current_angle}, landmarks_detected={landmarks_detected}")
-                
-                # Actualizar datos bilaterales si es frontal (usar ángulos ACTUALES, no máximos)
-                if hasattr(current_analyzer, 'left_angle') and hasattr(current_analyzer, 'right_angle'):
-                    analysis_session.update_bilateral_data(
-                        current_analyzer.left_angle,
-                        current_analyzer.right_angle
-                    )
-            
-            # Ahora el analyzer devuelve 'profile' o 'frontal' directamente
-            # Solo necesitamos pasar lo que dice el analyzer
-            orientation = raw_orientation.lower() if raw_orientation else None
-            
-            # Fallback para valores legacy ("mirando izquierda", etc.)
-            if orientation and orientation not in ['profile', 'frontal']:
-                if 'mirando' in orientation or 'izquierda' in orientation or 'derecha' in orientation:
-                    orientation = 'profile'
-                elif 'frente' in orientation:
-                    orientation = 'frontal'
-            
-            # Obtener el lado detectado del analyzer (left, right, o bilateral)
-            detected_side = analyzer_data.get('side', None)
-            # Normalizar el valor del lado
-            if detected_side and detected_side not in ('left', 'right', 'bilateral'):
-                detected_side = None  # Ignorar valores como "Detectando..."
-            
-            # Procesar frame en la máquina de estados (ahora incluye confidence y side)
-            process_result = analysis_session.process_frame(
-                landmarks=landmarks,
-                current_angle=current_angle,
-                detected_orientation=orientation,
-                confidence=confidence,
-                side=detected_side
-            )
-        
         # Obtener estado actualizado
         status = analysis_session.get_status()
         
@@ -2160,10 +2242,11 @@ def stop_session():
 @login_required
 def process_session_frame():
     """
-    Procesa un frame y avanza la máquina de estados de la sesión.
+    Procesa un frame enviado por el cliente y avanza la máquina de estados.
     
-    Este endpoint es llamado desde el video_feed loop para actualizar
-    el estado de la sesión con los datos del frame actual.
+    Solo para clientes sin inferencia en el servidor: si el loop de
+    inferencia ya está empujando frames a la sesión, los datos del cliente
+    se ignoran y se devuelve el estado actual.
     
     Body JSON:
         landmarks_detected: bool - Si se detectaron landmarks
@@ -2173,7 +2256,7 @@ def process_session_frame():
     Returns:
         JSON con estado actualizado
     """
-    from app.core.analysis_session import get_current_session
+    from app.core.analysis_session import get_current_session, AnalysisFrame
     
     try:
         analysis_session = get_current_session()
@@ -2185,19 +2268,28 @@ def process_session_frame():
                 'error': 'No hay sesión activa'
             }), 200
         
+        if analysis_session.is_server_fed:
+            return jsonify({
+                'success': True,
+                'active': True,
+                'server_fed': True,
+                'frame_result': None,
+                'session': analysis_session.get_status()
+            }), 200
+        
         data = request.get_json() or {}
         
         # Procesar frame con los datos recibidos
-        result = analysis_session.process_frame(
-            landmarks=data.get('landmarks_detected', False),
-            current_angle=data.get('current_angle'),
-            detected_orientation=data.get('orientation')
-        )
+        result = analysis_session.push_frame(AnalysisFrame(
+            landmarks_detected=bool(data.get('landmarks_detected', False)),
+            angle=data.get('current_angle'),
+            orientation=data.get('orientation')
+        ))
         
         return jsonify({
             'success': True,
             'active': True,
-            'frame_result': result
+            'frame_result': result.to_dict()
         }), 200
         
     except Exception as e:
@@ -2280,7 +2372,7 @@ def vps_process_frame():
     from app.analyzers.shoulder_frontal import ShoulderFrontalAnalyzer
     from app.analyzers.hip_profile import HipProfileAnalyzer
     from app.analyzers.knee_profile import KneeProfileAnalyzer
-    from app.core.analysis_session import get_current_session
+    from app.core.analysis_session import get_current_session, AnalysisFrame
     
     try:
         data = request.get_json()
@@ -2324,23 +2416,20 @@ def vps_process_frame():
         processed_frame = analyzer.process_frame(frame)
         
         # Obtener datos del analyzer
-        landmarks_detected = analyzer.landmarks_detected if hasattr(analyzer, 'landmarks_detected') else False
+        analysis_frame = AnalysisFrame.from_analyzer(analyzer)
+        landmarks_detected = analysis_frame.landmarks_detected
         current_angle = analyzer.current_angle if hasattr(analyzer, 'current_angle') else None
-        orientation = analyzer.detected_orientation if hasattr(analyzer, 'detected_orientation') else None
+        orientation = analysis_frame.orientation
         
         # Codificar frame procesado
         _, buffer = cv2.imencode('.jpg', processed_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
         processed_b64 = base64.b64encode(buffer).decode('utf-8')
         
-        # Actualizar sesión si existe
+        # Avanzar la sesión activa con este frame (inferencia en el servidor)
         session_result = None
         analysis_session = get_current_session()
         if analysis_session and analysis_session.is_active:
-            session_result = analysis_session.process_frame(
-                landmarks=landmarks_detected,
-                current_angle=current_angle,
-                detected_orientation=orientation
-            )
+            session_result = analysis_session.push_frame(analysis_frame).to_dict()
         
         return jsonify({
             'success': True,
@@ -369,7 +369,8 @@ def subjects_delete(subject_id):
 def history():
     """
     Historial de auto-análisis del usuario (user_analysis_history)
-    Con filtros por segmento, ejercicio y fecha
+    Con filtros por segmento, ejercicio y fecha; paginado por cursor
+    (?cursor=... con el next_cursor de la página anterior)
     """
     
     db_manager = current_app.config.get('DB_MANAGER')
@@ -380,16 +381,24 @@ def history():
     exercise = request.args.get('exercise', '').strip() or None
     date_from = request.args.get('date_from', '').strip() or None
     date_to = request.args.get('date_to', '').strip() or None
+    cursor = request.args.get('cursor', '').strip() or None
     
-    # Obtener historial filtrado
-    analyses = db_manager.get_user_analysis_history_filtered(
-        user_id=user_id,
-        segment=segment,
-        exercise_type=exercise,
-        date_from=date_from,
-        date_to=date_to,
-        limit=100
-    )
+    # Obtener página del historial filtrado
+    try:
+        page = db_manager.get_user_analysis_history_page(
+            user_id=user_id,
+            segment=segment,
+            exercise_type=exercise,
+            date_from=date_from,
+            date_to=date_to,
+            limit=100,
+            cursor=cursor
+        )
+    except ValueError:
+        flash('El enlace de paginación no es válido', 'warning')
+        return redirect(url_for('main.history', segment=segment, exercise=exercise,
+                                date_from=date_from, date_to=date_to))
+    analyses = page['items']
     
     # Contar total
     total_count = db_manager.count_user_analysis_history(
@@ -416,7 +425,9 @@ def history():
         analyses=analyses,
         total_count=total_count,
         stats=stats,
-        filters=filters
+        filters=filters,
+        cursor=cursor,
+        next_cursor=page['next_cursor']
     )
 
 
@@ -1173,7 +1184,8 @@ def users():
         users=users_data,
         search=search,
         role_filter=role_filter,
-        status_filter=status_filter
+        status_filter=status_filter,
+        programs=db_manager.get_student_programs()
     )
 
 
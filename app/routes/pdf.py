@@ -3,180 +3,389 @@
 =========================================
 Endpoints para generar reportes PDF
 
+Cada reporte tiene dos formas de pedirse:
+- GET  /pdf/<reporte>        -> genera en la request y descarga (síncrono)
+- POST /pdf/<reporte>/job    -> encola el render y retorna un job_id (202)
+
+Los trabajos se consultan en /pdf/jobs/<job_id> y el archivo terminado se
+descarga en /pdf/jobs/<job_id>/download (ver app/services/report_jobs.py).
+
+/pdf/class-report [ADMIN] transmite un ZIP con el historial de cada
+estudiante de una cohorte (ver app/services/batch_reports.py).
+
 Autor: BIOTRACK Team
 Fecha: 2025-12-08
 """
 
-from flask import Blueprint, request, send_file, jsonify, session, current_app
+from flask import Blueprint, Response, request, send_file, jsonify, session, current_app, url_for
+from werkzeug.utils import secure_filename
 from app.routes.auth import login_required, admin_required
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Any, Dict, List
+import io
 import os
 
 pdf_bp = Blueprint('pdf', __name__, url_prefix='/pdf')
 
 
-@pdf_bp.route('/analysis/<int:analysis_id>')
-@login_required
-def download_analysis_report(analysis_id):
+class ReportRequestError(Exception):
+    """Error al preparar los datos de un reporte (lleva el código HTTP)"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@dataclass
+class ReportSpec:
+    """Reporte listo para renderizar"""
+    method: str                        # Método de PDFReportGenerator
+    kwargs: Dict[str, Any]             # Datos del reporte (clave de la caché)
+    download_name: str
+    tags: List[str] = field(default_factory=list)   # Invalidación de caché
+
+
+# ============================================================================
+# 📋 PREPARACIÓN DE DATOS
+# ============================================================================
+# Cada función reúne los datos del reporte y retorna un ReportSpec. Solo
+# hacen consultas rápidas; el render con ReportLab ocurre después (en la
+# request o en la cola) y pasa por la caché de reportes.
+
+def _prepare_analysis_report(db_manager, analysis_id):
+    user_id = session.get('user_id')
+    user_role = session.get('role')
+
+    # Buscar el análisis (puede ser rom_session o user_analysis_history)
+    # Primero intentar rom_session
+    analysis = db_manager.get_session_by_id(analysis_id)
+    is_subject_analysis = True
+
+    if not analysis:
+        # Intentar user_analysis_history
+        analysis = db_manager.get_user_analysis_by_id(analysis_id)
+        is_subject_analysis = False
+
+    if not analysis:
+        raise ReportRequestError('Análisis no encontrado', 404)
+
+    # Verificar permisos
+    analysis_user_id = analysis.get('user_id')
+    if user_role != 'admin' and analysis_user_id != user_id:
+        raise ReportRequestError('No tienes permiso para ver este análisis', 403)
+
+    # Obtener datos del usuario
+    user_data = db_manager.get_user_by_id(analysis_user_id)
+    user_dict = {
+        'username': user_data.username,
+        'full_name': user_data.full_name,
+        'student_id': user_data.student_id,
+        'program': user_data.program
+    } if user_data else None
+
+    # Obtener datos del sujeto si es análisis de sujeto
+    subject_data = None
+    if is_subject_analysis and analysis.get('subject_id'):
+        subject = db_manager.get_subject_by_id_safe(analysis['subject_id'])
+        if subject:
+            subject_data = {
+                'subject_code': subject.get('subject_code'),
+                'first_name': subject.get('first_name'),
+                'last_name': subject.get('last_name'),
+                'gender': subject.get('gender'),
+                'age': subject.get('age')
+            }
+
+    if is_subject_analysis:
+        tags = [f"subject:{analysis.get('subject_id')}"]
+    else:
+        tags = [f"user:{analysis_user_id}"]
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return ReportSpec('generate_analysis_report', {
+        'analysis_data': analysis,
+        'user_data': user_dict,
+        'subject_data': subject_data
+    }, f"analisis_{analysis_id}_{timestamp}.pdf", tags)
+
+
+def _prepare_history_report(db_manager):
+    user_id = session.get('user_id')
+
+    # Filtros opcionales (query string o cuerpo JSON del trabajo)
+    filters = request.args.to_dict()
+    if request.is_json:
+        filters.update(request.get_json(silent=True) or {})
+
+    # Obtener análisis
+    analyses = db_manager.get_user_analysis_history_filtered(
+        user_id=user_id,
+        segment=filters.get('segment') or None,
+        date_from=filters.get('from_date') or None,
+        date_to=filters.get('to_date') or None
+    )
+
+    # Obtener datos del usuario
+    user = db_manager.get_user_by_id(user_id)
+    user_dict = {
+        'username': user.username,
+        'full_name': user.full_name,
+        'student_id': user.student_id,
+        'program': user.program
+    } if user else {'username': 'Usuario'}
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return ReportSpec('generate_history_report', {
+        'analyses': analyses,
+        'user_data': user_dict,
+        'title': "Mi Historial de Análisis"
+    }, f"historial_{user_dict['username']}_{timestamp}.pdf", [f"user:{user_id}"])
+
+
+def _prepare_subject_report(db_manager, subject_id):
+    user_id = session.get('user_id')
+    user_role = session.get('role')
+
+    # Obtener sujeto
+    subject = db_manager.get_subject_by_id_safe(subject_id)
+    if not subject:
+        raise ReportRequestError('Sujeto no encontrado', 404)
+
+    # Verificar permisos
+    if user_role != 'admin' and subject.get('created_by') != user_id:
+        raise ReportRequestError('No tienes permiso para ver este sujeto', 403)
+
+    subject_dict = {
+        'subject_code': subject.get('subject_code'),
+        'first_name': subject.get('first_name'),
+        'last_name': subject.get('last_name'),
+        'gender': subject.get('gender'),
+        'age': subject.get('age'),
+        'height': subject.get('height'),
+        'weight': subject.get('weight')
+    }
+
+    # Sesiones del sujeto (get_sessions_by_subject ya retorna diccionarios)
+    sessions_list = [{
+        'segment': s.get('segment'),
+        'exercise_name': s.get('exercise_type') or '',
+        'side': s.get('side'),
+        'rom_value': s.get('rom_value') or 0,
+        'quality_score': s.get('quality_score') or 0,
+        'created_at': s.get('created_at')
+    } for s in db_manager.get_sessions_by_subject(subject_id)]
+
+    # Obtener datos del usuario evaluador
+    user = db_manager.get_user_by_id(user_id)
+    user_dict = {
+        'username': user.username,
+        'full_name': user.full_name
+    } if user else None
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return ReportSpec('generate_subject_report', {
+        'subject_data': subject_dict,
+        'sessions': sessions_list,
+        'user_data': user_dict
+    }, f"sujeto_{subject_dict['subject_code']}_{timestamp}.pdf", [f"subject:{subject_id}"])
+
+
+def _prepare_user_history_report(db_manager, target_user_id):
+    # Obtener usuario objetivo
+    target_user = db_manager.get_user_by_id(target_user_id)
+    if not target_user:
+        raise ReportRequestError('Usuario no encontrado', 404)
+
+    user_dict = {
+        'username': target_user.username,
+        'full_name': target_user.full_name,
+        'student_id': target_user.student_id,
+        'program': target_user.program
+    }
+
+    # Obtener todos los análisis del usuario (auto-análisis)
+    analyses = db_manager.get_user_analysis_history_filtered(user_id=target_user_id)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return ReportSpec('generate_history_report', {
+        'analyses': analyses,
+        'user_data': user_dict,
+        'title': f"Historial de {target_user.full_name or target_user.username}"
+    }, f"historial_{target_user.username}_{timestamp}.pdf", [f"user:{target_user_id}"])
+
+
+# ============================================================================
+# ⚙️ EJECUCIÓN (SÍNCRONA O EN COLA)
+# ============================================================================
+
+def _get_job_manager():
+    from app.services.report_jobs import get_report_job_manager
+
+    config = current_app.config
+    return get_report_job_manager(config={
+        'max_workers': config.get('PDF_JOB_WORKERS', 2),
+        'max_pending': config.get('PDF_JOB_MAX_PENDING', 20),
+        'max_per_user': config.get('PDF_JOB_MAX_PER_USER', 3),
+        'nice': config.get('PDF_JOB_NICE', 10),
+        'job_ttl': config.get('PDF_EXPORT_TTL', 3600),
+        'disk_quota_mb': config.get('PDF_EXPORT_QUOTA_MB', 200),
+    })
+
+
+def _send_report(source, download_name, etag):
     """
-    Genera y descarga el reporte PDF de un análisis específico
+    Envía un PDF con su ETag (clave de la caché); el navegador revalida
+
+    Args:
+        source: Ruta del PDF en caché o bytes recién generados (se envían
+                desde memoria, con Content-Length)
     """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    response = send_file(
+        source,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=download_name,
+        etag=etag,
+        conditional=True
+    )
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _not_modified(etag):
+    """Respuesta 304 si el cliente ya tiene esta versión del reporte"""
+    if etag and etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def _render_now(prepare, *args):
+    """Genera el reporte dentro de la request (o lo toma de la caché) y lo envía"""
     try:
         from app.services.pdf_service import get_pdf_generator
-        
+        from app.services.report_cache import get_report_cache
+
         pdf_gen = get_pdf_generator()
         if not pdf_gen:
             return jsonify({'error': 'Generador de PDF no disponible. Instale: pip install reportlab'}), 500
-        
+
         db_manager = current_app.config.get('DB_MANAGER')
-        user_id = session.get('user_id')
-        user_role = session.get('role')
-        
-        # Buscar el análisis (puede ser rom_session o user_analysis_history)
-        # Primero intentar rom_session
-        analysis = db_manager.get_session_by_id(analysis_id)
-        is_subject_analysis = True
-        
-        if not analysis:
-            # Intentar user_analysis_history
-            analysis = db_manager.get_user_analysis_by_id(analysis_id)
-            is_subject_analysis = False
-        
-        if not analysis:
-            return jsonify({'error': 'Análisis no encontrado'}), 404
-        
-        # Verificar permisos
-        analysis_user_id = analysis.get('user_id') if isinstance(analysis, dict) else analysis.user_id
-        if user_role != 'admin' and analysis_user_id != user_id:
-            return jsonify({'error': 'No tienes permiso para ver este análisis'}), 403
-        
-        # Obtener datos del usuario
-        user_data = db_manager.get_user_by_id(analysis_user_id)
-        user_dict = {
-            'username': user_data.username,
-            'full_name': user_data.full_name,
-            'student_id': user_data.student_id,
-            'program': user_data.program
-        } if user_data else None
-        
-        # Obtener datos del sujeto si es análisis de sujeto
-        subject_data = None
-        if is_subject_analysis:
-            subject_id = analysis.get('subject_id') if isinstance(analysis, dict) else analysis.subject_id
-            if subject_id:
-                subject = db_manager.get_subject_by_id(subject_id)
-                if subject:
-                    subject_data = {
-                        'subject_code': subject.subject_code,
-                        'first_name': subject.first_name,
-                        'last_name': subject.last_name,
-                        'gender': subject.gender,
-                        'age': subject.age if hasattr(subject, 'age') else None
-                    }
-        
-        # Convertir análisis a diccionario
-        if not isinstance(analysis, dict):
-            analysis_dict = {
-                'segment': analysis.segment,
-                'exercise_name': analysis.exercise_name if hasattr(analysis, 'exercise_name') else analysis.exercise,
-                'side': analysis.side,
-                'rom_value': analysis.rom_value if hasattr(analysis, 'rom_value') else analysis.rom_max,
-                'rom_max': analysis.rom_max if hasattr(analysis, 'rom_max') else None,
-                'rom_min': analysis.rom_min if hasattr(analysis, 'rom_min') else None,
-                'rom_avg': analysis.rom_avg if hasattr(analysis, 'rom_avg') else None,
-                'quality_score': analysis.quality_score if hasattr(analysis, 'quality_score') else analysis.quality,
-                'created_at': analysis.created_at if hasattr(analysis, 'created_at') else analysis.analysis_date,
-                'notes': analysis.notes if hasattr(analysis, 'notes') else None
-            }
-        else:
-            analysis_dict = analysis
-        
-        # Generar PDF
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"analisis_{analysis_id}_{timestamp}.pdf"
-        
-        filepath = pdf_gen.generate_analysis_report(
-            analysis_data=analysis_dict,
-            user_data=user_dict,
-            subject_data=subject_data,
-            filename=filename
-        )
-        
-        return send_file(
-            filepath,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
-        
+        spec = prepare(db_manager, *args)
+
+        cache = get_report_cache()
+        key = cache.make_key(spec.method, spec.kwargs)
+        not_modified = _not_modified(key)
+        if not_modified is not None:
+            return not_modified
+
+        filepath = cache.get(key)
+        if filepath:
+            return _send_report(filepath, spec.download_name, key)
+
+        # Se genera en memoria; el único archivo que se escribe es el de la caché
+        key, data = cache.render(spec.method, spec.kwargs, spec.tags)
+        return _send_report(data, spec.download_name, key)
+
+    except ReportRequestError as e:
+        return jsonify({'error': e.message}), e.status
     except ImportError as e:
         return jsonify({'error': f'Librería no disponible: {str(e)}. Ejecute: pip install reportlab'}), 500
     except Exception as e:
-        current_app.logger.error(f"Error generando PDF de análisis: {e}")
+        current_app.logger.error(f"Error generando PDF ({prepare.__name__}): {e}")
         return jsonify({'error': f'Error al generar el reporte: {str(e)}'}), 500
 
 
+def _submit_job(prepare, *args):
+    """Prepara los datos y encola el render; responde 202 con el job_id"""
+    from app.services.report_jobs import ReportQueueFull
+
+    try:
+        db_manager = current_app.config.get('DB_MANAGER')
+        spec = prepare(db_manager, *args)
+
+        job = _get_job_manager().submit(
+            owner_id=session.get('user_id'),
+            method=spec.method,
+            kwargs=spec.kwargs,
+            download_name=spec.download_name,
+            tags=spec.tags
+        )
+
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': url_for('pdf.report_job_status', job_id=job.id),
+            'download_url': url_for('pdf.download_report_job', job_id=job.id)
+        }), 202
+
+    except ReportRequestError as e:
+        return jsonify({'error': e.message}), e.status
+    except ReportQueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '10'
+        return response, 429
+    except Exception as e:
+        current_app.logger.error(f"Error encolando PDF ({prepare.__name__}): {e}")
+        return jsonify({'error': f'Error al generar el reporte: {str(e)}'}), 500
+
+
+def _get_owned_job(job_id):
+    """Trabajo del usuario actual (el admin puede ver cualquiera) o None"""
+    job = _get_job_manager().get(job_id)
+    if job is None:
+        return None
+    if session.get('role') != 'admin' and job.owner_id != session.get('user_id'):
+        return None
+    return job
+
+
+# ============================================================================
+# 📄 REPORTES
+# ============================================================================
+
+@pdf_bp.route('/analysis/<int:analysis_id>')
+@login_required
+def download_analysis_report(analysis_id):
+    """
+    Genera y descarga el reporte PDF de un análisis específico
+    """
+    return _render_now(_prepare_analysis_report, analysis_id)
+
+
+@pdf_bp.route('/analysis/<int:analysis_id>/job', methods=['POST'])
+@login_required
+def submit_analysis_report(analysis_id):
+    """
+    Encola el reporte PDF de un análisis específico
+    """
+    return _submit_job(_prepare_analysis_report, analysis_id)
+
+
 @pdf_bp.route('/history')
 @login_required
 def download_history_report():
     """
     Genera y descarga el reporte PDF del historial de análisis del usuario
     """
-    try:
-        from app.services.pdf_service import get_pdf_generator
-        
-        pdf_gen = get_pdf_generator()
-        if not pdf_gen:
-            return jsonify({'error': 'Generador de PDF no disponible. Instale: pip install reportlab'}), 500
-        
-        db_manager = current_app.config.get('DB_MANAGER')
-        user_id = session.get('user_id')
-        
-        # Obtener filtros opcionales
-        segment = request.args.get('segment')
-        from_date = request.args.get('from_date')
-        to_date = request.args.get('to_date')
-        
-        # Obtener análisis
-        analyses = db_manager.get_user_analysis_history_filtered(
-            user_id=user_id,
-            segment=segment if segment else None,
-            date_from=from_date if from_date else None,
-            date_to=to_date if to_date else None
-        )
-        
-        # Obtener datos del usuario
-        user = db_manager.get_user_by_id(user_id)
-        user_dict = {
-            'username': user.username,
-            'full_name': user.full_name,
-            'student_id': user.student_id,
-            'program': user.program
-        } if user else {'username': 'Usuario'}
-        
-        # Generar PDF
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"historial_{user_dict['username']}_{timestamp}.pdf"
-        
-        filepath = pdf_gen.generate_history_report(
-            analyses=analyses,
-            user_data=user_dict,
-            title="Mi Historial de Análisis",
-            filename=filename
-        )
-        
-        return send_file(
-            filepath,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
-        
-    except ImportError as e:
-        return jsonify({'error': f'Librería no disponible: {str(e)}'}), 500
-    except Exception as e:
-        current_app.logger.error(f"Error generando PDF de historial: {e}")
-        return jsonify({'error': f'Error al generar el reporte: {str(e)}'}), 500
+    return _render_now(_prepare_history_report)
+
+
+@pdf_bp.route('/history/job', methods=['POST'])
+@login_required
+def submit_history_report():
+    """
+    Encola el reporte PDF del historial de análisis del usuario
+    """
+    return _submit_job(_prepare_history_report)
 
 
 @pdf_bp.route('/subject/<int:subject_id>')
@@ -185,81 +394,16 @@ def download_subject_report(subject_id):
     """
     Genera y descarga el reporte PDF de un sujeto con todas sus evaluaciones
     """
-    try:
-        from app.services.pdf_service import get_pdf_generator
-        
-        pdf_gen = get_pdf_generator()
-        if not pdf_gen:
-            return jsonify({'error': 'Generador de PDF no disponible. Instale: pip install reportlab'}), 500
-        
-        db_manager = current_app.config.get('DB_MANAGER')
-        user_id = session.get('user_id')
-        user_role = session.get('role')
-        
-        # Obtener sujeto
-        subject = db_manager.get_subject_by_id(subject_id)
-        if not subject:
-            return jsonify({'error': 'Sujeto no encontrado'}), 404
-        
-        # Verificar permisos
-        if user_role != 'admin' and subject.created_by != user_id:
-            return jsonify({'error': 'No tienes permiso para ver este sujeto'}), 403
-        
-        subject_dict = {
-            'subject_code': subject.subject_code,
-            'first_name': subject.first_name,
-            'last_name': subject.last_name,
-            'gender': subject.gender,
-            'age': subject.age if hasattr(subject, 'age') else None,
-            'height': subject.height if hasattr(subject, 'height') else None,
-            'weight': subject.weight if hasattr(subject, 'weight') else None
-        }
-        
-        # Obtener sesiones del sujeto
-        sessions = db_manager.get_sessions_by_subject(subject_id)
-        
-        # Convertir sesiones a diccionarios
-        sessions_list = []
-        for s in sessions:
-            sessions_list.append({
-                'segment': s.segment,
-                'exercise_name': s.exercise_name,
-                'side': s.side,
-                'rom_value': s.rom_value,
-                'quality_score': s.quality_score,
-                'created_at': s.created_at
-            })
-        
-        # Obtener datos del usuario evaluador
-        user = db_manager.get_user_by_id(user_id)
-        user_dict = {
-            'username': user.username,
-            'full_name': user.full_name
-        } if user else None
-        
-        # Generar PDF
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"sujeto_{subject.subject_code}_{timestamp}.pdf"
-        
-        filepath = pdf_gen.generate_subject_report(
-            subject_data=subject_dict,
-            sessions=sessions_list,
-            user_data=user_dict,
-            filename=filename
-        )
-        
-        return send_file(
-            filepath,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
-        
-    except ImportError as e:
-        return jsonify({'error': f'Librería no disponible: {str(e)}'}), 500
-    except Exception as e:
-        current_app.logger.error(f"Error generando PDF de sujeto: {e}")
-        return jsonify({'error': f'Error al generar el reporte: {str(e)}'}), 500
+    return _render_now(_prepare_subject_report, subject_id)
+
+
+@pdf_bp.route('/subject/<int:subject_id>/job', methods=['POST'])
+@login_required
+def submit_subject_report(subject_id):
+    """
+    Encola el reporte PDF de un sujeto con todas sus evaluaciones
+    """
+    return _submit_job(_prepare_subject_report, subject_id)
 
 
 @pdf_bp.route('/user/<int:target_user_id>/history')
@@ -268,48 +412,115 @@ def download_user_history_report(target_user_id):
     """
     [ADMIN] Genera y descarga el reporte PDF del historial de un usuario específico
     """
+    return _render_now(_prepare_user_history_report, target_user_id)
+
+
+@pdf_bp.route('/user/<int:target_user_id>/history/job', methods=['POST'])
+@admin_required
+def submit_user_history_report(target_user_id):
+    """
+    [ADMIN] Encola el reporte PDF del historial de un usuario específico
+    """
+    return _submit_job(_prepare_user_history_report, target_user_id)
+
+
+# ============================================================================
+# 📦 REPORTES DE CLASE
+# ============================================================================
+
+@pdf_bp.route('/class-report')
+@admin_required
+def download_class_report():
+    """
+    [ADMIN] ZIP con el reporte de historial de cada estudiante de una cohorte
+
+    Query params: program, semester, from_date, to_date (todos opcionales)
+    """
     try:
-        from app.services.pdf_service import get_pdf_generator
-        
-        pdf_gen = get_pdf_generator()
-        if not pdf_gen:
-            return jsonify({'error': 'Generador de PDF no disponible'}), 500
-        
+        from app.services.batch_reports import build_history_jobs, stream_class_zip
+
         db_manager = current_app.config.get('DB_MANAGER')
-        
-        # Obtener usuario objetivo
-        target_user = db_manager.get_user_by_id(target_user_id)
-        if not target_user:
-            return jsonify({'error': 'Usuario no encontrado'}), 404
-        
-        user_dict = {
-            'username': target_user.username,
-            'full_name': target_user.full_name,
-            'student_id': target_user.student_id,
-            'program': target_user.program
-        }
-        
-        # Obtener todos los análisis del usuario (auto-análisis)
-        analyses = db_manager.get_user_analysis_history_filtered(user_id=target_user_id)
-        
-        # Generar PDF
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"historial_{target_user.username}_{timestamp}.pdf"
-        
-        filepath = pdf_gen.generate_history_report(
-            analyses=analyses,
-            user_data=user_dict,
-            title=f"Historial de {target_user.full_name or target_user.username}",
-            filename=filename
+        program = request.args.get('program') or None
+        semester = request.args.get('semester', type=int)
+
+        cohort = db_manager.get_cohort_analysis_history(
+            program=program,
+            semester=semester,
+            date_from=request.args.get('from_date') or None,
+            date_to=request.args.get('to_date') or None
         )
-        
-        return send_file(
-            filepath,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
+        if not cohort:
+            return jsonify({'error': 'No hay estudiantes que coincidan con el filtro'}), 404
+
+        max_students = current_app.config.get('PDF_BATCH_MAX_STUDENTS', 500)
+        if len(cohort) > max_students:
+            return jsonify({
+                'error': f'La cohorte tiene {len(cohort)} estudiantes (máximo {max_students}). '
+                         f'Filtre por programa o semestre.'
+            }), 400
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = secure_filename('_'.join(
+            str(part) for part in ('reportes_clase', program, semester and f"sem{semester}", timestamp) if part
+        )) + '.zip'
+
+        return Response(
+            stream_class_zip(
+                build_history_jobs(cohort),
+                max_workers=current_app.config.get('PDF_BATCH_WORKERS', 2)
+            ),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'X-Accel-Buffering': 'no'   # nginx: enviar cada parte sin acumular
+            }
         )
-        
+
     except Exception as e:
-        current_app.logger.error(f"Error generando PDF: {e}")
-        return jsonify({'error': str(e)}), 500
+        current_app.logger.error(f"Error generando reportes de clase: {e}")
+        return jsonify({'error': f'Error al generar los reportes: {str(e)}'}), 500
+
+
+# ============================================================================
+# ⏳ TRABAJOS EN SEGUNDO PLANO
+# ============================================================================
+
+@pdf_bp.route('/jobs/<job_id>')
+@login_required
+def report_job_status(job_id):
+    """
+    Estado de un trabajo de reporte (queued, running, done, error)
+    """
+    job = _get_owned_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+
+    data = job.to_dict()
+    if job.status == 'done':
+        data['download_url'] = url_for('pdf.download_report_job', job_id=job.id)
+    return jsonify({'success': True, 'job': data})
+
+
+@pdf_bp.route('/jobs/<job_id>/download')
+@login_required
+def download_report_job(job_id):
+    """
+    Descarga el PDF de un trabajo terminado
+    """
+    job = _get_owned_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+
+    if job.status == 'error':
+        return jsonify({'error': f'Error al generar el reporte: {job.error}'}), 500
+    if job.status != 'done':
+        return jsonify({'error': 'El reporte aún se está generando', 'status': job.status}), 409
+
+    not_modified = _not_modified(job.cache_key)
+    if not_modified is not None:
+        return not_modified
+
+    if not job.filepath or not os.path.exists(job.filepath):
+        return jsonify({'error': 'El reporte expiró, genérelo de nuevo'}), 410
+
+    return _send_report(job.filepath, job.download_name, job.cache_key)
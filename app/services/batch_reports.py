@@ -0,0 +1,163 @@
+"""
+📦 REPORTES DE CLASE EN LOTE - BIOTRACK
+=========================================
+Genera el reporte de historial de cada estudiante de una cohorte y los
+entrega en un ZIP que se transmite a medida que se generan.
+
+FLUJO:
+1. La ruta obtiene toda la cohorte con UNA consulta agrupada
+   (DatabaseManager.get_cohort_analysis_history)
+2. Los reportes que ya están en la caché de reportes se usan directamente
+3. El resto se renderiza en paralelo en un pool de procesos; cada proceso
+   crea UN PDFReportGenerator (estilos y logos una sola vez) y lo reutiliza
+   para todos los estudiantes que le tocan
+4. Los workers generan en memoria y retornan los bytes; cada PDF se
+   guarda en la caché de reportes, se agrega al ZIP y se envía de
+   inmediato (ZIP sin seek: descriptores de datos, sin archivos temporales)
+
+Los procesos se crean con 'spawn': el proceso web tiene hilos (write-behind,
+cola de reportes) y un fork con hilos activos puede heredar locks tomados.
+
+Autor: BIOTRACK Team
+Fecha: 2025-11-29
+"""
+
+import logging
+import multiprocessing
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# Generador del proceso worker (uno por proceso del pool)
+_worker_generator = None
+
+
+def _init_worker():
+    """Inicializador del pool: crea el generador del proceso una sola vez"""
+    global _worker_generator
+    from app.services.pdf_service import PDFReportGenerator
+    _worker_generator = PDFReportGenerator()
+
+
+def _render_student(kwargs: Dict[str, Any]) -> bytes:
+    """Renderiza en memoria el reporte de un estudiante en el proceso worker"""
+    return _worker_generator.render_bytes('generate_history_report', **kwargs)
+
+
+class _ZipStream:
+    """Destino de escritura del ZIP que acumula bytes hasta drain()"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r'[^\w.-]+', '_', value or '').strip('_') or 'estudiante'
+
+
+def build_history_jobs(cohort: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Convierte la cohorte en trabajos de reporte de historial
+
+    Args:
+        cohort: Resultado de DatabaseManager.get_cohort_analysis_history
+
+    Returns:
+        Lista de {'arcname', 'kwargs', 'tags'}; kwargs son los mismos del
+        reporte individual (/pdf/user/<id>/history), así la caché se comparte
+    """
+    jobs = []
+    for entry in cohort:
+        user = entry['user']
+        user_dict = {
+            'username': user.get('username'),
+            'full_name': user.get('full_name'),
+            'student_id': user.get('student_id'),
+            'program': user.get('program')
+        }
+        jobs.append({
+            # username es único: no hay nombres repetidos dentro del ZIP
+            'arcname': f"{_safe_name(user.get('full_name'))}_{_safe_name(user.get('username'))}.pdf",
+            'kwargs': {
+                'analyses': entry['analyses'],
+                'user_data': user_dict,
+                'title': f"Historial de {user.get('full_name') or user.get('username')}"
+            },
+            'tags': [f"user:{user.get('id')}"]
+        })
+    return jobs
+
+
+def stream_class_zip(jobs: List[Dict[str, Any]], max_workers: int = 2) -> Iterator[bytes]:
+    """
+    Genera los PDFs en un pool de procesos y produce el ZIP por partes
+
+    Args:
+        jobs: Resultado de build_history_jobs
+        max_workers: Procesos del pool
+
+    Yields:
+        Fragmentos del archivo ZIP
+    """
+    from app.services.report_cache import ReportCache, get_report_cache
+
+    cache = get_report_cache()
+    stream = _ZipStream()
+    errors = []
+    executor = None
+
+    try:
+        # PDFs ya comprimidos: ZIP_STORED evita recomprimir
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as zf:
+            pending = []
+            for job in jobs:
+                job['key'] = ReportCache.make_key('generate_history_report', job['kwargs'])
+                cached_path = cache.get(job['key'])
+                if cached_path:
+                    zf.write(cached_path, job['arcname'])
+                    yield stream.drain()
+                else:
+                    pending.append(job)
+
+            if pending:
+                executor = ProcessPoolExecutor(
+                    max_workers=max(1, min(max_workers, len(pending))),
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+                futures = {executor.submit(_render_student, job['kwargs']): job for job in pending}
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        logger.error(f"Error generando {job['arcname']}: {e}")
+                        errors.append(f"{job['arcname']}: {e}")
+                        continue
+                    cache.put(job['key'], data, 'generate_history_report', job['tags'])
+                    zf.writestr(job['arcname'], data)
+                    yield stream.drain()
+
+            if errors:
+                zf.writestr('errores.txt', '\n'.join(errors))
+        yield stream.drain()
+
+    finally:
+        # También al cortar la descarga: GeneratorExit llega aquí
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -9,8 +9,9 @@ Fecha: 2025-12-08
 
 import os
 import io
+import threading
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, BinaryIO, Union
 
 try:
     from reportlab.lib import colors
@@ -23,6 +24,7 @@ try:
         Image, PageBreak, HRFlowable
     )
     from reportlab.pdfgen import canvas
+    from reportlab.pdfbase import pdfmetrics
     REPORTLAB_AVAILABLE = True
 except ImportError:
     REPORTLAB_AVAILABLE = False
@@ -35,6 +37,23 @@ class PDFReportGenerator:
     Incluye logos de Universidad del Valle y BIOTRACK
     """
     
+    # Versión de las plantillas: cambiarla al modificar el diseño de los
+    # reportes invalida la caché de PDFs (app/services/report_cache.py)
+    TEMPLATE_VERSION = '2025.11.2'
+    
+    # Logos: tamaño en el reporte y resolución a la que se pre-escalan
+    LOGO_SIZE_INCH = 1.2
+    LOGO_DPI = 200
+    
+    # Fuentes usadas por los estilos y el pie de página
+    FONTS = ('Helvetica', 'Helvetica-Bold')
+    
+    # Recursos compartidos por todas las instancias del proceso
+    # (se construyen una vez; los generadores solo los leen)
+    _shared_styles = None
+    _shared_logos: Dict[str, Optional[bytes]] = {}
+    _shared_lock = threading.Lock()
+    
     # Colores corporativos
     COLORS = {
         'primary': colors.HexColor('#00D4FF'),      # Cyan BIOTRACK
@@ -89,81 +108,138 @@ class PDFReportGenerator:
                 os.path.dirname(self.base_dir), 'instance', 'exports'
             )
         
-        # Crear directorio si no existe
-        os.makedirs(self.output_dir, exist_ok=True)
+        # El directorio se crea al escribir el primer archivo: con `output`
+        # (BytesIO) los reportes no tocan el disco
         
         # Rutas de logos
         self.logo_biotrack = os.path.join(self.images_dir, 'logo.png')
         self.logo_univalle = os.path.join(self.images_dir, 'logo univalle.png')
         
-        # Estilos
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
+        # Estilos (compartidos en el proceso)
+        self.styles = self._get_shared_styles()
+    
+    # ========================================================================
+    # RECURSOS COMPARTIDOS (estilos, logos, fuentes)
+    # ========================================================================
     
-    def _setup_custom_styles(self):
+    @classmethod
+    def _get_shared_styles(cls):
+        """Hoja de estilos del proceso (y métricas de fuentes precargadas)"""
+        if cls._shared_styles is None:
+            with cls._shared_lock:
+                if cls._shared_styles is None:
+                    # Las fuentes estándar no se registran, pero sus métricas
+                    # se cargan perezosamente en el primer uso
+                    for font_name in cls.FONTS:
+                        pdfmetrics.getFont(font_name)
+                    
+                    styles = getSampleStyleSheet()
+                    cls._setup_custom_styles(styles)
+                    cls._shared_styles = styles
+        return cls._shared_styles
+    
+    @classmethod
+    def _get_logo(cls, path: str) -> Optional[bytes]:
+        """
+        PNG del logo ya escalado al tamaño del reporte (cacheado por proceso)
+        
+        El original se decodifica y redimensiona una sola vez; además el PDF
+        embebe la imagen pequeña en lugar de la de resolución completa.
+        
+        Returns:
+            Bytes PNG o None si el archivo no existe
+        """
+        if path in cls._shared_logos:
+            return cls._shared_logos[path]
+        
+        with cls._shared_lock:
+            if path not in cls._shared_logos:
+                logo = None
+                if os.path.exists(path):
+                    from PIL import Image as PILImage
+                    
+                    side = int(cls.LOGO_SIZE_INCH * cls.LOGO_DPI)
+                    with PILImage.open(path) as img:
+                        img = img.convert('RGBA')
+                        img.thumbnail((side, side), PILImage.LANCZOS)
+                        buffer = io.BytesIO()
+                        img.save(buffer, format='PNG', optimize=True)
+                    logo = buffer.getvalue()
+                cls._shared_logos[path] = logo
+        return cls._shared_logos[path]
+    
+    @classmethod
+    def reset_shared_assets(cls):
+        """Descarta los recursos compartidos (benchmark / cambio de logos)"""
+        with cls._shared_lock:
+            cls._shared_styles = None
+            cls._shared_logos = {}
+    
+    @classmethod
+    def _setup_custom_styles(cls, styles):
         """Configura estilos personalizados para el PDF"""
         
         # Título principal
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='MainTitle',
-            parent=self.styles['Heading1'],
+            parent=styles['Heading1'],
             fontSize=24,
-            textColor=self.COLORS['primary'],
+            textColor=cls.COLORS['primary'],
             alignment=TA_CENTER,
             spaceAfter=20,
             fontName='Helvetica-Bold'
         ))
         
         # Subtítulo
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='SubTitle',
-            parent=self.styles['Heading2'],
+            parent=styles['Heading2'],
             fontSize=14,
-            textColor=self.COLORS['text'],
+            textColor=cls.COLORS['text'],
             alignment=TA_CENTER,
             spaceAfter=12,
             fontName='Helvetica'
         ))
         
         # Encabezado de sección
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='SectionHeader',
-            parent=self.styles['Heading2'],
+            parent=styles['Heading2'],
             fontSize=14,
-            textColor=self.COLORS['primary'],
+            textColor=cls.COLORS['primary'],
             spaceBefore=20,
             spaceAfter=10,
             fontName='Helvetica-Bold',
-            borderColor=self.COLORS['primary'],
+            borderColor=cls.COLORS['primary'],
             borderWidth=1,
             borderPadding=5
         ))
         
         # Texto normal
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='NormalText',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=10,
-            textColor=self.COLORS['text'],
+            textColor=cls.COLORS['text'],
             alignment=TA_JUSTIFY,
             spaceAfter=6
         ))
         
         # Texto pequeño
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='SmallText',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=8,
             textColor=colors.gray,
             alignment=TA_CENTER
         ))
         
         # Valor destacado
-        self.styles.add(ParagraphStyle(
+        styles.add(ParagraphStyle(
             name='HighlightValue',
-            parent=self.styles['Normal'],
+            parent=styles['Normal'],
             fontSize=18,
-            textColor=self.COLORS['primary'],
+            textColor=cls.COLORS['primary'],
             alignment=TA_CENTER,
             fontName='Helvetica-Bold'
         ))
@@ -184,15 +260,19 @@ class PDFReportGenerator:
         # Tabla con logos y título
         header_data = []
         
+        logo_size = self.LOGO_SIZE_INCH * inch
+        
         # Logo Univalle (izquierda)
-        if os.path.exists(self.logo_univalle):
-            logo_univalle = Image(self.logo_univalle, width=1.2*inch, height=1.2*inch)
+        logo_bytes = self._get_logo(self.logo_univalle)
+        if logo_bytes:
+            logo_univalle = Image(io.BytesIO(logo_bytes), width=logo_size, height=logo_size)
         else:
             logo_univalle = Paragraph("UNIVALLE", self.styles['NormalText'])
         
         # Logo BIOTRACK (derecha)
-        if os.path.exists(self.logo_biotrack):
-            logo_biotrack = Image(self.logo_biotrack, width=1.2*inch, height=1.2*inch)
+        logo_bytes = self._get_logo(self.logo_biotrack)
+        if logo_bytes:
+            logo_biotrack = Image(io.BytesIO(logo_bytes), width=logo_size, height=logo_size)
         else:
             logo_biotrack = Paragraph("BIOTRACK", self.styles['NormalText'])
         
@@ -307,13 +387,38 @@ class PDFReportGenerator:
         
         return elements
     
+    def _resolve_target(self, filename: str, output: Optional[BinaryIO]) -> Union[str, BinaryIO]:
+        """Destino del documento: el buffer `output` o el archivo en output_dir"""
+        if output is not None:
+            return output
+        
+        filepath = os.path.join(self.output_dir, filename)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        return filepath
+    
+    def render_bytes(self, method: str, **kwargs) -> bytes:
+        """
+        Genera un reporte en memoria
+        
+        Args:
+            method: Método generate_* a usar ('generate_history_report'...)
+            **kwargs: Argumentos del método (sin filename/output)
+        
+        Returns:
+            Contenido del PDF
+        """
+        buffer = io.BytesIO()
+        getattr(self, method)(**kwargs, output=buffer)
+        return buffer.getvalue()
+    
     def generate_analysis_report(
         self,
         analysis_data: Dict[str, Any],
         user_data: Dict[str, Any] = None,
         subject_data: Dict[str, Any] = None,
-        filename: str = None
-    ) -> str:
+        filename: str = None,
+        output: Optional[BinaryIO] = None
+    ) -> Union[str, BinaryIO]:
         """
         Genera un reporte PDF de un análisis ROM
         
@@ -321,20 +426,21 @@ class PDFReportGenerator:
             analysis_data: Datos del análisis (segment, exercise, rom_value, etc.)
             user_data: Datos del usuario que realizó el análisis
             subject_data: Datos del sujeto analizado (si aplica)
-            filename: Nombre del archivo (opcional)
+            filename: Nombre del archivo en output_dir (opcional)
+            output: Buffer escribible (ej. BytesIO); si se indica no se escribe a disco
         
         Returns:
-            Ruta del archivo PDF generado
+            Ruta del archivo PDF generado, u `output` si se indicó
         """
         if not filename:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"reporte_analisis_{timestamp}.pdf"
         
-        filepath = os.path.join(self.output_dir, filename)
+        target = self._resolve_target(filename, output)
         
         # Crear documento
         doc = SimpleDocTemplate(
-            filepath,
+            target,
             pagesize=letter,
             rightMargin=50,
             leftMargin=50,
@@ -452,15 +558,16 @@ class PDFReportGenerator:
         # Construir PDF
         doc.build(elements, onFirstPage=self._create_footer, onLaterPages=self._create_footer)
         
-        return filepath
+        return target
     
     def generate_history_report(
         self,
         analyses: List[Dict[str, Any]],
         user_data: Dict[str, Any],
         title: str = "Historial de Análisis",
-        filename: str = None
-    ) -> str:
+        filename: str = None,
+        output: Optional[BinaryIO] = None
+    ) -> Union[str, BinaryIO]:
         """
         Genera un reporte PDF del historial de análisis
         
@@ -468,19 +575,20 @@ class PDFReportGenerator:
             analyses: Lista de análisis
             user_data: Datos del usuario
             title: Título del reporte
-            filename: Nombre del archivo (opcional)
+            filename: Nombre del archivo en output_dir (opcional)
+            output: Buffer escribible (ej. BytesIO); si se indica no se escribe a disco
         
         Returns:
-            Ruta del archivo PDF generado
+            Ruta del archivo PDF generado, u `output` si se indicó
         """
         if not filename:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"historial_{user_data.get('username', 'usuario')}_{timestamp}.pdf"
         
-        filepath = os.path.join(self.output_dir, filename)
+        target = self._resolve_target(filename, output)
         
         doc = SimpleDocTemplate(
-            filepath,
+            target,
             pagesize=letter,
             rightMargin=50,
             leftMargin=50,
@@ -583,15 +691,16 @@ class PDFReportGenerator:
         # Construir PDF
         doc.build(elements, onFirstPage=self._create_footer, onLaterPages=self._create_footer)
         
-        return filepath
+        return target
     
     def generate_subject_report(
         self,
         subject_data: Dict[str, Any],
         sessions: List[Dict[str, Any]],
         user_data: Dict[str, Any] = None,
-        filename: str = None
-    ) -> str:
+        filename: str = None,
+        output: Optional[BinaryIO] = None
+    ) -> Union[str, BinaryIO]:
         """
         Genera un reporte PDF de un sujeto con todas sus sesiones
         
@@ -599,20 +708,21 @@ class PDFReportGenerator:
             subject_data: Datos del sujeto
             sessions: Lista de sesiones ROM del sujeto
             user_data: Datos del usuario evaluador
-            filename: Nombre del archivo (opcional)
+            filename: Nombre del archivo en output_dir (opcional)
+            output: Buffer escribible (ej. BytesIO); si se indica no se escribe a disco
         
         Returns:
-            Ruta del archivo PDF generado
+            Ruta del archivo PDF generado, u `output` si se indicó
         """
         if not filename:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             subject_code = subject_data.get('subject_code', 'sujeto')
             filename = f"reporte_sujeto_{subject_code}_{timestamp}.pdf"
         
-        filepath = os.path.join(self.output_dir, filename)
+        target = self._resolve_target(filename, output)
         
         doc = SimpleDocTemplate(
-            filepath,
+            target,
             pagesize=letter,
             rightMargin=50,
             leftMargin=50,
@@ -701,7 +811,7 @@ class PDFReportGenerator:
         # Construir PDF
         doc.build(elements, onFirstPage=self._create_footer, onLaterPages=self._create_footer)
         
-        return filepath
+        return target
     
     def _get_reference_rom(self, segment: str, exercise: str) -> str:
         """Obtiene el valor de referencia ROM para un ejercicio"""
@@ -0,0 +1,360 @@
+"""
+🗃️ CACHÉ DE REPORTES PDF - BIOTRACK
+=====================================
+Caché direccionada por contenido para los reportes PDF: la clave es el
+SHA-256 de los datos del reporte (filas de análisis, datos de usuario y
+sujeto), del método del generador y de PDFReportGenerator.TEMPLATE_VERSION.
+
+- Mismo contenido -> mismo archivo: se sirve sin volver a ejecutar ReportLab
+- La clave es también el ETag: con If-None-Match la respuesta es un 304
+- Si cambia una fila la clave cambia sola; además, los eventos de
+  UserAnalysisHistory y ROMSession borran de inmediato las entradas
+  afectadas (etiquetas 'user:<id>' y 'subject:<id>')
+- Presupuesto de disco (max_size_mb) con desalojo LRU por mtime, que se
+  actualiza en cada acierto
+
+Los archivos viven en instance/exports/cache/<clave>.pdf con un
+<clave>.json de metadatos (etiquetas), compartidos por todos los workers.
+Cada proceso mantiene un índice etiqueta -> claves en memoria; al invalidar
+solo se leen los .json de las claves que aún no conoce (las que guardó
+otro worker).
+
+NOTA: la fecha de generación impresa en el pie es la del primer render.
+
+Autor: BIOTRACK Team
+Fecha: 2025-11-29
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ReportCache:
+    """
+    Caché de PDFs en disco direccionada por contenido
+    """
+
+    DEFAULT_CONFIG = {
+        'max_size_mb': 100,
+    }
+
+    def __init__(self, cache_dir: str, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            cache_dir: Directorio de la caché (instance/exports/cache)
+            config: Sobrescribe valores de DEFAULT_CONFIG
+        """
+        self.config = {**self.DEFAULT_CONFIG, **(config or {})}
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+        # Índice de etiquetas (etiqueta -> claves y clave -> etiquetas)
+        self._tag_index: Dict[str, Set[str]] = {}
+        self._key_tags: Dict[str, Set[str]] = {}
+
+        # Contadores
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._sync_index()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(method: str, kwargs: Dict[str, Any]) -> str:
+        """Clave SHA-256 del reporte (datos + método + versión de plantilla)"""
+        from app.services.pdf_service import PDFReportGenerator
+
+        payload = json.dumps(
+            {'template': PDFReportGenerator.TEMPLATE_VERSION, 'method': method, 'kwargs': kwargs},
+            sort_keys=True, default=str, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Ruta del PDF cacheado o None (un acierto lo marca como reciente)"""
+        path = self._pdf_path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def render(self, method: str, kwargs: Dict[str, Any],
+               tags: Iterable[str] = ()) -> Tuple[str, bytes]:
+        """
+        Genera el reporte en memoria y lo guarda en la caché
+
+        Args:
+            method: Método de PDFReportGenerator
+            kwargs: Argumentos del método (sin filename/output)
+            tags: Etiquetas para la invalidación ('user:3', 'subject:7')
+
+        Returns:
+            (clave, contenido del PDF)
+        """
+        from app.services.pdf_service import get_pdf_generator
+
+        pdf_gen = get_pdf_generator()
+        if pdf_gen is None:
+            raise RuntimeError("Generador de PDF no disponible. Instale: pip install reportlab")
+
+        key = self.make_key(method, kwargs)
+        data = pdf_gen.render_bytes(method, **kwargs)
+        self.put(key, data, method, tags)
+        return key, data
+
+    def get_or_render(self, method: str, kwargs: Dict[str, Any],
+                      tags: Iterable[str] = ()) -> Tuple[str, str]:
+        """
+        Retorna el PDF cacheado o lo genera y lo guarda
+
+        Args:
+            method: Método de PDFReportGenerator
+            kwargs: Argumentos del método (sin filename/output)
+            tags: Etiquetas para la invalidación ('user:3', 'subject:7')
+
+        Returns:
+            (clave, ruta del PDF)
+        """
+        key = self.make_key(method, kwargs)
+        path = self.get(key)
+        if path:
+            return key, path
+
+        # Un solo render por clave dentro del proceso
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                path = self._pdf_path(key)
+                if not os.path.exists(path):
+                    self.render(method, kwargs, tags)
+        finally:
+            with self._lock:
+                self._key_locks.pop(key, None)
+
+        return key, path
+
+    def put(self, key: str, data: bytes, method: str, tags: Iterable[str] = ()):
+        """
+        Guarda un PDF ya generado y aplica el presupuesto de disco
+
+        Escritura atómica (archivo temporal + os.replace): otro worker puede
+        estar guardando la misma clave; queda uno de los dos (idénticos).
+        """
+        tags = set(tags)
+        tmp_path = os.path.join(self.cache_dir, f".{key}.{uuid.uuid4().hex}.tmp")
+        meta = {'key': key, 'method': method, 'tags': sorted(tags),
+                'created_at': time.time(), 'size': len(data)}
+        try:
+            with open(f"{tmp_path}.json", 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(f"{tmp_path}.json", self._meta_path(key))
+            os.replace(tmp_path, self._pdf_path(key))
+        finally:
+            for leftover in (tmp_path, f"{tmp_path}.json"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+        self._index(key, tags)
+        self._enforce_budget(keep=key)
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """
+        Borra las entradas que tengan alguna de las etiquetas
+
+        Returns:
+            Número de entradas borradas
+        """
+        tags = set(tags)
+        if not tags:
+            return 0
+
+        self._sync_index()
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tag_index.get(tag, set())
+        for key in keys:
+            self._remove(key)
+
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> int:
+        """Vacía la caché"""
+        keys = {os.path.splitext(name)[0] for name in os.listdir(self.cache_dir)}
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self._entries()
+        return {
+            'entries': len(entries),
+            'size_mb': round(size / (1024 * 1024), 2),
+            'max_size_mb': self.config['max_size_mb'],
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _entries(self):
+        entries = []
+        size = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.pdf'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.name[:-len('.pdf')]))
+                size += stat.st_size
+        return entries, size
+
+    def _enforce_budget(self, keep: Optional[str] = None):
+        """Desaloja las entradas menos usadas hasta quedar bajo max_size_mb"""
+        budget = self.config['max_size_mb'] * 1024 * 1024
+        entries, size = self._entries()
+        for _, entry_size, key in sorted(entries):
+            if size <= budget:
+                break
+            if key == keep:
+                continue
+            self._remove(key)
+            self.evictions += 1
+            size -= entry_size
+
+    def _sync_index(self):
+        """
+        Alinea el índice con el directorio: agrega las claves guardadas por
+        otros procesos (leyendo solo sus .json) y quita las borradas
+        """
+        on_disk = {
+            entry.name[:-len('.json')] for entry in os.scandir(self.cache_dir)
+            if entry.name.endswith('.json') and not entry.name.startswith('.')
+        }
+        with self._lock:
+            known = set(self._key_tags)
+        for key in known - on_disk:
+            self._unindex(key)
+        for key in on_disk - known:
+            try:
+                with open(self._meta_path(key), 'r', encoding='utf-8') as f:
+                    tags = set(json.load(f).get('tags', []))
+            except (OSError, ValueError):
+                continue
+            self._index(key, tags)
+
+    def _index(self, key: str, tags: Set[str]):
+        with self._lock:
+            self._key_tags[key] = tags
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+
+    def _unindex(self, key: str):
+        with self._lock:
+            for tag in self._key_tags.pop(key, ()):
+                keys = self._tag_index.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tag_index[tag]
+
+    def _remove(self, key: str):
+        for path in (self._pdf_path(key), self._meta_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._unindex(key)
+
+    def _pdf_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+
+# ============================================================================
+# 🔔 INVALIDACIÓN POR EVENTOS DE LOS MODELOS
+# ============================================================================
+
+_installed_models = set()
+
+
+def _tags_for_row(target) -> set:
+    """Etiquetas de caché afectadas por una fila de análisis"""
+    from database.database_manager import ROMSession
+
+    if isinstance(target, ROMSession):
+        return {f"subject:{target.subject_id}"}
+    return {f"user:{target.user_id}"}
+
+
+def install_invalidation_hooks():
+    """
+    Registra los eventos de UserAnalysisHistory y ROMSession que borran
+    los reportes cacheados afectados (idempotente)
+    """
+    from sqlalchemy import event
+    from database.database_manager import ROMSession, UserAnalysisHistory
+
+    def on_change(mapper, connection, target):
+        try:
+            get_report_cache().invalidate(_tags_for_row(target))
+        except Exception as e:
+            logger.warning(f"Error invalidando caché de reportes: {e}")
+
+    for model in (UserAnalysisHistory, ROMSession):
+        if model in _installed_models:
+            continue
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, event_name, on_change)
+        _installed_models.add(model)
+
+
+# Instancia global
+_report_cache = None
+_report_cache_lock = threading.Lock()
+
+
+def get_report_cache(cache_dir: str = None, config: Optional[Dict[str, Any]] = None) -> ReportCache:
+    """
+    Obtiene o crea la caché de reportes (singleton por proceso)
+
+    Args:
+        cache_dir: Directorio de la caché (solo en la primera llamada)
+        config: Configuración (solo en la primera llamada)
+    """
+    global _report_cache
+    if _report_cache is None:
+        with _report_cache_lock:
+            if _report_cache is None:
+                if cache_dir is None:
+                    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+                    cache_dir = os.path.join(base_dir, 'instance', 'exports', 'cache')
+                _report_cache = ReportCache(cache_dir, config)
+    return _report_cache
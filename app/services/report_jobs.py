@@ -0,0 +1,326 @@
+"""
+🧾 COLA DE TRABAJOS DE REPORTES PDF - BIOTRACK
+================================================
+Genera los reportes PDF en segundo plano para no bloquear un worker de
+Gunicorn durante el build de ReportLab.
+
+FLUJO:
+1. La ruta reúne los datos (consultas rápidas) y llama submit()
+2. submit() retorna un job_id de inmediato (HTTP 202)
+3. Un pool acotado de hilos renderiza el PDF a través de la caché de
+   reportes (report_cache.py); si ya está en caché el trabajo nace 'done'
+4. El cliente consulta el estado y descarga el archivo terminado
+
+LÍMITES:
+- max_workers: PDFs renderizándose a la vez (el resto espera en cola)
+- max_pending: trabajos en cola + en curso; al superarlo -> ReportQueueFull
+- max_per_user: trabajos activos por usuario
+- nice: prioridad de CPU más baja para los hilos de render (Linux), para
+  que los picos de fin de semestre no ahoguen el análisis en vivo
+
+LIMPIEZA DE instance/exports (archivos sueltos; la caché tiene su propio
+presupuesto):
+- Archivos y trabajos terminados con más de job_ttl segundos se borran
+- Si el directorio supera disk_quota_mb se borran los más antiguos
+- Nunca se borra el archivo de un trabajo en cola o en curso
+
+El estado de cada trabajo se guarda también en exports/jobs/<id>.json,
+así cualquier worker de Gunicorn puede responder el estado y la descarga.
+
+Autor: BIOTRACK Team
+Fecha: 2025-11-29
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, field
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ReportQueueFull(Exception):
+    """La cola de reportes (global o del usuario) está llena"""
+
+
+@dataclass
+class ReportJob:
+    """Estado de un trabajo de reporte"""
+    id: str
+    owner_id: Optional[int]
+    method: str                      # Método de PDFReportGenerator
+    download_name: str
+    status: str = 'queued'           # queued | running | done | error
+    filepath: Optional[str] = None
+    cache_key: Optional[str] = None  # ETag del PDF
+    size: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ('queued', 'running')
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop('filepath')
+        return data
+
+
+class ReportJobManager:
+    """
+    Cola acotada de trabajos de reportes PDF con limpieza de exports
+    """
+
+    DEFAULT_CONFIG = {
+        'max_workers': 2,
+        'max_pending': 20,
+        'max_per_user': 3,
+        'job_ttl': 3600,          # segundos
+        'disk_quota_mb': 200,
+        'nice': 10,
+    }
+
+    def __init__(self, output_dir: str, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            output_dir: Directorio de exports (el de PDFReportGenerator)
+            config: Sobrescribe valores de DEFAULT_CONFIG
+        """
+        self.config = {**self.DEFAULT_CONFIG, **(config or {})}
+        self.output_dir = output_dir
+        self.jobs_dir = os.path.join(output_dir, 'jobs')
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+        self._jobs: Dict[str, ReportJob] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config['max_workers'],
+            thread_name_prefix='biotrack-pdf',
+            initializer=self._lower_priority
+        )
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def submit(self, owner_id: Optional[int], method: str, kwargs: Dict[str, Any],
+               download_name: str, tags: Iterable[str] = ()) -> ReportJob:
+        """
+        Encola la generación de un reporte
+
+        Args:
+            owner_id: Usuario que pidió el reporte (control de acceso y cupo)
+            method: Método de PDFReportGenerator ('generate_history_report'...)
+            kwargs: Argumentos del método (sin filename)
+            download_name: Nombre con el que se descarga el PDF
+            tags: Etiquetas de invalidación de la caché de reportes
+
+        Returns:
+            ReportJob en estado 'queued' (o 'done' si ya estaba en caché)
+
+        Raises:
+            ReportQueueFull: Si se supera max_pending o max_per_user
+        """
+        from app.services.report_cache import get_report_cache
+
+        # Acierto de caché: no ocupa cupo ni hilo
+        cache = get_report_cache()
+        cache_key = cache.make_key(method, kwargs)
+        cached_path = cache.get(cache_key)
+        if cached_path:
+            now = time.time()
+            job = ReportJob(id=uuid.uuid4().hex, owner_id=owner_id, method=method,
+                            download_name=download_name, status='done', filepath=cached_path,
+                            cache_key=cache_key, size=os.path.getsize(cached_path),
+                            started_at=now, finished_at=now)
+            with self._lock:
+                self._jobs[job.id] = job
+                self._persist(job)
+            return job
+
+        with self._lock:
+            active = [job for job in self._jobs.values() if job.active]
+            if len(active) >= self.config['max_pending']:
+                raise ReportQueueFull("Hay demasiados reportes en proceso, intente en unos segundos")
+            if sum(1 for job in active if job.owner_id == owner_id) >= self.config['max_per_user']:
+                raise ReportQueueFull("Ya tiene reportes en proceso, espere a que terminen")
+
+            job = ReportJob(id=uuid.uuid4().hex, owner_id=owner_id, method=method,
+                            download_name=download_name)
+            self._jobs[job.id] = job
+            self._persist(job)
+
+        self._executor.submit(self._render, job, kwargs, list(tags))
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        """Estado de un trabajo (de memoria o del archivo de estado)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+
+        # Trabajo creado por otro worker
+        path = self._state_path(job_id)
+        if not path:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return ReportJob(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def cleanup(self) -> Dict[str, int]:
+        """
+        Borra trabajos/archivos vencidos y aplica la cuota de disco
+
+        Returns:
+            Diccionario con expired, evicted y bytes_used
+        """
+        now = time.time()
+        ttl = self.config['job_ttl']
+        quota = self.config['disk_quota_mb'] * 1024 * 1024
+
+        with self._lock:
+            protected = {job.filepath for job in self._jobs.values() if job.active and job.filepath}
+            for job_id in [j.id for j in self._jobs.values()
+                           if not j.active and now - (j.finished_at or j.created_at) > ttl]:
+                del self._jobs[job_id]
+
+        expired = evicted = 0
+
+        # Archivos de estado vencidos
+        for name in os.listdir(self.jobs_dir):
+            path = os.path.join(self.jobs_dir, name)
+            try:
+                if now - os.path.getmtime(path) > ttl:
+                    os.remove(path)
+            except OSError:
+                pass
+
+        # PDFs: vencidos por TTL, luego los más antiguos hasta la cuota
+        files = []
+        for entry in os.scandir(self.output_dir):
+            if not entry.is_file() or not entry.name.endswith('.pdf') or entry.path in protected:
+                continue
+            stat = entry.stat()
+            if now - stat.st_mtime > ttl:
+                expired += self._remove(entry.path)
+            else:
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        used = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if used <= quota:
+                break
+            if self._remove(path):
+                evicted += 1
+                used -= size
+
+        return {'expired': expired, 'evicted': evicted, 'bytes_used': used}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_status: Dict[str, int] = {}
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {'config': dict(self.config), 'jobs': by_status}
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _render(self, job: ReportJob, kwargs: Dict[str, Any], tags: List[str]):
+        from app.services.report_cache import get_report_cache
+
+        self._update(job, status='running', started_at=time.time())
+        try:
+            cache_key, filepath = get_report_cache().get_or_render(job.method, kwargs, tags)
+            self._update(job, status='done', filepath=filepath, cache_key=cache_key,
+                         size=os.path.getsize(filepath), finished_at=time.time())
+        except Exception as e:
+            logger.error(f"Error generando reporte {job.id} ({job.method}): {e}")
+            self._update(job, status='error', error=str(e), finished_at=time.time())
+
+        try:
+            self.cleanup()
+        except Exception as e:
+            logger.warning(f"Error en limpieza de exports: {e}")
+
+    def _update(self, job: ReportJob, **changes):
+        with self._lock:
+            for key, value in changes.items():
+                setattr(job, key, value)
+            self._persist(job)
+
+    def _persist(self, job: ReportJob):
+        path = os.path.join(self.jobs_dir, f"{job.id}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(asdict(job), f)
+        os.replace(tmp_path, path)
+
+    def _state_path(self, job_id: str) -> Optional[str]:
+        # El id viene de la URL: solo hex de uuid4
+        if len(job_id) != 32 or any(c not in '0123456789abcdef' for c in job_id):
+            return None
+        path = os.path.join(self.jobs_dir, f"{job_id}.json")
+        return path if os.path.exists(path) else None
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    def _lower_priority(self):
+        """Baja la prioridad de CPU del hilo de render (solo Linux)"""
+        nice = self.config['nice']
+        if nice and hasattr(os, 'setpriority') and hasattr(threading, 'get_native_id'):
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+            except OSError:
+                pass
+
+
+# Instancia global
+_report_job_manager = None
+_report_job_lock = threading.Lock()
+
+
+def get_report_job_manager(output_dir: str = None, config: Optional[Dict[str, Any]] = None
+                           ) -> ReportJobManager:
+    """
+    Obtiene o crea la cola de reportes (singleton por proceso)
+
+    Args:
+        output_dir: Directorio de exports (solo en la primera llamada)
+        config: Configuración (solo en la primera llamada)
+    """
+    global _report_job_manager
+    if _report_job_manager is None:
+        with _report_job_lock:
+            if _report_job_manager is None:
+                if output_dir is None:
+                    from app.services.pdf_service import get_pdf_generator
+                    pdf_gen = get_pdf_generator()
+                    output_dir = pdf_gen.output_dir if pdf_gen else os.path.join(
+                        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                        'instance', 'exports'
+                    )
+                os.makedirs(output_dir, exist_ok=True)
+                _report_job_manager = ReportJobManager(output_dir, config)
+    return _report_job_manager
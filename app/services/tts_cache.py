@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+🗂️ CACHÉ DE AUDIO TTS - BIOTRACK
+==================================
+Índice en memoria de app/static/audio_cache con tamaño acotado.
+
+- Índice: archivo -> mensaje, tamaño, duración, último uso, fijado.
+  Las consultas (¿existe?, ¿cuánto dura?) no tocan el disco
+- Manifiesto: el índice se guarda en audio_cache/manifest.json para no
+  reescanear el directorio en cada arranque y compartirlo entre workers
+- Presupuesto (max_size_mb) con desalojo LRU de las entradas NO fijadas;
+  los mensajes fijos y el banco de frases se fijan y nunca se desalojan
+- Precarga: los audios fijados se leen a buffers en memoria (hasta
+  warm_max_mb) y se sirven/reproducen sin tocar el sistema de archivos
+- Paquete: los audios de arranque se exportan/importan como un solo .zip
+  para instalar un servidor nuevo sin sintetizar nada
+
+Los nombres de archivo siguen siendo el hash del contenido (motor + voz +
+texto), así los ids de cue y la caché del navegador no cambian.
+
+Autor: BIOTRACK Team
+Fecha: 2025-12-01
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import wave
+import zipfile
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AudioEntry:
+    """Entrada del índice de audio"""
+    file: str
+    message: str = ''
+    size: int = 0
+    duration: float = 0.0
+    last_used: float = 0.0
+    pinned: bool = False
+
+
+class TTSAudioCache:
+    """
+    Índice acotado (LRU) de los audios TTS en disco con buffers en memoria
+    """
+
+    DEFAULT_CONFIG = {
+        'max_size_mb': 50,
+        'warm_max_mb': 16,
+        'save_interval': 60,      # segundos entre guardados por solo-uso
+    }
+
+    MANIFEST_NAME = 'manifest.json'
+    AUDIO_EXTENSIONS = ('.mp3', '.wav')
+
+    # Estimación de duración de MP3 por tamaño (Edge TTS: mono 48 kbps)
+    MP3_BYTES_PER_SECOND = 6000
+
+    def __init__(self, cache_dir: str, config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            cache_dir: Directorio de audio (app/static/audio_cache)
+            config: Sobrescribe valores de DEFAULT_CONFIG
+        """
+        self.config = {**self.DEFAULT_CONFIG, **(config or {})}
+        self.cache_dir = str(cache_dir)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, AudioEntry] = {}
+        self._buffers: Dict[str, bytes] = {}
+        self._pinned_names: Set[str] = set()
+        self._last_saved = 0.0
+        self._dirty = False
+
+        # Contadores
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def get(self, name: str) -> Optional[AudioEntry]:
+        """
+        Entrada de un audio (marca uso) o None si no está en caché
+
+        Un archivo creado por otro worker que aún no está en el índice se
+        adopta al primer fallo.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            entry = self._adopt(name)
+            if entry is None:
+                self.misses += 1
+                return None
+        self.hits += 1
+        self.touch(name)
+        return entry
+
+    def contains(self, name: str) -> bool:
+        """Consulta sin marcar uso ni tocar el disco"""
+        return name in self._entries
+
+    def add(self, name: str, message: str = '', pinned: bool = False) -> AudioEntry:
+        """
+        Registra un audio recién generado y aplica el presupuesto
+
+        Args:
+            name: Nombre del archivo en cache_dir
+            message: Texto del audio (informativo en el manifiesto)
+            pinned: Nunca desalojar
+        """
+        entry = self._describe(name, message, pinned)
+        with self._lock:
+            entry.pinned = entry.pinned or name in self._pinned_names
+            self._entries[name] = entry
+            self._enforce_budget()
+            self._dirty = True
+            self._save_if_due()
+        return entry
+
+    def touch(self, name: str):
+        """Marca un audio como usado (LRU)"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return
+            entry.last_used = time.time()
+            self._dirty = True
+            self._save_if_due()
+
+    def pin(self, names: Iterable[str], replace: bool = False):
+        """
+        Fija audios (no se desalojan); los que aún no existen se fijan al agregarse
+
+        Args:
+            names: Audios a fijar
+            replace: Reemplaza el conjunto fijado (ej: al cambiar de voz): los
+                     audios fijados que no están en `names` vuelven al LRU y
+                     se sueltan sus buffers en memoria
+        """
+        names = set(names)
+        with self._lock:
+            if replace:
+                self._pinned_names = set()
+                for name, entry in self._entries.items():
+                    if entry.pinned and name not in names:
+                        entry.pinned = False
+                        self._buffers.pop(name, None)
+                        self._dirty = True
+            for name in names:
+                self._pinned_names.add(name)
+                entry = self._entries.get(name)
+                if entry is not None and not entry.pinned:
+                    entry.pinned = True
+                    self._dirty = True
+            if replace:
+                self._enforce_budget()
+            if self._dirty:
+                self._save()
+
+    def warm_up(self, names: Iterable[str]) -> int:
+        """
+        Lee audios a memoria (hasta warm_max_mb)
+
+        Returns:
+            Bytes en memoria tras la precarga
+        """
+        budget = self.config['warm_max_mb'] * 1024 * 1024
+        loaded = sum(len(data) for data in self._buffers.values())
+        for name in names:
+            if name in self._buffers or not self.contains(name):
+                continue
+            entry = self._entries[name]
+            if loaded + entry.size > budget:
+                break
+            try:
+                with open(self.path(name), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue
+            with self._lock:
+                self._buffers[name] = data
+            loaded += len(data)
+        return loaded
+
+    def get_bytes(self, name: str) -> Optional[bytes]:
+        """Contenido precargado en memoria (None si no está precargado)"""
+        data = self._buffers.get(name)
+        if data is not None:
+            self.hits += 1
+            self.touch(name)
+        return data
+
+    def discard(self, name: str):
+        """Quita del índice un audio cuyo archivo ya no existe (ej: desalojado por otro worker)"""
+        with self._lock:
+            if self._entries.pop(name, None) is not None:
+                self._buffers.pop(name, None)
+                self._dirty = True
+
+    def flush(self):
+        """Guarda el manifiesto si hay cambios pendientes"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def export_bundle(self, bundle_path: str, names: Optional[Iterable[str]] = None) -> int:
+        """
+        Exporta audios (por defecto los fijados) a un único .zip
+
+        Args:
+            bundle_path: Archivo .zip destino
+            names: Audios a incluir (None = todos los fijados)
+
+        Returns:
+            Número de audios exportados
+        """
+        with self._lock:
+            if names is None:
+                names = [n for n, e in self._entries.items() if e.pinned]
+            entries = [self._entries[n] for n in names if n in self._entries]
+
+        tmp_path = f"{bundle_path}.{os.getpid()}.tmp"
+        exported = []
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            for entry in entries:
+                try:
+                    bundle.write(self.path(entry.file), entry.file)
+                except OSError:
+                    continue
+                exported.append(asdict(entry))
+            bundle.writestr(self.MANIFEST_NAME, json.dumps({'entries': exported}, ensure_ascii=False))
+        os.replace(tmp_path, bundle_path)
+        return len(exported)
+
+    def import_bundle(self, bundle_path: str, overwrite: bool = False) -> int:
+        """
+        Importa un paquete creado con export_bundle()
+
+        Args:
+            bundle_path: Archivo .zip
+            overwrite: Reemplazar audios que ya existen
+
+        Returns:
+            Número de audios importados
+        """
+        imported = 0
+        with zipfile.ZipFile(bundle_path, 'r') as bundle:
+            messages = {}
+            if self.MANIFEST_NAME in bundle.namelist():
+                data = json.loads(bundle.read(self.MANIFEST_NAME))
+                messages = {e['file']: e.get('message', '') for e in data.get('entries', [])}
+            for name in bundle.namelist():
+                # Solo audios en la raíz del paquete (sin rutas)
+                if os.path.basename(name) != name or not name.endswith(self.AUDIO_EXTENSIONS):
+                    continue
+                if not overwrite and os.path.exists(self.path(name)):
+                    continue
+                tmp_path = f"{self.path(name)}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(bundle.read(name))
+                os.replace(tmp_path, self.path(name))
+                self.add(name, messages.get(name, ''))
+                imported += 1
+        self.flush()
+        return imported
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            'entries': len(entries),
+            'pinned': sum(1 for e in entries if e.pinned),
+            'bytes_used': sum(e.size for e in entries),
+            'max_bytes': int(self.config['max_size_mb'] * 1024 * 1024),
+            'bytes_in_memory': sum(len(data) for data in self._buffers.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        """
+        Carga el manifiesto y lo concilia con el directorio (un solo scandir
+        al arrancar): quita entradas sin archivo e indexa archivos nuevos
+        """
+        manifest_path = self.path(self.MANIFEST_NAME)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._entries = {
+                name: AudioEntry(**fields) for name, fields in data.get('entries', {}).items()
+            }
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"[TTSAudioCache] Manifiesto inválido, se reconstruye: {e}")
+            self._entries = {}
+
+        on_disk = {
+            entry.name for entry in os.scandir(self.cache_dir)
+            if entry.is_file() and entry.name.endswith(self.AUDIO_EXTENSIONS) and '.tmp' not in entry.name
+        }
+        stale = set(self._entries) - on_disk
+        for name in stale:
+            del self._entries[name]
+        for name in on_disk - set(self._entries):
+            self._entries[name] = self._describe(name)
+
+        with self._lock:
+            self._save()
+        logger.info(f"[TTSAudioCache] Índice cargado: {len(self._entries)} audios ({len(stale)} sin archivo)")
+
+    def _adopt(self, name: str) -> Optional[AudioEntry]:
+        if not os.path.exists(self.path(name)):
+            return None
+        entry = self._describe(name)
+        with self._lock:
+            self._entries.setdefault(name, entry)
+            self._dirty = True
+        return entry
+
+    def _describe(self, name: str, message: str = '', pinned: bool = False) -> AudioEntry:
+        """Crea la entrada leyendo tamaño y duración del archivo (una sola vez)"""
+        path = self.path(name)
+        size = os.path.getsize(path)
+        try:
+            if name.endswith('.wav'):
+                with wave.open(path, 'rb') as audio:
+                    duration = audio.getnframes() / float(audio.getframerate())
+            else:
+                duration = size / self.MP3_BYTES_PER_SECOND
+        except (OSError, wave.Error, EOFError):
+            duration = 0.0
+        return AudioEntry(file=name, message=message, size=size, duration=duration,
+                          last_used=time.time(), pinned=pinned)
+
+    def _enforce_budget(self):
+        """Desaloja las entradas no fijadas menos usadas (llamar con _lock)"""
+        budget = self.config['max_size_mb'] * 1024 * 1024
+        used = sum(e.size for e in self._entries.values())
+        if used <= budget:
+            return
+        candidates = sorted((e for e in self._entries.values() if not e.pinned),
+                            key=lambda e: e.last_used)
+        for entry in candidates:
+            if used <= budget:
+                break
+            try:
+                os.remove(self.path(entry.file))
+            except OSError:
+                pass
+            del self._entries[entry.file]
+            self._buffers.pop(entry.file, None)
+            used -= entry.size
+            self.evictions += 1
+        self._dirty = True
+
+    def _save_if_due(self):
+        """Guarda el manifiesto como mucho cada save_interval (llamar con _lock)"""
+        if time.time() - self._last_saved > self.config['save_interval']:
+            self._save()
+
+    def _save(self):
+        """Escribe el manifiesto de forma atómica (llamar con _lock)"""
+        manifest_path = self.path(self.MANIFEST_NAME)
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'entries': {name: asdict(e) for name, e in self._entries.items()}},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, manifest_path)
+            self._dirty = False
+            self._last_saved = time.time()
+        except OSError as e:
+            logger.warning(f"[TTSAudioCache] No se pudo guardar el manifiesto: {e}")
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+🗣️ MOTORES DE SÍNTESIS TTS - BIOTRACK
+======================================
+
+Backends intercambiables para convertir texto a archivo de audio.
+TTSService solo conoce la interfaz TTSEngine; el motor se elige con
+Config.TTS_ENGINE.
+
+Motores:
+- pyttsx3: Offline, en proceso (espeak/SAPI5/NSSpeech según el SO) -> WAV
+- espeak:  Offline, binario espeak-ng/espeak por subproceso        -> WAV
+- edge:    Microsoft Edge TTS (voz neuronal Dalia), requiere red    -> MP3
+
+Si el motor configurado no está disponible se usa el siguiente motor
+offline disponible; 'edge' solo se usa si se pide explícitamente.
+
+Uso:
+    from app.services.tts_engines import create_tts_engine
+
+    engine = create_tts_engine('pyttsx3', rate=150, volume=0.9)
+    await engine.synthesize("Postura correcta", "/ruta/audio.wav")
+
+Autor: BIOTRACK Team
+Fecha: 2025-12-01
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import threading
+from typing import Dict, Optional, Type
+
+logger = logging.getLogger(__name__)
+
+
+class TTSEngine:
+    """
+    Interfaz de un motor de síntesis
+
+    Subclases implementan is_available() y _synthesize(). La escritura es
+    atómica (archivo temporal + replace) para que otro hilo o worker nunca
+    reproduzca un audio a medio escribir.
+    """
+
+    name = 'base'
+    extension = '.wav'
+
+    # Multiplicador de velocidad para mensajes rápidos (cuenta regresiva)
+    FAST_FACTOR = 1.3
+
+    def __init__(self, rate: int = 150, volume: float = 0.9, voice: Optional[str] = None):
+        """
+        Args:
+            rate: Velocidad en palabras por minuto
+            volume: Volumen de 0.0 a 1.0
+            voice: Voz o idioma (depende del motor)
+        """
+        self.rate = rate
+        self.base_rate = rate
+        self.volume = volume
+        self.voice = voice
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return False
+
+    @property
+    def cache_tag(self) -> str:
+        """Identifica la voz en los nombres de la caché de audio"""
+        return f"{self.name}:{self.voice}:{self.rate}"
+
+    def set_rate(self, rate):
+        """
+        Cambia la velocidad
+
+        Args:
+            rate: Palabras por minuto (int) o porcentaje sobre la velocidad
+                inicial ('+10%')
+        """
+        if isinstance(rate, str) and rate.endswith('%'):
+            self.rate = int(round(self.base_rate * (1 + int(rate[:-1]) / 100)))
+        else:
+            self.rate = int(rate)
+
+    async def synthesize(self, text: str, path: str, fast: bool = False):
+        """
+        Sintetiza `text` en `path`
+
+        Args:
+            text: Texto a sintetizar
+            path: Archivo destino (con la extensión del motor)
+            fast: Usar velocidad rápida (cuenta regresiva)
+
+        Raises:
+            RuntimeError: Si el motor no produjo audio
+        """
+        stem, ext = os.path.splitext(path)
+        tmp_path = f"{stem}.{os.getpid()}.{threading.get_ident()}.tmp{ext}"
+        try:
+            await self._synthesize(text, tmp_path, fast)
+            if not os.path.exists(tmp_path) or os.path.getsize(tmp_path) == 0:
+                raise RuntimeError(f"{self.name} no generó audio para '{text[:30]}'")
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def _synthesize(self, text: str, path: str, fast: bool):
+        raise NotImplementedError
+
+
+class Pyttsx3Engine(TTSEngine):
+    """Motor offline en proceso con pyttsx3"""
+
+    name = 'pyttsx3'
+    extension = '.wav'
+
+    def __init__(self, rate: int = 150, volume: float = 0.9, voice: Optional[str] = 'es'):
+        super().__init__(rate, volume, voice)
+        self._engine = None
+        self._selected_voice = None
+        # pyttsx3 no es thread-safe: una síntesis a la vez por proceso
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_available(cls) -> bool:
+        try:
+            import pyttsx3  # type: ignore  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    async def _synthesize(self, text: str, path: str, fast: bool):
+        await asyncio.to_thread(self._synthesize_sync, text, path, fast)
+
+    def _synthesize_sync(self, text: str, path: str, fast: bool):
+        with self._lock:
+            engine = self._get_engine()
+            if self._selected_voice != self.voice:
+                self._select_voice()
+            engine.setProperty('rate', int(self.rate * (self.FAST_FACTOR if fast else 1)))
+            engine.setProperty('volume', self.volume)
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+
+    def _get_engine(self):
+        if self._engine is None:
+            import pyttsx3  # type: ignore
+            self._engine = pyttsx3.init()
+        return self._engine
+
+    def _select_voice(self):
+        """Elige la primera voz cuyo id, nombre o idioma coincide con self.voice"""
+        self._selected_voice = self.voice
+        if not self.voice:
+            return
+        wanted = self.voice.lower()
+        for voice in self._engine.getProperty('voices') or []:
+            languages = [
+                lang.decode(errors='ignore') if isinstance(lang, bytes) else str(lang)
+                for lang in (getattr(voice, 'languages', None) or [])
+            ]
+            candidates = [voice.id or '', getattr(voice, 'name', '') or ''] + languages
+            if any(wanted in candidate.lower() for candidate in candidates):
+                self._engine.setProperty('voice', voice.id)
+                return
+        logger.warning(f"[TTSEngine] pyttsx3 sin voz '{self.voice}', se usa la voz por defecto")
+
+
+class EspeakEngine(TTSEngine):
+    """Motor offline con el binario espeak-ng (o espeak)"""
+
+    name = 'espeak'
+    extension = '.wav'
+
+    def __init__(self, rate: int = 150, volume: float = 0.9, voice: Optional[str] = 'es-419'):
+        super().__init__(rate, volume, voice)
+
+    @staticmethod
+    def _binary() -> Optional[str]:
+        return shutil.which('espeak-ng') or shutil.which('espeak')
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return cls._binary() is not None
+
+    async def _synthesize(self, text: str, path: str, fast: bool):
+        speed = int(self.rate * (self.FAST_FACTOR if fast else 1))
+        amplitude = int(self.volume * 100)     # espeak: 0-200, 100 = normal
+        process = await asyncio.create_subprocess_exec(
+            self._binary(), '-v', self.voice or 'es', '-s', str(speed),
+            '-a', str(amplitude), '-w', path, text,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"espeak falló ({process.returncode}): {stderr.decode(errors='ignore').strip()}")
+
+
+class EdgeTTSEngine(TTSEngine):
+    """Microsoft Edge TTS (voz neuronal, requiere conexión a internet)"""
+
+    name = 'edge'
+    extension = '.mp3'
+
+    def __init__(self, rate: str = '+10%', volume: str = '+0%',
+                 voice: Optional[str] = 'es-MX-DaliaNeural', pitch: str = '+0Hz'):
+        super().__init__(rate, volume, voice)
+        self.pitch = pitch
+
+    @classmethod
+    def is_available(cls) -> bool:
+        try:
+            import edge_tts  # type: ignore  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @property
+    def cache_tag(self) -> str:
+        # Sin etiqueta: conserva los nombres de la caché generada antes de los motores
+        return ''
+
+    def set_rate(self, rate):
+        """Cambia la velocidad (porcentaje de Edge TTS, ej: '+10%')"""
+        self.rate = rate
+
+    async def _synthesize(self, text: str, path: str, fast: bool):
+        import edge_tts  # type: ignore
+        communicate = edge_tts.Communicate(
+            text,
+            self.voice,
+            rate='+30%' if fast else self.rate,
+            volume=self.volume,
+            pitch=self.pitch
+        )
+        await communicate.save(path)
+
+
+ENGINES: Dict[str, Type[TTSEngine]] = {
+    'pyttsx3': Pyttsx3Engine,
+    'espeak': EspeakEngine,
+    'edge': EdgeTTSEngine,
+}
+
+# Orden de respaldo (solo motores offline)
+OFFLINE_FALLBACK = ('pyttsx3', 'espeak')
+
+
+def create_tts_engine(name: str, rate: int = 150, volume: float = 0.9) -> Optional[TTSEngine]:
+    """
+    Crea el motor pedido o el primer motor offline disponible
+
+    Args:
+        name: 'pyttsx3', 'espeak' o 'edge'
+        rate: Palabras por minuto (motores offline)
+        volume: Volumen de 0.0 a 1.0 (motores offline)
+
+    Returns:
+        Instancia del motor, o None si no hay ninguno disponible
+    """
+    for candidate in (name,) + tuple(n for n in OFFLINE_FALLBACK if n != name):
+        engine_cls = ENGINES.get(candidate)
+        if engine_cls is None or not engine_cls.is_available():
+            continue
+        if candidate != name:
+            logger.warning(f"[TTSEngine] Motor '{name}' no disponible, usando '{candidate}'")
+        if engine_cls is EdgeTTSEngine:
+            return EdgeTTSEngine()
+        return engine_cls(rate=rate, volume=volume)
+
+    logger.error(f"[TTSEngine] Ningún motor TTS disponible (pedido: '{name}')")
+    return None
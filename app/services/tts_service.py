@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 """
-🔊 TTS SERVICE - Servicio de Text-to-Speech con Edge-TTS (Voz Dalia)
+🔊 TTS SERVICE - Servicio de Text-to-Speech
 =====================================================================
 
 Servicio SINGLETON para reproducir mensajes de voz durante el análisis ROM.
-Usa Microsoft Edge TTS para acceder a voces neurales de alta calidad.
+La síntesis la hace un motor intercambiable (tts_engines.py) elegido con
+Config.TTS_ENGINE: pyttsx3/espeak offline por defecto, Edge TTS (voz Dalia)
+si se configura 'edge' y hay red.
 
 Características:
 - SINGLETON: Una única instancia para toda la aplicación
@@ -12,10 +14,18 @@ Características:
 - NO BLOQUEA: El análisis continúa mientras se reproduce el audio
 - CANCELABLE: Puede interrumpir mensaje actual para reproducir nuevo
 - TOGGLE: Puede activarse/desactivarse sin destruir el hilo
-- VOZ NATURAL: Usa es-MX-DaliaNeural (voz neuronal de Microsoft)
+- OFFLINE: Funciona sin red con pyttsx3 o espeak
+- CUES PARA EL NAVEGADOR: Con Config.TTS_PLAYBACK='browser' el servidor no
+  reproduce nada; speak() publica "cues" (ids de archivos de audio_cache) que
+  viajan en el estado de la sesión y el navegador reproduce (audio_cues.js)
+- BANCO DE FRASES: Los resultados dinámicos ("Rango de 145 grados. Normal")
+  se arman concatenando fragmentos pre-generados (números, "grados",
+  clasificaciones), así un anuncio nunca espera una síntesis
 
 Requisitos:
-    pip install edge-tts pygame
+    pip install pyttsx3            (offline)
+    pip install edge-tts           (voz neuronal, requiere red)
+    pip install pygame             (solo TTS_PLAYBACK='server')
 
 Uso:
     from app.services.tts_service import get_tts_service
@@ -37,16 +47,22 @@ import os
 import tempfile
 import asyncio
 import hashlib
-from typing import Optional, Dict, Any
+import io
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Sequence, Union
 from enum import Enum
 from pathlib import Path
 
+from app.config import Config
+from app.services.tts_cache import TTSAudioCache
+from app.services.tts_engines import TTSEngine, create_tts_engine
+
 # Imports de audio (verificar disponibilidad al inicio)
-# type: ignore - Los módulos se instalan con: pip install edge-tts pygame
-print("\n🔊 [TTS_IMPORT] Intentando importar edge_tts y pygame...")
+# type: ignore - El módulo se instala con: pip install pygame
+# (la síntesis depende del motor, ver tts_engines.py)
+print("\n🔊 [TTS_IMPORT] Intentando importar pygame...")
 try:
-    import edge_tts  # type: ignore
-    print(f"🔊 [TTS_IMPORT] ✅ edge_tts importado: {edge_tts.__file__}")
     import pygame  # type: ignore
     print(f"🔊 [TTS_IMPORT] ✅ pygame importado: {pygame.__file__}")
     AUDIO_AVAILABLE = True
@@ -148,11 +164,140 @@ class TTSMessages:
         # Instrucción genérica si no hay específica
         return f"Realiza el movimiento de {movement_type} de {joint_type}"
     
+    # === RESULTADO (fragmentos del banco de frases) ===
+    RESULT_RANGE = "Rango de"
+    RESULT_DEGREES = "grados."
+    RESULT_LEFT = "Lado izquierdo"
+    RESULT_RIGHT = "Lado derecho"
+    RESULT_MINUS = "menos"
+    
+    # Clasificación -> texto hablado
+    CLASSIFICATION_SPOKEN = {
+        'Normal': 'Rango normal',
+        'Limitación Leve': 'Limitación leve',
+        'Limitación Moderada': 'Limitación moderada', 
+        'Limitación Severa': 'Limitación severa',
+        'Hipermovilidad Leve': 'Hipermovilidad leve',
+        'Hipermovilidad Moderada': 'Hipermovilidad moderada',
+        'Hipermovilidad Severa': 'Hipermovilidad severa',
+        'INCREASED': 'Aumentado, posible hiperlaxitud',
+        'OPTIMAL': 'Óptimo',
+        'FUNCTIONAL': 'Funcional',
+        'LIMITED': 'Limitado',
+        'VERY_LIMITED': 'Muy Limitado',
+        'Aumentado': 'Aumentado, posible hiperlaxitud',  # Title case from level_display
+        'Optimo': 'Óptimo',                              # Title case from level_display
+        'Funcional': 'Funcional',                        # Title case from level_display
+        'Limitado': 'Limitado',                          # Title case from level_display
+        'Muy Limitado': 'Muy Limitado',                  # Title case from level_display
+        'aumentado': 'Aumentado, posible hiperlaxitud',
+        'óptimo': 'Óptimo',
+        'funcional': 'Funcional',
+        'limitado': 'Limitado',
+        'muy_limitado': 'Muy Limitado',
+    }
+    
+    # Números: 0-29 tienen palabra propia; "un" (apócope) porque siempre
+    # preceden a "grados" ("veintiún grados", "ciento un grados")
+    _UNITS = [
+        'cero', 'un', 'dos', 'tres', 'cuatro', 'cinco', 'seis', 'siete', 'ocho', 'nueve',
+        'diez', 'once', 'doce', 'trece', 'catorce', 'quince', 'dieciséis', 'diecisiete',
+        'dieciocho', 'diecinueve', 'veinte', 'veintiún', 'veintidós', 'veintitrés',
+        'veinticuatro', 'veinticinco', 'veintiséis', 'veintisiete', 'veintiocho', 'veintinueve',
+    ]
+    _TENS = {3: 'treinta', 4: 'cuarenta', 5: 'cincuenta', 6: 'sesenta',
+             7: 'setenta', 8: 'ochenta', 9: 'noventa'}
+    _HUNDREDS = {1: 'ciento', 2: 'doscientos', 3: 'trescientos', 4: 'cuatrocientos',
+                 5: 'quinientos', 6: 'seiscientos', 7: 'setecientos', 8: 'ochocientos',
+                 9: 'novecientos'}
+    
+    @staticmethod
+    def _words_below_100(n: int) -> str:
+        if n < 30:
+            return TTSMessages._UNITS[n]
+        tens, units = divmod(n, 10)
+        if units == 0:
+            return TTSMessages._TENS[tens]
+        return f"{TTSMessages._TENS[tens]} y {TTSMessages._UNITS[units]}"
+    
+    @staticmethod
+    def number_fragments(value: float) -> List[str]:
+        """
+        Descompone un número de grados en fragmentos del banco de frases.
+        
+        Cada fragmento es una unidad pre-grabada: 145 -> ['ciento', 'cuarenta y cinco'].
+        Se redondea al entero y se limita a ±999.
+        """
+        n = int(round(value))
+        fragments = [TTSMessages.RESULT_MINUS] if n < 0 else []
+        n = min(abs(n), 999)
+        
+        hundreds, rest = divmod(n, 100)
+        if hundreds:
+            fragments.append('cien' if n == 100 else TTSMessages._HUNDREDS[hundreds])
+        if rest or not hundreds:
+            fragments.append(TTSMessages._words_below_100(rest))
+        return fragments
+    
+    @staticmethod
+    def completed_result_fragments(rom_value: float, classification: str,
+                                   left_rom: float = None, right_rom: float = None) -> List[str]:
+        """
+        Mensaje de resultado como lista de fragmentos pre-generables.
+        
+        Mismos argumentos que completed_result(); TTSService reproduce los
+        fragmentos en orden sin sintetizar nada en el momento.
+        """
+        spoken_class = TTSMessages.CLASSIFICATION_SPOKEN.get(classification, classification)
+        
+        if left_rom is not None and right_rom is not None:
+            return ([TTSMessages.RESULT_LEFT] + TTSMessages.number_fragments(left_rom) +
+                    [TTSMessages.RESULT_DEGREES, TTSMessages.RESULT_RIGHT] +
+                    TTSMessages.number_fragments(right_rom) +
+                    [TTSMessages.RESULT_DEGREES, spoken_class])
+        
+        return ([TTSMessages.RESULT_RANGE] + TTSMessages.number_fragments(rom_value) +
+                [TTSMessages.RESULT_DEGREES, spoken_class])
+    
+    @staticmethod
+    def core_messages() -> List[str]:
+        """
+        Mensajes fijos que se pre-generan al iniciar y se precargan en el navegador.
+        
+        Incluye todas las constantes de texto de la clase, los mensajes de
+        error y la instrucción de cada ejercicio de Config.EXERCISE_TYPES
+        (también las genéricas de ejercicios sin instrucción propia).
+        """
+        messages = [value for name, value in vars(TTSMessages).items()
+                    if name.isupper() and isinstance(value, str)]
+        for joint_type, movements in Config.EXERCISE_TYPES.items():
+            messages += [TTSMessages.get_exercise_instruction(joint_type, movement)
+                         for movement in movements]
+        messages += [TTSMessages.error_message(error_type)
+                     for error_type in ('no_person', 'wrong_orientation', 'bad_posture', 'timeout', 'generic')]
+        return list(dict.fromkeys(messages))
+    
+    @staticmethod
+    def phrase_bank() -> List[str]:
+        """
+        Todos los fragmentos que puede usar completed_result_fragments().
+        
+        Se pre-generan junto a los mensajes fijos; con ellos cualquier
+        resultado de 0 a 999 grados se anuncia sin síntesis en tiempo real.
+        """
+        fragments = [TTSMessages.RESULT_RANGE, TTSMessages.RESULT_DEGREES,
+                     TTSMessages.RESULT_LEFT, TTSMessages.RESULT_RIGHT, TTSMessages.RESULT_MINUS,
+                     'cien']
+        fragments += [TTSMessages._words_below_100(n) for n in range(100)]
+        fragments += list(TTSMessages._HUNDREDS.values())
+        fragments += list(dict.fromkeys(TTSMessages.CLASSIFICATION_SPOKEN.values()))
+        return fragments
+    
     @staticmethod
     def completed_result(rom_value: float, classification: str, 
                          left_rom: float = None, right_rom: float = None) -> str:
         """
-        Genera mensaje de resultado personalizado.
+        Genera mensaje de resultado personalizado (texto para mostrar/registrar).
         
         Args:
             rom_value: Valor ROM principal en grados
@@ -160,32 +305,7 @@ class TTSMessages:
             left_rom: ROM del lado izquierdo (bilateral)
             right_rom: ROM del lado derecho (bilateral)
         """
-        classification_map = {
-            'Normal': 'Rango normal',
-            'Limitación Leve': 'Limitación leve',
-            'Limitación Moderada': 'Limitación moderada', 
-            'Limitación Severa': 'Limitación severa',
-            'Hipermovilidad Leve': 'Hipermovilidad leve',
-            'Hipermovilidad Moderada': 'Hipermovilidad moderada',
-            'Hipermovilidad Severa': 'Hipermovilidad severa',
-            'INCREASED': 'Aumentado, posible hiperlaxitud',
-            'OPTIMAL': 'Óptimo',
-            'FUNCTIONAL': 'Funcional',
-            'LIMITED': 'Limitado',
-            'VERY_LIMITED': 'Muy Limitado',
-            'Aumentado': 'Aumentado, posible hiperlaxitud',  # Title case from level_display
-            'Optimo': 'Óptimo',                              # Title case from level_display
-            'Funcional': 'Funcional',                        # Title case from level_display
-            'Limitado': 'Limitado',                          # Title case from level_display
-            'Muy Limitado': 'Muy Limitado',                  # Title case from level_display
-            'aumentado': 'Aumentado, posible hiperlaxitud',
-            'óptimo': 'Óptimo',
-            'funcional': 'Funcional',
-            'limitado': 'Limitado',
-            'muy_limitado': 'Muy Limitado',
-        }
-        
-        spoken_class = classification_map.get(classification, classification)
+        spoken_class = TTSMessages.CLASSIFICATION_SPOKEN.get(classification, classification)
         
         # Si es bilateral, decir ambos valores
         if left_rom is not None and right_rom is not None:
@@ -217,11 +337,11 @@ class TTSMessages:
 
 class TTSService:
     """
-    🔊 Servicio de Text-to-Speech con Edge-TTS (Singleton)
+    🔊 Servicio de Text-to-Speech (Singleton)
     
     Implementa patrón Singleton para garantizar una única instancia.
     Usa un hilo daemon para reproducción asíncrona.
-    Utiliza Microsoft Edge TTS con voz Dalia (español México).
+    La síntesis la hace el motor de Config.TTS_ENGINE (offline por defecto).
     
     IMPORTANTE:
     - NO crear instancia directamente, usar get_tts_service()
@@ -234,6 +354,18 @@ class TTSService:
     _instance: Optional['TTSService'] = None
     _lock = threading.Lock()
     
+    # Mensajes que se sintetizan con velocidad rápida
+    FAST_MESSAGES = (TTSMessages.COUNTDOWN_3, TTSMessages.COUNTDOWN_2, TTSMessages.COUNTDOWN_1)
+    
+    # Cues recientes que se conservan para el polling del navegador
+    CUE_HISTORY = 32
+    
+    # Estimación de duración de un audio que aún no existe
+    CHARS_PER_SECOND = 14
+    
+    # Síntesis simultáneas al pre-generar la caché
+    CACHE_CONCURRENCY = 4
+    
     def __new__(cls):
         """Implementación del patrón Singleton thread-safe"""
         if cls._instance is None:
@@ -256,18 +388,20 @@ class TTSService:
         
         self._initialized = True
         
-        # Verificar disponibilidad de módulos
-        if not AUDIO_AVAILABLE:
-            logger.error("[TTSService] edge-tts o pygame no instalados. TTS deshabilitado.")
-            self._voice_enabled = False
-            self._state = TTSState.IDLE
-            self._thread = None
-            return
+        # Motor de síntesis (Config.TTS_ENGINE, con respaldo offline)
+        self._engine: Optional[TTSEngine] = create_tts_engine(
+            getattr(Config, 'TTS_ENGINE', 'pyttsx3'),
+            rate=getattr(Config, 'TTS_RATE', 150),
+            volume=getattr(Config, 'TTS_VOLUME', 0.9)
+        )
+        
+        # 'browser': el navegador reproduce los cues | 'server': pygame en el servidor
+        self._playback = getattr(Config, 'TTS_PLAYBACK', 'browser')
         
         # Estado
         self._state = TTSState.IDLE
-        self._voice_enabled = True
         self._pygame_initialized = False
+        self._thread: Optional[threading.Thread] = None
         
         # Cola de mensajes (tamaño aumentado para manejar transiciones rápidas)
         self._message_queue: queue.Queue = queue.Queue(maxsize=15)
@@ -276,24 +410,42 @@ class TTSService:
         self._stop_event = threading.Event()
         self._skip_current = threading.Event()
         
-        # Configuración de voz Edge-TTS
-        self._voice_config = {
-            'voice': 'es-MX-DaliaNeural',  # Voz Dalia (español México)
-            'rate': '+10%',                 # Un poco más rápido para fluidez
-            'volume': '+0%',                # Volumen normal
-            'pitch': '+0Hz',                # Tono normal
-        }
+        # Cues para el navegador: últimos eventos con número de secuencia
+        self._cues: deque = deque(maxlen=self.CUE_HISTORY)
+        self._cue_seq = 0
+        self._cue_lock = threading.Lock()
+        self._busy_until = 0.0      # Fin estimado de la reproducción en el navegador
+        self._synth_executor: Optional[ThreadPoolExecutor] = None
+        self.audio_cache: Optional[TTSAudioCache] = None
+        self._cache_progress: Dict[str, Any] = {'state': 'idle', 'total': 0, 'done': 0, 'failed': 0}
+        
+        # Verificar disponibilidad de módulos
+        needs_pygame = self._playback == 'server'
+        if self._engine is None or (needs_pygame and not AUDIO_AVAILABLE):
+            logger.error("[TTSService] Motor TTS (o pygame en modo server) no disponible. TTS deshabilitado.")
+            self._voice_enabled = False
+            return
+        
+        self._voice_enabled = True
         
         # Directorio de caché para audios (persistente entre reinicios)
         self._cache_dir = Path(__file__).parent.parent / "static" / "audio_cache"
         self._cache_dir.mkdir(parents=True, exist_ok=True)
         
-        # Caché de rutas: mensaje -> ruta archivo
+        # Caché de nombres: "voz|mensaje" -> archivo (evita recalcular el hash)
         self._audio_cache: Dict[str, str] = {}
         
+        # Índice acotado de audio_cache (LRU + manifiesto + buffers en memoria)
+        self.audio_cache = TTSAudioCache(self._cache_dir, {
+            'max_size_mb': getattr(Config, 'TTS_CACHE_MAX_MB', 50),
+            'warm_max_mb': getattr(Config, 'TTS_CACHE_WARM_MB', 16),
+        })
+        self._pin_phrases()
+        
         # Iniciar hilo worker (daemon para que muera con Flask)
-        self._thread: Optional[threading.Thread] = None
-        self._start_worker_thread()
+        # En modo 'browser' no hay reproducción en el servidor: sin hilo worker
+        if self._playback == 'server':
+            self._start_worker_thread()
         
         # Pre-generar caché de mensajes comunes (en background)
         self._cache_thread = threading.Thread(
@@ -303,64 +455,64 @@ class TTSService:
         )
         self._cache_thread.start()
         
-        logger.info("🔊 [TTSService] ✅ Servicio inicializado - Voz: Dalia (es-MX)")
-        print("🔊 [TTSService] ✅ Servicio TTS inicializado - Voz: Dalia")  # Print directo para asegurar visibilidad
+        logger.info(f"🔊 [TTSService] ✅ Servicio inicializado - Motor: {self._engine.name} "
+                    f"({self._engine.voice}), reproducción: {self._playback}")
+        print(f"🔊 [TTSService] ✅ Servicio TTS inicializado - Motor: {self._engine.name}, reproducción: {self._playback}")  # Print directo para asegurar visibilidad
     
     def _generate_cache(self):
-        """Pre-genera audios para mensajes comunes (en background)"""
-        print("🔊 [TTS_CACHE] Iniciando pre-generación de caché...")
-        
-        # Lista de mensajes a pre-generar
-        messages = [
-            TTSMessages.DETECTING_PERSON,
-            TTSMessages.DETECTING_RETRY,
-            TTSMessages.ORIENTATION_PROFILE,
-            TTSMessages.ORIENTATION_FRONTAL,
-            TTSMessages.CHECKING_POSTURE,
-            TTSMessages.COUNTDOWN_3,
-            TTSMessages.COUNTDOWN_2,
-            TTSMessages.COUNTDOWN_1,
-            TTSMessages.ANALYZING_START,
-            TTSMessages.COMPLETED_RELAX,
-            # Instrucciones de ejercicios
-            TTSMessages.INSTRUCTION_SHOULDER_FLEXION,
-            TTSMessages.INSTRUCTION_SHOULDER_EXTENSION,
-            TTSMessages.INSTRUCTION_SHOULDER_ABDUCTION,
-            TTSMessages.INSTRUCTION_ELBOW_FLEXION,
-            TTSMessages.INSTRUCTION_ELBOW_EXTENSION,
-            TTSMessages.INSTRUCTION_HIP_FLEXION,
-            TTSMessages.INSTRUCTION_HIP_EXTENSION,
-            TTSMessages.INSTRUCTION_HIP_ABDUCTION,
-            TTSMessages.INSTRUCTION_KNEE_FLEXION,
-            TTSMessages.INSTRUCTION_ANKLE_DORSIFLEXION,
-        ]
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        """
+        Pre-genera audios de mensajes fijos y del banco de frases (en background).
         
-        generated = 0
-        for msg in messages:
-            audio_path = self._get_audio_path(msg)
-            if os.path.exists(audio_path):
-                generated += 1
-                continue
-            
+        Si Config.TTS_CACHE_BUNDLE apunta a un paquete exportado, se importa
+        primero y solo se sintetiza lo que falte.
+        """
+        messages = list(dict.fromkeys(TTSMessages.core_messages() + TTSMessages.phrase_bank()))
+        progress = self._cache_progress
+        progress.update(state='running', total=len(messages), done=0, failed=0,
+                        started_at=time.time(), elapsed=0.0)
+        print(f"🔊 [TTS_CACHE] Iniciando pre-generación de caché ({len(messages)} audios)...")
+        
+        bundle_path = getattr(Config, 'TTS_CACHE_BUNDLE', None)
+        if bundle_path and os.path.exists(bundle_path):
             try:
-                # Countdown numbers con rate +30% (más rápido)
-                rate = "+30%" if msg in ["Tres", "Dos", "Uno"] else self._voice_config['rate']
-                communicate = edge_tts.Communicate(
-                    msg, 
-                    self._voice_config['voice'],
-                    rate=rate
-                )
-                loop.run_until_complete(communicate.save(audio_path))
-                generated += 1
-                print(f"🔊 [TTS_CACHE] ✅ '{msg[:25]}...' (rate={rate})")
+                imported = self.audio_cache.import_bundle(bundle_path)
+                print(f"🔊 [TTS_CACHE] 📦 {imported} audios importados de {bundle_path}")
             except Exception as e:
-                print(f"🔊 [TTS_CACHE] ❌ Error: {msg[:20]}... -> {e}")
+                print(f"🔊 [TTS_CACHE] ❌ Paquete inválido {bundle_path}: {e}")
+        
+        asyncio.run(self._pregenerate(messages))
+        
+        # Mensajes fijos y banco de frases a memoria: reproducción sin leer disco
+        in_memory = self.audio_cache.warm_up(self._pinned)
+        self.audio_cache.flush()
+        progress.update(state='done', elapsed=round(time.time() - progress['started_at'], 1))
+        print(f"🔊 [TTS_CACHE] ✅ Caché listo: {progress['done']}/{len(messages)} audios "
+              f"en {progress['elapsed']}s ({in_memory / 1024:.0f} KB en memoria)")
+    
+    async def _pregenerate(self, messages: List[str]):
+        """Sintetiza los mensajes que falten, hasta CACHE_CONCURRENCY a la vez"""
+        semaphore = asyncio.Semaphore(getattr(Config, 'TTS_CACHE_CONCURRENCY', self.CACHE_CONCURRENCY))
+        progress = self._cache_progress
         
-        loop.close()
-        print(f"🔊 [TTS_CACHE] ✅ Caché listo: {generated}/{len(messages)} audios")
+        async def generate(message: str):
+            async with semaphore:
+                try:
+                    await self._ensure_audio(message)
+                    progress['done'] += 1
+                except Exception as e:
+                    progress['failed'] += 1
+                    print(f"🔊 [TTS_CACHE] ❌ Error: {message[:20]}... -> {e}")
+                progress['elapsed'] = round(time.time() - progress['started_at'], 1)
+        
+        await asyncio.gather(*(generate(message) for message in messages))
+    
+    def _pin_phrases(self):
+        """
+        Fija en la caché los mensajes fijos y el banco de frases de la voz actual
+        (nunca se desalojan); los de una voz/velocidad anterior se sueltan
+        """
+        self._pinned = [self.cue_id(m) for m in TTSMessages.core_messages() + TTSMessages.phrase_bank()]
+        self.audio_cache.pin(self._pinned, replace=True)
     
     def _start_worker_thread(self):
         """Inicia el hilo worker si no está corriendo"""
@@ -411,9 +563,9 @@ class TTSService:
                 except queue.Empty:
                     continue
                 
-                # Log cuando recibe mensaje
-                logger.info(f"🔊 [TTS Worker] Recibido mensaje: '{message}'")
-                print(f"🔊 [TTS Worker] Reproduciendo: '{message}'")  # Print directo
+                # Log cuando recibe mensaje (tupla de fragmentos)
+                logger.info(f"🔊 [TTS Worker] Recibido mensaje: '{' '.join(message)}'")
+                print(f"🔊 [TTS Worker] Reproduciendo: '{' '.join(message)}'")  # Print directo
                 
                 # Verificar si la voz está habilitada
                 if not self._voice_enabled:
@@ -436,21 +588,36 @@ class TTSService:
         """
         Genera ruta única para un mensaje (basada en hash).
         Esto permite caché persistente entre reinicios.
+        El hash incluye la voz del motor para no mezclar audios de motores distintos.
         """
-        msg_hash = hashlib.md5(message.encode()).hexdigest()[:12]
-        return str(self._cache_dir / f"tts_{msg_hash}.mp3")
+        return str(self._cache_dir / self.cue_id(message))
     
-    async def _speak_async(self, message: str):
+    async def _ensure_audio(self, message: str) -> str:
         """
-        Reproduce un mensaje usando Edge-TTS con caché.
+        Retorna el nombre del audio de un mensaje, sintetizándolo si no está en caché.
         
         Args:
-            message: Texto a reproducir
+            message: Texto (mensaje completo o fragmento del banco de frases)
+        """
+        name = self.cue_id(message)
+        if self.audio_cache.get(name) is None:
+            fast = message in self.FAST_MESSAGES
+            await self._engine.synthesize(message, self._get_audio_path(message), fast=fast)
+            self.audio_cache.add(name, message)
+            print(f"🔊 [TTS_CACHE] ✅ '{message[:25]}' generado ({self._engine.name}, fast={fast})")
+        return name
+    
+    async def _speak_async(self, fragments: Sequence[str]):
         """
-        if not message or not self._voice_enabled:
+        Reproduce un mensaje (uno o varios fragmentos en orden) con caché.
+        
+        Args:
+            fragments: Fragmentos de texto a reproducir
+        """
+        if not fragments or not self._voice_enabled:
             return
         
-        print(f"🔊 [TTS_ASYNC] Iniciando: '{message}'")
+        print(f"🔊 [TTS_ASYNC] Iniciando: '{' '.join(fragments)}'")
         
         # Limpiar flag de skip
         self._skip_current.clear()
@@ -463,26 +630,8 @@ class TTSService:
                 self._state = TTSState.IDLE
                 return
             
-            # Obtener ruta de audio (única por mensaje)
-            audio_path = self._get_audio_path(message)
-            
-            # Verificar si ya existe en caché
-            if not os.path.exists(audio_path):
-                print(f"🔊 [TTS_ASYNC] Generando audio...")
-                # Números de countdown con +30%, resto con config normal
-                rate = "+30%" if message in ["Tres", "Dos", "Uno"] else self._voice_config['rate']
-                # Generar audio con Edge-TTS
-                communicate = edge_tts.Communicate(
-                    message, 
-                    self._voice_config['voice'],
-                    rate=rate,
-                    volume=self._voice_config['volume'],
-                    pitch=self._voice_config['pitch']
-                )
-                await communicate.save(audio_path)
-                print(f"🔊 [TTS_ASYNC] ✅ Audio guardado en caché (rate={rate})")
-            else:
-                print(f"🔊 [TTS_ASYNC] ✅ Usando audio en caché")
+            # Tener todos los fragmentos antes de empezar: sin pausas a mitad de frase
+            audio_names = [await self._ensure_audio(fragment) for fragment in fragments]
             
             # Verificar si se canceló durante la generación
             if self._skip_current.is_set():
@@ -490,17 +639,26 @@ class TTSService:
                 self._state = TTSState.IDLE
                 return
             
-            # Reproducir con pygame
-            pygame.mixer.music.load(audio_path)
-            pygame.mixer.music.play()
-            
-            # Esperar a que termine (con posibilidad de cancelar)
-            while pygame.mixer.music.get_busy():
+            # Reproducir con pygame, fragmento por fragmento
+            for name in audio_names:
+                # Audios precargados se reproducen desde memoria
+                data = self.audio_cache.get_bytes(name)
+                if data is not None:
+                    pygame.mixer.music.load(io.BytesIO(data), name)
+                else:
+                    pygame.mixer.music.load(self.audio_cache.path(name))
+                pygame.mixer.music.play()
+                
+                # Esperar a que termine (con posibilidad de cancelar)
+                while pygame.mixer.music.get_busy():
+                    if self._skip_current.is_set():
+                        pygame.mixer.music.stop()
+                        print("🔊 [TTS_ASYNC] ⚠️ Reproducción cancelada")
+                        break
+                    await asyncio.sleep(0.05)
+                
                 if self._skip_current.is_set():
-                    pygame.mixer.music.stop()
-                    print("🔊 [TTS_ASYNC] ⚠️ Reproducción cancelada")
                     break
-                await asyncio.sleep(0.05)
             
             print("🔊 [TTS_ASYNC] ✅ Completado")
             
@@ -512,7 +670,12 @@ class TTSService:
     
     @property
     def is_speaking(self) -> bool:
-        """Indica si se está reproduciendo audio actualmente."""
+        """
+        Indica si se está reproduciendo audio actualmente.
+        En modo 'browser' es una estimación según la duración de los cues publicados.
+        """
+        if self._playback == 'browser':
+            return time.time() < self._busy_until
         return self._state == TTSState.SPEAKING
     
     @property
@@ -523,32 +686,43 @@ class TTSService:
     @property
     def is_idle(self) -> bool:
         """Indica si el TTS está completamente libre (no hablando y cola vacía)."""
-        return self._state == TTSState.IDLE and self._message_queue.empty()
+        return not self.is_speaking and self._message_queue.empty()
     
-    def speak(self, message: str, interrupt: bool = False):
+    def speak(self, message: Union[str, Sequence[str]], interrupt: bool = False) -> Optional[Dict[str, Any]]:
         """
         Agrega un mensaje a la cola para ser reproducido.
         
         Por defecto, agrega a la cola SIN interrumpir mensajes anteriores.
         Si interrupt=True, cancela cualquier mensaje en reproducción.
+        En modo 'browser' no se reproduce nada aquí: se publica un cue.
         
         Args:
-            message: Texto a reproducir
+            message: Texto a reproducir, o lista de fragmentos que se
+                reproducen en orden (ej: TTSMessages.completed_result_fragments)
             interrupt: Si True, cancela mensaje actual y limpia cola
+        
+        Returns:
+            El cue publicado (modo 'browser'), o None
         """
+        fragments = (message,) if isinstance(message, str) else tuple(message)
+        message = ' '.join(fragments)
+        
         # Log para diagnosticar
         print(f"\n🔊 [TTS] speak() LLAMADO con mensaje: '{message}'")
         logger.info(f"🔊 [TTS] speak() llamado: '{message[:50]}...'")
         
-        if not AUDIO_AVAILABLE:
-            print("🔊 [TTS] ❌ AUDIO_AVAILABLE=False, no hay módulos de audio")
-            logger.warning("🔊 [TTS] AUDIO_AVAILABLE=False, no hay módulos de audio")
-            return
+        if self._engine is None or (self._playback == 'server' and not AUDIO_AVAILABLE):
+            print("🔊 [TTS] ❌ Sin motor TTS (o sin pygame en modo server), no hay audio")
+            logger.warning("🔊 [TTS] Sin motor TTS (o sin pygame en modo server), no hay audio")
+            return None
         
         if not self._voice_enabled:
             print("🔊 [TTS] ⚠️ Voz desactivada, ignorando mensaje")
             logger.info(f"🔊 [TTS] Voz desactivada, ignorando mensaje")
-            return
+            return None
+        
+        if self._playback == 'browser':
+            return self._publish_cue(fragments, interrupt)
         
         print(f"🔊 [TTS] ✅ Procesando mensaje... thread_alive={self._thread.is_alive() if self._thread else False}")
         
@@ -561,17 +735,24 @@ class TTSService:
         
         # Agregar nuevo mensaje
         try:
-            self._message_queue.put_nowait(message)
+            self._message_queue.put_nowait(fragments)
             print(f"🔊 [TTS] ✅ Mensaje agregado a cola (queue_size={self._message_queue.qsize()})")
             logger.info(f"🔊 [TTS] Mensaje en cola: '{message}' (queue_size={self._message_queue.qsize()})")
         except queue.Full:
             logger.warning("🔊 [TTS] Cola llena, mensaje descartado")
+        return None
     
     def stop_current(self):
         """
         Detiene el mensaje que se está reproduciendo actualmente.
         No detiene el hilo worker, solo el mensaje actual.
+        En modo 'browser' publica un cue de detención.
         """
+        if self._playback == 'browser':
+            if self._engine is not None:
+                self._publish_cue((), interrupt=True)
+            return
+        
         if not AUDIO_AVAILABLE:
             return
         
@@ -628,20 +809,127 @@ class TTSService:
         return {
             'enabled': self._voice_enabled,
             'state': self._state.value,
-            'voice': self._voice_config['voice'],
-            'audio_available': AUDIO_AVAILABLE,
+            'engine': self._engine.name if self._engine else None,
+            'voice': self._engine.voice if self._engine else None,
+            'audio_available': self._engine is not None and (self._playback == 'browser' or AUDIO_AVAILABLE),
+            'playback': self._playback,
+            'cue_seq': self._cue_seq,
+            'cache': self.audio_cache.stats() if self.audio_cache else None,
+            'cache_progress': dict(self._cache_progress),
             'thread_alive': self._thread.is_alive() if self._thread else False,
             'queue_size': self._message_queue.qsize() if hasattr(self, '_message_queue') else 0,
         }
     
-    def set_voice(self, voice_name: str):
-        """Cambia la voz a usar (ej: 'es-MX-DaliaNeural')"""
-        self._voice_config['voice'] = voice_name
-        logger.info(f"[TTSService] Voz cambiada a: {voice_name}")
+    # ------------------------------------------------------------------
+    # CUES PARA EL NAVEGADOR (TTS_PLAYBACK='browser')
+    # ------------------------------------------------------------------
+    
+    @property
+    def cue_seq(self) -> int:
+        """Número de secuencia del último cue publicado."""
+        return self._cue_seq
+    
+    def cue_id(self, message: str) -> str:
+        """Id de cue de un mensaje: nombre del archivo en audio_cache (estable por contenido)."""
+        tag = self._engine.cache_tag
+        key = f"{tag}|{message}" if tag else message
+        name = self._audio_cache.get(key)
+        if name is None:
+            msg_hash = hashlib.md5(key.encode()).hexdigest()[:12]
+            name = self._audio_cache[key] = f"tts_{msg_hash}{self._engine.extension}"
+        return name
+    
+    def get_cues(self, since: int = 0) -> List[Dict[str, Any]]:
+        """
+        Cues publicados después de `since`.
+        
+        Args:
+            since: Último número de secuencia que el cliente ya conoce
+        """
+        with self._cue_lock:
+            return [cue for cue in self._cues if cue['seq'] > since]
     
-    def set_rate(self, rate: str):
-        """Cambia la velocidad (ej: '+10%', '-20%', '+0%')"""
-        self._voice_config['rate'] = rate
+    def get_manifest(self) -> Dict[str, Any]:
+        """
+        Manifiesto de precarga: cues de los mensajes fijos y del banco de frases
+        que ya existen en audio_cache.
+        """
+        if self._engine is None:
+            return {'engine': None, 'cues': {}}
+        
+        cues = {}
+        for message in TTSMessages.core_messages() + TTSMessages.phrase_bank():
+            name = self.cue_id(message)
+            if self.audio_cache.contains(name):
+                cues[message] = name
+        return {'engine': self._engine.name, 'extension': self._engine.extension, 'cues': cues}
+    
+    def _publish_cue(self, fragments: Sequence[str], interrupt: bool) -> Dict[str, Any]:
+        """
+        Publica un cue para el navegador (sin reproducir ni bloquear).
+        
+        Los fragmentos que aún no existen en caché se sintetizan en segundo
+        plano; el navegador reintenta o usa speechSynthesis con `text`.
+        Un cue sin fragmentos con interrupt=True significa "detener".
+        """
+        audio_ids = []
+        duration = 0.0
+        for fragment in fragments:
+            name = self.cue_id(fragment)
+            entry = self.audio_cache.get(name)     # Índice en memoria: sin syscalls
+            if entry is None:
+                self._synthesize_later(fragment)
+                duration += len(fragment) / self.CHARS_PER_SECOND
+            else:
+                duration += entry.duration
+            audio_ids.append(name)
+        
+        now = time.time()
+        with self._cue_lock:
+            self._cue_seq += 1
+            cue = {
+                'seq': self._cue_seq,
+                'audio': audio_ids,
+                'text': ' '.join(fragments),
+                'interrupt': interrupt,
+            }
+            self._cues.append(cue)
+            
+            # Reproducción estimada en el navegador (mismo orden de cola que el cliente)
+            start = now if interrupt else max(now, self._busy_until)
+            self._busy_until = start + duration
+        
+        logger.info(f"🔊 [TTS] Cue #{cue['seq']} publicado: '{cue['text']}' ({duration:.1f}s)")
+        return cue
+    
+    def _synthesize_later(self, message: str):
+        """Sintetiza un mensaje faltante fuera del hilo que llamó a speak()."""
+        if self._synth_executor is None:
+            with self._cue_lock:
+                if self._synth_executor is None:
+                    self._synth_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='TTSSynth')
+        self._synth_executor.submit(self._synthesize_blocking, message)
+    
+    def _synthesize_blocking(self, message: str):
+        try:
+            asyncio.run(self._ensure_audio(message))
+        except Exception as e:
+            logger.error(f"[TTSService] Error sintetizando '{message[:30]}': {e}")
+    
+    def set_voice(self, voice_name: str):
+        """Cambia la voz del motor (ej: 'es' en pyttsx3, 'es-MX-DaliaNeural' en edge)"""
+        if self._engine:
+            self._engine.voice = voice_name
+            if self.audio_cache:
+                self._pin_phrases()
+            logger.info(f"[TTSService] Voz cambiada a: {voice_name}")
+    
+    def set_rate(self, rate: Union[int, str]):
+        """Cambia la velocidad (ej: '+10%', '-20%', o palabras por minuto en motores offline)"""
+        if self._engine:
+            self._engine.set_rate(rate)
+            if self.audio_cache:
+                self._pin_phrases()
 
 
 # ============================================================================
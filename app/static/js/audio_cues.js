@@ -0,0 +1,148 @@
+/**
+ * 🔊 AUDIO CUES - Reproducción de la guía de voz en el navegador
+ * ===========================================================
+ * El servidor ya no reproduce audio: cada mensaje de voz se publica como
+ * un "cue" en el estado de la sesión (/api/session/status -> audio_cues).
+ * Este módulo reproduce los cues nuevos en orden con los audios de
+ * app/static/audio_cache (servidos por /api/tts/audio con caché larga).
+ *
+ * Cue: { seq, audio: ['tts_xxx.wav', ...], text, interrupt }
+ * - audio: fragmentos que se reproducen uno tras otro
+ * - interrupt: cancela lo que suena (sin audio = solo detener)
+ * - text: respaldo con speechSynthesis si un audio aún no existe
+ *
+ * Uso:
+ *   AudioCues.init();                 // precarga según /api/tts/manifest
+ *   AudioCues.reset();                // al iniciar una sesión
+ *   AudioCues.handle(session.audio_cues);
+ *   AudioCues.play(data.audio_cue);   // cue suelto (ej: /api/tts/speak_result)
+ *   AudioCues.stop();
+ *
+ * Autor: BIOTRACK Team
+ * Fecha: 2025-12-01
+ */
+
+const AudioCues = (function () {
+    'use strict';
+
+    let baseUrl = '/api/tts/audio/';
+    let lastSeq = 0;
+    let queue = [];
+    let current = null;         // Audio en reproducción
+    let playing = false;
+    let generation = 0;         // Cambia en stop(): invalida reproducciones en curso
+    const preloaded = new Map(); // cue id -> Audio precargado
+
+    function urlFor(id) {
+        return baseUrl + encodeURIComponent(id);
+    }
+
+    /**
+     * Carga el manifiesto y precarga los audios fijos y del banco de frases
+     */
+    async function init() {
+        try {
+            const response = await fetch('/api/tts/manifest');
+            if (!response.ok) return;
+            const manifest = await response.json();
+            if (!manifest.success || manifest.playback !== 'browser') return;
+
+            baseUrl = manifest.base_url || baseUrl;
+            Object.values(manifest.cues || {}).forEach((id) => {
+                if (preloaded.has(id)) return;
+                const audio = new Audio();
+                audio.preload = 'auto';
+                audio.src = urlFor(id);
+                preloaded.set(id, audio);
+            });
+            console.log(`🔊 [AudioCues] ${preloaded.size} audios precargados`);
+        } catch (error) {
+            console.warn('[AudioCues] No se pudo cargar el manifiesto:', error);
+        }
+    }
+
+    function reset() {
+        lastSeq = 0;
+        stop();
+    }
+
+    /**
+     * Reproduce los cues con seq mayor al último reproducido
+     */
+    function handle(cues) {
+        (cues || []).forEach((cue) => {
+            if (cue.seq > lastSeq) {
+                lastSeq = cue.seq;
+                play(cue);
+            }
+        });
+    }
+
+    function play(cue) {
+        if (!cue) return;
+        if (cue.interrupt) stop();
+        if (!cue.audio || cue.audio.length === 0) return;
+        queue.push(cue);
+        if (!playing) next();
+    }
+
+    function stop() {
+        generation += 1;
+        queue = [];
+        if (current) {
+            current.pause();
+            current = null;
+        }
+        if (window.speechSynthesis) window.speechSynthesis.cancel();
+        playing = false;
+    }
+
+    async function next() {
+        const cue = queue.shift();
+        if (!cue) {
+            playing = false;
+            return;
+        }
+        playing = true;
+        const gen = generation;
+
+        for (const id of cue.audio) {
+            const ok = await playFragment(id);
+            if (gen !== generation) return;     // stop() durante la reproducción
+            if (!ok) {
+                // Audio aún no generado: decir el texto completo con el navegador
+                await speakText(cue.text);
+                if (gen !== generation) return;
+                break;
+            }
+        }
+        next();
+    }
+
+    function playFragment(id) {
+        return new Promise((resolve) => {
+            const cached = preloaded.get(id);
+            const audio = cached ? cached : new Audio(urlFor(id));
+            audio.currentTime = 0;
+            current = audio;
+            audio.onended = () => resolve(true);
+            audio.onerror = () => resolve(false);
+            audio.play().catch(() => resolve(false));
+        });
+    }
+
+    function speakText(text) {
+        return new Promise((resolve) => {
+            if (!text || !window.speechSynthesis) return resolve();
+            const utterance = new SpeechSynthesisUtterance(text);
+            utterance.lang = 'es-MX';
+            utterance.onend = resolve;
+            utterance.onerror = resolve;
+            window.speechSynthesis.speak(utterance);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', init);
+
+    return { init, reset, handle, play, stop };
+})();
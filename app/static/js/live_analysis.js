@@ -581,6 +581,11 @@ class LiveAnalysisController {
                 this.isActive = true;
                 this.sessionState = data.session.state;
                 
+                // 🔊 Nueva sesión: reproducir sus cues de audio desde el primero
+                if (typeof AudioCues !== 'undefined') {
+                    AudioCues.reset();
+                }
+                
                 // Actualizar UI
                 document.getElementById('startBtn').disabled = true;
                 document.getElementById('stopBtn').disabled = false;
@@ -620,6 +625,10 @@ class LiveAnalysisController {
                 const data = await response.json();
                 
                 if (data.success && data.session) {
+                    // 🔊 Guía de voz: reproducir cues nuevos en el navegador
+                    if (typeof AudioCues !== 'undefined') {
+                        AudioCues.handle(data.session.audio_cues);
+                    }
                     this.handleSessionState(data.session);
                 } else if (!data.session) {
                     // Sesión terminada
@@ -839,6 +848,9 @@ class LiveAnalysisController {
             // Detener polling de sesión primero
             this.stopSessionPolling();
             this.stopVPSFrameCapture(); // Detener captura VPS
+            if (typeof AudioCues !== 'undefined') {
+                AudioCues.stop();
+            }
             this.hideStateOverlay();
             
             // Llamar al nuevo endpoint de sesión
@@ -1468,6 +1480,13 @@ class LiveAnalysisController {
             
             if (!response.ok) {
                 console.warn('[TTS] No se pudo hablar resultado bilateral');
+                return;
+            }
+            
+            // 🔊 Modo navegador: el servidor retorna el cue para reproducirlo aquí
+            const data = await response.json();
+            if (data.audio_cue && typeof AudioCues !== 'undefined') {
+                AudioCues.play(data.audio_cue);
             }
         } catch (error) {
             console.warn('[TTS] Error al hablar resultado:', error);
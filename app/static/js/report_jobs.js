@@ -0,0 +1,87 @@
+/**
+ * 🧾 REPORT JOBS - Descarga de reportes PDF en segundo plano
+ * ===========================================================
+ * Enlaces con data-report-job="<url POST del trabajo>":
+ * 1. Encola el reporte (POST -> 202 con job_id)
+ * 2. Consulta el estado cada segundo
+ * 3. Al terminar navega a la descarga
+ *
+ * Si el encolado falla (o la cola está llena) se usa el href normal,
+ * que genera el PDF de forma síncrona.
+ *
+ * Autor: BIOTRACK Team
+ * Fecha: 2025-11-29
+ */
+
+(function() {
+    const POLL_INTERVAL_MS = 1000;
+    const MAX_POLLS = 300;
+
+    function setBusy(link, busy) {
+        if (busy) {
+            link.dataset.originalHtml = link.innerHTML;
+            link.classList.add('disabled');
+            link.setAttribute('aria-disabled', 'true');
+            link.innerHTML = '<span class="spinner-border spinner-border-sm me-1" role="status"></span>Generando...';
+        } else {
+            link.classList.remove('disabled');
+            link.removeAttribute('aria-disabled');
+            if (link.dataset.originalHtml) {
+                link.innerHTML = link.dataset.originalHtml;
+            }
+        }
+    }
+
+    async function pollJob(statusUrl) {
+        for (let i = 0; i < MAX_POLLS; i++) {
+            await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+
+            const response = await fetch(statusUrl, { credentials: 'same-origin' });
+            const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || 'Trabajo no encontrado');
+            }
+            if (data.job.status === 'done') {
+                return data.job.download_url;
+            }
+            if (data.job.status === 'error') {
+                throw new Error(data.job.error || 'Error al generar el reporte');
+            }
+        }
+        throw new Error('El reporte está tardando demasiado, intente de nuevo');
+    }
+
+    async function runReportJob(link) {
+        setBusy(link, true);
+        try {
+            const response = await fetch(link.dataset.reportJob, {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: { 'Accept': 'application/json' }
+            });
+
+            if (response.status !== 202) {
+                // Cola llena o endpoint no disponible: descarga síncrona
+                window.location.href = link.href;
+                return;
+            }
+
+            const job = await response.json();
+            window.location.href = await pollJob(job.status_url);
+        } catch (error) {
+            console.error('❌ Error en reporte PDF:', error);
+            alert(error.message);
+        } finally {
+            setBusy(link, false);
+        }
+    }
+
+    document.addEventListener('click', function(event) {
+        const link = event.target.closest('a[data-report-job]');
+        if (!link || link.classList.contains('disabled')) {
+            return;
+        }
+        event.preventDefault();
+        runReportJob(link);
+    });
+})();
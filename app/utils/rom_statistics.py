@@ -15,6 +15,7 @@ Autor: BIOTRACK Team
 Fecha: 2025-11-26
 """
 
+import warnings
 import numpy as np
 from typing import Dict, Any, List, Optional, Tuple
 from collections import deque
@@ -61,6 +62,52 @@ class ROMClassification(Enum):
     VERY_LIMITED = "muy_limitado"  # < 50% del rango normal
 
 
+def weighted_percentile(values, weights, q):
+    """
+    Percentil ponderado con interpolación lineal.
+    
+    Generaliza el método 'linear' de np.percentile: la muestra i-ésima
+    (ordenada) se ubica en (C_i - w_1) / (C_n - w_1), con C el peso
+    acumulado. Con pesos iguales el resultado coincide con np.percentile.
+    
+    Args:
+        values: Valores (sin NaN)
+        weights: Pesos > 0, misma longitud que values
+        q: Percentil o secuencia de percentiles (0-100)
+    
+    Returns:
+        float o np.ndarray con los percentiles
+    """
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    order = np.argsort(values, kind='stable')
+    sorted_values = values[order]
+    cumulative = np.cumsum(weights[order])
+    
+    span = cumulative[-1] - cumulative[0]
+    if span <= 0:
+        return np.full(np.shape(q), sorted_values[-1]) if np.ndim(q) else float(sorted_values[-1])
+    
+    positions = (cumulative - cumulative[0]) / span
+    result = np.interp(np.asarray(q, dtype=np.float64) / 100.0, positions, sorted_values)
+    return result if np.ndim(q) else float(result)
+
+
+def weighted_mean_std(values, weights) -> Tuple[float, float]:
+    """Media y desviación estándar ponderadas (poblacionales, como np.std)"""
+    values = np.asarray(values, dtype=np.float64)
+    mean = np.average(values, weights=weights)
+    std = np.sqrt(np.average((values - mean) ** 2, weights=weights))
+    return float(mean), float(std)
+
+
+def effective_sample_size(weights) -> float:
+    """Tamaño efectivo de muestra de Kish: (Σw)² / Σw²"""
+    weights = np.asarray(weights, dtype=np.float64)
+    total_sq = float(np.dot(weights, weights))
+    return float(weights.sum() ** 2 / total_sq) if total_sq > 0 else 0.0
+
+
 class ROMStatisticsCalculator:
     """
     📊 Calculadora de estadísticas ROM
@@ -71,6 +118,7 @@ class ROMStatisticsCalculator:
     - Detecta meseta (ángulo estable por tiempo)
     - Evalúa calidad de medición
     - Clasifica según estándares clínicos
+    - Pondera cada muestra por la visibilidad de sus landmarks
     
     NO crea hilos, procesos ni instancias de MediaPipe.
     """
@@ -93,6 +141,9 @@ class ROMStatisticsCalculator:
         'min_samples_excellent': 10,
         'min_samples_good': 5,
         'min_samples_acceptable': 3,
+        
+        # Admisión de muestras por confianza (visibilidad de landmarks)
+        'min_sample_weight': 0.5,       # Peso mínimo para admitir la muestra
     }
     
     def __init__(self, config: Dict = None):
@@ -106,7 +157,10 @@ class ROMStatisticsCalculator:
         
         # Almacenamiento de datos
         self._all_angles: List[Tuple[float, float]] = []  # (timestamp, angle)
+        self._weights: List[float] = []                   # Peso de cada muestra de _all_angles
         self._capture_window_angles: List[float] = []
+        self._capture_window_weights: List[float] = []
+        self._rejected_count = 0
         self._plateau_detected = False
         self._plateau_angle: Optional[float] = None
         self._start_time: Optional[float] = None
@@ -117,7 +171,10 @@ class ROMStatisticsCalculator:
     def reset(self):
         """Reinicia el calculador para una nueva sesión"""
         self._all_angles = []
+        self._weights = []
         self._capture_window_angles = []
+        self._capture_window_weights = []
+        self._rejected_count = 0
         self._plateau_detected = False
         self._plateau_angle = None
         self._start_time = None
@@ -129,13 +186,18 @@ class ROMStatisticsCalculator:
         self.reset()
         self._start_time = time.time()
     
-    def add_angle(self, angle: float, timestamp: float = None):
+    def add_angle(self, angle: float, timestamp: float = None, weight: float = 1.0) -> bool:
         """
         Agrega un ángulo a la colección.
         
         Args:
             angle: Ángulo medido en grados
             timestamp: Timestamp opcional (usa tiempo actual si no se proporciona)
+            weight: Confianza de la muestra (0.0 - 1.0), p. ej. la visibilidad
+                    mínima de los landmarks que definen el ángulo
+        
+        Returns:
+            True si la muestra fue admitida, False si se descartó por peso bajo
         """
         import time
         
@@ -144,15 +206,23 @@ class ROMStatisticsCalculator:
                 self._start_time = time.time()
             timestamp = time.time() - self._start_time
         
+        # Admisión: frames con landmarks ocluidos no llegan al percentil
+        if weight <= 0 or weight < self.config['min_sample_weight']:
+            self._rejected_count += 1
+            return False
+        
         self._all_angles.append((timestamp, angle))
+        self._weights.append(weight)
         
         # Verificar si está en ventana de captura
         if (self.config['capture_window_start'] <= timestamp < 
             self.config['capture_window_end']):
             self._capture_window_angles.append(angle)
+            self._capture_window_weights.append(weight)
         
         # Detectar meseta
         self._check_plateau()
+        return True
     
     def _check_plateau(self):
         """Verifica si se ha alcanzado una meseta (ángulo estable)"""
@@ -171,16 +241,22 @@ class ROMStatisticsCalculator:
             current_time = self._all_angles[-1][0]
             window_start = current_time - duration
             
-            window_angles = [
-                angle for ts, angle in self._all_angles 
+            # La meseta debe cubrir la duración completa: a tasa de cámara
+            # 10 muestras llegan en ~0.3s, mucho antes de `plateau_duration`
+            if self._all_angles[0][0] > window_start:
+                return
+            
+            window = [
+                (angle, weight) for (ts, angle), weight in zip(self._all_angles, self._weights)
                 if ts >= window_start
             ]
             
-            if len(window_angles) >= 5:  # Mínimo para evaluar estabilidad
-                std = np.std(window_angles)
+            if len(window) >= 5:  # Mínimo para evaluar estabilidad
+                window_angles, window_weights = zip(*window)
+                _, std = weighted_mean_std(window_angles, window_weights)
                 if std <= threshold:
                     self._plateau_detected = True
-                    self._plateau_angle = np.median(window_angles)
+                    self._plateau_angle = weighted_percentile(window_angles, window_weights, 50)
     
     def calculate_rom(self) -> Dict[str, Any]:
         """
@@ -191,6 +267,10 @@ class ROMStatisticsCalculator:
         2. Ángulo de meseta (si se detectó)
         3. Percentil 95 de todos los datos (fallback)
         
+        Percentiles, media y desviación se ponderan por el peso de cada
+        muestra. La calidad usa el tamaño efectivo de muestra y se escala
+        por el peso medio de las muestras usadas.
+        
         Returns:
             Dict con ROM calculado, calidad, clasificación, etc.
         """
@@ -198,48 +278,59 @@ class ROMStatisticsCalculator:
             return self._empty_result("No hay datos de ángulos")
         
         all_angles = [angle for _, angle in self._all_angles]
+        all_weights = self._weights
         
         # Método 1: Ventana de captura (preferido)
         if len(self._capture_window_angles) >= 3:
-            rom_value = float(np.percentile(self._capture_window_angles, 95))
+            rom_value = weighted_percentile(self._capture_window_angles, self._capture_window_weights, 95)
             method = "capture_window_p95"
-            sample_count = len(self._capture_window_angles)
-            std_dev = float(np.std(self._capture_window_angles))
+            used_weights = self._capture_window_weights
+            _, std_dev = weighted_mean_std(self._capture_window_angles, used_weights)
         
         # Método 2: Meseta detectada
         elif self._plateau_detected and self._plateau_angle is not None:
             rom_value = self._plateau_angle
             method = "plateau_detection"
-            sample_count = len(all_angles)
-            std_dev = float(np.std(all_angles[-10:]))  # Últimas 10 muestras
+            used_weights = all_weights
+            _, std_dev = weighted_mean_std(all_angles[-10:], all_weights[-10:])  # Últimas 10 muestras
         
         # Método 3: Fallback - todos los datos
         else:
-            rom_value = float(np.percentile(all_angles, 95))
+            rom_value = weighted_percentile(all_angles, all_weights, 95)
             method = "all_data_p95"
-            sample_count = len(all_angles)
-            std_dev = float(np.std(all_angles))
+            used_weights = all_weights
+            _, std_dev = weighted_mean_std(all_angles, all_weights)
+        
+        sample_count = len(used_weights)
+        effective_samples = effective_sample_size(used_weights)
+        mean_weight = float(np.mean(used_weights))
+        
+        # Calcular calidad (tamaño efectivo de muestra + peso medio)
+        quality = self._calculate_quality(std_dev, effective_samples)
         
-        # Calcular calidad
-        quality = self._calculate_quality(std_dev, sample_count)
+        mean, _ = weighted_mean_std(all_angles, all_weights)
+        p25, median, p75, p95 = weighted_percentile(all_angles, all_weights, [25, 50, 75, 95])
         
         # Calcular estadísticas adicionales
         self._result = {
             'rom': round(rom_value, 1),
             'method': method,
             'quality': quality.value,
-            'quality_score': self._quality_to_score(quality),
+            'quality_score': round(self._quality_to_score(quality) * mean_weight),
             'sample_count': sample_count,
+            'effective_samples': round(effective_samples, 1),
+            'mean_weight': round(mean_weight, 3),
+            'rejected_count': self._rejected_count,
             'std_dev': round(std_dev, 2),
             'plateau_detected': self._plateau_detected,
             'statistics': {
                 'min': round(float(np.min(all_angles)), 1),
                 'max': round(float(np.max(all_angles)), 1),
-                'mean': round(float(np.mean(all_angles)), 1),
-                'median': round(float(np.median(all_angles)), 1),
-                'p25': round(float(np.percentile(all_angles, 25)), 1),
-                'p75': round(float(np.percentile(all_angles, 75)), 1),
-                'p95': round(float(np.percentile(all_angles, 95)), 1),
+                'mean': round(mean, 1),
+                'median': round(float(median), 1),
+                'p25': round(float(p25), 1),
+                'p75': round(float(p75), 1),
+                'p95': round(float(p95), 1),
             }
         }
         
@@ -336,7 +427,7 @@ class ROMStatisticsCalculator:
     def _calculate_quality(
         self, 
         std_dev: float, 
-        sample_count: int
+        sample_count: float
     ) -> MeasurementQuality:
         """Calcula la calidad de medición"""
         config = self.config
@@ -384,6 +475,11 @@ class ROMStatisticsCalculator:
         """Número de ángulos recolectados"""
         return len(self._all_angles)
     
+    @property
+    def rejected_count(self) -> int:
+        """Número de muestras descartadas por peso bajo"""
+        return self._rejected_count
+    
     @property
     def capture_window_count(self) -> int:
         """Número de ángulos en ventana de captura"""
@@ -413,9 +509,9 @@ class ROMStatisticsCalculator:
     # ALIAS DE MÉTODOS - Compatibilidad con analysis_session.py
     # =========================================================================
     
-    def add_measurement(self, angle: float, timestamp: float = None):
+    def add_measurement(self, angle: float, timestamp: float = None, weight: float = 1.0) -> bool:
         """Alias de add_angle() para compatibilidad con analysis_session.py"""
-        self.add_angle(angle, timestamp)
+        return self.add_angle(angle, timestamp, weight)
     
     def detect_plateau(self) -> bool:
         """Alias de is_plateau_detected para compatibilidad con analysis_session.py"""
@@ -452,3 +548,406 @@ class ROMStatisticsCalculator:
     def _measurements(self) -> List[Tuple[float, float]]:
         """Alias de _all_angles para compatibilidad"""
         return self._all_angles
+
+
+class MultiChannelROMStatistics:
+    """
+    📊 Motor de estadísticas ROM multicanal
+    
+    Mantiene N canales de ángulo (p. ej. 'primary', 'left', 'right') en un
+    único array 2-D (muestras × canales) con una línea de tiempo compartida.
+    Meseta, percentiles y calidad se calculan para TODOS los canales en una
+    sola llamada vectorizada de NumPy, en lugar de un ROMStatisticsCalculator
+    por canal. Un valor NaN marca "sin muestra" para ese canal en ese frame.
+    
+    Aplica las mismas reglas que ROMStatisticsCalculator (ventana de captura,
+    meseta pegajosa, umbrales de calidad, admisión y ponderación por peso) y
+    get_channel_stats() devuelve el mismo formato que get_capture_window_stats().
+    
+    NO crea hilos, procesos ni instancias de MediaPipe.
+    """
+    
+    INITIAL_CAPACITY = 512
+    
+    def __init__(self, channels, config: Dict = None):
+        """
+        Inicializa el motor multicanal.
+        
+        Args:
+            channels: Nombres de los canales (orden = columnas del array)
+            config: Configuración personalizada (mismas claves que ROMStatisticsCalculator)
+        """
+        self.config = {**ROMStatisticsCalculator.DEFAULT_CONFIG, **(config or {})}
+        self.channels: Tuple[str, ...] = tuple(channels)
+        self._index: Dict[str, int] = {name: i for i, name in enumerate(self.channels)}
+        self.reset()
+    
+    def reset(self):
+        """Reinicia el motor para una nueva sesión"""
+        n = len(self.channels)
+        self._values = np.full((self.INITIAL_CAPACITY, n), np.nan)
+        self._weights = np.zeros((self.INITIAL_CAPACITY, n))
+        self._timestamps = np.zeros(self.INITIAL_CAPACITY)
+        self._size = 0
+        self._start_time: Optional[float] = None
+        
+        # Estado por canal
+        self._counts = np.zeros(n, dtype=np.int64)
+        self._rejected = np.zeros(n, dtype=np.int64)
+        self._first_ts = np.full(n, np.nan)
+        self._plateau = np.zeros(n, dtype=bool)
+        self._plateau_angle = np.full(n, np.nan)
+    
+    def channel_index(self, name: str) -> int:
+        """Índice de columna de un canal"""
+        return self._index[name]
+    
+    def add_sample(self, values, timestamp: float = None, weights=None):
+        """
+        Agrega una fila (un frame) con un valor por canal.
+        
+        Args:
+            values: Dict {canal: ángulo} o secuencia en el orden de `channels`.
+                    Canales ausentes o None quedan como NaN (sin muestra).
+            timestamp: Timestamp opcional (usa tiempo actual si no se proporciona)
+            weights: Peso (confianza) por canal, mismo formato que `values`.
+                     None = peso 1.0. Los valores con peso menor que
+                     `min_sample_weight` se descartan (quedan como NaN).
+        """
+        import time
+        
+        if timestamp is None:
+            if self._start_time is None:
+                self._start_time = time.time()
+            timestamp = time.time() - self._start_time
+        
+        if self._size == len(self._timestamps):
+            self._grow()
+        
+        row = self._values[self._size]
+        if isinstance(values, dict):
+            for name, value in values.items():
+                if value is not None:
+                    row[self._index[name]] = value
+        else:
+            for i, value in enumerate(values):
+                if value is not None:
+                    row[i] = value
+        
+        weight_row = self._weights[self._size]
+        weight_row[:] = 1.0
+        if isinstance(weights, dict):
+            for name, weight in weights.items():
+                if weight is not None:
+                    weight_row[self._index[name]] = weight
+        elif weights is not None:
+            for i, weight in enumerate(weights):
+                if weight is not None:
+                    weight_row[i] = weight
+        
+        # Admisión por confianza: la muestra con peso bajo no llega al percentil
+        min_weight = self.config['min_sample_weight']
+        rejected = ~np.isnan(row) & ((weight_row <= 0) | (weight_row < min_weight))
+        if rejected.any():
+            row[rejected] = np.nan
+            self._rejected += rejected
+        
+        self._timestamps[self._size] = timestamp
+        self._size += 1
+        
+        valid = ~np.isnan(row)
+        weight_row[~valid] = 0.0
+        self._counts += valid
+        self._first_ts = np.where(valid & np.isnan(self._first_ts), timestamp, self._first_ts)
+        
+        self._check_plateau(valid)
+    
+    def _grow(self):
+        """Duplica la capacidad de los buffers"""
+        capacity = len(self._timestamps) * 2
+        values = np.full((capacity, len(self.channels)), np.nan)
+        values[:self._size] = self._values[:self._size]
+        weights = np.zeros((capacity, len(self.channels)))
+        weights[:self._size] = self._weights[:self._size]
+        timestamps = np.zeros(capacity)
+        timestamps[:self._size] = self._timestamps[:self._size]
+        self._values = values
+        self._weights = weights
+        self._timestamps = timestamps
+    
+    def _check_plateau(self, updated: np.ndarray):
+        """
+        Verifica meseta en los canales que recibieron muestra (una pasada vectorizada).
+        
+        Args:
+            updated: Máscara booleana de canales con muestra en la última fila
+        """
+        pending = updated & ~self._plateau & (self._counts >= 10)  # Mínimo para evaluar
+        if not pending.any():
+            return
+        
+        current_time = self._timestamps[self._size - 1]
+        window_start = current_time - self.config['plateau_duration']
+        
+        # La meseta debe cubrir la duración completa (ver ROMStatisticsCalculator)
+        pending &= self._first_ts <= window_start
+        if not pending.any():
+            return
+        
+        start = np.searchsorted(self._timestamps[:self._size], window_start, side='left')
+        window = self._values[start:self._size]
+        weights = self._weights[start:self._size]  # 0.0 donde no hay muestra
+        
+        mask = ~np.isnan(window)
+        counts = mask.sum(axis=0)
+        total_weight = np.maximum(weights.sum(axis=0), 1e-12)
+        filled = np.where(mask, window, 0.0)
+        mean = (weights * filled).sum(axis=0) / total_weight
+        std = np.sqrt((weights * np.where(mask, window - mean, 0.0) ** 2).sum(axis=0) / total_weight)
+        
+        # Mínimo 5 muestras en la ventana para evaluar estabilidad
+        detected = pending & (counts >= 5) & (std <= self.config['plateau_threshold'])
+        if detected.any():
+            self._plateau_angle[detected] = self._weighted_column_percentiles(
+                window[:, detected], weights[:, detected], [50]
+            )[0]
+        self._plateau |= detected
+    
+    def compute(self) -> Dict[str, np.ndarray]:
+        """
+        Calcula las estadísticas de TODOS los canales en una pasada.
+        
+        Prioridad por canal (igual que ROMStatisticsCalculator.calculate_rom):
+        1. Percentil 95 de ventana de captura (>= 3 muestras)
+        2. Ángulo de meseta (si se detectó)
+        3. Percentil 95 de todos los datos (fallback)
+        
+        Percentiles, media y desviación son ponderados; la calidad usa el
+        tamaño efectivo de muestra y se escala por el peso medio.
+        
+        Returns:
+            Dict de arrays de longitud N (uno por canal): rom, std, samples,
+            quality_score, mean, min, max, p25, median, p75, p95, plateau, count,
+            effective_samples, mean_weight, rejected
+        """
+        data = self._values[:self._size]
+        weights = self._weights[:self._size]
+        timestamps = self._timestamps[:self._size]
+        
+        in_window = (
+            (timestamps >= self.config['capture_window_start'])
+            & (timestamps < self.config['capture_window_end'])
+        )
+        window = data[in_window]
+        window_weights = weights[in_window]
+        window_counts = (~np.isnan(window)).sum(axis=0)
+        
+        all_stats = self._weighted_column_stats(data, weights)
+        window_stats = self._weighted_column_stats(window, window_weights)
+        p25, median, p75, p95 = all_stats['percentiles']
+        window_p95 = window_stats['percentiles'][3]
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            std_tail = self._tail_std(data, weights, 10)
+            minimum = np.nanmin(data, axis=0)
+            maximum = np.nanmax(data, axis=0)
+        
+        use_window = window_counts >= 3
+        use_plateau = ~use_window & self._plateau
+        
+        rom = np.where(use_window, window_p95, np.where(use_plateau, self._plateau_angle, p95))
+        std = np.where(use_window, window_stats['std'], np.where(use_plateau, std_tail, all_stats['std']))
+        samples = np.where(use_window, window_counts, self._counts)
+        effective = np.where(use_window, window_stats['effective'], all_stats['effective'])
+        mean_weight = np.where(use_window, window_stats['mean_weight'], all_stats['mean_weight'])
+        
+        cfg = self.config
+        base_score = np.select(
+            [
+                (std < cfg['excellent_std']) & (effective >= cfg['min_samples_excellent']),
+                (std < cfg['good_std']) & (effective >= cfg['min_samples_good']),
+                (std < cfg['acceptable_std']) & (effective >= cfg['min_samples_acceptable']),
+            ],
+            [95, 80, 60],
+            default=40
+        )
+        quality_score = np.round(base_score * np.nan_to_num(mean_weight, nan=1.0))
+        
+        return {
+            'rom': rom,
+            'std': std,
+            'samples': samples,
+            'quality_score': quality_score,
+            'effective_samples': effective,
+            'mean_weight': mean_weight,
+            'rejected': self._rejected.copy(),
+            'mean': all_stats['mean'],
+            'min': minimum,
+            'max': maximum,
+            'p25': p25,
+            'median': median,
+            'p75': p75,
+            'p95': p95,
+            'plateau': self._plateau.copy(),
+            'count': self._counts.copy(),
+        }
+    
+    @staticmethod
+    def _weighted_column_percentiles(data: np.ndarray, weights: np.ndarray, q) -> np.ndarray:
+        """
+        Percentiles ponderados de todas las columnas a la vez (NaN = sin muestra).
+        
+        Misma definición que weighted_percentile(): ordena cada columna
+        (argsort + take_along_axis), acumula pesos e interpola linealmente.
+        
+        Returns:
+            Array (len(q) × N); NaN en columnas sin muestras
+        """
+        mask = ~np.isnan(data)
+        counts = mask.sum(axis=0)
+        
+        # Los NaN (+inf al ordenar) quedan al final de cada columna con peso 0
+        order = np.argsort(np.where(mask, data, np.inf), axis=0, kind='stable')
+        sorted_values = np.take_along_axis(data, order, axis=0)
+        sorted_weights = np.take_along_axis(np.where(mask, weights, 0.0), order, axis=0)
+        cumulative = np.cumsum(sorted_weights, axis=0)
+        
+        first = sorted_weights[0]
+        span = cumulative[-1] - first
+        with np.errstate(divide='ignore', invalid='ignore'):
+            positions = (cumulative - first) / span
+        rows = np.arange(data.shape[0])[:, None]
+        positions = np.where(rows < counts, positions, np.inf)
+        
+        targets = np.asarray(q, dtype=np.float64)[:, None, None] / 100.0   # (Q, 1, 1)
+        last = np.maximum(counts - 1, 0)
+        upper = np.minimum((positions[None] < targets).sum(axis=1), last)  # (Q, N)
+        lower = np.maximum(upper - 1, 0)
+        
+        pos_lo = np.take_along_axis(positions, lower, axis=0)
+        pos_hi = np.take_along_axis(positions, upper, axis=0)
+        val_lo = np.take_along_axis(sorted_values, lower, axis=0)
+        val_hi = np.take_along_axis(sorted_values, upper, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gap = pos_hi - pos_lo
+            fraction = np.where(gap > 0, (targets[:, 0] - pos_lo) / gap, 0.0)
+        result = val_lo + np.clip(fraction, 0.0, 1.0) * (val_hi - val_lo)
+        
+        # Una sola muestra (span 0): el valor mayor, como weighted_percentile()
+        single = np.take_along_axis(sorted_values, last[None], axis=0)
+        result = np.where(span > 0, result, single)
+        result[:, counts == 0] = np.nan
+        return result
+    
+    @classmethod
+    def _weighted_column_stats(cls, data: np.ndarray, weights: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Estadísticas ponderadas por columna (NaN = sin muestra), vectorizadas.
+        
+        Returns:
+            Dict con mean, std, effective, mean_weight (arrays N) y
+            percentiles (array 4 × N: p25, p50, p75, p95)
+        """
+        mask = ~np.isnan(data)
+        counts = mask.sum(axis=0)
+        w = np.where(mask, weights, 0.0)
+        filled = np.where(mask, data, 0.0)
+        total = w.sum(axis=0)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = (w * filled).sum(axis=0) / total
+            std = np.sqrt((w * np.where(mask, data - mean, 0.0) ** 2).sum(axis=0) / total)
+            total_sq = (w * w).sum(axis=0)
+            effective = np.where(total_sq > 0, total ** 2 / total_sq, 0.0)
+            mean_weight = total / counts
+        
+        empty = counts == 0
+        mean[empty] = np.nan
+        std[empty] = np.nan
+        mean_weight[empty] = np.nan
+        return {
+            'mean': mean,
+            'std': std,
+            'effective': effective,
+            'mean_weight': mean_weight,
+            'percentiles': cls._weighted_column_percentiles(data, weights, [25, 50, 75, 95]),
+        }
+    
+    @staticmethod
+    def _tail_std(data: np.ndarray, weights: np.ndarray, n: int) -> np.ndarray:
+        """Desv. estándar ponderada de las últimas `n` muestras válidas de cada canal"""
+        mask = ~np.isnan(data)
+        # Posición de cada muestra contada desde el final de su columna
+        from_end = np.cumsum(mask[::-1], axis=0)[::-1]
+        tail = mask & (from_end <= n)
+        w = np.where(tail, weights, 0.0)
+        total = w.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = (w * np.where(tail, data, 0.0)).sum(axis=0) / total
+            std = np.sqrt((w * np.where(tail, data - mean, 0.0) ** 2).sum(axis=0) / total)
+        std[~tail.any(axis=0)] = np.nan
+        return std
+    
+    def get_all_channel_stats(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Estadísticas de todos los canales en formato get_capture_window_stats().
+        
+        Returns:
+            {canal: dict o None si el canal tiene < 3 muestras}
+        """
+        stats = self.compute()
+        result = {}
+        for i, name in enumerate(self.channels):
+            if stats['count'][i] < 3:
+                result[name] = None
+                continue
+            result[name] = {
+                'percentile_95': round(float(stats['rom'][i]), 1),
+                'mean': round(float(stats['mean'][i]), 1),
+                'std': round(float(stats['std'][i]), 2),
+                'samples': int(stats['samples'][i]),
+                'quality': int(stats['quality_score'][i]) / 100.0,  # Convertir a 0.0-1.0
+                'effective_samples': round(float(stats['effective_samples'][i]), 1),
+                'rejected': int(stats['rejected'][i]),
+                'plateau_detected': bool(stats['plateau'][i])
+            }
+        return result
+    
+    def get_channel_stats(self, name: str) -> Optional[Dict[str, Any]]:
+        """Estadísticas de un canal (ver get_all_channel_stats)"""
+        return self.get_all_channel_stats()[name]
+    
+    def is_plateau_detected(self, name: str) -> bool:
+        """Si se detectó meseta en el canal"""
+        return bool(self._plateau[self._index[name]])
+    
+    def channel_count(self, name: str) -> int:
+        """Número de muestras válidas del canal"""
+        return int(self._counts[self._index[name]])
+    
+    def channel_series(self, name: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Serie temporal de las muestras admitidas de un canal.
+        
+        Returns:
+            Tupla de arrays (timestamps, índices de fila, valores, pesos)
+        """
+        column = self._index[name]
+        values = self._values[:self._size, column]
+        rows = np.flatnonzero(~np.isnan(values))
+        return (
+            self._timestamps[rows],
+            rows,
+            values[rows],
+            self._weights[rows, column]
+        )
+    
+    def rejected_count(self, name: str) -> int:
+        """Número de muestras del canal descartadas por peso bajo"""
+        return int(self._rejected[self._index[name]])
+    
+    @property
+    def sample_count(self) -> int:
+        """Número de filas (frames) recolectadas"""
+        return self._size
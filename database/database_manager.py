@@ -11,14 +11,21 @@ CARACTERÍSTICAS:
 - Autenticación de usuarios con Werkzeug
 - Consultas específicas del negocio educativo
 - Context managers para conexiones seguras
+- Caché TTL+LRU en proceso para lecturas calientes (database/query_cache.py)
+- Escritura diferida de auditoría y last_login (database/write_behind.py)
 - Sin columna weight en Subject (solo height)
 
 Autor: BIOTRACK Team
 Fecha: 2025-11-14
 """
 
+import atexit
+import base64
+import json
 import os
+import re
 import sqlite3
+import weakref
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Optional, List, Dict, Any, Generator
@@ -31,14 +38,74 @@ def get_bolivia_time():
     """Retorna la hora actual en zona horaria de Bolivia (UTC-4)"""
     return datetime.now(BOLIVIA_TZ).replace(tzinfo=None)
 
+
+# ============================================================================
+# CURSORES DE PAGINACIÓN (KEYSET)
+# ============================================================================
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    """
+    Codifica la posición (created_at, id) como cursor opaco para URLs
+    
+    created_at es el texto tal como está guardado en SQLite: así la
+    comparación en la siguiente página es exacta aunque las filas
+    tengan formatos de fecha distintos (con o sin microsegundos).
+    """
+    raw = json.dumps([created_at, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decodifica un cursor de encode_cursor()
+    
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError(f"Cursor de paginación inválido: {cursor!r}")
+    
+    if not isinstance(created_at, str) or not isinstance(row_id, int):
+        raise ValueError(f"Cursor de paginación inválido: {cursor!r}")
+    return created_at, row_id
+
+
+# ============================================================================
+# BÚSQUEDA DE TEXTO COMPLETO (FTS5)
+# ============================================================================
+
+def build_fts_query(search: str) -> Optional[str]:
+    """
+    Convierte texto libre en una consulta FTS5 de prefijos
+    
+    Cada palabra se cita (los operadores de FTS5 no se interpretan) y se
+    busca como prefijo: "juan per" -> "juan"* "per"* (AND implícito).
+    
+    Returns:
+        Expresión MATCH o None si el texto no tiene palabras
+    """
+    tokens = re.findall(r'\w+', search or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Float, Boolean, 
-    DateTime, Text, ForeignKey, CheckConstraint, func
+    create_engine, event, insert, update, text, Column, Integer, String, Float, Boolean, 
+    DateTime, Text, LargeBinary, ForeignKey, CheckConstraint, func, and_, or_,
+    tuple_, type_coerce, column, select
 )
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship, Session
+from sqlalchemy.orm import sessionmaker, relationship, Session, aliased
 from werkzeug.security import check_password_hash, generate_password_hash
 
+from database.landmark_codec import encode_landmarks, decode_frame, landmarks_from_json
+from database.query_cache import QueryCache, MISSING
+from database.write_behind import WriteBehindQueue
+
 # ============================================================================
 # BASE DE DATOS Y ENGINE
 # ============================================================================
@@ -281,7 +348,8 @@ class AngleMeasurement(Base):
     frame_number = Column(Integer, nullable=False)
     angle_value = Column(Float, nullable=False)
     confidence = Column(Float)
-    landmarks_json = Column(Text)
+    landmarks_json = Column(Text)        # Legacy: JSON de texto (ver migración 003)
+    landmarks_blob = Column(LargeBinary) # Binario empaquetado (database/landmark_codec.py)
     
     # Relaciones
     session = relationship('ROMSession', back_populates='angle_measurements')
@@ -303,6 +371,16 @@ class AngleMeasurement(Base):
             'confidence': self.confidence
         }
     
+    def get_landmarks(self):
+        """
+        Landmarks del frame como array NumPy (33, 4): x, y, z, visibility
+        
+        Lee el BLOB empaquetado; si no existe, cae al JSON legacy.
+        """
+        if self.landmarks_blob:
+            return decode_frame(self.landmarks_blob)
+        return landmarks_from_json(self.landmarks_json)
+    
     def __repr__(self):
         return f"<AngleMeasurement(id={self.id}, frame={self.frame_number}, angle={self.angle_value})>"
 
@@ -406,6 +484,41 @@ class UserAnalysisHistory(Base):
         return f"<UserAnalysisHistory(id={self.id}, segment='{self.segment}', rom={self.rom_value})>"
 
 
+class AnalysisSummary(Base):
+    """
+    Modelo de Resumen de Análisis (agregados para dashboards)
+    Tabla: analysis_summary
+    
+    Una fila por origen × usuario × segmento × ejercicio. Se actualiza en la
+    misma transacción que el análisis y se puede reconstruir desde las
+    tablas de origen (DatabaseManager.rebuild_analysis_summary).
+    """
+    __tablename__ = 'analysis_summary'
+    
+    # Clave
+    source = Column(String(20), primary_key=True)  # 'rom_session' o 'self'
+    user_id = Column(Integer, primary_key=True)
+    segment = Column(String(50), primary_key=True)
+    exercise_type = Column(String(50), primary_key=True)
+    
+    # Agregados
+    count = Column(Integer, nullable=False, default=0)
+    rom_count = Column(Integer, nullable=False, default=0)  # Filas con rom_value
+    rom_sum = Column(Float, nullable=False, default=0.0)
+    rom_sumsq = Column(Float, nullable=False, default=0.0)
+    rom_min = Column(Float)
+    rom_max = Column(Float)
+    last_at = Column(DateTime)
+    
+    __table_args__ = (
+        CheckConstraint("source IN ('rom_session', 'self')", name='check_summary_source'),
+    )
+    
+    def __repr__(self):
+        return (f"<AnalysisSummary(source='{self.source}', user={self.user_id}, "
+                f"segment='{self.segment}', exercise='{self.exercise_type}', count={self.count})>")
+
+
 # ============================================================================
 # DATABASE MANAGER CLASS
 # ============================================================================
@@ -422,6 +535,48 @@ class DatabaseManager:
     - Context managers para sesiones seguras
     """
     
+    # PRAGMAs aplicados a cada conexión nueva del pool (evento 'connect').
+    # WAL permite lectores concurrentes con un escritor; con WAL,
+    # synchronous=NORMAL es seguro ante caídas de la aplicación.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -20000,         # Negativo = KiB (~20 MB de page cache)
+        'mmap_size': 268435456,       # 256 MB de lectura mapeada en memoria
+        'busy_timeout': 5000,         # ms esperando un lock antes de fallar
+        'temp_store': 'MEMORY',
+    }
+    
+    # Tablas de origen de analysis_summary
+    SUMMARY_SOURCES = {
+        'rom_session': ROMSession,
+        'self': UserAnalysisHistory,
+    }
+    
+    # Pesos bm25() por columna de las tablas FTS5 (migración 006);
+    # el código y el username pesan más que los nombres
+    FTS_WEIGHTS = {
+        'subject_fts': (10.0, 5.0, 5.0),           # subject_code, first_name, last_name
+        'user_fts': (8.0, 5.0, 3.0, 8.0),          # username, full_name, email, student_id
+    }
+    
+    # Pool por proceso (cada worker de Gunicorn tiene el suyo)
+    POOL_SIZE = 5
+    MAX_OVERFLOW = 10
+    POOL_TIMEOUT = 30
+    
+    # Caché de lecturas calientes (usuario, altura, sujeto, dueño del sujeto).
+    # TTL corto: acota lo que tarda en verse un cambio hecho por otro worker.
+    QUERY_CACHE_TTL = 60
+    QUERY_CACHE_MAX_ENTRIES = 1024
+    
+    # Escritura diferida de system_log y last_login: fuera del camino de
+    # la request, en lotes (tamaño / segundos) y al cerrar el proceso
+    WRITE_BEHIND_ENABLED = True
+    WRITE_BEHIND_BATCH_SIZE = 200
+    WRITE_BEHIND_INTERVAL = 1.0
+    WRITE_BEHIND_MAX_QUEUE = 10000
+    
     def __init__(self, db_path: str = 'database/biotrack.db'):
         """
         Inicializa el gestor de base de datos
@@ -436,10 +591,185 @@ class DatabaseManager:
             raise FileNotFoundError(f"Base de datos no encontrada: {db_path}")
         
         # Crear engine
-        self.engine = create_engine(f'sqlite:///{db_path}', echo=False)
+        self.engine = create_engine(
+            f'sqlite:///{db_path}',
+            echo=False,
+            pool_size=self.POOL_SIZE,
+            max_overflow=self.MAX_OVERFLOW,
+            pool_timeout=self.POOL_TIMEOUT,
+            pool_pre_ping=True,
+            connect_args={
+                'check_same_thread': False,
+                'timeout': self.SQLITE_PRAGMAS['busy_timeout'] / 1000.0
+            }
+        )
+        event.listen(self.engine, 'connect', self._configure_connection)
         
         # Crear sesión
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        
+        # Caché de lecturas (se invalida en los métodos que modifican)
+        self.cache = QueryCache(max_entries=self.QUERY_CACHE_MAX_ENTRIES, ttl=self.QUERY_CACHE_TTL)
+        
+        # Tablas FTS5 disponibles (se consulta una vez por tabla)
+        self._fts_tables: Dict[str, bool] = {}
+        
+        # Hilo escritor de auditoría (arranca con la primera escritura)
+        self.write_behind = WriteBehindQueue(
+            self._write_audit_batch,
+            batch_size=self.WRITE_BEHIND_BATCH_SIZE,
+            flush_interval=self.WRITE_BEHIND_INTERVAL,
+            max_queue=self.WRITE_BEHIND_MAX_QUEUE
+        )
+        
+        # Hooks de fork y de salida del proceso (ver _live_managers)
+        _live_managers.add(self)
+    
+    def _configure_connection(self, dbapi_connection, connection_record):
+        """Aplica SQLITE_PRAGMAS a una conexión DBAPI recién abierta"""
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in self.SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+    
+    def _dispose_after_fork(self):
+        """Descarta el pool heredado en el proceso hijo sin cerrar las conexiones del padre"""
+        self.engine.dispose(close=False)
+        self.write_behind.reset_after_fork()
+    
+    def _write_audit_batch(self, logs: List[Dict[str, Any]], last_logins: Dict[int, datetime]):
+        """
+        Escribe un lote de la cola diferida en una sola transacción
+        
+        Args:
+            logs: Filas de system_log
+            last_logins: {user_id: fecha} ya combinados por usuario
+        """
+        with self.get_session() as session:
+            if logs:
+                session.execute(insert(SystemLog), logs)
+            if last_logins:
+                # UPDATE masivo por clave primaria (executemany)
+                session.execute(update(User), [
+                    {'id': user_id, 'last_login': when} for user_id, when in last_logins.items()
+                ])
+        
+        for user_id in last_logins:
+            self._invalidate_user(user_id)
+    
+    def shutdown(self):
+        """Escribe la auditoría pendiente y cierra las conexiones del pool"""
+        self.write_behind.close()
+        self.engine.dispose()
+    
+    def get_connection_health(self) -> Dict[str, Any]:
+        """
+        Health-check de la conexión SQLite
+        
+        Lee de vuelta los PRAGMAs efectivos de una conexión del pool y el
+        estado del pool, para verificar que la configuración se aplicó.
+        
+        Returns:
+            Diccionario con ok, latency_ms, pragmas, expected y pool
+        """
+        import time
+        
+        health = {
+            'ok': False,
+            'latency_ms': None,
+            'pragmas': {},
+            'expected': dict(self.SQLITE_PRAGMAS),
+            'pool': self.engine.pool.status()
+        }
+        try:
+            start = time.perf_counter()
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                health['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+                for pragma in self.SQLITE_PRAGMAS:
+                    health['pragmas'][pragma] = connection.execute(text(f"PRAGMA {pragma}")).scalar()
+            
+            health['ok'] = str(health['pragmas'].get('journal_mode', '')).lower() == 'wal'
+        except Exception as e:
+            health['error'] = str(e)
+        
+        return health
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Contadores hits/misses de la caché de lecturas"""
+        return self.cache.stats()
+    
+    def _invalidate_user(self, user_id: int, with_subjects: bool = False):
+        """
+        Invalida las entradas cacheadas de un usuario
+        
+        Args:
+            user_id: ID del usuario
+            with_subjects: También los sujetos cacheados (incluyen creator_name)
+        """
+        self.cache.invalidate('user', user_id)
+        self.cache.invalidate('user_height', user_id)
+        if with_subjects:
+            self.cache.invalidate('subject')
+    
+    def _invalidate_subject(self, subject_id: int):
+        """Invalida las entradas cacheadas de un sujeto"""
+        self.cache.invalidate('subject', subject_id)
+        self.cache.invalidate('subject_owner', subject_id)
+    
+    def _keyset_page(self, query, model, limit: int, cursor: Optional[str] = None,
+                     offset: int = 0):
+        """
+        Página ordenada por (created_at DESC, id DESC) a partir de un cursor
+        
+        A diferencia de OFFSET, el costo no crece con la profundidad de la
+        página: el filtro (created_at, id) < cursor usa los índices
+        compuestos de la migración 005.
+        
+        Args:
+            query: Query de `model` con los filtros ya aplicados
+            model: Modelo con columnas created_at e id
+            limit: Filas por página
+            cursor: Cursor de la página anterior (None = primera página)
+            offset: Solo para saltos por número de página sin cursor
+        
+        Returns:
+            Tupla (filas, next_cursor); next_cursor es None en la última página
+        
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        # Texto crudo de SQLite (ver encode_cursor)
+        created_raw = type_coerce(model.created_at, String)
+        
+        if cursor:
+            after_created, after_id = decode_cursor(cursor)
+            query = query.filter(tuple_(created_raw, model.id) < tuple_(after_created, after_id))
+        
+        rows = query.add_columns(created_raw)\
+                    .order_by(model.created_at.desc(), model.id.desc())\
+                    .offset(offset)\
+                    .limit(limit + 1)\
+                    .all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last, last_created = rows[-1]
+            next_cursor = encode_cursor(last_created, last.id)
+        
+        return [row for row, _ in rows], next_cursor
+    
+    def _has_fts(self, session: Session, table: str) -> bool:
+        """Indica si la tabla FTS5 existe (migración 006 aplicada)"""
+        if table not in self._fts_tables:
+            self._fts_tables[table] = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': table}
+            ).first() is not None
+        return self._fts_tables[table]
     
     @contextmanager
     def get_session(self) -> Generator[Session, None, None]:
@@ -460,6 +790,136 @@ class DatabaseManager:
         finally:
             session.close()
     
+    # ========================================================================
+    # RESUMEN DE ANÁLISIS (analysis_summary)
+    # ========================================================================
+    
+    def _add_to_summary(self, session: Session, source: str, record):
+        """
+        Suma un análisis recién insertado a analysis_summary (misma transacción)
+        
+        Args:
+            session: Sesión activa (el registro ya debe estar en flush)
+            source: 'rom_session' o 'self'
+            record: ROMSession o UserAnalysisHistory
+        """
+        rom = record.rom_value
+        stmt = sqlite_insert(AnalysisSummary).values(
+            source=source,
+            user_id=record.user_id,
+            segment=record.segment,
+            exercise_type=record.exercise_type,
+            count=1,
+            rom_count=0 if rom is None else 1,
+            rom_sum=rom or 0.0,
+            rom_sumsq=(rom or 0.0) ** 2,
+            rom_min=rom,
+            rom_max=rom,
+            last_at=record.created_at
+        )
+        current = AnalysisSummary.__table__.c
+        new = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['source', 'user_id', 'segment', 'exercise_type'],
+            set_={
+                'count': current['count'] + 1,
+                'rom_count': current.rom_count + new.rom_count,
+                'rom_sum': current.rom_sum + new.rom_sum,
+                'rom_sumsq': current.rom_sumsq + new.rom_sumsq,
+                # MIN/MAX escalares de SQLite; COALESCE para ignorar NULL
+                'rom_min': func.min(func.coalesce(current.rom_min, new.rom_min),
+                                    func.coalesce(new.rom_min, current.rom_min)),
+                'rom_max': func.max(func.coalesce(current.rom_max, new.rom_max),
+                                    func.coalesce(new.rom_max, current.rom_max)),
+                'last_at': func.max(func.coalesce(current.last_at, new.last_at),
+                                    func.coalesce(new.last_at, current.last_at)),
+            }
+        )
+        session.execute(stmt)
+    
+    def _refresh_summary(self, session: Session, source: str, keys=None):
+        """
+        Recalcula filas de analysis_summary desde la tabla de origen
+        
+        Se usa cuando un análisis cambia o se elimina (min/max no se pueden
+        restar de forma incremental).
+        
+        Args:
+            session: Sesión activa
+            source: 'rom_session' o 'self'
+            keys: Iterable de (user_id, segment, exercise_type); None = toda la tabla
+        """
+        model = self.SUMMARY_SOURCES[source]
+        
+        delete_query = session.query(AnalysisSummary).filter(AnalysisSummary.source == source)
+        select_query = session.query(
+            model.user_id,
+            model.segment,
+            model.exercise_type,
+            func.count(),
+            func.count(model.rom_value),
+            func.coalesce(func.sum(model.rom_value), 0.0),
+            func.coalesce(func.sum(model.rom_value * model.rom_value), 0.0),
+            func.min(model.rom_value),
+            func.max(model.rom_value),
+            func.max(model.created_at)
+        ).group_by(model.user_id, model.segment, model.exercise_type)
+        
+        if keys is not None:
+            keys = set(keys)
+            if not keys:
+                return
+            delete_query = delete_query.filter(or_(*[
+                and_(AnalysisSummary.user_id == user_id,
+                     AnalysisSummary.segment == segment,
+                     AnalysisSummary.exercise_type == exercise_type)
+                for user_id, segment, exercise_type in keys
+            ]))
+            select_query = select_query.filter(or_(*[
+                and_(model.user_id == user_id,
+                     model.segment == segment,
+                     model.exercise_type == exercise_type)
+                for user_id, segment, exercise_type in keys
+            ]))
+        
+        delete_query.delete(synchronize_session=False)
+        rows = [
+            {
+                'source': source,
+                'user_id': user_id,
+                'segment': segment,
+                'exercise_type': exercise_type,
+                'count': count,
+                'rom_count': rom_count,
+                'rom_sum': rom_sum,
+                'rom_sumsq': rom_sumsq,
+                'rom_min': rom_min,
+                'rom_max': rom_max,
+                'last_at': last_at
+            }
+            for (user_id, segment, exercise_type, count, rom_count,
+                 rom_sum, rom_sumsq, rom_min, rom_max, last_at) in select_query.all()
+        ]
+        if rows:
+            session.execute(insert(AnalysisSummary), rows)
+    
+    def rebuild_analysis_summary(self) -> Dict[str, int]:
+        """
+        Reconstruye analysis_summary completa desde rom_session y
+        user_analysis_history (mantenimiento: scripts/rebuild_summaries.py)
+        
+        Returns:
+            Número de filas de resumen por origen
+        """
+        with self.get_session() as session:
+            for source in self.SUMMARY_SOURCES:
+                self._refresh_summary(session, source)
+            session.flush()
+            return dict(
+                session.query(AnalysisSummary.source, func.count())
+                .group_by(AnalysisSummary.source).all()
+            )
+    
     # ========================================================================
     # MÉTODOS DE AUTENTICACIÓN
     # ========================================================================
@@ -479,9 +939,8 @@ class DatabaseManager:
             user = session.query(User).filter_by(username=username).first()
             
             if user and user.check_password(password):
-                # Actualizar last_login
-                user.last_login = datetime.utcnow()
-                session.commit()
+                # Actualizar last_login (escritura diferida)
+                self.update_last_login(user.id)
                 
                 # Retornar datos del usuario como diccionario para evitar DetachedInstanceError
                 return {
@@ -496,27 +955,39 @@ class DatabaseManager:
             return None
     
     def update_last_login(self, user_id: int):
-        """Actualiza la fecha de último login"""
-        with self.get_session() as session:
-            user = session.query(User).filter_by(id=user_id).first()
-            if user:
-                user.last_login = datetime.utcnow()
-                session.commit()
+        """
+        Actualiza la fecha de último login
+        
+        Se encola en la escritura diferida: varios logins del mismo usuario
+        dentro de un lote se combinan en un solo UPDATE.
+        """
+        if self.WRITE_BEHIND_ENABLED:
+            self.write_behind.touch_last_login(user_id)
+            return
+        
+        self._write_audit_batch([], {user_id: datetime.utcnow()})
     
     # ========================================================================
     # MÉTODOS CRUD - USER
     # ========================================================================
     
     def get_user_by_id(self, user_id: int) -> Optional[User]:
-        """Obtiene un usuario por ID"""
-        with self.get_session() as session:
-            user = session.query(User).filter_by(id=user_id).first()
-            if user:
-                # Forzar carga de todos los atributos antes de cerrar sesión
-                session.expunge(user)
-                from sqlalchemy.orm import make_transient
-                make_transient(user)
-            return user
+        """
+        Obtiene un usuario por ID (cacheado)
+        
+        Se cachean las columnas, no el objeto: cada llamada retorna un User
+        transitorio nuevo, así un llamador no puede alterar la caché.
+        """
+        columns = self.cache.get('user', user_id)
+        if columns is MISSING:
+            with self.get_session() as session:
+                user = session.query(User).filter_by(id=user_id).first()
+                columns = None
+                if user:
+                    columns = {c.key: getattr(user, c.key) for c in User.__table__.columns}
+            self.cache.set('user', user_id, columns)
+        
+        return User(**columns) if columns is not None else None
     
     def get_user_height(self, user_id: int) -> Optional[float]:
         """
@@ -529,9 +1000,13 @@ class DatabaseManager:
         Returns:
             Altura en cm o None si no existe el usuario o no tiene altura
         """
-        with self.get_session() as session:
-            result = session.query(User.height).filter_by(id=user_id).first()
-            return result[0] if result else None
+        height = self.cache.get('user_height', user_id)
+        if height is MISSING:
+            with self.get_session() as session:
+                result = session.query(User.height).filter_by(id=user_id).first()
+                height = result[0] if result else None
+            self.cache.set('user_height', user_id, height)
+        return height
     
     def get_user_by_username(self, username: str) -> Optional[User]:
         """Obtiene un usuario por username"""
@@ -572,6 +1047,8 @@ class DatabaseManager:
             session.add(user)
             session.commit()
             session.refresh(user)
+            # SQLite puede reutilizar IDs: descartar un "no existe" cacheado
+            self._invalidate_user(user.id)
             
             return user
     
@@ -601,39 +1078,87 @@ class DatabaseManager:
         """Obtiene todos los estudiantes"""
         return self.get_all_users(role='student', active_only=active_only)
     
+    @staticmethod
+    def _activity_counts(session: Session, user_ids: Optional[List[int]] = None) -> Dict[str, Dict[int, int]]:
+        """
+        Conteos de actividad por usuario con un GROUP BY por tabla
+        
+        Siempre son 2 consultas, sin importar cuántos usuarios haya
+        (antes: 3 consultas COUNT por usuario): los análisis salen de
+        analysis_summary y los sujetos de un GROUP BY sobre subject.
+        
+        Args:
+            session: Sesión activa
+            user_ids: Limitar a estos usuarios (None = todos)
+        
+        Returns:
+            {'rom_sessions': {user_id: n}, 'self_analyses': {...}, 'subjects': {...}}
+        """
+        counts = {'rom_sessions': {}, 'self_analyses': {}}
+        source_keys = {'rom_session': 'rom_sessions', 'self': 'self_analyses'}
+        
+        analyses = session.query(
+            AnalysisSummary.source, AnalysisSummary.user_id, func.sum(AnalysisSummary.count)
+        ).group_by(AnalysisSummary.source, AnalysisSummary.user_id)
+        subjects = session.query(Subject.created_by, func.count()).group_by(Subject.created_by)
+        if user_ids is not None:
+            analyses = analyses.filter(AnalysisSummary.user_id.in_(user_ids))
+            subjects = subjects.filter(Subject.created_by.in_(user_ids))
+        
+        for source, user_id, total in analyses.all():
+            counts[source_keys[source]][user_id] = int(total)
+        counts['subjects'] = dict(subjects.all())
+        return counts
+    
     def get_users_paginated(
         self, 
         page: int = 1, 
         per_page: int = 10, 
         search: str = None,
         role_filter: str = None,
-        status_filter: str = None
+        status_filter: str = None,
+        cursor: str = None
     ) -> Dict[str, Any]:
         """
         Obtiene usuarios con paginación y filtros
         
+        Con `cursor` la página se obtiene por keyset (created_at, id) en
+        lugar de OFFSET y `page` solo se usa para mostrar.
+        
         Args:
             page: Número de página
             per_page: Usuarios por página
             search: Búsqueda por username, full_name, email
             role_filter: Filtrar por rol ('admin', 'student', 'all')
             status_filter: Filtrar por estado ('active', 'inactive', 'all')
+            cursor: Cursor opaco de la página anterior (next_cursor)
         
         Returns:
-            Diccionario con items, page, pages, total, has_prev, has_next
+            Diccionario con items, page, pages, total, has_prev, has_next,
+            next_cursor
+        
+        Raises:
+            ValueError: Si el cursor no es válido
         """
         with self.get_session() as session:
             query = session.query(User)
             
             # Aplicar filtros
             if search:
-                search_term = f'%{search}%'
-                query = query.filter(
-                    (User.username.ilike(search_term)) |
-                    (User.full_name.ilike(search_term)) |
-                    (User.email.ilike(search_term)) |
-                    (User.student_id.ilike(search_term))
-                )
+                fts_query = build_fts_query(search)
+                if fts_query and self._has_fts(session, 'user_fts'):
+                    matches = text("SELECT rowid FROM user_fts WHERE user_fts MATCH :fts_query")\
+                        .bindparams(fts_query=fts_query)\
+                        .columns(column('rowid', Integer))
+                    query = query.filter(User.id.in_(matches))
+                else:
+                    search_term = f'%{search}%'
+                    query = query.filter(
+                        (User.username.ilike(search_term)) |
+                        (User.full_name.ilike(search_term)) |
+                        (User.email.ilike(search_term)) |
+                        (User.student_id.ilike(search_term))
+                    )
             
             if role_filter and role_filter != 'all':
                 query = query.filter(User.role == role_filter)
@@ -651,25 +1176,23 @@ class DatabaseManager:
             page = max(1, min(page, pages))
             
             # Obtener usuarios de la página actual
-            users = query.order_by(User.created_at.desc())\
-                        .offset((page - 1) * per_page)\
-                        .limit(per_page)\
-                        .all()
+            if cursor:
+                users, next_cursor = self._keyset_page(query, User, per_page, cursor)
+            else:
+                users, next_cursor = self._keyset_page(
+                    query, User, per_page, offset=(page - 1) * per_page
+                )
+            
+            # Conteos de la página en 3 consultas agrupadas (sujetos,
+            # análisis de sujetos en rom_session, auto-análisis)
+            counts = self._activity_counts(session, [user.id for user in users])
             
             # Convertir a diccionarios con estadísticas adicionales
             users_with_stats = []
             for user in users:
-                # Contar sujetos del usuario
-                subjects_count = session.query(func.count(Subject.id))\
-                    .filter(Subject.created_by == user.id).scalar() or 0
-                
-                # Contar análisis de sujetos (rom_session)
-                sessions_count = session.query(func.count(ROMSession.id))\
-                    .filter(ROMSession.user_id == user.id).scalar() or 0
-                
-                # Contar auto-análisis (user_analysis_history)
-                self_analyses = session.query(func.count(UserAnalysisHistory.id))\
-                    .filter(UserAnalysisHistory.user_id == user.id).scalar() or 0
+                subjects_count = counts['subjects'].get(user.id, 0)
+                sessions_count = counts['rom_sessions'].get(user.id, 0)
+                self_analyses = counts['self_analyses'].get(user.id, 0)
                 
                 users_with_stats.append({
                     'id': user.id,
@@ -682,7 +1205,7 @@ class DatabaseManager:
                     'is_active': user.is_active,
                     'last_login': user.last_login,
                     'created_at': user.created_at,
-                    'birth_date': user.birth_date,
+                    'birth_date': getattr(user, 'birth_date', None),
                     'subjects_count': subjects_count,
                     'sessions_count': sessions_count,
                     'self_analyses_count': self_analyses,
@@ -698,7 +1221,8 @@ class DatabaseManager:
                 'has_prev': page > 1,
                 'has_next': page < pages,
                 'prev_num': page - 1 if page > 1 else None,
-                'next_num': page + 1 if page < pages else None
+                'next_num': page + 1 if page < pages else None,
+                'next_cursor': next_cursor
             }
     
     def get_user_detail_for_admin(self, user_id: int) -> Optional[Dict[str, Any]]:
@@ -837,6 +1361,7 @@ class DatabaseManager:
             
             user.is_active = not user.is_active
             session.commit()
+            self._invalidate_user(user_id)
             
             return {
                 'id': user.id,
@@ -857,6 +1382,7 @@ class DatabaseManager:
                 
                 session.commit()
                 session.refresh(user)
+                self._invalidate_user(user_id, with_subjects='full_name' in kwargs)
             
             return user
     
@@ -868,6 +1394,7 @@ class DatabaseManager:
             if user:
                 user.is_active = False
                 session.commit()
+                self._invalidate_user(user_id)
                 return True
             
             return False
@@ -903,6 +1430,7 @@ class DatabaseManager:
             session.add(subject)
             session.commit()
             session.refresh(subject)
+            self._invalidate_subject(subject.id)
             
             return subject
     
@@ -973,15 +1501,20 @@ class DatabaseManager:
         Returns:
             Diccionario con datos del sujeto o None
         """
-        with self.get_session() as session:
-            subject = session.query(Subject).filter_by(id=subject_id).first()
-            if subject:
-                subject_dict = subject.to_dict()
-                subject_dict['created_by'] = subject.created_by
-                if subject.creator:
-                    subject_dict['creator_name'] = subject.creator.full_name
-                return subject_dict
-            return None
+        subject_dict = self.cache.get('subject', subject_id)
+        if subject_dict is MISSING:
+            with self.get_session() as session:
+                subject = session.query(Subject).filter_by(id=subject_id).first()
+                subject_dict = None
+                if subject:
+                    subject_dict = subject.to_dict()
+                    subject_dict['created_by'] = subject.created_by
+                    if subject.creator:
+                        subject_dict['creator_name'] = subject.creator.full_name
+            self.cache.set('subject', subject_id, subject_dict)
+        
+        # Copia: el llamador puede modificar el diccionario
+        return dict(subject_dict) if subject_dict is not None else None
     
     def generate_subject_code(self) -> str:
         """
@@ -1027,11 +1560,15 @@ class DatabaseManager:
         if user_role == 'admin':
             return True
         
-        with self.get_session() as session:
-            subject = session.query(Subject).filter_by(id=subject_id).first()
-            if subject:
-                return subject.created_by == user_id
-            return False
+        # Se cachea el dueño del sujeto (None = no existe), no el par usuario/sujeto
+        owner = self.cache.get('subject_owner', subject_id)
+        if owner is MISSING:
+            with self.get_session() as session:
+                result = session.query(Subject.created_by).filter_by(id=subject_id).first()
+                owner = result[0] if result else None
+            self.cache.set('subject_owner', subject_id, owner)
+        
+        return owner is not None and owner == user_id
     
     def can_user_modify_subject(self, user_id: int, subject_id: int, user_role: str) -> bool:
         """
@@ -1084,6 +1621,7 @@ class DatabaseManager:
                 subject.updated_at = datetime.utcnow()
                 session.commit()
                 session.refresh(subject)
+                self._invalidate_subject(subject_id)
             
             return subject
     
@@ -1093,8 +1631,14 @@ class DatabaseManager:
             subject = session.query(Subject).filter_by(id=subject_id).first()
             
             if subject:
+                summary_keys = {
+                    (s.user_id, s.segment, s.exercise_type) for s in subject.rom_sessions
+                }
                 session.delete(subject)
+                session.flush()
+                self._refresh_summary(session, 'rom_session', summary_keys)
                 session.commit()
+                self._invalidate_subject(subject_id)
                 return True
             
             return False
@@ -1128,6 +1672,8 @@ class DatabaseManager:
             )
             
             session.add(rom_session)
+            session.flush()
+            self._add_to_summary(session, 'rom_session', rom_session)
             session.commit()
             session.refresh(rom_session)
             
@@ -1167,6 +1713,47 @@ class DatabaseManager:
             sessions = session.query(ROMSession).filter_by(subject_id=subject_id).order_by(ROMSession.created_at.desc()).all()
             return [s.to_dict() for s in sessions]
     
+    def get_rom_sessions_page(
+        self,
+        user_id: int = None,
+        subject_id: int = None,
+        segment: str = None,
+        limit: int = 50,
+        cursor: str = None
+    ) -> Dict[str, Any]:
+        """
+        Página de sesiones ROM, más recientes primero (paginación por cursor)
+        
+        Args:
+            user_id: Filtrar por estudiante (opcional)
+            subject_id: Filtrar por sujeto (opcional)
+            segment: Filtrar por segmento (opcional)
+            limit: Sesiones por página
+            cursor: next_cursor de la página anterior (None = primera página)
+        
+        Returns:
+            Diccionario con items, next_cursor y has_next
+        
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        with self.get_session() as session:
+            query = session.query(ROMSession)
+            if user_id is not None:
+                query = query.filter(ROMSession.user_id == user_id)
+            if subject_id is not None:
+                query = query.filter(ROMSession.subject_id == subject_id)
+            if segment:
+                query = query.filter(ROMSession.segment == segment)
+            
+            sessions, next_cursor = self._keyset_page(query, ROMSession, limit, cursor)
+            
+            return {
+                'items': [s.to_dict() for s in sessions],
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+    
     def get_sessions_by_segment(self, segment: str) -> List[ROMSession]:
         """Obtiene sesiones por segmento corporal"""
         with self.get_session() as session:
@@ -1178,10 +1765,16 @@ class DatabaseManager:
             rom_session = session.query(ROMSession).filter_by(id=session_id).first()
             
             if rom_session:
+                old_key = (rom_session.user_id, rom_session.segment, rom_session.exercise_type)
+                
                 for key, value in kwargs.items():
                     if hasattr(rom_session, key):
                         setattr(rom_session, key, value)
                 
+                session.flush()
+                self._refresh_summary(session, 'rom_session', {
+                    old_key, (rom_session.user_id, rom_session.segment, rom_session.exercise_type)
+                })
                 session.commit()
                 session.refresh(rom_session)
             
@@ -1193,7 +1786,10 @@ class DatabaseManager:
             rom_session = session.query(ROMSession).filter_by(id=session_id).first()
             
             if rom_session:
+                summary_key = (rom_session.user_id, rom_session.segment, rom_session.exercise_type)
                 session.delete(rom_session)
+                session.flush()
+                self._refresh_summary(session, 'rom_session', {summary_key})
                 session.commit()
                 return True
             
@@ -1205,8 +1801,14 @@ class DatabaseManager:
     
     def add_angle_measurement(self, session_id: int, timestamp: float, frame_number: int,
                              angle_value: float, confidence: Optional[float] = None,
-                             landmarks_json: Optional[str] = None) -> AngleMeasurement:
-        """Agrega una medición de ángulo a una sesión"""
+                             landmarks_json: Optional[str] = None,
+                             landmarks=None) -> AngleMeasurement:
+        """
+        Agrega una medición de ángulo a una sesión
+        
+        Args:
+            landmarks: Array (33, 4) opcional; se guarda empaquetado en landmarks_blob
+        """
         with self.get_session() as session:
             measurement = AngleMeasurement(
                 session_id=session_id,
@@ -1214,7 +1816,8 @@ class DatabaseManager:
                 frame_number=frame_number,
                 angle_value=angle_value,
                 confidence=confidence,
-                landmarks_json=landmarks_json
+                landmarks_json=landmarks_json,
+                landmarks_blob=encode_landmarks(landmarks) if landmarks is not None else None
             )
             
             session.add(measurement)
@@ -1223,6 +1826,60 @@ class DatabaseManager:
             
             return measurement
     
+    def add_angle_measurements(self, session_id: int, measurements) -> int:
+        """
+        Inserta mediciones de ángulo en bloque (una sola transacción)
+        
+        Usa un INSERT de SQLAlchemy Core con executemany en lugar de un
+        commit + refresh por fila.
+        
+        Args:
+            session_id: ID de la sesión ROM
+            measurements: Iterable de (timestamp, frame_number, angle_value, confidence)
+                          o array NumPy (N, 4) con esas columnas. Un quinto
+                          elemento opcional con landmarks (33, 4) se guarda
+                          empaquetado en landmarks_blob.
+        
+        Returns:
+            Número de filas insertadas
+        """
+        rows = []
+        for measurement in measurements:
+            timestamp, frame_number, angle_value, confidence = measurement[:4]
+            landmarks = measurement[4] if len(measurement) > 4 else None
+            angle_value = float(angle_value)
+            # Respetar los CHECK de la tabla (ángulo 0-360, confianza 0-1)
+            if not 0 <= angle_value <= 360:
+                continue
+            if confidence is not None:
+                confidence = min(max(float(confidence), 0.0), 1.0)
+            rows.append({
+                'session_id': session_id,
+                'timestamp': float(timestamp),
+                'frame_number': int(frame_number),
+                'angle_value': angle_value,
+                'confidence': confidence,
+                'landmarks_blob': encode_landmarks(landmarks) if landmarks is not None else None
+            })
+        
+        if not rows:
+            return 0
+        
+        with self.get_session() as session:
+            session.execute(insert(AngleMeasurement), rows)
+        
+        return len(rows)
+    
+    def angle_measurement_buffer(self, session_id: int, flush_every: int = 500) -> 'AngleMeasurementBuffer':
+        """
+        Crea un buffer de mediciones para una sesión ROM
+        
+        Uso:
+            with db_manager.angle_measurement_buffer(session_id) as buffer:
+                buffer.append(timestamp, frame_number, angle, confidence)
+        """
+        return AngleMeasurementBuffer(self, session_id, flush_every)
+    
     def get_measurements_by_session(self, session_id: int) -> List[AngleMeasurement]:
         """Obtiene todas las mediciones de una sesión"""
         with self.get_session() as session:
@@ -1233,19 +1890,28 @@ class DatabaseManager:
     # ========================================================================
     
     def log_action(self, action: str, user_id: Optional[int] = None,
-                  details: Optional[str] = None, ip_address: Optional[str] = None) -> SystemLog:
+                  details: Optional[str] = None, ip_address: Optional[str] = None,
+                  wait: bool = False) -> Optional[SystemLog]:
         """
         Registra una acción en el sistema
         
+        Por defecto se encola en la escritura diferida (sin commit en la
+        request); con wait=True se escribe en el momento.
+        
         Args:
             action: Tipo de acción ('login', 'logout', 'create_subject', etc.)
             user_id: ID del usuario (None para eventos del sistema)
             details: Detalles adicionales
             ip_address: IP del cliente
+            wait: Escribir de forma síncrona y retornar el log
         
         Returns:
-            Log creado
+            Log creado (solo con wait=True o sin escritura diferida), si no None
         """
+        if self.WRITE_BEHIND_ENABLED and not wait:
+            self.write_behind.log(action, user_id=user_id, details=details, ip_address=ip_address)
+            return None
+        
         with self.get_session() as session:
             log = SystemLog(
                 action=action,
@@ -1262,11 +1928,13 @@ class DatabaseManager:
     
     def get_logs_by_user(self, user_id: int, limit: int = 100) -> List[SystemLog]:
         """Obtiene los logs de un usuario"""
+        self.write_behind.flush()
         with self.get_session() as session:
             return session.query(SystemLog).filter_by(user_id=user_id).order_by(SystemLog.timestamp.desc()).limit(limit).all()
     
     def get_recent_logs(self, limit: int = 100) -> List[SystemLog]:
         """Obtiene los logs más recientes del sistema"""
+        self.write_behind.flush()
         with self.get_session() as session:
             return session.query(SystemLog).order_by(SystemLog.timestamp.desc()).limit(limit).all()
     
@@ -1315,37 +1983,110 @@ class DatabaseManager:
             Estadísticas del segmento
         """
         with self.get_session() as session:
-            sessions = session.query(ROMSession).filter_by(segment=segment).filter(ROMSession.rom_value.isnot(None)).all()
-            
-            if not sessions:
+            # Agregado sobre analysis_summary (no recorre rom_session)
+            total, rom_sum, rom_min, rom_max = session.query(
+                func.sum(AnalysisSummary.rom_count),
+                func.sum(AnalysisSummary.rom_sum),
+                func.min(AnalysisSummary.rom_min),
+                func.max(AnalysisSummary.rom_max)
+            ).filter(
+                AnalysisSummary.source == 'rom_session',
+                AnalysisSummary.segment == segment
+            ).one()
+            
+            if not total:
                 return {'segment': segment, 'total_sessions': 0}
             
-            rom_values = [s.rom_value for s in sessions]
-            
             return {
                 'segment': segment,
-                'total_sessions': len(sessions),
-                'avg_rom': round(sum(rom_values) / len(rom_values), 2),
-                'min_rom': min(rom_values),
-                'max_rom': max(rom_values)
+                'total_sessions': int(total),
+                'avg_rom': round(rom_sum / total, 2),
+                'min_rom': rom_min,
+                'max_rom': rom_max
             }
     
-    def search_subjects(self, query: str) -> List[Subject]:
+    def search_subjects(self, query: str, created_by: int = None, limit: int = 50) -> List[dict]:
         """
-        Busca sujetos por nombre o código
+        Busca sujetos por nombre o código (prefijos, ordenados por relevancia)
+        
+        Usa el índice FTS5 subject_fts; sin la migración 006 recurre a LIKE.
+        
+        Args:
+            query: Texto a buscar ("jua per", "SUJ-2025")
+            created_by: Solo sujetos de este usuario (estudiantes)
+            limit: Máximo de resultados
+        
+        Returns:
+            Lista de sujetos (diccionarios), más relevantes primero
+        """
+        fts_query = build_fts_query(query)
+        if not fts_query:
+            return []
+        
+        with self.get_session() as session:
+            if self._has_fts(session, 'subject_fts'):
+                weights = ', '.join(str(w) for w in self.FTS_WEIGHTS['subject_fts'])
+                # JOIN en lugar de "IN (ids)": cada coincidencia se busca por clave primaria
+                sql = (
+                    "SELECT subject.* FROM subject_fts "
+                    "JOIN subject ON subject.id = subject_fts.rowid "
+                    "WHERE subject_fts MATCH :fts_query"
+                )
+                if created_by is not None:
+                    sql += " AND subject.created_by = :created_by"
+                sql += f" ORDER BY bm25(subject_fts, {weights}) LIMIT :limit"
+                
+                subjects = session.query(Subject).from_statement(text(sql)).params(
+                    fts_query=fts_query, created_by=created_by, limit=limit
+                )
+                return [s.to_dict() for s in subjects]
+            
+            search_term = f'%{query}%'
+            subjects = session.query(Subject).filter(
+                (Subject.first_name.like(search_term)) |
+                (Subject.last_name.like(search_term)) |
+                (Subject.subject_code.like(search_term))
+            )
+            if created_by is not None:
+                subjects = subjects.filter(Subject.created_by == created_by)
+            return [s.to_dict() for s in subjects.limit(limit)]
+    
+    def search_users(self, query: str, limit: int = 20) -> List[dict]:
+        """
+        Busca usuarios por username, nombre, email o código de estudiante
+        (prefijos, ordenados por relevancia)
         
         Args:
             query: Texto a buscar
+            limit: Máximo de resultados
         
         Returns:
-            Lista de sujetos que coinciden
+            Lista de usuarios (diccionarios), más relevantes primero
         """
+        fts_query = build_fts_query(query)
+        if not fts_query:
+            return []
+        
         with self.get_session() as session:
-            return session.query(Subject).filter(
-                (Subject.first_name.like(f'%{query}%')) |
-                (Subject.last_name.like(f'%{query}%')) |
-                (Subject.subject_code.like(f'%{query}%'))
-            ).all()
+            if self._has_fts(session, 'user_fts'):
+                weights = ', '.join(str(w) for w in self.FTS_WEIGHTS['user_fts'])
+                # Sin "IN (ids)": SQLite recorre toda la tabla con listas
+                # grandes (o vacías); el JOIN busca cada fila por clave primaria
+                users = session.query(User).from_statement(text(
+                    "SELECT user.* FROM user_fts JOIN user ON user.id = user_fts.rowid "
+                    "WHERE user_fts MATCH :fts_query "
+                    f"ORDER BY bm25(user_fts, {weights}) LIMIT :limit"
+                )).params(fts_query=fts_query, limit=limit)
+                return [u.to_dict() for u in users]
+            
+            search_term = f'%{query}%'
+            users = session.query(User).filter(
+                (User.username.ilike(search_term)) |
+                (User.full_name.ilike(search_term)) |
+                (User.email.ilike(search_term)) |
+                (User.student_id.ilike(search_term))
+            ).limit(limit)
+            return [u.to_dict() for u in users]
     
     # ========================================================================
     # MÉTODOS AUXILIARES
@@ -1407,6 +2148,8 @@ class DatabaseManager:
             )
             
             session.add(analysis)
+            session.flush()
+            self._add_to_summary(session, 'self', analysis)
             session.commit()
             
             # Obtener el ID antes de cerrar la sesión
@@ -1470,6 +2213,8 @@ class DatabaseManager:
             )
             
             session.add(analysis)
+            session.flush()
+            self._add_to_summary(session, 'self', analysis)
             session.commit()
             session.refresh(analysis)
             
@@ -1507,6 +2252,72 @@ class DatabaseManager:
             
             return [record.to_dict() for record in records]
     
+    @staticmethod
+    def _filter_analysis_history(query, segment: str = None, exercise_type: str = None,
+                                 date_from: str = None, date_to: str = None):
+        """Aplica los filtros opcionales del historial de auto-análisis"""
+        if segment:
+            query = query.filter(UserAnalysisHistory.segment == segment)
+        
+        if exercise_type:
+            query = query.filter(UserAnalysisHistory.exercise_type == exercise_type)
+        
+        if date_from:
+            try:
+                date_from_dt = datetime.strptime(date_from, '%Y-%m-%d')
+                query = query.filter(UserAnalysisHistory.created_at >= date_from_dt)
+            except ValueError:
+                pass
+        
+        if date_to:
+            try:
+                date_to_dt = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
+                query = query.filter(UserAnalysisHistory.created_at < date_to_dt)
+            except ValueError:
+                pass
+        
+        return query
+    
+    def get_user_analysis_history_page(
+        self,
+        user_id: int,
+        segment: str = None,
+        exercise_type: str = None,
+        date_from: str = None,
+        date_to: str = None,
+        limit: int = 50,
+        cursor: str = None
+    ) -> Dict[str, Any]:
+        """
+        Página del historial de análisis de un usuario (paginación por cursor)
+        
+        Args:
+            user_id: ID del usuario
+            segment: Filtrar por segmento (opcional)
+            exercise_type: Filtrar por ejercicio (opcional)
+            date_from: Fecha desde (formato YYYY-MM-DD) (opcional)
+            date_to: Fecha hasta (formato YYYY-MM-DD) (opcional)
+            limit: Registros por página
+            cursor: next_cursor de la página anterior (None = primera página)
+        
+        Returns:
+            Diccionario con items, next_cursor y has_next
+        
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        with self.get_session() as session:
+            query = session.query(UserAnalysisHistory).filter(UserAnalysisHistory.user_id == user_id)
+            query = self._filter_analysis_history(query, segment, exercise_type, date_from, date_to)
+            
+            records, next_cursor = self._keyset_page(query, UserAnalysisHistory, limit, cursor)
+            
+            return {
+                'items': [record.to_dict() for record in records],
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+    
     def get_user_analysis_history_filtered(
         self,
         user_id: int,
@@ -1533,27 +2344,7 @@ class DatabaseManager:
         with self.get_session() as session:
             query = session.query(UserAnalysisHistory).filter_by(user_id=user_id)
             
-            if segment:
-                query = query.filter_by(segment=segment)
-            
-            if exercise_type:
-                query = query.filter_by(exercise_type=exercise_type)
-            
-            if date_from:
-                try:
-                    from datetime import datetime
-                    date_from_dt = datetime.strptime(date_from, '%Y-%m-%d')
-                    query = query.filter(UserAnalysisHistory.created_at >= date_from_dt)
-                except ValueError:
-                    pass
-            
-            if date_to:
-                try:
-                    from datetime import datetime, timedelta
-                    date_to_dt = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
-                    query = query.filter(UserAnalysisHistory.created_at < date_to_dt)
-                except ValueError:
-                    pass
+            query = self._filter_analysis_history(query, segment, exercise_type, date_from, date_to)
             
             records = query.order_by(UserAnalysisHistory.created_at.desc()).limit(limit).all()
             
@@ -1582,30 +2373,78 @@ class DatabaseManager:
         """
         with self.get_session() as session:
             query = session.query(func.count(UserAnalysisHistory.id)).filter_by(user_id=user_id)
+            query = self._filter_analysis_history(query, segment, exercise_type, date_from, date_to)
             
-            if segment:
-                query = query.filter(UserAnalysisHistory.segment == segment)
-            
-            if exercise_type:
-                query = query.filter(UserAnalysisHistory.exercise_type == exercise_type)
-            
-            if date_from:
-                try:
-                    from datetime import datetime
-                    date_from_dt = datetime.strptime(date_from, '%Y-%m-%d')
-                    query = query.filter(UserAnalysisHistory.created_at >= date_from_dt)
-                except ValueError:
-                    pass
+            return query.scalar() or 0
+    
+    def get_cohort_analysis_history(
+        self,
+        program: str = None,
+        semester: int = None,
+        date_from: str = None,
+        date_to: str = None,
+        segment: str = None,
+        limit_per_user: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Historial de auto-análisis de una cohorte de estudiantes en UNA consulta
+        (reportes de clase). Incluye a los estudiantes sin análisis.
+        
+        Args:
+            program: Filtrar por programa académico (opcional)
+            semester: Filtrar por semestre (opcional)
+            date_from: Fecha desde (formato YYYY-MM-DD) (opcional)
+            date_to: Fecha hasta (formato YYYY-MM-DD) (opcional)
+            segment: Filtrar por segmento (opcional)
+            limit_per_user: Análisis más recientes por estudiante (como el
+                            reporte individual)
+        
+        Returns:
+            Lista de {'user': dict, 'analyses': [dict]} ordenada por nombre
+        """
+        # Numerar los análisis de cada estudiante para limitar por estudiante
+        # dentro de la misma consulta
+        row_number = func.row_number().over(
+            partition_by=UserAnalysisHistory.user_id,
+            order_by=(UserAnalysisHistory.created_at.desc(), UserAnalysisHistory.id.desc())
+        ).label('row_number')
+        ranked_query = self._filter_analysis_history(
+            select(UserAnalysisHistory, row_number), segment, None, date_from, date_to
+        )
+        ranked = ranked_query.subquery()
+        analysis = aliased(UserAnalysisHistory, ranked)
+        
+        with self.get_session() as session:
+            query = session.query(User, analysis).outerjoin(
+                analysis,
+                and_(analysis.user_id == User.id, ranked.c.row_number <= limit_per_user)
+            ).filter(User.role == 'student', User.is_active == True)
+            
+            if program:
+                query = query.filter(User.program == program)
+            if semester:
+                query = query.filter(User.semester == semester)
+            
+            rows = query.order_by(
+                User.full_name, User.id, ranked.c.created_at.desc(), ranked.c.id.desc()
+            ).all()
             
-            if date_to:
-                try:
-                    from datetime import datetime, timedelta
-                    date_to_dt = datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)
-                    query = query.filter(UserAnalysisHistory.created_at < date_to_dt)
-                except ValueError:
-                    pass
+            cohort = []
+            for user, record in rows:
+                if not cohort or cohort[-1]['user']['id'] != user.id:
+                    cohort.append({'user': user.to_dict(), 'analyses': []})
+                if record is not None:
+                    cohort[-1]['analyses'].append(record.to_dict())
             
-            return query.scalar() or 0
+            return cohort
+    
+    def get_student_programs(self) -> List[str]:
+        """Programas académicos de los estudiantes activos (filtro de cohortes)"""
+        with self.get_session() as session:
+            rows = session.query(User.program).filter(
+                User.role == 'student', User.is_active == True, User.program.isnot(None)
+            ).distinct().order_by(User.program).all()
+            return [program for (program,) in rows if program]
     
     def get_session_by_id(self, session_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -1713,14 +2552,24 @@ class DatabaseManager:
             Estadísticas de análisis
         """
         with self.get_session() as session:
-            query = session.query(UserAnalysisHistory).filter_by(user_id=user_id)
+            # Agregado sobre analysis_summary (no recorre el historial)
+            query = session.query(
+                func.sum(AnalysisSummary.count),
+                func.sum(AnalysisSummary.rom_count),
+                func.sum(AnalysisSummary.rom_sum),
+                func.max(AnalysisSummary.rom_max),
+                func.max(AnalysisSummary.last_at)
+            ).filter(
+                AnalysisSummary.source == 'self',
+                AnalysisSummary.user_id == user_id
+            )
             
             if segment:
-                query = query.filter_by(segment=segment)
+                query = query.filter(AnalysisSummary.segment == segment)
             
-            records = query.all()
+            total, rom_count, rom_sum, rom_max, last_at = query.one()
             
-            if not records:
+            if not total:
                 return {
                     'total_analyses': 0,
                     'avg_rom': 0,
@@ -1728,13 +2577,11 @@ class DatabaseManager:
                     'last_analysis': None
                 }
             
-            rom_values = [r.rom_value for r in records if r.rom_value]
-            
             return {
-                'total_analyses': len(records),
-                'avg_rom': round(sum(rom_values) / len(rom_values), 1) if rom_values else 0,
-                'max_rom': round(max(rom_values), 1) if rom_values else 0,
-                'last_analysis': records[0].created_at.isoformat() if records else None
+                'total_analyses': int(total),
+                'avg_rom': round(rom_sum / rom_count, 1) if rom_count else 0,
+                'max_rom': round(rom_max, 1) if rom_max is not None else 0,
+                'last_analysis': last_at.isoformat() if last_at else None
             }
     
     def get_admin_global_statistics(self) -> Dict[str, Any]:
@@ -1755,11 +2602,13 @@ class DatabaseManager:
             total_admins = session.query(func.count(User.id)).filter_by(role='admin', is_active=True).scalar() or 0
             total_subjects = session.query(func.count(Subject.id)).scalar() or 0
             
-            # Sesiones ROM (análisis de sujetos)
-            total_rom_sessions = session.query(func.count(ROMSession.id)).scalar() or 0
-            
-            # Auto-análisis
-            total_self_analyses = session.query(func.count(UserAnalysisHistory.id)).scalar() or 0
+            # Sesiones ROM (análisis de sujetos) y auto-análisis desde analysis_summary
+            totals_by_source = dict(
+                session.query(AnalysisSummary.source, func.sum(AnalysisSummary.count))
+                .group_by(AnalysisSummary.source).all()
+            )
+            total_rom_sessions = int(totals_by_source.get('rom_session') or 0)
+            total_self_analyses = int(totals_by_source.get('self') or 0)
             
             # Total combinado
             total_analyses = total_rom_sessions + total_self_analyses
@@ -1774,12 +2623,15 @@ class DatabaseManager:
                 'ankle': 'Tobillo'
             }
             
+            # Ambas tablas de origen ya sumadas en analysis_summary
+            count_by_segment = dict(
+                session.query(AnalysisSummary.segment, func.sum(AnalysisSummary.count))
+                .group_by(AnalysisSummary.segment).all()
+            )
+            
             segment_stats = []
             for seg in segments:
-                # Contar de ambas tablas
-                rom_count = session.query(func.count(ROMSession.id)).filter_by(segment=seg).scalar() or 0
-                self_count = session.query(func.count(UserAnalysisHistory.id)).filter_by(segment=seg).scalar() or 0
-                total_seg = rom_count + self_count
+                total_seg = int(count_by_segment.get(seg) or 0)
                 
                 # Calcular porcentaje
                 percentage = round((total_seg / total_analyses * 100), 1) if total_analyses > 0 else 0
@@ -1804,11 +2656,14 @@ class DatabaseManager:
                 'external_rotation': 'Rot. Externa'
             }
             
+            count_by_exercise = dict(
+                session.query(AnalysisSummary.exercise_type, func.sum(AnalysisSummary.count))
+                .group_by(AnalysisSummary.exercise_type).all()
+            )
+            
             exercise_stats = []
             for ex_key, ex_name in exercise_names.items():
-                rom_count = session.query(func.count(ROMSession.id)).filter_by(exercise_type=ex_key).scalar() or 0
-                self_count = session.query(func.count(UserAnalysisHistory.id)).filter_by(exercise_type=ex_key).scalar() or 0
-                total_ex = rom_count + self_count
+                total_ex = int(count_by_exercise.get(ex_key) or 0)
                 
                 if total_ex > 0:
                     percentage = round((total_ex / total_analyses * 100), 1) if total_analyses > 0 else 0
@@ -1824,11 +2679,12 @@ class DatabaseManager:
             # ====== TOP ESTUDIANTES (por actividad) ======
             top_students = []
             students = session.query(User).filter_by(role='student', is_active=True).all()
+            counts = self._activity_counts(session)
             
             for student in students:
-                rom_count = session.query(func.count(ROMSession.id)).filter_by(user_id=student.id).scalar() or 0
-                self_count = session.query(func.count(UserAnalysisHistory.id)).filter_by(user_id=student.id).scalar() or 0
-                subjects_count = session.query(func.count(Subject.id)).filter_by(created_by=student.id).scalar() or 0
+                rom_count = counts['rom_sessions'].get(student.id, 0)
+                self_count = counts['self_analyses'].get(student.id, 0)
+                subjects_count = counts['subjects'].get(student.id, 0)
                 
                 total_activity = rom_count + self_count
                 
@@ -1863,16 +2719,8 @@ class DatabaseManager:
             ).scalar() or 0
             
             # ====== ÚLTIMA ACTIVIDAD ======
-            last_rom = session.query(ROMSession).order_by(ROMSession.created_at.desc()).first()
-            last_self = session.query(UserAnalysisHistory).order_by(UserAnalysisHistory.created_at.desc()).first()
-            
-            last_activity = None
-            if last_rom and last_self:
-                last_activity = max(last_rom.created_at, last_self.created_at).isoformat()
-            elif last_rom:
-                last_activity = last_rom.created_at.isoformat()
-            elif last_self:
-                last_activity = last_self.created_at.isoformat()
+            last_at = session.query(func.max(AnalysisSummary.last_at)).scalar()
+            last_activity = last_at.isoformat() if last_at else None
             
             return {
                 # Contadores principales
@@ -1908,12 +2756,13 @@ class DatabaseManager:
         """
         with self.get_session() as session:
             students = session.query(User).filter_by(role='student').order_by(User.created_at.desc()).all()
+            counts = self._activity_counts(session)
             
             result = []
             for student in students:
-                rom_count = session.query(func.count(ROMSession.id)).filter_by(user_id=student.id).scalar() or 0
-                self_count = session.query(func.count(UserAnalysisHistory.id)).filter_by(user_id=student.id).scalar() or 0
-                subjects_count = session.query(func.count(Subject.id)).filter_by(created_by=student.id).scalar() or 0
+                rom_count = counts['rom_sessions'].get(student.id, 0)
+                self_count = counts['self_analyses'].get(student.id, 0)
+                subjects_count = counts['subjects'].get(student.id, 0)
                 
                 result.append({
                     'id': student.id,
@@ -1943,10 +2792,94 @@ class DatabaseManager:
                 'total_subjects': session.query(func.count(Subject.id)).scalar(),
                 'total_sessions': session.query(func.count(ROMSession.id)).scalar(),
                 'total_measurements': session.query(func.count(AngleMeasurement.id)).scalar(),
-                'total_logs': session.query(func.count(SystemLog.id)).scalar()
+                'total_logs': session.query(func.count(SystemLog.id)).scalar(),
+                'health': self.get_connection_health(),
+                'query_cache': self.get_cache_stats(),
+                'write_behind': self.write_behind.stats()
             }
 
 
+class AngleMeasurementBuffer:
+    """
+    Buffer en memoria de mediciones de ángulo de una sesión ROM
+    
+    Acumula filas (timestamp, frame_number, angle_value, confidence[, landmarks])
+    y las escribe con DatabaseManager.add_angle_measurements() cada
+    `flush_every` filas y al cerrar (fin de sesión o salida del bloque with).
+    """
+    
+    def __init__(self, db_manager: DatabaseManager, session_id: int, flush_every: int = 500):
+        self.db_manager = db_manager
+        self.session_id = session_id
+        self.flush_every = max(1, flush_every)
+        self.total_written = 0
+        self._rows: List[tuple] = []
+    
+    def append(self, timestamp: float, frame_number: int, angle_value: float,
+               confidence: Optional[float] = None, landmarks=None):
+        """Agrega una medición; escribe el bloque si se alcanza flush_every"""
+        self._rows.append((timestamp, frame_number, angle_value, confidence, landmarks))
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+    
+    def extend(self, measurements):
+        """Agrega varias mediciones (iterable de tuplas o array NumPy (N, 4))"""
+        for row in measurements:
+            self.append(*row)
+    
+    def flush(self) -> int:
+        """Escribe las filas pendientes en una transacción"""
+        if not self._rows:
+            return 0
+        rows, self._rows = self._rows, []
+        written = self.db_manager.add_angle_measurements(self.session_id, rows)
+        self.total_written += written
+        return written
+    
+    def close(self) -> int:
+        """Fin de sesión: escribe lo pendiente y retorna el total escrito"""
+        self.flush()
+        return self.total_written
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def __enter__(self) -> 'AngleMeasurementBuffer':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        return False
+
+
+# ============================================================================
+# HOOKS DE PROCESO (fork y salida)
+# ============================================================================
+
+# Un solo hook por proceso recorre los gestores vivos. Registrar uno por
+# instancia (os.register_at_fork no permite quitarlo) mantendría cada
+# gestor, con su engine y su cola, referenciado hasta el final del proceso.
+_live_managers: 'weakref.WeakSet[DatabaseManager]' = weakref.WeakSet()
+
+
+def _dispose_managers_after_fork():
+    """Proceso hijo (Gunicorn con --preload): no reutilizar las conexiones del padre"""
+    for manager in list(_live_managers):
+        manager._dispose_after_fork()
+
+
+def _close_managers_at_exit():
+    """Escribe la auditoría pendiente de los gestores vivos al cerrar el proceso"""
+    for manager in list(_live_managers):
+        manager.write_behind.close()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_managers_after_fork)
+atexit.register(_close_managers_at_exit)
+
+
 # ============================================================================
 # SINGLETON INSTANCE (Opcional - para uso global)
 # ============================================================================
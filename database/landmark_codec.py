@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+📦 LANDMARK CODEC - FORMATO BINARIO EMPAQUETADO DE LANDMARKS
+==============================================================
+Codifica landmarks de MediaPipe (x, y, z, visibility por landmark) como
+BLOB binario en lugar de JSON de texto.
+
+FORMATO (little-endian):
+    Cabecera de 16 bytes:
+        magic        4s   b'BTLM'
+        version      B    FORMAT_VERSION
+        dtype        B    1 = float16, 2 = float32
+        compression  B    0 = ninguna, 1 = zlib
+        reserved     B    0
+        n_landmarks  H    landmarks por frame (33 en MediaPipe Pose)
+        n_fields     H    valores por landmark (4: x, y, z, visibility)
+        n_frames     I    frames en el bloque
+    Payload:
+        array (n_frames, n_landmarks, n_fields) en C-order, opcionalmente
+        comprimido con zlib (útil para bloques de varios frames por sesión)
+
+Un frame de 33 landmarks ocupa 280 bytes en float16 (vs ~3 KB en JSON).
+
+Autor: BIOTRACK Team
+Fecha: 2025-11-29
+"""
+
+import json
+import struct
+import zlib
+from typing import Any, Optional
+
+import numpy as np
+
+MAGIC = b'BTLM'
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct('<4sBBBBHHI')
+
+DTYPE_CODES = {
+    'float16': 1,
+    'float32': 2,
+}
+_CODE_DTYPES = {code: np.dtype(name).newbyteorder('<') for name, code in DTYPE_CODES.items()}
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+
+# Campos por landmark en el orden almacenado
+LANDMARK_FIELDS = ('x', 'y', 'z', 'visibility')
+
+
+class LandmarkCodecError(ValueError):
+    """BLOB de landmarks inválido o de versión no soportada"""
+
+
+def encode_landmarks(landmarks: Any, dtype: str = 'float16', compress: bool = False) -> bytes:
+    """
+    Empaqueta landmarks en un BLOB con cabecera versionada
+
+    Args:
+        landmarks: Array (n_landmarks, n_fields) para un frame o
+                   (n_frames, n_landmarks, n_fields) para un bloque
+        dtype: 'float16' (compacto) o 'float32' (precisión completa)
+        compress: Comprimir el payload con zlib
+
+    Returns:
+        bytes listos para guardar en una columna BLOB
+    """
+    if dtype not in DTYPE_CODES:
+        raise LandmarkCodecError(f"dtype no soportado: {dtype}")
+
+    array = np.asarray(landmarks, dtype=_CODE_DTYPES[DTYPE_CODES[dtype]])
+    if array.ndim == 2:
+        array = array[np.newaxis]
+    if array.ndim != 3:
+        raise LandmarkCodecError(f"Forma de landmarks inválida: {array.shape}")
+
+    n_frames, n_landmarks, n_fields = array.shape
+    payload = np.ascontiguousarray(array).tobytes()
+    compression = COMPRESSION_NONE
+    if compress:
+        payload = zlib.compress(payload)
+        compression = COMPRESSION_ZLIB
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, DTYPE_CODES[dtype], compression, 0,
+        n_landmarks, n_fields, n_frames
+    )
+    return header + payload
+
+
+def decode_landmarks(blob: bytes) -> np.ndarray:
+    """
+    Desempaqueta un BLOB de landmarks
+
+    Args:
+        blob: Bytes generados por encode_landmarks()
+
+    Returns:
+        np.ndarray float32 de forma (n_frames, n_landmarks, n_fields)
+    """
+    if blob is None or len(blob) < HEADER.size:
+        raise LandmarkCodecError("BLOB de landmarks vacío o truncado")
+
+    magic, version, dtype_code, compression, _, n_landmarks, n_fields, n_frames = \
+        HEADER.unpack_from(blob)
+
+    if magic != MAGIC:
+        raise LandmarkCodecError("BLOB sin cabecera BTLM")
+    if version > FORMAT_VERSION:
+        raise LandmarkCodecError(f"Versión de formato no soportada: {version}")
+    if dtype_code not in _CODE_DTYPES:
+        raise LandmarkCodecError(f"Código de dtype desconocido: {dtype_code}")
+
+    payload = memoryview(blob)[HEADER.size:]
+    if compression == COMPRESSION_ZLIB:
+        payload = zlib.decompress(payload)
+    elif compression != COMPRESSION_NONE:
+        raise LandmarkCodecError(f"Compresión desconocida: {compression}")
+
+    array = np.frombuffer(payload, dtype=_CODE_DTYPES[dtype_code])
+    expected = n_frames * n_landmarks * n_fields
+    if array.size != expected:
+        raise LandmarkCodecError(f"Payload de {array.size} valores, se esperaban {expected}")
+
+    return array.reshape(n_frames, n_landmarks, n_fields).astype(np.float32)
+
+
+def decode_frame(blob: bytes) -> np.ndarray:
+    """Desempaqueta un BLOB de un solo frame como array (n_landmarks, n_fields)"""
+    return decode_landmarks(blob)[0]
+
+
+def landmarks_from_json(landmarks_json: Optional[str]) -> Optional[np.ndarray]:
+    """
+    Convierte el formato legacy landmarks_json a array (n_landmarks, 4)
+
+    Acepta una lista de objetos {x, y, z, visibility}, una lista de listas
+    [x, y, z, visibility] o un objeto {'landmarks': [...]}.
+
+    Returns:
+        np.ndarray float32 o None si el JSON está vacío
+    """
+    if not landmarks_json:
+        return None
+
+    data = json.loads(landmarks_json)
+    if isinstance(data, dict):
+        data = data.get('landmarks', [])
+    if not data:
+        return None
+
+    rows = []
+    for item in data:
+        if isinstance(item, dict):
+            rows.append([float(item.get(field, 0.0) or 0.0) for field in LANDMARK_FIELDS])
+        else:
+            values = [float(v) for v in item][:len(LANDMARK_FIELDS)]
+            rows.append(values + [0.0] * (len(LANDMARK_FIELDS) - len(values)))
+
+    return np.array(rows, dtype=np.float32)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+⚡ QUERY CACHE - CACHÉ EN PROCESO PARA LECTURAS CALIENTES
+==========================================================
+Caché TTL + LRU usada por DatabaseManager para lecturas que se repiten
+en casi todas las requests (usuario actual, altura, sujeto, dueño del
+sujeto) y que cambian muy poco.
+
+CARACTERÍSTICAS:
+- Claves (namespace, clave): se invalidan por clave o por namespace
+- Expiración por TTL + desalojo LRU al superar max_entries
+- Thread-safe (un Lock; Flask sirve requests en varios hilos)
+- Contadores de hits/misses por namespace para verificar su efecto
+
+La caché es por proceso: con varios workers, un cambio hecho en otro
+proceso se ve como máximo tras `ttl` segundos.
+
+Autor: BIOTRACK Team
+Fecha: 2025-11-29
+"""
+
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Hashable, Optional
+
+# Centinela para distinguir "no está en caché" de un valor None cacheado
+MISSING = object()
+
+
+class QueryCache:
+    """
+    Caché TTL + LRU con invalidación explícita
+
+    Uso:
+        value = cache.get('user', user_id)
+        if value is MISSING:
+            value = cargar_de_bd(user_id)
+            cache.set('user', user_id, value)
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0):
+        """
+        Args:
+            max_entries: Máximo de entradas antes de desalojar la menos usada
+            ttl: Segundos de vida de cada entrada (<= 0 desactiva la caché)
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits: Dict[str, int] = defaultdict(int)
+        self._misses: Dict[str, int] = defaultdict(int)
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, namespace: str, key: Hashable) -> Any:
+        """Retorna el valor cacheado o MISSING (cuenta hit/miss)"""
+        full_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(full_key)
+                    self._hits[namespace] += 1
+                    return value
+                del self._entries[full_key]
+            self._misses[namespace] += 1
+            return MISSING
+
+    def set(self, namespace: str, key: Hashable, value: Any):
+        """Guarda un valor (None también se cachea: "no existe")"""
+        if not self.enabled:
+            return
+        full_key = (namespace, key)
+        with self._lock:
+            self._entries[full_key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, namespace: str, key: Optional[Hashable] = None):
+        """
+        Elimina una clave o, si key es None, todo el namespace
+        """
+        with self._lock:
+            if key is not None:
+                if self._entries.pop((namespace, key), None) is not None:
+                    self._invalidations += 1
+                return
+            stale = [full_key for full_key in self._entries if full_key[0] == namespace]
+            for full_key in stale:
+                del self._entries[full_key]
+            self._invalidations += len(stale)
+
+    def clear(self):
+        """Vacía la caché (los contadores se conservan)"""
+        with self._lock:
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits.clear()
+            self._misses.clear()
+            self._evictions = 0
+            self._invalidations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Contadores de la caché
+
+        Returns:
+            Diccionario con hits, misses, hit_rate, entries, evictions,
+            invalidations y el desglose por namespace
+        """
+        with self._lock:
+            namespaces = sorted(set(self._hits) | set(self._misses))
+            hits = sum(self._hits.values())
+            misses = sum(self._misses.values())
+            return {
+                'enabled': self.enabled,
+                'ttl': self.ttl,
+                'max_entries': self.max_entries,
+                'entries': len(self._entries),
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+                'namespaces': {
+                    name: {'hits': self._hits[name], 'misses': self._misses[name]}
+                    for name in namespaces
+                }
+            }
@@ -202,6 +202,8 @@ CREATE TABLE angle_measurement (
         -- Confianza de MediaPipe (0-1)
     landmarks_json TEXT,
         -- JSON con coordenadas de landmarks (opcional, para debugging)
+    landmarks_blob BLOB,
+        -- Landmarks empaquetados float16/float32 con cabecera BTLM (ver database/landmark_codec.py)
     
     -- Relaciones
     FOREIGN KEY (session_id) REFERENCES rom_session(id) ON DELETE CASCADE,
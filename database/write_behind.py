@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+📝 WRITE-BEHIND - ESCRITURA DIFERIDA DE AUDITORÍA
+===================================================
+Hilo escritor en segundo plano para las escrituras que no necesitan
+estar en disco antes de responder la request:
+
+- Inserciones en system_log (log_action)
+- Actualizaciones de user.last_login (update_last_login)
+
+Las escrituras se encolan en una cola acotada y el hilo las agrupa en
+una sola transacción:
+- Logs: un INSERT executemany por lote
+- last_login: se combinan por usuario (solo se escribe el más reciente)
+
+El lote se escribe al llegar a `batch_size` elementos, cuando el más
+antiguo supera `flush_interval` segundos, con flush() explícito y al
+cerrar el proceso (atexit). Si la cola está llena, la escritura se hace
+de forma síncrona en el hilo que llama.
+
+Si un lote falla (p. ej. "database is locked") se reintenta `retries`
+veces; si sigue fallando se escribe fila por fila, de modo que una fila
+inválida no arrastra al resto del lote. Solo las filas que fallan también
+por separado se descartan: se cuentan en `dropped` y se registran en el log.
+
+Autor: BIOTRACK Team
+Fecha: 2025-11-29
+"""
+
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Marcadores de control en la cola
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """
+    Cola de escritura diferida con un hilo escritor
+
+    El hilo se inicia con el primer elemento encolado (perezoso), de modo
+    que un proceso hijo creado con fork arranca el suyo propio.
+    """
+
+    def __init__(self, write_batch: Callable[[List[Dict[str, Any]], Dict[int, datetime]], None],
+                 batch_size: int = 200, flush_interval: float = 1.0, max_queue: int = 10000,
+                 retries: int = 2, retry_delay: float = 0.2):
+        """
+        Args:
+            write_batch: Función (logs, last_logins) que escribe un lote en
+                         una transacción; last_logins es {user_id: fecha}
+            batch_size: Elementos pendientes que fuerzan una escritura
+            flush_interval: Segundos máximos que un elemento espera en memoria
+            max_queue: Capacidad de la cola (al llenarse se escribe síncrono)
+            retries: Reintentos de un lote fallido antes de escribir fila por fila
+            retry_delay: Segundos de espera antes del primer reintento (se duplica)
+        """
+        self.write_batch = write_batch
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.retries = max(0, retries)
+        self.retry_delay = retry_delay
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+        # Contadores
+        self.enqueued = 0
+        self.written_logs = 0
+        self.written_logins = 0
+        self.coalesced_logins = 0
+        self.sync_fallbacks = 0
+        self.batches = 0
+        self.errors = 0
+        self.retried = 0
+        self.row_fallbacks = 0
+        self.dropped = 0
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def log(self, action: str, user_id: Optional[int] = None, details: Optional[str] = None,
+            ip_address: Optional[str] = None):
+        """Encola una fila de system_log (timestamp = momento de la llamada)"""
+        self._put(('log', {
+            'action': action,
+            'user_id': user_id,
+            'details': details,
+            'ip_address': ip_address,
+            'timestamp': datetime.utcnow()
+        }))
+
+    def touch_last_login(self, user_id: int, when: Optional[datetime] = None):
+        """Encola la actualización de last_login de un usuario"""
+        self._put(('last_login', (user_id, when or datetime.utcnow())))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Escribe todo lo pendiente y espera a que termine
+
+        Returns:
+            True si el lote se escribió dentro del timeout
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Escribe lo pendiente y detiene el hilo (idempotente)"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def reset_after_fork(self):
+        """En el proceso hijo: cola nueva y sin hilo (el del padre no existe aquí)"""
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'pending': self._queue.qsize(),
+            'enqueued': self.enqueued,
+            'written_logs': self.written_logs,
+            'written_logins': self.written_logins,
+            'coalesced_logins': self.coalesced_logins,
+            'sync_fallbacks': self.sync_fallbacks,
+            'batches': self.batches,
+            'errors': self.errors,
+            'retried': self.retried,
+            'row_fallbacks': self.row_fallbacks,
+            'dropped': self.dropped
+        }
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _put(self, item):
+        if self._closed:
+            # Tras el cierre (atexit) se escribe directamente
+            self._write_sync(item)
+            return
+
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(item)
+            self.enqueued += 1
+        except queue.Full:
+            self.sync_fallbacks += 1
+            self._write_sync(item)
+
+    def _write_sync(self, item):
+        kind, payload = item
+        if kind == 'log':
+            self.write_batch([payload], {})
+        else:
+            user_id, when = payload
+            self.write_batch([], {user_id: when})
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='biotrack-write-behind', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        logs: List[Dict[str, Any]] = []
+        logins: Dict[int, datetime] = {}
+        oldest = None
+
+        while True:
+            timeout = None
+            if oldest is not None:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - oldest))
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            waiter = None
+            stop = False
+            if item is _STOP:
+                stop = True
+            elif item is not None:
+                kind, payload = item
+                if kind == 'log':
+                    logs.append(payload)
+                elif kind == 'last_login':
+                    user_id, when = payload
+                    if user_id in logins:
+                        self.coalesced_logins += 1
+                    logins[user_id] = max(when, logins.get(user_id, when))
+                elif kind == 'flush':
+                    waiter = payload
+                if oldest is None and (logs or logins):
+                    oldest = time.monotonic()
+
+            due = oldest is not None and time.monotonic() - oldest >= self.flush_interval
+            if stop or waiter is not None or due or len(logs) + len(logins) >= self.batch_size:
+                self._write(logs, logins)
+                logs, logins, oldest = [], {}, None
+
+            if waiter is not None:
+                waiter.set()
+            if stop:
+                return
+
+    def _write(self, logs: List[Dict[str, Any]], logins: Dict[int, datetime]):
+        if not logs and not logins:
+            return
+
+        delay = self.retry_delay
+        for attempt in range(self.retries + 1):
+            try:
+                self.write_batch(logs, logins)
+            except Exception as e:
+                # La auditoría no debe tumbar el hilo
+                self.errors += 1
+                logger.warning(f"Error escribiendo lote diferido ({len(logs)} logs, "
+                               f"{len(logins)} last_login, intento {attempt + 1}): {e}")
+                if attempt < self.retries:
+                    self.retried += 1
+                    time.sleep(delay)
+                    delay *= 2
+                continue
+            self.batches += 1
+            self.written_logs += len(logs)
+            self.written_logins += len(logins)
+            return
+
+        self._write_rows(logs, logins)
+
+    def _write_rows(self, logs: List[Dict[str, Any]], logins: Dict[int, datetime]):
+        """Último recurso tras un lote fallido: una transacción por fila"""
+        self.row_fallbacks += 1
+        for log in logs:
+            try:
+                self.write_batch([log], {})
+                self.written_logs += 1
+            except Exception as e:
+                self.dropped += 1
+                logger.error(f"Log de auditoría descartado ({log.get('action')}, "
+                             f"user_id={log.get('user_id')}): {e}")
+        for user_id, when in logins.items():
+            try:
+                self.write_batch([], {user_id: when})
+                self.written_logins += 1
+            except Exception as e:
+                self.dropped += 1
+                logger.error(f"last_login descartado (user_id={user_id}, {when}): {e}")
@@ -103,7 +103,8 @@ from .arduino_serial import (
     arduino_serial,
     ArduinoSerial,
     ArduinoStatus,
-    ArduinoResponse
+    ArduinoResponse,
+    TelemetrySample
 )
 
 # ============================================================================
@@ -153,4 +154,5 @@ __all__ = [
     'ArduinoSerial',
     'ArduinoStatus',
     'ArduinoResponse',
+    'TelemetrySample',
 ]
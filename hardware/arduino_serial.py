@@ -8,6 +8,17 @@ CARACTERÍSTICAS:
 - Thread-safe con locks para acceso concurrente
 - Conexión lazy (solo se conecta cuando se necesita)
 - No bloquea el hilo principal de Flask
+- Hilo lector dedicado: cada línea "codigo,altura" se guarda en un buffer
+  circular de telemetría y resuelve el comando pendiente (Future). El
+  puerto solo se bloquea mientras se escribe un comando, así get_status()
+  y stop() responden al instante con la última altura
+- Un comando solo se resuelve con líneas recibidas después de escribirlo;
+  un movimiento, además, solo con la altura objetivo (±MOVE_TOLERANCE_MM)
+  o un código de error. El firmware responde dos líneas por comando y la
+  del STOP llega ~1 s tarde (readString() espera su timeout): esas líneas
+  viejas no deben dar por terminado el comando siguiente. HOME no tiene
+  altura objetivo: ignora las líneas OK que llegan dentro de
+  STALE_REPLY_WINDOW después del comando anterior
 - Manejo robusto de errores de conexión y timeouts
 - Reconexión automática si se pierde la conexión
 
@@ -32,8 +43,10 @@ Fecha: 2025-12-01
 import threading
 import time
 import logging
-from typing import Optional, Tuple
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional, Tuple, List
+from dataclasses import dataclass, asdict
 from enum import IntEnum
 
 # pyserial es requerido - agregar a requirements.txt si no está
@@ -71,6 +84,15 @@ class ArduinoResponse:
     error_message: Optional[str] = None
 
 
+@dataclass
+class TelemetrySample:
+    """Línea "codigo,altura" recibida por el hilo lector"""
+    timestamp: float
+    status: ArduinoStatus
+    height_mm: int
+    raw: str
+
+
 # ============================================================================
 # CLASE SINGLETON PARA COMUNICACIÓN SERIAL
 # ============================================================================
@@ -110,6 +132,10 @@ class ArduinoSerial:
     READ_TIMEOUT = 2.0        # Segundos para timeout de lectura
     COMMAND_TIMEOUT = 35.0    # Segundos para esperar que el motor complete movimiento
     ARDUINO_RESET_DELAY = 2.0 # Segundos a esperar después de conectar (Arduino se reinicia)
+    HOME_TIMEOUT = 30.0       # Segundos para esperar el HOME automático al conectar
+    TELEMETRY_SIZE = 256      # Lecturas guardadas en el buffer circular
+    MOVE_TOLERANCE_MM = 5     # Diferencia aceptada con la altura objetivo (firmware: Derror = 2)
+    STALE_REPLY_WINDOW = 1.2  # Segundos: timeout de readString() del firmware (1 s) + margen
     
     # Palabras clave para auto-detectar Arduino en los puertos
     ARDUINO_KEYWORDS = ['CH340', 'CH341', 'Arduino', 'USB-SERIAL', 'FTDI']
@@ -130,12 +156,27 @@ class ArduinoSerial:
             return
         
         self._serial = None  # Optional[serial.Serial] - inicializado como None
-        self._serial_lock = threading.Lock()
+        self._serial_lock = threading.Lock()  # Abrir/cerrar el puerto y escribir (nunca durante un movimiento)
         self._connected = False
         self._port = self.DEFAULT_PORT
         self._baudrate = self.DEFAULT_BAUDRATE
         self._last_known_height = 0  # Última altura conocida (para evitar comandos innecesarios)
-        self._stop_requested = False  # Flag para interrumpir comandos en curso
+        self._last_status = ArduinoStatus.OK
+        self._last_raw = ""
+        
+        # Telemetría: buffer circular alimentado por el hilo lector
+        self._telemetry: deque = deque(maxlen=self.TELEMETRY_SIZE)
+        self._reader_thread: Optional[threading.Thread] = None
+        self._reader_stop = threading.Event()
+        
+        # Comando en espera de respuesta (lo resuelve el hilo lector)
+        self._pending: Optional[Future] = None
+        self._pending_wait = True  # True: resolver al terminar el movimiento
+        self._pending_sent_at = 0.0  # Líneas anteriores a la escritura no lo resuelven
+        self._pending_target: Optional[int] = None  # Altura objetivo de un movimiento
+        self._pending_settled_at = 0.0  # Sin objetivo: líneas OK anteriores son del comando previo
+        self._last_write_at = 0.0  # Última escritura al puerto (incluye STOP)
+        self._pending_lock = threading.Lock()
         
         self._initialized = True
         logger.info("ArduinoSerial: Singleton inicializado")
@@ -196,45 +237,6 @@ class ArduinoSerial:
                 self._connected = True
                 self._port = port
                 
-                # Enviar comando HOME (0.0) y ESPERAR a que termine
-                logger.info("ArduinoSerial: Enviando comando HOME automático y esperando...")
-                self._serial.write(b"0.0\n")
-                
-                # Esperar respuesta del HOME (máximo 30 segundos)
-                home_timeout = 30.0
-                start_time = time.time()
-                home_completed = False
-                
-                while time.time() - start_time < home_timeout:
-                    if self._serial.in_waiting:
-                        line = self._serial.readline().decode('utf-8', errors='ignore').strip()
-                        logger.debug(f"ArduinoSerial: Respuesta HOME: '{line}'")
-                        
-                        # Buscar respuesta con formato "codigo,altura"
-                        if "," in line:
-                            parts = line.split(",")
-                            if len(parts) == 2:
-                                try:
-                                    codigo = int(parts[0])
-                                    altura = int(parts[1])
-                                    self._last_known_height = altura
-                                    # codigo 0 = OK, HOME completado
-                                    if codigo == 0:
-                                        home_completed = True
-                                        logger.info(f"ArduinoSerial: HOME completado, altura: {altura}mm")
-                                        break
-                                except ValueError:
-                                    pass
-                    else:
-                        time.sleep(0.1)  # Pequeña pausa para no saturar CPU
-                
-                if home_completed:
-                    logger.info(f"ArduinoSerial: ✅ Conectado en {port} - HOME completado")
-                    return True, f"Conectado en {port} - Posición inicial OK"
-                else:
-                    logger.warning(f"ArduinoSerial: ✅ Conectado en {port} - HOME timeout (puede seguir moviéndose)")
-                    return True, f"Conectado en {port} - Inicializando..."
-                
             except serial.SerialException as e:
                 logger.error(f"ArduinoSerial: Error de conexión en {port}: {e}")
                 self._connected = False
@@ -243,6 +245,20 @@ class ArduinoSerial:
                 logger.error(f"ArduinoSerial: Error inesperado: {e}")
                 self._connected = False
                 return False, f"Error inesperado: {e}"
+            
+            self._start_reader()
+        
+        # Enviar comando HOME (0.0) y ESPERAR a que termine.
+        # La respuesta la recibe el hilo lector: el puerto queda libre para STOP
+        logger.info("ArduinoSerial: Enviando comando HOME automático y esperando...")
+        response = self._send_command("0.0", wait_for_completion=True, timeout=self.HOME_TIMEOUT)
+        
+        if response.success and response.status == ArduinoStatus.OK:
+            logger.info(f"ArduinoSerial: ✅ Conectado en {port} - HOME completado, altura: {response.current_height_mm}mm")
+            return True, f"Conectado en {port} - Posición inicial OK"
+        
+        logger.warning(f"ArduinoSerial: ✅ Conectado en {port} - HOME timeout (puede seguir moviéndose)")
+        return True, f"Conectado en {port} - Inicializando..."
     
     def disconnect(self) -> Tuple[bool, str]:
         """
@@ -255,15 +271,20 @@ class ArduinoSerial:
             if not self._connected or not self._serial:
                 return True, "No estaba conectado"
             
+            self._reader_stop.set()
             try:
                 self._serial.close()
-                self._connected = False
+                result = True, "Desconectado correctamente"
                 logger.info("ArduinoSerial: Desconectado")
-                return True, "Desconectado correctamente"
             except Exception as e:
                 logger.error(f"ArduinoSerial: Error al desconectar: {e}")
-                self._connected = False
-                return False, f"Error al desconectar: {e}"
+                result = False, f"Error al desconectar: {e}"
+            self._connected = False
+        
+        self._fail_pending("Desconectado del Arduino")
+        if self._reader_thread and self._reader_thread is not threading.current_thread():
+            self._reader_thread.join(timeout=self.READ_TIMEOUT)
+        return result
     
     def is_connected(self) -> bool:
         """Verifica si está conectado y el puerto está abierto"""
@@ -285,24 +306,170 @@ class ArduinoSerial:
             self._serial.is_open
         )
     
+    # ========================================================================
+    # HILO LECTOR Y TELEMETRÍA
+    # ========================================================================
+    
+    def _start_reader(self):
+        """Inicia el hilo lector del puerto recién abierto (llamar con _serial_lock)"""
+        # Evento propio por conexión: un lector anterior nunca se reactiva
+        self._reader_stop = threading.Event()
+        self._reader_thread = threading.Thread(
+            target=self._reader_loop,
+            args=(self._serial, self._reader_stop),
+            name="ArduinoSerialReader",
+            daemon=True
+        )
+        self._reader_thread.start()
+    
+    def _reader_loop(self, port, stop_event: threading.Event):
+        """
+        Único consumidor del puerto: lee líneas hasta desconectar.
+        
+        readline() bloquea hasta READ_TIMEOUT, sin polling de in_waiting.
+        """
+        logger.debug("ArduinoSerial: Hilo lector iniciado")
+        while not stop_event.is_set():
+            try:
+                line = port.readline().decode('utf-8', errors='ignore').strip()
+                received_at = time.time()
+            except Exception as e:
+                # Al cerrar el puerto desde disconnect() readline() también falla
+                if not stop_event.is_set():
+                    logger.error(f"ArduinoSerial: Error de comunicación: {e}")
+                    self._connected = False
+                    self._fail_pending(f"Error de comunicación: {e}")
+                    try:
+                        port.close()  # Liberar el puerto para reconectar
+                    except Exception:
+                        pass
+                break
+            
+            # Ignorar líneas vacías (timeout de lectura) y mensajes READY
+            if not line or line == "READY":
+                continue
+            
+            logger.debug(f"ArduinoSerial: Respuesta: '{line}'")
+            if "," in line:
+                self._handle_status_line(line, received_at)
+        logger.debug("ArduinoSerial: Hilo lector detenido")
+    
+    def _handle_status_line(self, line: str, received_at: Optional[float] = None):
+        """Guarda una línea "codigo,altura" en la telemetría y resuelve el comando pendiente"""
+        response = self._parse_status(line)
+        if response.error_message:
+            return
+        if received_at is None:
+            received_at = time.time()
+        
+        self._telemetry.append(TelemetrySample(
+            timestamp=received_at,
+            status=response.status,
+            height_mm=response.current_height_mm,
+            raw=line
+        ))
+        self._last_status = response.status
+        self._last_raw = line
+        if response.current_height_mm > 0:
+            self._last_known_height = response.current_height_mm
+        
+        with self._pending_lock:
+            future = self._pending
+            if future is None or not self._resolves_pending(response, received_at):
+                return
+            self._pending = None
+        if not future.done():
+            future.set_result(response)
+    
+    def _resolves_pending(self, response: ArduinoResponse, received_at: float) -> bool:
+        """¿La línea corresponde al comando pendiente? (llamar con _pending_lock)"""
+        # Respuesta de un comando anterior (ej: las dos líneas del STOP)
+        if received_at < self._pending_sent_at:
+            return False
+        # Si se espera el fin del movimiento, los reportes MOVING no lo resuelven
+        if self._pending_wait and response.status == ArduinoStatus.MOVING:
+            return False
+        # Un movimiento termina en la altura objetivo o con un código de error
+        if response.status == ArduinoStatus.OK:
+            return self._completed(response.current_height_mm, received_at,
+                                   self._pending_target, self._pending_settled_at)
+        return True
+    
+    def _completed(self, height_mm: int, received_at: float,
+                   target_mm: Optional[int], settled_at: float) -> bool:
+        """¿Una línea OK marca el fin del comando?"""
+        if target_mm is None:
+            # HOME: la respuesta retrasada de un comando anterior también es OK
+            return received_at >= settled_at
+        return abs(height_mm - target_mm) <= self.MOVE_TOLERANCE_MM
+    
+    def _take_pending(self) -> Optional[Future]:
+        """Quita y retorna el comando pendiente (None si no hay)"""
+        with self._pending_lock:
+            future, self._pending = self._pending, None
+        if future is None or future.done():
+            return None
+        return future
+    
+    def _fail_pending(self, message: str):
+        """Resuelve el comando pendiente con un error (desconexión)"""
+        future = self._take_pending()
+        if future:
+            future.set_result(ArduinoResponse(
+                status=self._last_status,
+                current_height_mm=self._last_known_height,
+                raw_response="",
+                success=False,
+                error_message=message
+            ))
+    
+    def get_telemetry(self, limit: Optional[int] = None) -> List[dict]:
+        """
+        Últimas lecturas del Arduino (más antigua primero).
+        
+        Args:
+            limit: Máximo de lecturas (None = todo el buffer)
+        """
+        samples = list(self._telemetry)
+        if limit is not None:
+            samples = samples[-limit:]
+        return [
+            {**asdict(sample), 'status': int(sample.status)}
+            for sample in samples
+        ]
+    
     # ========================================================================
     # ENVÍO DE COMANDOS
     # ========================================================================
     
-    def _send_command(self, command: str, wait_for_completion: bool = True) -> ArduinoResponse:
+    def _write_line(self, command: str):
+        """Escribe un comando; el lock solo se mantiene durante la escritura"""
+        with self._serial_lock:
+            self._last_write_at = time.time()
+            self._serial.write(f"{command}\n".encode('utf-8'))
+            self._serial.flush()  # Asegurar que se envió
+        logger.debug(f"ArduinoSerial: Comando enviado: '{command}'")
+    
+    def _send_command(self, command: str, wait_for_completion: bool = True,
+                      timeout: Optional[float] = None,
+                      target_height: Optional[int] = None) -> ArduinoResponse:
         """
         Envía un comando al Arduino y espera respuesta.
         
+        La respuesta la entrega el hilo lector a través de un Future; el
+        puerto no queda bloqueado durante la espera. Un comando nuevo o
+        stop() resuelven el comando anterior como interrumpido.
+        
         Args:
             command: Comando a enviar (ej: "1.1200" para ir a 1200mm)
             wait_for_completion: Si True, espera hasta que el movimiento termine
+            timeout: Segundos de espera (default: COMMAND_TIMEOUT o READ_TIMEOUT)
+            target_height: Altura objetivo (mm) de un movimiento: solo una
+                           línea OK en esa altura lo da por terminado
             
         Returns:
             ArduinoResponse con el resultado
         """
-        # Resetear flag de stop al iniciar comando
-        self._stop_requested = False
-        
         # Respuesta de error por defecto
         error_response = ArduinoResponse(
             status=ArduinoStatus.OK,
@@ -315,86 +482,70 @@ class ArduinoSerial:
             error_response.error_message = "No conectado al Arduino"
             return error_response
         
+        if timeout is None:
+            timeout = self.COMMAND_TIMEOUT if wait_for_completion else self.READ_TIMEOUT
+        
+        future: Future = Future()
+        sent_at = time.time()
+        settled_at = max(sent_at, self._last_write_at + self.STALE_REPLY_WINDOW)
+        with self._pending_lock:
+            previous, self._pending = self._pending, future
+            self._pending_wait = wait_for_completion
+            self._pending_sent_at = sent_at
+            self._pending_target = target_height
+            self._pending_settled_at = settled_at
+        if previous and not previous.done():
+            previous.set_result(self._interrupted_response(f"Reemplazado por '{command}'"))
+        
         try:
-            with self._serial_lock:
-                # Limpiar buffers COMPLETAMENTE antes de enviar
-                self._serial.reset_input_buffer()
-                self._serial.reset_output_buffer()
-                time.sleep(0.05)  # Pequeña pausa para asegurar limpieza
-                
-                # Enviar comando con terminador de línea
-                cmd_bytes = f"{command}\n".encode('utf-8')
-                self._serial.write(cmd_bytes)
-                self._serial.flush()  # Asegurar que se envió
-                logger.debug(f"ArduinoSerial: Comando enviado: '{command}'")
-                
-                # Esperar y procesar respuestas
-                start_time = time.time()
-                last_response = None
-                timeout = self.COMMAND_TIMEOUT if wait_for_completion else self.READ_TIMEOUT
-                
-                while time.time() - start_time < timeout:
-                    # IMPORTANTE: Verificar si se solicitó STOP
-                    if self._stop_requested:
-                        logger.info("ArduinoSerial: Comando interrumpido por STOP")
-                        return ArduinoResponse(
-                            status=ArduinoStatus.OK,
-                            current_height_mm=self._last_known_height,
-                            raw_response="INTERRUPTED",
-                            success=True,  # El STOP es exitoso
-                            error_message="Interrumpido por STOP"
-                        )
-                    
-                    if self._serial.in_waiting:
-                        line = self._serial.readline().decode('utf-8', errors='ignore').strip()
-                        
-                        if not line:
-                            continue
-                        
-                        logger.debug(f"ArduinoSerial: Respuesta: '{line}'")
-                        
-                        # Ignorar mensajes READY
-                        if line == "READY":
-                            continue
-                        
-                        # Parsear respuesta de estado (formato: "codigo,altura")
-                        if "," in line:
-                            last_response = self._parse_status(line)
-                            
-                            # Guardar última altura conocida
-                            if last_response.current_height_mm > 0:
-                                self._last_known_height = last_response.current_height_mm
-                            
-                            # Si no esperamos completar, retornar primera respuesta
-                            if not wait_for_completion:
-                                return last_response
-                            
-                            # Si el código es 0 (OK), el movimiento terminó
-                            if last_response.status == ArduinoStatus.OK:
-                                return last_response
-                    
-                    time.sleep(0.02)  # Polling rápido
-                
-                # Timeout alcanzado
-                if last_response:
-                    if last_response.status != ArduinoStatus.OK:
-                        last_response.error_message = "Timeout esperando fin de movimiento"
-                    return last_response
-                
-                # No se recibió ninguna respuesta válida
-                error_response.status = ArduinoStatus.TIMEOUT
-                error_response.error_message = "Timeout: No se recibió respuesta del Arduino"
-                return error_response
-                
-        except serial.SerialException as e:
+            self._write_line(command)
+        except Exception as e:
             logger.error(f"ArduinoSerial: Error de comunicación: {e}")
-            self._connected = False
+            if SERIAL_AVAILABLE and isinstance(e, serial.SerialException):
+                self._connected = False
+            with self._pending_lock:
+                if self._pending is future:
+                    self._pending = None
             error_response.error_message = f"Error de comunicación: {e}"
             return error_response
-        except Exception as e:
-            logger.error(f"ArduinoSerial: Error inesperado: {e}")
-            error_response.error_message = f"Error inesperado: {e}"
-            return error_response
+        
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._pending_lock:
+                if self._pending is future:
+                    self._pending = None
+            if future.done():
+                return future.result()
+        
+        # Timeout alcanzado: última lectura recibida tras enviar el comando
+        last = self._telemetry[-1] if self._telemetry else None
+        if last and last.timestamp >= sent_at:
+            reached = (last.status == ArduinoStatus.OK
+                       and self._completed(last.height_mm, last.timestamp,
+                                           target_height, settled_at))
+            return ArduinoResponse(
+                status=last.status,
+                current_height_mm=last.height_mm,
+                raw_response=last.raw,
+                success=reached,
+                error_message=None if reached else "Timeout esperando fin de movimiento"
+            )
+        
+        # No se recibió ninguna respuesta válida
+        error_response.status = ArduinoStatus.TIMEOUT
+        error_response.error_message = "Timeout: No se recibió respuesta del Arduino"
+        return error_response
+    
+    def _interrupted_response(self, reason: str) -> ArduinoResponse:
+        """Respuesta de un comando interrumpido (por STOP u otro comando)"""
+        return ArduinoResponse(
+            status=ArduinoStatus.OK,
+            current_height_mm=self._last_known_height,
+            raw_response="INTERRUPTED",
+            success=True,  # El STOP es exitoso
+            error_message=reason
+        )
     
     def _parse_status(self, response: str) -> ArduinoResponse:
         """
@@ -469,7 +620,7 @@ class ArduinoSerial:
         
         logger.info(f"ArduinoSerial: Moviendo cámara a {height_mm}mm...")
         command = f"1.{height_mm}"
-        return self._send_command(command, wait_for_completion=True)
+        return self._send_command(command, wait_for_completion=True, target_height=height_mm)
     
     def go_to_initial_position(self) -> ArduinoResponse:
         """
@@ -485,50 +636,30 @@ class ArduinoSerial:
         """
         Detiene el movimiento del motor INMEDIATAMENTE.
         
-        CRÍTICO: Este método NO usa locks ni verificaciones que bloqueen.
-        Solo escribe "2.0\n" al puerto y lee la respuesta con la altura.
+        CRÍTICO: Este método NO usa locks ni espera respuesta. Escribe "2.0\n"
+        al puerto y retorna la última altura conocida; la altura final que
+        reporta el Arduino la recibe el hilo lector (ver get_status()).
         
         Returns:
             ArduinoResponse con el resultado y altura actual
         """
-        # Activar flag para interrumpir _send_command si está corriendo
-        self._stop_requested = True
+        # Interrumpir el comando en curso (move_to_height retorna de inmediato)
+        future = self._take_pending()
+        if future:
+            logger.info("ArduinoSerial: Comando interrumpido por STOP")
+            future.set_result(self._interrupted_response("Interrumpido por STOP"))
         
         try:
             # Verificación directa SIN lock
             if self._serial and self._serial.is_open:
-                # Limpiar buffer de entrada antes de enviar
-                self._serial.reset_input_buffer()
-                
                 # Escribir directamente - igual que en monitor serie
+                self._last_write_at = time.time()
                 self._serial.write(b"2.0\n")
                 logger.info("ArduinoSerial: ⏹️ STOP enviado")
                 
-                # Esperar para que Arduino procese STOP y envíe altura
-                import time
-                time.sleep(0.3)  # 300ms para que Arduino detenga motor y mida
-                
-                current_height = self._last_known_height
-                
-                # Intentar leer la respuesta del Arduino (puede haber múltiples líneas)
-                attempts = 0
-                while self._serial.in_waiting > 0 and attempts < 5:
-                    attempts += 1
-                    try:
-                        response_line = self._serial.readline().decode('utf-8').strip()
-                        if response_line:
-                            logger.debug(f"ArduinoSerial: STOP respuesta #{attempts}: '{response_line}'")
-                            parsed = self._parse_status(response_line)
-                            if parsed.current_height_mm > 0:
-                                current_height = parsed.current_height_mm
-                                self._last_known_height = current_height
-                                logger.info(f"ArduinoSerial: STOP - altura actual: {current_height}mm")
-                    except Exception as e:
-                        logger.debug(f"ArduinoSerial: No se pudo leer respuesta STOP: {e}")
-                
                 return ArduinoResponse(
                     status=ArduinoStatus.OK,
-                    current_height_mm=current_height,
+                    current_height_mm=self._last_known_height,
                     raw_response="STOP",
                     success=True
                 )
@@ -555,16 +686,18 @@ class ArduinoSerial:
         Obtiene el estado actual del sistema.
         
         IMPORTANTE: Este método NO envía comandos al Arduino para evitar
-        interferir con operaciones en curso. Retorna la última altura conocida.
+        interferir con operaciones en curso. Retorna la última lectura del
+        hilo lector (MOVING mientras hay un movimiento en espera).
         
         Returns:
             ArduinoResponse con la información actual
         """
-        # Retornar última altura conocida sin enviar comandos
+        with self._pending_lock:
+            moving = self._pending is not None and self._pending_wait
         return ArduinoResponse(
-            status=ArduinoStatus.OK,
+            status=ArduinoStatus.MOVING if moving else self._last_status,
             current_height_mm=self._last_known_height,
-            raw_response="cached",
+            raw_response=self._last_raw or "cached",
             success=True
         )
     
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+🔄 MIGRATE - APLICADOR DE MIGRACIONES DE BIOTRACK
+===================================================
+Aplica en orden las migraciones de migrations/versions/ sobre la base
+de datos SQLite y registra las aplicadas en la tabla schema_migrations.
+
+Tipos de migración:
+- NNN_nombre.sql: se ejecuta con executescript()
+- NNN_nombre.py:  debe definir upgrade(connection) (sqlite3.Connection);
+                  para conversiones de datos que SQL no puede expresar
+
+Cada migración se aplica en una transacción junto con su registro en
+schema_migrations. Varios procesos (workers de Gunicorn) pueden llamar a
+apply_migrations() a la vez: un lock de archivo (<db>.migrate.lock) los
+serializa y las pendientes se recalculan después de obtenerlo.
+
+Uso:
+    python migrations/migrate.py [ruta/a/biotrack.db]
+
+Autor: BIOTRACK Team
+Fecha: 2025-11-29
+"""
+
+import importlib.util
+import logging
+import sqlite3
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Raíz del proyecto en el path (las migraciones .py pueden importar database.*)
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+VERSIONS_DIR = Path(__file__).resolve().parent / 'versions'
+
+logger = logging.getLogger(__name__)
+
+
+def _ensure_migrations_table(connection: sqlite3.Connection):
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(255) PRIMARY KEY,
+            applied_at DATETIME NOT NULL
+        )
+    """)
+    connection.commit()
+
+
+def get_pending_migrations(connection: sqlite3.Connection) -> List[Path]:
+    """Migraciones de versions/ aún no registradas en schema_migrations"""
+    _ensure_migrations_table(connection)
+    applied = {row[0] for row in connection.execute("SELECT version FROM schema_migrations")}
+
+    migrations = sorted(
+        path for path in VERSIONS_DIR.iterdir()
+        if path.suffix in ('.sql', '.py') and path.name[:3].isdigit()
+    )
+    return [path for path in migrations if path.stem not in applied]
+
+
+def _is_file_database(db_path: str) -> bool:
+    """False para bases en memoria (':memory:', URIs 'file:...mode=memory')"""
+    return db_path != ':memory:' and not db_path.startswith('file:')
+
+
+@contextmanager
+def _migration_lock(db_path: str):
+    """
+    Lock exclusivo entre procesos mientras se aplican migraciones
+
+    Una base en memoria es privada de la conexión: no hay nada que
+    serializar ni archivo junto al que crear el lock.
+    """
+    if not _is_file_database(db_path):
+        yield
+        return
+    with open(f"{db_path}.migrate.lock", 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _apply(connection: sqlite3.Connection, path: Path):
+    if path.suffix == '.sql':
+        # executescript() no abre transacción: se abre aquí y queda abierta
+        # hasta el commit, junto con el INSERT en schema_migrations
+        connection.executescript("BEGIN;\n" + path.read_text(encoding='utf-8'))
+    else:
+        spec = importlib.util.spec_from_file_location(f"migration_{path.stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        connection.execute("BEGIN")
+        module.upgrade(connection)
+
+    connection.execute(
+        "INSERT INTO schema_migrations (version, applied_at) VALUES (?, ?)",
+        (path.stem, datetime.now().isoformat(sep=' ', timespec='seconds'))
+    )
+    connection.commit()
+
+
+def apply_migrations(db_path: str) -> List[str]:
+    """
+    Aplica las migraciones pendientes
+
+    Args:
+        db_path: Ruta a la base de datos SQLite
+
+    Returns:
+        Lista de versiones aplicadas en esta llamada
+
+    Raises:
+        Exception: la de la migración que falló (ya revertida); las
+            anteriores quedan aplicadas y registradas
+    """
+    applied = []
+    with _migration_lock(db_path):
+        connection = sqlite3.connect(db_path, timeout=30)
+        try:
+            # Pendientes calculadas con el lock tomado: otro proceso pudo
+            # haberlas aplicado mientras se esperaba
+            for path in get_pending_migrations(connection):
+                logger.info(f"Aplicando migración {path.name}")
+                try:
+                    _apply(connection, path)
+                except Exception:
+                    connection.rollback()
+                    logger.error(f"Error aplicando migración {path.name}")
+                    raise
+                applied.append(path.stem)
+        finally:
+            connection.close()
+
+    return applied
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else str(PROJECT_ROOT / 'database' / 'biotrack.db')
+
+    if not Path(db_path).exists():
+        print(f"❌ Base de datos no encontrada: {db_path}")
+        return 1
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    applied = apply_migrations(db_path)
+
+    if applied:
+        print(f"✅ {len(applied)} migración(es) aplicada(s): {', '.join(applied)}")
+    else:
+        print("✅ Base de datos al día, no hay migraciones pendientes")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
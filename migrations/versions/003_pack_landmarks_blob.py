@@ -0,0 +1,67 @@
+"""
+============================================================================
+MIGRACIÓN: Landmarks empaquetados en angle_measurement.landmarks_blob
+============================================================================
+Fecha: 2025-11-29
+Descripción: Agrega la columna BLOB landmarks_blob y convierte las filas
+             existentes de landmarks_json (texto) al formato binario BTLM
+             de database/landmark_codec.py, en float32 (sin pérdida: los
+             landmarks de MediaPipe son float32). El JSON solo se borra si
+             el blob decodificado es idéntico; si no, la fila conserva su
+             JSON y queda sin blob.
+============================================================================
+"""
+
+import logging
+import sqlite3
+
+import numpy as np
+
+from database.landmark_codec import encode_landmarks, decode_landmarks, landmarks_from_json
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def upgrade(connection: sqlite3.Connection):
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(angle_measurement)")}
+    if not columns:
+        # Sin tabla angle_measurement (base aún no creada con schema.sql):
+        # no hay filas que convertir y schema.sql ya trae landmarks_blob
+        return
+    if 'landmarks_blob' not in columns:
+        connection.execute("ALTER TABLE angle_measurement ADD COLUMN landmarks_blob BLOB")
+
+    last_id = 0
+    kept = 0
+    while True:
+        rows = connection.execute(
+            "SELECT id, landmarks_json FROM angle_measurement "
+            "WHERE landmarks_json IS NOT NULL AND id > ? ORDER BY id LIMIT ?",
+            (last_id, BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for row_id, landmarks_json in rows:
+            landmarks = landmarks_from_json(landmarks_json)
+            if landmarks is None:
+                kept += 1
+                continue
+            blob = encode_landmarks(landmarks, dtype='float32')
+            # Verificar el blob antes de borrar el JSON original
+            if not np.array_equal(decode_landmarks(blob).reshape(landmarks.shape), landmarks):
+                kept += 1
+                continue
+            updates.append((blob, row_id))
+
+        connection.executemany(
+            "UPDATE angle_measurement SET landmarks_blob = ?, landmarks_json = NULL WHERE id = ?",
+            updates
+        )
+        last_id = rows[-1][0]
+
+    if kept:
+        logger.warning(f"003: {kept} filas conservan landmarks_json (no convertibles sin pérdida)")
@@ -0,0 +1,54 @@
+-- ============================================================================
+-- MIGRACIÓN: Agregar tabla analysis_summary
+-- ============================================================================
+-- Fecha: 2025-11-29
+-- Descripción: Agregados por usuario × segmento × ejercicio para dashboards.
+--              Se mantiene transaccionalmente desde DatabaseManager
+--              (save_user_analysis, create_rom_session, update_rom_session...)
+--              y se reconstruye con scripts/rebuild_summaries.py
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS analysis_summary (
+    -- Origen de los datos
+    source VARCHAR(20) NOT NULL,
+        -- 'rom_session' (análisis de sujetos) o 'self' (user_analysis_history)
+    user_id INTEGER NOT NULL,
+    segment VARCHAR(50) NOT NULL,
+    exercise_type VARCHAR(50) NOT NULL,
+
+    -- Agregados
+    count INTEGER NOT NULL DEFAULT 0,
+        -- Número de análisis
+    rom_count INTEGER NOT NULL DEFAULT 0,
+        -- Análisis con rom_value (base de sum/sumsq/min/max)
+    rom_sum FLOAT NOT NULL DEFAULT 0,
+    rom_sumsq FLOAT NOT NULL DEFAULT 0,
+    rom_min FLOAT,
+    rom_max FLOAT,
+    last_at DATETIME,
+        -- Fecha del análisis más reciente
+
+    PRIMARY KEY (source, user_id, segment, exercise_type),
+    CHECK (source IN ('rom_session', 'self'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_analysis_summary_segment ON analysis_summary(segment, exercise_type);
+
+-- Población inicial desde las tablas de origen
+DELETE FROM analysis_summary;
+
+INSERT INTO analysis_summary
+    (source, user_id, segment, exercise_type, count, rom_count, rom_sum, rom_sumsq, rom_min, rom_max, last_at)
+SELECT 'rom_session', user_id, segment, exercise_type,
+       COUNT(*), COUNT(rom_value), COALESCE(SUM(rom_value), 0), COALESCE(SUM(rom_value * rom_value), 0),
+       MIN(rom_value), MAX(rom_value), MAX(created_at)
+FROM rom_session
+GROUP BY user_id, segment, exercise_type;
+
+INSERT INTO analysis_summary
+    (source, user_id, segment, exercise_type, count, rom_count, rom_sum, rom_sumsq, rom_min, rom_max, last_at)
+SELECT 'self', user_id, segment, exercise_type,
+       COUNT(*), COUNT(rom_value), COALESCE(SUM(rom_value), 0), COALESCE(SUM(rom_value * rom_value), 0),
+       MIN(rom_value), MAX(rom_value), MAX(created_at)
+FROM user_analysis_history
+GROUP BY user_id, segment, exercise_type;
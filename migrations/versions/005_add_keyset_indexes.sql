@@ -0,0 +1,22 @@
+-- ============================================================================
+-- MIGRACIÓN: Índices compuestos para paginación por cursor (keyset)
+-- ============================================================================
+-- Fecha: 2025-11-29
+-- Descripción: Las listas paginadas ordenan por (created_at DESC, id DESC)
+--              y continúan con WHERE (created_at, id) < (cursor). Estos
+--              índices permiten recorrer cada página sin OFFSET ni sort.
+-- ============================================================================
+
+-- Historial de auto-análisis por usuario (/history, /api/analysis/history)
+CREATE INDEX IF NOT EXISTS idx_user_analysis_user_created
+    ON user_analysis_history(user_id, created_at DESC, id DESC);
+
+-- Sesiones ROM por estudiante y por sujeto
+CREATE INDEX IF NOT EXISTS idx_rom_session_user_created
+    ON rom_session(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_rom_session_subject_created
+    ON rom_session(subject_id, created_at DESC, id DESC);
+
+-- Listado de usuarios del admin
+CREATE INDEX IF NOT EXISTS idx_user_created
+    ON user(created_at DESC, id DESC);
@@ -0,0 +1,81 @@
+-- ============================================================================
+-- MIGRACIÓN: Índices de búsqueda de texto completo (FTS5)
+-- ============================================================================
+-- Fecha: 2025-11-29
+-- Descripción: Tablas FTS5 "external content" sobre subject y user para la
+--              búsqueda por prefijo con ranking (DatabaseManager.search_*).
+--              Reemplazan los LIKE '%texto%' que recorrían la tabla entera.
+--              Los triggers mantienen el índice sincronizado; solo se
+--              disparan cuando cambian las columnas indexadas.
+-- ============================================================================
+
+-- ----------------------------------------------------------------------------
+-- SUJETOS: código y nombre
+-- ----------------------------------------------------------------------------
+CREATE VIRTUAL TABLE IF NOT EXISTS subject_fts USING fts5(
+    subject_code,
+    first_name,
+    last_name,
+    content='subject',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+        -- "jose" encuentra "José"
+    prefix='2 3'
+        -- Índices de prefijo para el typeahead ("ju*", "juan*")
+);
+
+CREATE TRIGGER IF NOT EXISTS subject_fts_insert AFTER INSERT ON subject BEGIN
+    INSERT INTO subject_fts(rowid, subject_code, first_name, last_name)
+    VALUES (new.id, new.subject_code, new.first_name, new.last_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS subject_fts_delete AFTER DELETE ON subject BEGIN
+    INSERT INTO subject_fts(subject_fts, rowid, subject_code, first_name, last_name)
+    VALUES ('delete', old.id, old.subject_code, old.first_name, old.last_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS subject_fts_update
+AFTER UPDATE OF subject_code, first_name, last_name ON subject BEGIN
+    INSERT INTO subject_fts(subject_fts, rowid, subject_code, first_name, last_name)
+    VALUES ('delete', old.id, old.subject_code, old.first_name, old.last_name);
+    INSERT INTO subject_fts(rowid, subject_code, first_name, last_name)
+    VALUES (new.id, new.subject_code, new.first_name, new.last_name);
+END;
+
+-- ----------------------------------------------------------------------------
+-- USUARIOS: username, nombre, email y código de estudiante
+-- ----------------------------------------------------------------------------
+CREATE VIRTUAL TABLE IF NOT EXISTS user_fts USING fts5(
+    username,
+    full_name,
+    email,
+    student_id,
+    content='user',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS user_fts_insert AFTER INSERT ON user BEGIN
+    INSERT INTO user_fts(rowid, username, full_name, email, student_id)
+    VALUES (new.id, new.username, new.full_name, new.email, new.student_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_fts_delete AFTER DELETE ON user BEGIN
+    INSERT INTO user_fts(user_fts, rowid, username, full_name, email, student_id)
+    VALUES ('delete', old.id, old.username, old.full_name, old.email, old.student_id);
+END;
+
+-- Solo columnas indexadas: last_login cambia en cada login y no debe
+-- reescribir el índice
+CREATE TRIGGER IF NOT EXISTS user_fts_update
+AFTER UPDATE OF username, full_name, email, student_id ON user BEGIN
+    INSERT INTO user_fts(user_fts, rowid, username, full_name, email, student_id)
+    VALUES ('delete', old.id, old.username, old.full_name, old.email, old.student_id);
+    INSERT INTO user_fts(rowid, username, full_name, email, student_id)
+    VALUES (new.id, new.username, new.full_name, new.email, new.student_id);
+END;
+
+-- Indexar las filas existentes
+INSERT INTO subject_fts(subject_fts) VALUES ('rebuild');
+INSERT INTO user_fts(user_fts) VALUES ('rebuild');
@@ -0,0 +1,52 @@
+-- ============================================================================
+-- MIGRACIÓN: Índices compuestos de las consultas calientes
+-- ============================================================================
+-- Fecha: 2025-11-29
+-- Descripción: Índices identificados con scripts/audit_query_plans.py.
+--              Las consultas filtran por usuario/sujeto + segmento/ejercicio
+--              y ordenan por fecha DESC; con índices de una sola columna
+--              SQLite recorría tablas completas o creaba B-trees temporales.
+--              Los índices de una columna que quedan como prefijo de uno
+--              compuesto se eliminan (mismo uso, menos costo de escritura).
+-- ============================================================================
+
+-- Historial reciente por ejercicio y filtros del historial
+-- (get_recent_history_for_exercise, get_user_analysis_history*, resumen)
+CREATE INDEX IF NOT EXISTS idx_user_analysis_user_exercise
+    ON user_analysis_history(user_id, segment, exercise_type, created_at DESC);
+DROP INDEX IF EXISTS idx_user_analysis_user;
+
+-- Sesiones ROM recientes de un sujeto por ejercicio
+-- (get_recent_sessions_for_subject) y recálculo del resumen por usuario
+CREATE INDEX IF NOT EXISTS idx_rom_session_subject_exercise
+    ON rom_session(subject_id, segment, exercise_type, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_rom_session_user_exercise
+    ON rom_session(user_id, segment, exercise_type, created_at DESC);
+DROP INDEX IF EXISTS idx_rom_session_user;
+DROP INDEX IF EXISTS idx_rom_session_subject;
+
+-- Mediciones de una sesión en orden de frame: antes el planificador
+-- recorría idx_angle_measurement_frame completo para evitar el ORDER BY
+CREATE INDEX IF NOT EXISTS idx_angle_measurement_session_frame
+    ON angle_measurement(session_id, frame_number);
+DROP INDEX IF EXISTS idx_angle_measurement_session;
+
+-- Logs de un usuario, más recientes primero (get_logs_by_user)
+CREATE INDEX IF NOT EXISTS idx_system_log_user_timestamp
+    ON system_log(user_id, timestamp DESC);
+DROP INDEX IF EXISTS idx_system_log_user;
+
+-- Sujetos de un estudiante / todos, más recientes primero
+CREATE INDEX IF NOT EXISTS idx_subject_created_by_created
+    ON subject(created_by, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_subject_created
+    ON subject(created_at DESC);
+DROP INDEX IF EXISTS idx_subject_created_by;
+
+-- Listados de estudiantes (role = 'student' ORDER BY created_at DESC)
+CREATE INDEX IF NOT EXISTS idx_user_role_created
+    ON user(role, created_at DESC);
+DROP INDEX IF EXISTS idx_user_role;
+
+-- Estadísticas para el planificador
+ANALYZE;
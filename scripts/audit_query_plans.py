@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+🔍 AUDITORÍA DE PLANES DE CONSULTA (EXPLAIN QUERY PLAN)
+=========================================================
+Ejecuta los métodos de DatabaseManager sobre una COPIA de la base de
+datos sembrada (mismo dataset que scripts/benchmark_queries.py), captura
+cada sentencia SQL que emiten y obtiene su EXPLAIN QUERY PLAN.
+
+Marca:
+- SCAN      recorrido completo de tabla (sin índice)
+- IDX-SCAN  recorrido completo de un índice (sin rango de búsqueda)
+- TEMP      B-tree temporal para ORDER BY / GROUP BY / DISTINCT
+
+Las marcas inherentes a la consulta (conteos globales, orden por
+relevancia de FTS5, recorrido ordenado que corta en LIMIT...) se
+muestran como "esperado" y no cuentan para --strict.
+
+Uso:
+    python scripts/audit_query_plans.py [--students 200] [--per-student 5]
+                                        [--db database/biotrack.db] [--all] [--strict]
+
+    --all     Muestra también las consultas sin marcas
+    --strict  Código de salida 1 si alguna consulta tiene marcas no esperadas
+
+Autor: BIOTRACK Team
+Fecha: 2025-11-29
+"""
+
+import argparse
+import re
+import shutil
+import sys
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+# Agregar directorio raíz al path
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from sqlalchemy import event
+
+from database.database_manager import (
+    DatabaseManager, User, Subject, ROMSession, UserAnalysisHistory
+)
+from migrations.migrate import apply_migrations
+from scripts.benchmark_queries import seed_dataset
+
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+
+# Tablas cuyo recorrido completo es aceptable (pocas filas, o conteos
+# globales del dashboard que deben leer todo)
+SMALL_TABLES = {'schema_migrations', 'sqlite_master'}
+
+
+def expected_reason(statement: str, plan, flags):
+    """
+    Motivo por el que las marcas de una consulta son inherentes, o None
+
+    Args:
+        statement: SQL normalizado (una línea)
+        plan: Líneas del plan
+        flags: Marcas de classify()
+    """
+    upper = statement.upper()
+    has_where = ' WHERE ' in upper
+
+    if 'MATCH ?' in upper and set(flags) == {'TEMP'}:
+        return "orden por relevancia bm25 (FTS5)"
+    if 'FROM ANALYSIS_SUMMARY' in upper and not has_where:
+        return "tabla de agregados (una fila por usuario × ejercicio)"
+    if upper.startswith('SELECT COUNT(') and not has_where:
+        return "conteo global"
+    if flags == ['IDX-SCAN'] and ' GROUP BY ' in upper and not has_where \
+            and all('COVERING INDEX' in d for d in plan if d.startswith('SCAN')):
+        return "agregado de toda la tabla sobre índice cubriente"
+    if flags == ['IDX-SCAN'] and ' ORDER BY ' in upper and ' LIMIT ' in upper:
+        return "recorrido en orden del índice que corta en LIMIT"
+    if flags == ['IDX-SCAN'] and ' ORDER BY ' in upper and not has_where:
+        return "listado completo en orden del índice (sin sort)"
+    return None
+
+
+def classify(detail: str):
+    """Retorna la marca de una línea del plan o None"""
+    if 'VIRTUAL TABLE' in detail or 'CONSTANT ROW' in detail:
+        return None
+    if detail.startswith('USE TEMP B-TREE'):
+        return 'TEMP'
+    match = re.match(r'SCAN (\w+)', detail)
+    if match and match.group(1) not in SMALL_TABLES:
+        return 'IDX-SCAN' if 'USING' in detail else 'SCAN'
+    return None
+
+
+def build_calls(db_manager: DatabaseManager):
+    """
+    Llamadas representativas de DatabaseManager sobre el dataset sembrado
+
+    Returns:
+        Lista de (nombre, función, args, kwargs)
+    """
+    with db_manager.get_session() as session:
+        student = session.query(User).filter_by(role='student')\
+            .order_by(User.id.desc()).first()
+        subject = session.query(Subject).filter_by(created_by=student.id).first()
+        rom = session.query(ROMSession).filter_by(user_id=student.id).first()
+        analysis = session.query(UserAnalysisHistory).filter_by(user_id=student.id).first()
+        student_id, username, email = student.id, student.username, student.email
+        subject_id, subject_code = subject.id, subject.subject_code
+        rom_id, segment, exercise = rom.id, rom.segment, rom.exercise_type
+        analysis_id = analysis.id
+
+    page = db_manager.get_user_analysis_history_page(student_id, limit=2)
+    cursor = page['next_cursor']
+
+    return [
+        # Usuarios
+        ('get_user_by_id', db_manager.get_user_by_id, (student_id,), {}),
+        ('get_user_height', db_manager.get_user_height, (student_id,), {}),
+        ('get_user_by_username', db_manager.get_user_by_username, (username,), {}),
+        ('get_user_by_email', db_manager.get_user_by_email, (email,), {}),
+        ('get_all_users', db_manager.get_all_users, (), {'role': 'student'}),
+        ('get_students', db_manager.get_students, (), {}),
+        ('get_users_paginated', db_manager.get_users_paginated, (1, 10), {}),
+        ('get_users_paginated[search]', db_manager.get_users_paginated, (1, 10),
+         {'search': 'benchmark', 'role_filter': 'student', 'status_filter': 'active'}),
+        ('get_user_detail_for_admin', db_manager.get_user_detail_for_admin, (student_id,), {}),
+        ('search_users', db_manager.search_users, ('estudiante',), {}),
+        # Sujetos
+        ('get_subject_by_code', db_manager.get_subject_by_code, (subject_code,), {}),
+        ('get_subjects_by_user', db_manager.get_subjects_by_user, (student_id,), {}),
+        ('get_all_subjects_with_creator', db_manager.get_all_subjects_with_creator, (), {}),
+        ('get_subject_by_id_safe', db_manager.get_subject_by_id_safe, (subject_id,), {}),
+        ('generate_subject_code', db_manager.generate_subject_code, (), {}),
+        ('can_user_access_subject', db_manager.can_user_access_subject,
+         (student_id, subject_id, 'student'), {}),
+        ('get_subjects_count_by_user', db_manager.get_subjects_count_by_user, (student_id,), {}),
+        ('search_subjects', db_manager.search_subjects, ('sujeto',), {'created_by': student_id}),
+        # Sesiones ROM
+        ('get_sessions_by_user', db_manager.get_sessions_by_user, (student_id,), {}),
+        ('get_sessions_by_subject', db_manager.get_sessions_by_subject, (subject_id,), {}),
+        ('get_rom_sessions_page', db_manager.get_rom_sessions_page, (), {'user_id': student_id}),
+        ('get_sessions_by_segment', db_manager.get_sessions_by_segment, (segment,), {}),
+        ('get_session_by_id', db_manager.get_session_by_id, (rom_id,), {}),
+        ('get_recent_sessions_for_subject', db_manager.get_recent_sessions_for_subject,
+         (subject_id, segment, exercise), {}),
+        ('get_measurements_by_session', db_manager.get_measurements_by_session, (rom_id,), {}),
+        # Historial de auto-análisis
+        ('get_user_analysis_history', db_manager.get_user_analysis_history,
+         (student_id,), {'segment': segment, 'exercise_type': exercise}),
+        ('get_user_analysis_history_page', db_manager.get_user_analysis_history_page,
+         (student_id,), {'segment': segment, 'cursor': cursor}),
+        ('get_user_analysis_history_filtered', db_manager.get_user_analysis_history_filtered,
+         (student_id,), {'segment': segment, 'exercise_type': exercise, 'date_from': '2020-01-01'}),
+        ('count_user_analysis_history', db_manager.count_user_analysis_history,
+         (student_id,), {'segment': segment}),
+        ('get_user_analysis_by_id', db_manager.get_user_analysis_by_id, (analysis_id,), {}),
+        ('get_recent_history_for_exercise', db_manager.get_recent_history_for_exercise,
+         (student_id, segment, exercise), {}),
+        # Estadísticas y dashboards
+        ('get_user_statistics', db_manager.get_user_statistics, (student_id,), {}),
+        ('get_segment_statistics', db_manager.get_segment_statistics, (segment,), {}),
+        ('get_user_analysis_stats', db_manager.get_user_analysis_stats, (student_id,), {}),
+        ('get_admin_global_statistics', db_manager.get_admin_global_statistics, (), {}),
+        ('get_all_students_with_stats', db_manager.get_all_students_with_stats, (), {}),
+        # Auditoría
+        ('get_logs_by_user', db_manager.get_logs_by_user, (student_id,), {}),
+        ('get_recent_logs', db_manager.get_recent_logs, (), {}),
+        # Escrituras (sobre la copia)
+        ('update_rom_session', db_manager.update_rom_session, (rom_id,), {'rom_value': 90.0}),
+        ('save_user_analysis', db_manager.save_user_analysis, (student_id,),
+         {'segment': segment, 'exercise_type': exercise, 'camera_view': 'profile',
+          'side': 'right', 'rom_value': 80.0}),
+        ('delete_rom_session', db_manager.delete_rom_session, (rom_id,), {}),
+    ]
+
+
+def capture_statements(db_manager: DatabaseManager, calls):
+    """
+    Ejecuta las llamadas y captura las sentencias de cada una
+
+    Returns:
+        OrderedDict {nombre: [(sql, parámetros), ...]} sin duplicados
+    """
+    captured = OrderedDict()
+    current = {'name': None}
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if current['name'] is None:
+            return
+        if executemany and parameters:
+            parameters = parameters[0]
+        key = (statement, tuple(parameters) if isinstance(parameters, (list, tuple)) else parameters)
+        statements = captured.setdefault(current['name'], [])
+        if all(stmt != statement for stmt, _ in statements):
+            statements.append(key)
+
+    event.listen(db_manager.engine, 'before_cursor_execute', _capture)
+    try:
+        for name, func, args, kwargs in calls:
+            current['name'] = name
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"⚠️  {name}: {e}")
+            finally:
+                # Escrituras diferidas dentro del mismo método
+                db_manager.write_behind.flush()
+            current['name'] = None
+    finally:
+        event.remove(db_manager.engine, 'before_cursor_execute', _capture)
+
+    return captured
+
+
+def explain(db_manager: DatabaseManager, statement: str, parameters):
+    """Retorna las líneas 'detail' del EXPLAIN QUERY PLAN"""
+    connection = db_manager.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+        return [row[3] for row in cursor.fetchall()]
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auditoría EXPLAIN QUERY PLAN de DatabaseManager")
+    parser.add_argument('--db', default=str(BASE_DIR / 'database' / 'biotrack.db'))
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--per-student', type=int, default=5)
+    parser.add_argument('--all', action='store_true', help="Mostrar también consultas sin marcas")
+    parser.add_argument('--strict', action='store_true', help="Salir con 1 si hay marcas")
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print("🔍 AUDITORÍA DE PLANES DE CONSULTA (copia temporal de la BD)")
+    print("=" * 78)
+
+    flagged_total = 0
+    expected_total = 0
+    statements_total = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / 'audit.db')
+        shutil.copy(args.db, db_path)
+        apply_migrations(db_path)
+
+        db_manager = DatabaseManager(db_path)
+        # Sin caché: cada método debe llegar a SQLite
+        db_manager.cache.ttl = 0
+        seed_dataset(db_manager, args.students, per_student=args.per_student)
+
+        # Estadísticas del planificador para el dataset sembrado
+        with db_manager.engine.connect() as connection:
+            connection.exec_driver_sql("ANALYZE")
+
+        captured = capture_statements(db_manager, build_calls(db_manager))
+
+        for name, statements in captured.items():
+            lines = []
+            for statement, parameters in statements:
+                if not statement.lstrip().upper().startswith(EXPLAINABLE):
+                    continue
+                if statement.lstrip().upper().startswith('INSERT') and 'SELECT' not in statement.upper():
+                    continue
+                statements_total += 1
+                plan = explain(db_manager, statement, parameters)
+                flags = sorted({flag for flag in map(classify, plan) if flag})
+                sql = ' '.join(statement.split())
+                reason = expected_reason(sql, plan, flags) if flags else None
+                
+                if reason:
+                    expected_total += 1
+                    status = f"ℹ️  {','.join(flags)} (esperado: {reason})"
+                elif flags:
+                    flagged_total += 1
+                    status = f"⚠️  {','.join(flags)}"
+                else:
+                    status = "✅"
+                
+                if (flags and not reason) or args.all:
+                    lines.append(f"   {status}  {sql[:150]}{'...' if len(sql) > 150 else ''}")
+                    lines.extend(f"        └─ {detail}" for detail in plan)
+            if lines:
+                print(f"\n📌 {name}")
+                print("\n".join(lines))
+
+        db_manager.shutdown()
+
+    print("\n" + "-" * 78)
+    print(f"Sentencias analizadas: {statements_total}   con marcas: {flagged_total}   "
+          f"esperadas: {expected_total}")
+    return 1 if args.strict and flagged_total else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
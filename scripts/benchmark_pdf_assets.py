@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+📈 BENCHMARK DE RECURSOS DE REPORTES PDF
+==========================================
+Mide el costo fijo por reporte de PDFReportGenerator (hoja de estilos,
+logos, métricas de fuentes) y el tiempo total de un reporte de análisis
+pequeño, en dos modos:
+
+- frío:     se descartan los recursos compartidos antes de cada reporte
+            (equivale a construirlos en cada reporte)
+- caliente: los recursos se construyen una vez por proceso y se reutilizan
+
+Uso:
+    python scripts/benchmark_pdf_assets.py [--reports 20]
+
+Autor: BIOTRACK Team
+Fecha: 2025-11-29
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Agregar directorio raíz al path
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from app.services.pdf_service import PDFReportGenerator
+
+SAMPLE_ANALYSIS = {
+    'segment': 'knee',
+    'exercise_type': 'flexion',
+    'side': 'right',
+    'rom_value': 128.4,
+    'quality_score': 87.0,
+    'created_at': datetime(2025, 11, 29, 10, 30),
+}
+SAMPLE_USER = {
+    'username': 'benchmark',
+    'full_name': 'Estudiante Benchmark',
+    'student_id': '2025000',
+    'program': 'Fisioterapia'
+}
+
+
+def run(mode: str, reports: int, output_dir: str):
+    """
+    Genera `reports` reportes de análisis y mide setup y total
+
+    Returns:
+        (tiempos de setup en ms, tiempos totales en ms, tamaño del último PDF)
+    """
+    setup_times, total_times = [], []
+    filepath = None
+
+    PDFReportGenerator.reset_shared_assets()
+    for i in range(reports):
+        if mode == 'frío':
+            PDFReportGenerator.reset_shared_assets()
+
+        start = time.perf_counter()
+        generator = PDFReportGenerator(output_dir=output_dir)
+        generator._create_header("Reporte de Análisis ROM")    # estilos + logos
+        setup_done = time.perf_counter()
+
+        filepath = generator.generate_analysis_report(
+            analysis_data=SAMPLE_ANALYSIS,
+            user_data=SAMPLE_USER,
+            filename=f"bench_{mode}_{i}.pdf"
+        )
+        end = time.perf_counter()
+
+        setup_times.append((setup_done - start) * 1000)
+        total_times.append((end - start) * 1000)
+
+    return setup_times, total_times, os.path.getsize(filepath)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de recursos de reportes PDF")
+    parser.add_argument('--reports', type=int, default=20, help='Reportes por modo')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='biotrack_pdf_bench_') as output_dir:
+        # Calentar imports y caches de ReportLab que no dependen del generador
+        run('caliente', 1, output_dir)
+
+        print(f"\n{'Modo':<10} {'Setup med (ms)':>15} {'Total med (ms)':>15} {'Total p95 (ms)':>15} {'PDF (KB)':>10}")
+        print('-' * 70)
+        for mode in ('frío', 'caliente'):
+            setup_times, total_times, size = run(mode, args.reports, output_dir)
+            p95 = sorted(total_times)[max(0, int(len(total_times) * 0.95) - 1)]
+            print(f"{mode:<10} {statistics.median(setup_times):>15.2f} "
+                  f"{statistics.median(total_times):>15.2f} {p95:>15.2f} {size / 1024:>10.1f}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
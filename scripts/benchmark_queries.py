@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+📈 BENCHMARK DE CONSULTAS DEL DASHBOARD
+========================================
+Cuenta las consultas SQL y mide el tiempo de los métodos del dashboard
+del admin sobre una COPIA de la base de datos sembrada con N estudiantes.
+
+Con consultas agrupadas (GROUP BY) el número de consultas debe ser
+constante al crecer N; un patrón N+1 crece linealmente.
+
+Uso:
+    python scripts/benchmark_queries.py [--sizes 10 100 500] [--db database/biotrack.db]
+
+Autor: BIOTRACK Team
+Fecha: 2025-11-29
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Agregar directorio raíz al path
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from sqlalchemy import event, insert
+
+from database.database_manager import (
+    DatabaseManager, User, Subject, ROMSession, UserAnalysisHistory
+)
+from migrations.migrate import apply_migrations
+
+SEGMENTS = ['shoulder', 'elbow', 'hip', 'knee', 'ankle']
+EXERCISES = ['flexion', 'extension', 'abduction', 'adduction']
+
+
+def seed_dataset(db_manager: DatabaseManager, students: int, per_student: int = 5, seed: int = 42):
+    """
+    Siembra estudiantes con sujetos, sesiones ROM y auto-análisis
+
+    Args:
+        db_manager: DatabaseManager sobre la copia de la BD
+        students: Número de estudiantes a crear
+        per_student: Sujetos, sesiones y auto-análisis por estudiante
+        seed: Semilla para datos reproducibles
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    tag = f"bench{int(time.time() * 1000)}"
+
+    with db_manager.get_session() as session:
+        users = [{
+            'username': f"{tag}_{i}",
+            'password_hash': 'x',
+            'full_name': f"Estudiante Benchmark {i}",
+            'email': f"{tag}_{i}@bench.local",
+            'role': 'student',
+            'is_active': True,
+            'created_at': now - timedelta(minutes=i),
+        } for i in range(students)]
+        session.execute(insert(User), users)
+
+        user_ids = [row[0] for row in session.query(User.id).filter(User.username.like(f"{tag}_%"))]
+
+        subjects = [{
+            'subject_code': f"{tag}-{user_id}-{j}",
+            'first_name': 'Sujeto',
+            'last_name': f"{user_id}-{j}",
+            'created_by': user_id,
+            'created_at': now,
+            'updated_at': now,
+        } for user_id in user_ids for j in range(per_student)]
+        session.execute(insert(Subject), subjects)
+
+        subject_rows = session.query(Subject.id, Subject.created_by)\
+            .filter(Subject.subject_code.like(f"{tag}-%")).all()
+        session.execute(insert(ROMSession), [{
+            'subject_id': subject_id,
+            'user_id': user_id,
+            'segment': rng.choice(SEGMENTS),
+            'exercise_type': rng.choice(EXERCISES),
+            'camera_view': 'lateral',
+            'side': 'right',
+            'rom_value': rng.uniform(20, 170),
+            'quality_score': rng.uniform(40, 95),
+            'created_at': now - timedelta(hours=rng.randint(0, 24 * 30)),
+        } for subject_id, user_id in subject_rows])
+
+        session.execute(insert(UserAnalysisHistory), [{
+            'user_id': user_id,
+            'segment': rng.choice(SEGMENTS),
+            'exercise_type': rng.choice(EXERCISES),
+            'camera_view': 'profile',
+            'side': 'right',
+            'rom_value': rng.uniform(20, 170),
+            'quality_score': rng.uniform(40, 95),
+            'created_at': now - timedelta(hours=rng.randint(0, 24 * 30)),
+        } for user_id in user_ids for _ in range(per_student)])
+
+    # Las inserciones Core no pasan por DatabaseManager: reconstruir agregados
+    db_manager.rebuild_analysis_summary()
+
+
+def count_queries(db_manager: DatabaseManager, func, *args, **kwargs):
+    """Ejecuta func y retorna (número de consultas, segundos)"""
+    counter = {'n': 0}
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter['n'] += 1
+
+    event.listen(db_manager.engine, 'before_cursor_execute', _count)
+    try:
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+    finally:
+        event.remove(db_manager.engine, 'before_cursor_execute', _count)
+    return counter['n'], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de consultas del dashboard")
+    parser.add_argument('--db', default=str(BASE_DIR / 'database' / 'biotrack.db'))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500])
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print("📈 BENCHMARK DE CONSULTAS (copia temporal de la BD)")
+    print("=" * 78)
+    print(f"{'estudiantes':>12} | {'método':<30} | {'consultas':>9} | {'ms':>8}")
+    print("-" * 78)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            db_path = str(Path(tmp) / f"bench_{size}.db")
+            shutil.copy(args.db, db_path)
+            apply_migrations(db_path)
+
+            db_manager = DatabaseManager(db_path)
+            seed_dataset(db_manager, size)
+
+            benchmarks = [
+                ('get_all_students_with_stats', db_manager.get_all_students_with_stats, ()),
+                ('get_users_paginated', db_manager.get_users_paginated, (1, 50)),
+                ('get_admin_global_statistics', db_manager.get_admin_global_statistics, ()),
+                ('get_segment_statistics', db_manager.get_segment_statistics, ('shoulder',)),
+                ('get_user_analysis_stats', db_manager.get_user_analysis_stats, (1,)),
+            ]
+            for name, func, func_args in benchmarks:
+                queries, elapsed = count_queries(db_manager, func, *func_args)
+                print(f"{size:>12} | {name:<30} | {queries:>9} | {elapsed * 1000:>8.1f}")
+
+            db_manager.engine.dispose()
+            print("-" * 78)
+
+
+if __name__ == '__main__':
+    main()
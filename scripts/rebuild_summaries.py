@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+🧮 RECONSTRUIR TABLAS DE RESUMEN
+=================================
+Recalcula analysis_summary desde rom_session y user_analysis_history.
+Usar tras importaciones masivas o ediciones manuales de la base de datos.
+
+Uso:
+    python scripts/rebuild_summaries.py [ruta/a/biotrack.db]
+
+Autor: BIOTRACK Team
+Fecha: 2025-11-29
+"""
+
+import sys
+from pathlib import Path
+
+# Agregar directorio raíz al path
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from database.database_manager import get_db_manager
+from migrations.migrate import apply_migrations
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else str(BASE_DIR / 'database' / 'biotrack.db')
+
+    print("=" * 70)
+    print("🧮 RECONSTRUYENDO analysis_summary")
+    print("=" * 70)
+
+    apply_migrations(db_path)
+    rows = get_db_manager(db_path).rebuild_analysis_summary()
+
+    for source, count in sorted(rows.items()):
+        print(f"   • {source}: {count} filas de resumen")
+    print("✅ Resumen reconstruido")
+
+
+if __name__ == '__main__':
+    main()
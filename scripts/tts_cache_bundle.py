@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+📦 PAQUETE DE CACHÉ TTS
+========================
+Exporta/importa la caché de audio de arranque (mensajes fijos, instrucciones
+y banco de frases) como un único .zip, para instalar un servidor nuevo sin
+sintetizar nada.
+
+Exportar desde un servidor con la caché ya generada (se exportan los audios
+fijados en audio_cache/manifest.json):
+    python scripts/tts_cache_bundle.py export tts_cache.zip
+
+Importar en el servidor nuevo:
+    python scripts/tts_cache_bundle.py import tts_cache.zip [--overwrite]
+
+También se puede dejar el paquete en el servidor y apuntar TTS_CACHE_BUNDLE
+a él: TTSService lo importa al iniciar.
+
+Autor: BIOTRACK Team
+Fecha: 2025-12-01
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar directorio raíz al path
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from app.config import Config
+from app.services.tts_cache import TTSAudioCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta/importa la caché de audio TTS")
+    parser.add_argument('action', choices=['export', 'import'])
+    parser.add_argument('bundle', help="Archivo .zip del paquete")
+    parser.add_argument('--cache-dir', default=Config.AUDIO_CACHE_DIR)
+    parser.add_argument('--overwrite', action='store_true', help="Reemplazar audios existentes al importar")
+    args = parser.parse_args()
+
+    cache = TTSAudioCache(args.cache_dir)
+
+    if args.action == 'export':
+        count = cache.export_bundle(args.bundle)
+        print(f"📦 {count} audios exportados a {args.bundle}")
+        if count == 0:
+            print("⚠️  No hay audios fijados: inicia la aplicación una vez para generar la caché")
+    else:
+        count = cache.import_bundle(args.bundle, overwrite=args.overwrite)
+        print(f"📦 {count} audios importados en {args.cache_dir}")
+
+    stats = cache.stats()
+    print(f"   • Caché: {stats['entries']} audios, {stats['bytes_used'] / 1024:.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
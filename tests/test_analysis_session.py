@@ -0,0 +1,163 @@
+"""
+Tests de la tabla de transiciones de AnalysisSession (app/core/analysis_session.py)
+
+El módulo usa el singleton de MediaPipe (pose_singleton): sin mediapipe y
+cv2 instalados los tests se omiten.
+
+Ejecutar:
+    python -m pytest tests/test_analysis_session.py -q
+"""
+
+import json
+import time
+
+import pytest
+
+pytest.importorskip('cv2')
+pytest.importorskip('mediapipe')
+
+from app.core import analysis_session as session_module
+from app.core.analysis_session import (
+    AnalysisSession, AnalysisState, compile_transition_table
+)
+
+
+class SilentTTS:
+    """Servicio TTS mínimo: registra los mensajes en lugar de reproducirlos"""
+
+    cue_seq = 0
+
+    def __init__(self):
+        self.spoken = []
+
+    def speak(self, message, *args, **kwargs):
+        self.spoken.append(message)
+
+    def get_cues(self, since=0):
+        return []
+
+
+@pytest.fixture(autouse=True)
+def tts(monkeypatch):
+    silent = SilentTTS()
+    monkeypatch.setattr(session_module, 'get_tts_service', lambda: silent)
+    return silent
+
+
+@pytest.fixture
+def exercises_config(tmp_path, monkeypatch):
+    """Escribe un exercises.json temporal y recompila las tablas con él"""
+    path = tmp_path / 'exercises.json'
+
+    def write(system_overrides=None, exercise_overrides=None):
+        config = {
+            'system_config': {'session_state_machine': system_overrides or {}},
+            'segments': {'knee': {'exercises': {'flexion': {'state_machine': exercise_overrides or {}}}}},
+        }
+        path.write_text(json.dumps(config), encoding='utf-8')
+        compile_transition_table.cache_clear()
+
+    monkeypatch.setattr(session_module, 'EXERCISES_CONFIG_PATH', path)
+    write()
+    yield write
+    compile_transition_table.cache_clear()
+
+
+FAST = {
+    'DETECTING_PERSON': {'frames_required': 1, 'min_dwell': 0},
+    'CHECKING_ORIENTATION': {'frames_required': 2, 'min_dwell': 0},
+    'CHECKING_POSTURE': {'frames_required': 1, 'min_dwell': 0},
+}
+
+
+def test_table_covers_every_state_in_order(exercises_config):
+    table = compile_transition_table('knee', 'flexion', 'profile')
+    assert set(table) == set(AnalysisState)
+
+    chain, state = [], AnalysisState.DETECTING_PERSON
+    while state is not None:
+        chain.append(state)
+        state = table[state].next_state
+    assert chain == [
+        AnalysisState.DETECTING_PERSON, AnalysisState.CHECKING_ORIENTATION,
+        AnalysisState.CHECKING_POSTURE, AnalysisState.COUNTDOWN,
+        AnalysisState.ANALYZING, AnalysisState.COMPLETED,
+    ]
+    for terminal in (AnalysisState.IDLE, AnalysisState.COMPLETED, AnalysisState.ERROR):
+        assert table[terminal].handler is None
+    assert table[AnalysisState.CHECKING_POSTURE].timeout_state == AnalysisState.ERROR
+
+
+def test_table_is_cached_and_read_only(exercises_config):
+    table = compile_transition_table('knee', 'flexion', 'profile')
+    assert compile_transition_table('knee', 'flexion', 'profile') is table
+    assert compile_transition_table('knee', 'flexion', 'frontal') is not table
+    assert AnalysisSession('knee', 'flexion', 'profile')._transition_table is table
+    with pytest.raises(TypeError):
+        table[AnalysisState.IDLE] = None
+
+
+def test_orientation_guard_uses_required_orientation(exercises_config):
+    guard = compile_transition_table('knee', 'flexion', 'profile')[AnalysisState.CHECKING_ORIENTATION].guard
+    assert guard(True, 'profile', 0.9)
+    assert guard(True, 'PROFILE', 0.9)
+    assert not guard(True, 'frontal', 0.9)
+    assert not guard(None, 'profile', 0.9)
+    assert not guard(True, 'profile', 0.0)
+
+
+def test_exercise_overrides_take_precedence(exercises_config):
+    exercises_config(
+        system_overrides={'DETECTING_PERSON': {'frames_required': 4, 'min_dwell': 0.5},
+                          'ANALYZING': {'timeout': 12}},
+        exercise_overrides={'DETECTING_PERSON': {'frames_required': 7},
+                            'IDLE': {'frames_required': 1},
+                            'ANALYZING': {'unknown_param': 1}}
+    )
+    table = compile_transition_table('knee', 'flexion', 'profile')
+    assert table[AnalysisState.DETECTING_PERSON].frames_required == 7
+    assert table[AnalysisState.DETECTING_PERSON].min_dwell == 0.5
+    assert table[AnalysisState.ANALYZING].timeout == 12.0
+
+    # Otro ejercicio: solo los overrides del sistema
+    assert compile_transition_table('hip', 'flexion', 'profile')[AnalysisState.DETECTING_PERSON].frames_required == 4
+
+
+def test_session_walks_the_table(exercises_config):
+    exercises_config(system_overrides=FAST)
+    session = AnalysisSession('knee', 'flexion', 'profile')
+    assert session.start()
+    assert session.state == AnalysisState.DETECTING_PERSON
+
+    assert session.process_frame(None).state == 'DETECTING_PERSON'
+    assert session.process_frame(True, confidence=0.9).state == 'CHECKING_ORIENTATION'
+
+    # Orientación incorrecta reinicia el conteo de frames consecutivos
+    session.process_frame(True, detected_orientation='profile', confidence=0.9)
+    session.process_frame(True, detected_orientation='frontal', confidence=0.9)
+    assert session.process_frame(True, detected_orientation='profile', confidence=0.9).state == 'CHECKING_ORIENTATION'
+    assert session.process_frame(True, detected_orientation='profile', confidence=0.9).state == 'CHECKING_POSTURE'
+
+    assert session.process_frame(True, confidence=0.9).state == 'COUNTDOWN'
+    assert [t.to_state for t in session._transitions] == [
+        AnalysisState.DETECTING_PERSON, AnalysisState.CHECKING_ORIENTATION,
+        AnalysisState.CHECKING_POSTURE, AnalysisState.COUNTDOWN,
+    ]
+
+
+def test_posture_timeout_goes_to_error(exercises_config):
+    exercises_config(system_overrides={**FAST, 'CHECKING_POSTURE': {'min_dwell': 0, 'timeout': 0}})
+    session = AnalysisSession('knee', 'flexion', 'profile')
+    session.start()
+    session.process_frame(True, confidence=0.9)
+    session.process_frame(True, detected_orientation='profile', confidence=0.9)
+    session.process_frame(True, detected_orientation='profile', confidence=0.9)
+    assert session.state == AnalysisState.CHECKING_POSTURE
+
+    time.sleep(0.01)
+    result = session.process_frame(None)
+    assert session.state == AnalysisState.ERROR
+    assert result.to_dict()['error'] == 'posture_timeout'
+
+    # Estado terminal: solo reporta
+    assert session.process_frame(True, confidence=1.0).state == 'ERROR'
@@ -0,0 +1,197 @@
+"""
+Tests del hilo lector de hardware/arduino_serial.py con un puerto serial falso
+
+El puerto falso imita al firmware (camera_height_control.ino): dos líneas
+"codigo,altura" por comando y la respuesta del STOP con ~1 s de retraso.
+
+Ejecutar:
+    python -m pytest tests/test_arduino_serial.py -q
+"""
+
+import importlib.util
+import queue
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# hardware/__init__.py importa cv2 (camera_manager); este módulo no lo necesita
+_spec = importlib.util.spec_from_file_location(
+    'arduino_serial_under_test',
+    Path(__file__).resolve().parent.parent / 'hardware' / 'arduino_serial.py'
+)
+arduino_serial_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(arduino_serial_module)
+
+ArduinoSerial = arduino_serial_module.ArduinoSerial
+ArduinoStatus = arduino_serial_module.ArduinoStatus
+
+
+class FakeSerialPort:
+    """Puerto serial falso: readline() lee de una cola, write() registra el comando"""
+
+    def __init__(self):
+        self.is_open = True
+        self.written = []
+        self.on_write = None
+        self._lines = queue.Queue()
+
+    def readline(self):
+        if not self.is_open:
+            raise OSError("Puerto cerrado")
+        try:
+            return self._lines.get(timeout=0.02)
+        except queue.Empty:
+            return b""
+
+    def write(self, data):
+        command = data.decode('utf-8').strip()
+        self.written.append(command)
+        if self.on_write:
+            self.on_write(command)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+    def send(self, *lines, delay=0.0):
+        """Encola líneas del Arduino (tras `delay` segundos)"""
+        def push():
+            for line in lines:
+                self._lines.put(f"{line}\n".encode('utf-8'))
+        if delay:
+            threading.Timer(delay, push).start()
+        else:
+            push()
+
+
+@pytest.fixture
+def port():
+    return FakeSerialPort()
+
+
+@pytest.fixture
+def arduino(port):
+    ArduinoSerial._instance = None
+    device = ArduinoSerial()
+    device.COMMAND_TIMEOUT = 1.5
+    device._serial = port
+    device._connected = True
+    device._start_reader()
+    yield device
+    device.disconnect()
+    ArduinoSerial._instance = None
+
+
+def run_in_thread(function, *args):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('response', function(*args)))
+    thread.start()
+    return thread, result
+
+
+def test_move_resolves_at_target_height(arduino, port):
+    port.on_write = lambda command: port.send("0,1200", "0,1200", delay=0.05)
+    response = arduino.move_to_height(1200)
+
+    assert port.written == ["1.1200"]
+    assert response.success and response.current_height_mm == 1200
+    assert arduino.get_status().status == ArduinoStatus.OK
+
+
+def test_late_stop_reply_does_not_resolve_next_move(arduino, port):
+    # El STOP responde ~1 s tarde con la altura donde se detuvo (999)
+    port.on_write = lambda command: port.send("0,999", "0,999", delay=0.2) if command == "2.0" else None
+    arduino.stop()
+    thread, result = run_in_thread(arduino.move_to_height, 1500)
+
+    time.sleep(0.4)
+    assert 'response' not in result
+    assert arduino.get_status().status == ArduinoStatus.MOVING
+    assert arduino.get_last_known_height() == 999
+
+    port.send("0,1500", "0,1500")
+    thread.join(timeout=2)
+    assert result['response'].success
+    assert result['response'].current_height_mm == 1500
+
+
+def test_late_stop_reply_does_not_resolve_home(arduino, port):
+    # HOME no tiene altura objetivo: la respuesta OK retrasada del STOP no lo resuelve
+    arduino.STALE_REPLY_WINDOW = 0.5
+    port.on_write = lambda command: port.send("0,900", "0,900", delay=0.1) if command == "2.0" else None
+    arduino.stop()
+    thread, result = run_in_thread(arduino.go_to_initial_position)
+
+    time.sleep(0.3)
+    assert 'response' not in result
+    assert arduino.get_status().status == ArduinoStatus.MOVING
+    assert arduino.get_last_known_height() == 900
+
+    time.sleep(0.3)
+    port.send("0,210", "0,210")
+    thread.join(timeout=2)
+    assert result['response'].success
+    assert result['response'].current_height_mm == 210
+
+
+def test_move_times_out_when_only_stale_lines_arrive(arduino, port):
+    arduino.COMMAND_TIMEOUT = 0.4
+    port.on_write = lambda command: port.send("0,999", delay=0.05)
+    response = arduino.move_to_height(1500)
+
+    assert not response.success
+    assert response.current_height_mm == 999
+    assert response.error_message == "Timeout esperando fin de movimiento"
+
+
+def test_lines_received_before_the_command_are_ignored(arduino, port):
+    arduino.COMMAND_TIMEOUT = 0.3
+    # Línea leída antes de escribir el comando pero procesada después
+    port.on_write = lambda command: arduino._handle_status_line("0,200", received_at=time.time() - 1)
+    response = arduino.go_to_initial_position()
+
+    assert not response.success
+    assert response.status == ArduinoStatus.TIMEOUT
+
+
+def test_error_code_resolves_move(arduino, port):
+    port.on_write = lambda command: port.send("2,250", "0,250", delay=0.05)
+    response = arduino.move_to_height(300)
+
+    assert not response.success
+    assert response.status == ArduinoStatus.HEIGHT_ERROR
+
+
+def test_home_resolves_on_first_ok_line(arduino, port):
+    port.on_write = lambda command: port.send("0,210", "0,210", delay=0.05)
+    response = arduino.go_to_initial_position()
+
+    assert port.written == ["0.0"]
+    assert response.success and response.current_height_mm == 210
+
+
+def test_stop_interrupts_pending_move(arduino, port):
+    thread, result = run_in_thread(arduino.move_to_height, 1500)
+    time.sleep(0.1)
+    stop_response = arduino.stop()
+    thread.join(timeout=1)
+
+    assert stop_response.success
+    assert result['response'].raw_response == "INTERRUPTED"
+    assert port.written == ["1.1500", "2.0"]
+
+
+def test_telemetry_keeps_every_line(arduino, port):
+    port.send("1,500", "0,510", "basura", "0,510")
+    deadline = time.time() + 1
+    while len(arduino.get_telemetry()) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+
+    telemetry = arduino.get_telemetry()
+    assert [sample['height_mm'] for sample in telemetry] == [500, 510, 510]
+    assert telemetry[0]['status'] == int(ArduinoStatus.MOVING)
+    assert arduino.get_telemetry(limit=1) == telemetry[-1:]
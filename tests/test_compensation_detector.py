@@ -0,0 +1,79 @@
+"""
+Tests del detector de compensaciones (app/core/compensation_detector.py)
+
+Ejecutar:
+    python -m pytest tests/test_compensation_detector.py -q
+"""
+
+import numpy as np
+import pytest
+
+from app.core.compensation_detector import (
+    CompensationDetector, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP
+)
+
+
+def make_points(shoulders, hips, visibility=1.0):
+    """Array (33, 4) con solo hombros y caderas posicionados"""
+    points = np.zeros((33, 4), dtype=np.float32)
+    points[:, 3] = visibility
+    points[LEFT_SHOULDER, :2], points[RIGHT_SHOULDER, :2] = shoulders
+    points[LEFT_HIP, :2], points[RIGHT_HIP, :2] = hips
+    return points
+
+
+@pytest.fixture
+def detector():
+    return CompensationDetector()
+
+
+def test_upright_frontal_has_no_compensation(detector):
+    points = make_points(((0.4, 0.3), (0.6, 0.3)), ((0.42, 0.6), (0.58, 0.6)))
+    values, compensating = detector.compute(points, 'shoulder', 'abduction', 'frontal')
+    np.testing.assert_allclose(values, [0.0, 0.0, 0.0], atol=1e-4)
+    assert not compensating
+
+
+def test_shoulder_hike_uses_exercise_threshold(detector):
+    # Hombro derecho ~14° más alto que la línea de caderas
+    points = make_points(((0.4, 0.3), (0.6, 0.25)), ((0.42, 0.6), (0.58, 0.6)))
+    values, _ = detector.compute(points, orientation='frontal')
+    assert values[2] == pytest.approx(14.04, abs=0.1)
+
+    # Umbral por defecto (10°) lo marca; abducción de hombro tolera hasta 15°
+    assert detector.compute(points, orientation='frontal')[1]
+    assert not detector.compute(points, 'shoulder', 'abduction', 'frontal')[1]
+
+
+def test_profile_only_measures_trunk(detector):
+    # Líneas de hombros/caderas inclinadas: en perfil no son observables
+    points = make_points(((0.4, 0.3), (0.6, 0.1)), ((0.42, 0.6), (0.58, 0.5)))
+    values = detector.measure(points, 'profile')
+    assert not np.isnan(values[0])
+    assert np.isnan(values[1]) and np.isnan(values[2])
+    assert not detector.compute(points, 'knee', 'flexion', 'profile')[1]
+
+
+def test_profile_trunk_lean_invalidates_sample(detector):
+    # Tronco inclinado ~18° hacia adelante
+    points = make_points(((0.49, 0.3), (0.51, 0.3)), ((0.39, 0.6), (0.41, 0.6)))
+    values = detector.measure(points, 'profile')
+    assert values[0] == pytest.approx(18.4, abs=0.2)
+    assert detector.compute(points, 'hip', 'flexion', 'profile')[1]        # umbral 10°
+    assert not detector.compute(points, 'knee', 'flexion', 'profile')[1]   # umbral 20°
+
+
+def test_thresholds_mask_unobservable_channels(detector):
+    thresholds = detector.thresholds_for('shoulder', 'flexion', 'profile')
+    assert thresholds[0] == 10.0
+    assert np.isinf(thresholds[1:]).all()
+
+    default = detector.thresholds_for('unknown', 'movement', 'frontal')
+    np.testing.assert_array_equal(default, [15.0, 10.0, 10.0])
+
+
+def test_low_visibility_is_not_measurable(detector):
+    points = make_points(((0.4, 0.3), (0.6, 0.1)), ((0.42, 0.6), (0.58, 0.6)), visibility=0.1)
+    values, compensating = detector.compute(points, orientation='frontal')
+    assert np.isnan(values).all()
+    assert not compensating
@@ -0,0 +1,367 @@
+"""
+Tests de la capa de datos (database/ y migrations/)
+
+Cada test usa una base de datos SQLite temporal creada con schema.sql y
+las migraciones de migrations/versions/.
+
+Ejecutar:
+    python -m pytest tests/test_database.py -q
+"""
+
+import gc
+import importlib.util
+import json
+import sqlite3
+import threading
+import weakref
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from database import database_manager
+from database.database_manager import DatabaseManager, build_fts_query, encode_cursor, decode_cursor
+from database.landmark_codec import decode_frame
+from migrations import migrate
+
+SCHEMA_FILE = Path(__file__).resolve().parent.parent / 'database' / 'schema.sql'
+
+
+def create_schema(db_path):
+    connection = sqlite3.connect(db_path)
+    connection.executescript(SCHEMA_FILE.read_text(encoding='utf-8'))
+    connection.close()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'biotrack.db')
+    create_schema(path)
+    migrate.apply_migrations(path)
+    return path
+
+
+@pytest.fixture
+def db(db_path):
+    manager = DatabaseManager(db_path)
+    yield manager
+    manager.write_behind.close()
+    manager.engine.dispose()
+
+
+def row_id(db, table, column, value):
+    """ID de una fila (los modelos que retornan los create_* quedan expirados tras el commit)"""
+    connection = sqlite3.connect(db.db_path)
+    try:
+        return connection.execute(f"SELECT id FROM {table} WHERE {column} = ?", (value,)).fetchone()[0]
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def user_id(db):
+    db.create_user('est01', 'clave123', 'Ana Pérez', 'ana@example.com')
+    return row_id(db, 'user', 'username', 'est01')
+
+
+@pytest.fixture
+def subject_id(db, user_id):
+    db.create_subject('SUJ-2025-0001', 'Luis', 'Gómez', created_by=user_id)
+    return row_id(db, 'subject', 'subject_code', 'SUJ-2025-0001')
+
+
+@pytest.fixture
+def rom_session(db, user_id, subject_id):
+    return db.create_rom_session(subject_id, user_id, 'knee', 'flexion')
+
+
+# ============================================================================
+# MIGRACIONES
+# ============================================================================
+
+def test_migrations_are_applied_once(db_path):
+    assert migrate.apply_migrations(db_path) == []
+
+
+def test_concurrent_apply_migrations_apply_each_version_once(tmp_path):
+    path = str(tmp_path / 'biotrack.db')
+    create_schema(path)
+
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(migrate.apply_migrations(path))
+        except Exception as e:  # pragma: no cover - se reporta abajo
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    applied = [version for result in results for version in result]
+    assert len(applied) == len(set(applied))
+    assert sum(1 for result in results if result) == 1
+
+
+def test_failed_sql_migration_is_rolled_back(tmp_path, monkeypatch):
+    versions = tmp_path / 'versions'
+    versions.mkdir()
+    (versions / '001_ok.sql').write_text("CREATE TABLE ok_table (x INTEGER);")
+    (versions / '002_broken.sql').write_text(
+        "CREATE TABLE half_table (x INTEGER);\nINSERT INTO missing_table VALUES (1);"
+    )
+    monkeypatch.setattr(migrate, 'VERSIONS_DIR', versions)
+    path = str(tmp_path / 'test.db')
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate.apply_migrations(path)
+
+    connection = sqlite3.connect(path)
+    tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    versions_applied = {row[0] for row in connection.execute("SELECT version FROM schema_migrations")}
+    connection.close()
+    assert 'ok_table' in tables
+    assert 'half_table' not in tables
+    assert versions_applied == {'001_ok'}
+
+
+def test_memory_database_takes_no_lock_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    versions = tmp_path / 'versions'
+    versions.mkdir()
+    (versions / '001_ok.sql').write_text("CREATE TABLE ok_table (x INTEGER);")
+    monkeypatch.setattr(migrate, 'VERSIONS_DIR', versions)
+
+    assert migrate.apply_migrations(':memory:') == ['001_ok']
+    assert list(tmp_path.glob('*.lock')) == []
+
+
+def test_landmarks_migration_without_table_is_noop():
+    connection = sqlite3.connect(':memory:')
+    spec = importlib.util.spec_from_file_location(
+        'migration_003', migrate.VERSIONS_DIR / '003_pack_landmarks_blob.py'
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    module.upgrade(connection)
+    assert connection.execute("SELECT name FROM sqlite_master").fetchall() == []
+    connection.close()
+
+
+def test_landmarks_migration_is_lossless(tmp_path):
+    path = str(tmp_path / 'biotrack.db')
+    create_schema(path)
+
+    rng = np.random.default_rng(5)
+    landmarks = rng.uniform(-1, 1, (33, 4)).astype(np.float32)
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "INSERT INTO angle_measurement (session_id, timestamp, frame_number, angle_value, landmarks_json) "
+        "VALUES (1, 0.0, 1, 45.0, ?), (1, 0.1, 2, 46.0, '[]')",
+        (json.dumps(landmarks.tolist()),)
+    )
+    connection.commit()
+    connection.close()
+
+    migrate.apply_migrations(path)
+
+    connection = sqlite3.connect(path)
+    rows = connection.execute(
+        "SELECT landmarks_json, landmarks_blob FROM angle_measurement ORDER BY frame_number"
+    ).fetchall()
+    connection.close()
+
+    converted_json, converted_blob = rows[0]
+    assert converted_json is None
+    np.testing.assert_array_equal(decode_frame(converted_blob), landmarks)
+
+    # Fila sin landmarks convertibles: conserva su JSON
+    assert rows[1] == ('[]', None)
+
+
+# ============================================================================
+# MEDICIONES FRAME A FRAME
+# ============================================================================
+
+def test_measurement_buffer_stores_landmarks(db, rom_session):
+    landmarks = np.random.default_rng(2).uniform(0, 1, (33, 4)).astype(np.float32)
+
+    with db.angle_measurement_buffer(rom_session['id'], flush_every=2) as buffer:
+        buffer.extend([
+            (0.0, 0, 30.0, 0.9, landmarks),
+            (0.1, 1, 31.0, 0.8, None),
+            (0.2, 2, 32.0, 0.7),
+        ])
+    assert buffer.total_written == 3
+
+    connection = sqlite3.connect(db.db_path)
+    rows = connection.execute(
+        "SELECT angle_value, landmarks_blob FROM angle_measurement WHERE session_id = ? ORDER BY frame_number",
+        (rom_session['id'],)
+    ).fetchall()
+    connection.close()
+    assert [row[0] for row in rows] == [30.0, 31.0, 32.0]
+    np.testing.assert_allclose(decode_frame(rows[0][1]), landmarks, atol=1e-3)
+    assert rows[1][1] is None and rows[2][1] is None
+
+
+def test_closed_manager_is_released(db_path):
+    # Los hooks de fork/atexit son de módulo: no mantienen vivo al gestor
+    manager = DatabaseManager(db_path)
+    manager.log_action('login', user_id=None)
+    manager.shutdown()
+    assert manager in database_manager._live_managers
+
+    reference = weakref.ref(manager)
+    del manager
+    gc.collect()
+    assert reference() is None
+    assert not any(m.db_path == db_path for m in database_manager._live_managers)
+
+
+# ============================================================================
+# PAGINACIÓN POR CURSOR (KEYSET)
+# ============================================================================
+
+def walk_pages(fetch_page):
+    """Recorre todas las páginas siguiendo next_cursor"""
+    ids, cursor = [], None
+    while True:
+        page = fetch_page(cursor)
+        ids.extend(item['id'] for item in page['items'])
+        if not page['has_next']:
+            return ids
+        cursor = page['next_cursor']
+
+
+def test_cursor_round_trip_and_validation():
+    cursor = encode_cursor('2025-11-29 10:00:00.123456', 42)
+    assert decode_cursor(cursor) == ('2025-11-29 10:00:00.123456', 42)
+    for invalid in ('no-es-un-cursor', encode_cursor('2025-11-29', 1)[:-3] + '!!'):
+        with pytest.raises(ValueError):
+            decode_cursor(invalid)
+
+
+def test_keyset_pages_cover_every_row_once(db, user_id, subject_id):
+    for _ in range(8):
+        db.create_rom_session(subject_id, user_id, 'knee', 'flexion')
+    # Empates de created_at: el id desempata
+    connection = sqlite3.connect(db.db_path)
+    connection.execute("UPDATE rom_session SET created_at = '2025-11-29 10:00:00' WHERE id % 2 = 0")
+    connection.execute("UPDATE rom_session SET created_at = '2025-11-29 09:00:00.500000' WHERE id % 2 = 1")
+    connection.commit()
+    expected = [row[0] for row in connection.execute(
+        "SELECT id FROM rom_session ORDER BY created_at DESC, id DESC"
+    )]
+    connection.close()
+
+    ids = walk_pages(lambda cursor: db.get_rom_sessions_page(user_id=user_id, limit=3, cursor=cursor))
+    assert ids == expected
+
+    with pytest.raises(ValueError):
+        db.get_rom_sessions_page(user_id=user_id, cursor='basura')
+
+
+def test_users_cursor_matches_offset_pages(db):
+    for i in range(7):
+        db.create_user(f'est{i:02d}', 'clave123', f'Estudiante {i}', f'est{i}@example.com')
+
+    by_offset = []
+    for page in (1, 2, 3):
+        by_offset.extend(u['id'] for u in db.get_users_paginated(page=page, per_page=3)['items'])
+
+    cursor_ids, cursor = [], None
+    while True:
+        result = db.get_users_paginated(per_page=3, cursor=cursor)
+        cursor_ids.extend(u['id'] for u in result['items'])
+        if not result['next_cursor']:
+            break
+        cursor = result['next_cursor']
+
+    assert cursor_ids == by_offset
+    assert len(set(cursor_ids)) == 7
+
+
+# ============================================================================
+# BÚSQUEDA FTS5
+# ============================================================================
+
+@pytest.fixture
+def subjects(db, user_id):
+    people = [('SUJ-2025-0001', 'Juan', 'Pérez'), ('SUJ-2025-0002', 'Juana', 'López'),
+              ('SUJ-2025-0003', 'Pedro', 'Juárez'), ('SUJ-2025-0004', 'José', 'Martínez')]
+    for code, first_name, last_name in people:
+        db.create_subject(code, first_name, last_name, created_by=user_id)
+    return {code: row_id(db, 'subject', 'subject_code', code) for code, _, _ in people}
+
+
+def names(results):
+    return sorted(f"{s['first_name']} {s['last_name']}" for s in results)
+
+
+def test_build_fts_query_quotes_tokens():
+    assert build_fts_query('juan per') == '"juan"* "per"*'
+    assert build_fts_query('a" OR b') == '"a"* "OR"* "b"*'
+    assert build_fts_query('  -- ') is None
+
+
+def test_search_subjects_by_prefix_ignoring_accents(db, subjects):
+    assert names(db.search_subjects('jua')) == ['Juan Pérez', 'Juana López', 'Pedro Juárez']
+    assert names(db.search_subjects('juan per')) == ['Juan Pérez']
+    assert names(db.search_subjects('jose')) == ['José Martínez']
+    assert names(db.search_subjects('SUJ-2025-0002')) == ['Juana López']
+    assert db.search_subjects('!!') == []
+
+
+def test_search_subjects_ranks_and_filters(db, user_id, subjects):
+    # Coincide en nombre y apellido: más relevante que en una sola columna
+    db.create_subject('SUJ-2025-0005', 'Juan', 'Juanes', created_by=user_id)
+    results = db.search_subjects('jua')
+    assert f"{results[0]['first_name']} {results[0]['last_name']}" == 'Juan Juanes'
+    assert len(db.search_subjects('jua', limit=2)) == 2
+
+    db.create_user('est02', 'clave123', 'Otro', 'otro@example.com')
+    other_id = row_id(db, 'user', 'username', 'est02')
+    assert db.search_subjects('jua', created_by=other_id) == []
+    assert len(db.search_subjects('jua', created_by=user_id)) == 4
+
+
+def test_fts_index_follows_updates_and_deletes(db, subjects):
+    db.update_subject(subjects['SUJ-2025-0004'], first_name='Julián')
+    assert 'Julián Martínez' in names(db.search_subjects('juli'))
+    assert db.search_subjects('jose') == []
+
+    db.delete_subject(subjects['SUJ-2025-0001'])
+    assert names(db.search_subjects('juan')) == ['Juana López']
+
+
+def test_search_users(db, user_id):
+    db.create_user('mgarcia', 'clave123', 'María García', 'maria@example.com', student_id='EST-2024-0123')
+    assert [u['username'] for u in db.search_users('mari')] == ['mgarcia']
+    assert [u['username'] for u in db.search_users('EST 2024')] == ['mgarcia']
+    assert db.search_users('zzz') == []
+    assert [u['username'] for u in db.get_users_paginated(search='garc')['items']] == ['mgarcia']
+
+
+def test_search_falls_back_to_like_without_fts(db_path):
+    connection = sqlite3.connect(db_path)
+    connection.executescript(
+        "DROP TRIGGER subject_fts_insert; DROP TRIGGER subject_fts_delete; "
+        "DROP TRIGGER subject_fts_update; DROP TABLE subject_fts;"
+    )
+    connection.close()
+
+    manager = DatabaseManager(db_path)
+    try:
+        manager.create_user('est01', 'clave123', 'Ana Pérez', 'ana@example.com')
+        creator = row_id(manager, 'user', 'username', 'est01')
+        manager.create_subject('SUJ-2025-0001', 'Juan', 'Pérez', created_by=creator)
+        assert names(manager.search_subjects('Jua')) == ['Juan Pérez']
+    finally:
+        manager.write_behind.close()
+        manager.engine.dispose()
@@ -0,0 +1,115 @@
+"""
+Tests de la caché de reportes PDF (app/services/report_cache.py) y de los
+ETag de app/routes/pdf.py
+
+Ejecutar:
+    python -m pytest tests/test_report_cache.py -q
+"""
+
+import pytest
+from flask import Flask
+
+from app.routes import pdf as pdf_routes
+from app.services import pdf_service
+from app.services.report_cache import ReportCache
+
+
+class FakeGenerator:
+    """PDFReportGenerator falso: render_bytes cuenta las llamadas"""
+
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    def render_bytes(self, method, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("ReportLab falló")
+        return f"%PDF-{method}-{sorted(kwargs.items())}".encode('utf-8')
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    fake = FakeGenerator()
+    monkeypatch.setattr(pdf_service, 'get_pdf_generator', lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ReportCache(str(tmp_path / 'cache'))
+
+
+def test_key_depends_on_content_not_order(monkeypatch):
+    key = ReportCache.make_key('user_history', {'user': {'id': 1}, 'rows': [1, 2]})
+    assert key == ReportCache.make_key('user_history', {'rows': [1, 2], 'user': {'id': 1}})
+    assert key != ReportCache.make_key('user_history', {'user': {'id': 1}, 'rows': [1, 3]})
+    assert key != ReportCache.make_key('subject_history', {'user': {'id': 1}, 'rows': [1, 2]})
+
+    monkeypatch.setattr(pdf_service.PDFReportGenerator, 'TEMPLATE_VERSION', 'otra-version')
+    assert key != ReportCache.make_key('user_history', {'user': {'id': 1}, 'rows': [1, 2]})
+
+
+def test_get_or_render_renders_once(cache, generator):
+    key, path = cache.get_or_render('user_history', {'rows': [1]}, tags=['user:1'])
+    again_key, again_path = cache.get_or_render('user_history', {'rows': [1]}, tags=['user:1'])
+
+    assert (again_key, again_path) == (key, path)
+    assert generator.calls == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_failed_render_releases_key_lock(cache, monkeypatch):
+    monkeypatch.setattr(pdf_service, 'get_pdf_generator', lambda: FakeGenerator(fail=True))
+    with pytest.raises(RuntimeError):
+        cache.get_or_render('user_history', {'rows': [1]})
+    assert cache._key_locks == {}
+
+
+def test_invalidate_uses_tag_index(cache, generator):
+    cache.get_or_render('user_history', {'rows': [1]}, tags=['user:1'])
+    cache.get_or_render('user_history', {'rows': [2]}, tags=['user:2'])
+    cache.get_or_render('subject_history', {'rows': [3]}, tags=['subject:1', 'user:1'])
+
+    assert cache.invalidate(['user:1']) == 2
+    assert cache.invalidate(['user:1']) == 0
+    assert cache.stats()['entries'] == 1
+    assert cache._tag_index == {'user:2': set(cache._key_tags)}
+
+
+def test_invalidate_sees_entries_from_other_process(tmp_path, generator):
+    cache_dir = str(tmp_path / 'cache')
+    worker_a, worker_b = ReportCache(cache_dir), ReportCache(cache_dir)
+
+    worker_a.get_or_render('user_history', {'rows': [1]}, tags=['user:1'])
+    assert worker_b.invalidate(['user:1']) == 1
+    assert worker_a.invalidate(['user:1']) == 0
+    assert worker_a._key_tags == {}
+
+
+def test_budget_evicts_least_recently_used(tmp_path, generator):
+    cache = ReportCache(str(tmp_path / 'cache'), {'max_size_mb': 100 / (1024 * 1024)})
+    first_key, _ = cache.get_or_render('user_history', {'rows': [1] * 20}, tags=['user:1'])
+    second_key, _ = cache.get_or_render('user_history', {'rows': [2] * 20}, tags=['user:2'])
+
+    assert cache.get(first_key) is None
+    assert cache.get(second_key) is not None
+    assert cache.stats()['evictions'] == 1
+    assert 'user:1' not in cache._tag_index
+
+
+def test_etag_and_not_modified(cache, generator):
+    key, data = cache.render('user_history', {'rows': [1]})
+    app = Flask(__name__)
+
+    with app.test_request_context(headers={'If-None-Match': f'"{key}"'}):
+        response = pdf_routes._not_modified(key)
+        assert response.status_code == 304
+        assert response.get_etag()[0] == key
+
+    with app.test_request_context(headers={'If-None-Match': '"otra-clave"'}):
+        assert pdf_routes._not_modified(key) is None
+        response = pdf_routes._send_report(data, 'reporte.pdf', key)
+        assert response.status_code == 200
+        assert response.get_etag()[0] == key
+        assert response.cache_control.no_cache
@@ -0,0 +1,109 @@
+"""
+Tests del motor de estadísticas ROM (app/utils/rom_statistics.py)
+
+Cubren el percentil ponderado, la equivalencia del motor multicanal con
+ROMStatisticsCalculator y las estadísticas vectorizadas por columna.
+
+Ejecutar:
+    python -m pytest tests/test_rom_statistics.py -q
+"""
+
+import numpy as np
+import pytest
+
+from app.utils.rom_statistics import (
+    ROMStatisticsCalculator,
+    MultiChannelROMStatistics,
+    weighted_percentile,
+    weighted_mean_std,
+    effective_sample_size,
+)
+
+
+def test_weighted_percentile_matches_numpy_with_equal_weights():
+    rng = np.random.default_rng(1)
+    values = rng.normal(90, 15, 200)
+    q = [5, 25, 50, 75, 95]
+    np.testing.assert_allclose(
+        weighted_percentile(values, np.ones_like(values), q),
+        np.percentile(values, q)
+    )
+
+
+def test_weighted_percentile_follows_heavy_samples():
+    values = [10.0, 20.0, 30.0]
+    assert weighted_percentile(values, [1, 1, 1], 50) == pytest.approx(20.0)
+    assert weighted_percentile(values, [1, 1, 10], 50) > 20.0
+    assert weighted_percentile([42.0], [0.7], 95) == 42.0
+
+
+def make_samples(seed=3, frames=400):
+    """Serie sintética: sube hasta ~120° y se estabiliza, con pesos variables"""
+    rng = np.random.default_rng(seed)
+    timestamps = np.linspace(0.0, 14.0, frames)
+    angles = np.minimum(timestamps * 20.0, 120.0) + rng.normal(0, 1.5, frames)
+    weights = rng.uniform(0.3, 1.0, frames)
+    return timestamps, angles, weights
+
+
+def test_multichannel_matches_single_channel_calculator():
+    timestamps, angles, weights = make_samples()
+
+    single = ROMStatisticsCalculator()
+    multi = MultiChannelROMStatistics(('primary', 'left'))
+    for t, angle, weight in zip(timestamps, angles, weights):
+        single.add_angle(angle, timestamp=t, weight=weight)
+        multi.add_sample((angle, None), timestamp=t, weights=(weight, None))
+
+    expected = single.get_capture_window_stats()
+    stats = multi.get_channel_stats('primary')
+    assert stats['percentile_95'] == pytest.approx(expected['percentile_95'], abs=0.1)
+    assert stats['std'] == pytest.approx(expected['std'], abs=0.01)
+    assert stats['samples'] == expected['samples']
+    assert stats['quality'] == pytest.approx(expected['quality'])
+    assert stats['plateau_detected'] == expected['plateau_detected']
+    assert stats['rejected'] == int((weights < 0.5).sum())
+    assert multi.get_channel_stats('left') is None
+
+
+def test_low_weight_samples_are_rejected():
+    multi = MultiChannelROMStatistics(('primary',))
+    multi.add_sample((100.0,), timestamp=0.0, weights=(0.2,))
+    multi.add_sample((50.0,), timestamp=0.1, weights=(0.9,))
+    assert multi.channel_count('primary') == 1
+    assert multi.rejected_count('primary') == 1
+    _, _, values, _ = multi.channel_series('primary')
+    np.testing.assert_array_equal(values, [50.0])
+
+
+def test_column_stats_match_per_column_reference():
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        rows = int(rng.integers(1, 80))
+        data = rng.normal(60, 25, (rows, 5))
+        weights = rng.uniform(0.1, 1.0, (rows, 5))
+        data[rng.random((rows, 5)) < 0.4] = np.nan
+        data[:, 0] = np.nan                 # Canal sin muestras
+        data[1:, 1] = np.nan                # Canal con una sola muestra
+
+        stats = MultiChannelROMStatistics._weighted_column_stats(data, weights)
+        tail_std = MultiChannelROMStatistics._tail_std(data, weights, 10)
+
+        for i in range(data.shape[1]):
+            mask = ~np.isnan(data[:, i])
+            if not mask.any():
+                assert np.isnan(stats['percentiles'][:, i]).all()
+                assert np.isnan(stats['mean'][i]) and np.isnan(tail_std[i])
+                continue
+            values, column_weights = data[mask, i], weights[mask, i]
+            np.testing.assert_allclose(
+                stats['percentiles'][:, i],
+                weighted_percentile(values, column_weights, [25, 50, 75, 95])
+            )
+            mean, std = weighted_mean_std(values, column_weights)
+            assert stats['mean'][i] == pytest.approx(mean)
+            assert stats['std'][i] == pytest.approx(std)
+            assert stats['effective'][i] == pytest.approx(effective_sample_size(column_weights))
+            assert stats['mean_weight'][i] == pytest.approx(column_weights.mean())
+            _, expected_tail = weighted_mean_std(values[-10:], column_weights[-10:])
+            assert tail_std[i] == pytest.approx(expected_tail)
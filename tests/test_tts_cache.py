@@ -0,0 +1,136 @@
+"""
+Tests de la caché de audio TTS (app/services/tts_cache.py)
+
+Ejecutar:
+    python -m pytest tests/test_tts_cache.py -q
+"""
+
+import os
+import wave
+
+import pytest
+
+from app.services.tts_cache import TTSAudioCache
+
+FRAMERATE = 8000
+
+
+def write_wav(cache_dir, name, seconds=0.5):
+    """WAV mono de 8 bits: 8000 bytes de datos por segundo"""
+    with wave.open(os.path.join(cache_dir, name), 'wb') as audio:
+        audio.setnchannels(1)
+        audio.setsampwidth(1)
+        audio.setframerate(FRAMERATE)
+        audio.writeframes(b'\x80' * int(FRAMERATE * seconds))
+    return name
+
+
+def make_cache(cache_dir, max_bytes):
+    return TTSAudioCache(str(cache_dir), {'max_size_mb': max_bytes / (1024 * 1024)})
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    path = tmp_path / 'audio_cache'
+    path.mkdir()
+    return path
+
+
+def test_index_reads_duration_once(cache_dir):
+    write_wav(cache_dir, 'a.wav', seconds=0.25)
+    cache = make_cache(cache_dir, 10 ** 6)
+
+    entry = cache.get('a.wav')
+    assert entry.duration == pytest.approx(0.25)
+    assert cache.get('missing.wav') is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_lru_eviction_skips_pinned(cache_dir):
+    # Presupuesto para dos audios de ~4 KB
+    cache = make_cache(cache_dir, 9000)
+    cache.pin(['pinned.wav'])
+    cache.add(write_wav(cache_dir, 'pinned.wav'))
+    cache.add(write_wav(cache_dir, 'old.wav'))
+    cache.add(write_wav(cache_dir, 'new.wav'))
+
+    assert cache.contains('pinned.wav')
+    assert not cache.contains('old.wav')
+    assert not os.path.exists(cache_dir / 'old.wav')
+    assert cache.contains('new.wav')
+    assert cache.stats()['evictions'] == 1
+
+
+def test_touch_protects_recently_used(cache_dir):
+    cache = make_cache(cache_dir, 9000)
+    cache.add(write_wav(cache_dir, 'first.wav'))
+    cache.add(write_wav(cache_dir, 'second.wav'))
+    cache._entries['first.wav'].last_used += 10    # uso más reciente
+    cache.add(write_wav(cache_dir, 'third.wav'))
+
+    assert cache.contains('first.wav')
+    assert not cache.contains('second.wav')
+
+
+def test_pin_replace_releases_previous_voice(cache_dir):
+    cache = make_cache(cache_dir, 10 ** 6)
+    for name in ('voice_a_1.wav', 'voice_a_2.wav', 'voice_b_1.wav'):
+        cache.add(write_wav(cache_dir, name))
+    cache.pin(['voice_a_1.wav', 'voice_a_2.wav'], replace=True)
+    cache.warm_up(['voice_a_1.wav'])
+    assert cache.get_bytes('voice_a_1.wav') is not None
+
+    cache.pin(['voice_b_1.wav', 'voice_b_2.wav'], replace=True)
+
+    assert cache._pinned_names == {'voice_b_1.wav', 'voice_b_2.wav'}
+    assert not cache._entries['voice_a_1.wav'].pinned
+    assert cache._entries['voice_b_1.wav'].pinned
+    assert cache.get_bytes('voice_a_1.wav') is None
+
+    # Un audio de la voz nueva que aún no existía se fija al agregarse
+    assert cache.add(write_wav(cache_dir, 'voice_b_2.wav')).pinned
+    assert not cache.add(write_wav(cache_dir, 'voice_a_3.wav')).pinned
+
+
+def test_pin_replace_frees_budget(cache_dir):
+    cache = make_cache(cache_dir, 9000)
+    cache.pin(['a.wav', 'b.wav', 'c.wav'])
+    for name in ('a.wav', 'b.wav', 'c.wav'):
+        cache.add(write_wav(cache_dir, name))
+    assert cache.stats()['entries'] == 3      # Fijados: por encima del presupuesto
+
+    cache.pin(['c.wav'], replace=True)
+    assert cache.stats()['bytes_used'] <= 9000
+    assert cache.contains('c.wav')
+
+
+def test_manifest_is_reused_and_reconciled(cache_dir):
+    cache = make_cache(cache_dir, 10 ** 6)
+    cache.pin(['kept.wav'])
+    cache.add(write_wav(cache_dir, 'kept.wav'), message='Hola')
+    cache.add(write_wav(cache_dir, 'gone.wav'))
+    cache.flush()
+    os.remove(cache_dir / 'gone.wav')
+    write_wav(cache_dir, 'external.wav')
+
+    reloaded = make_cache(cache_dir, 10 ** 6)
+    assert reloaded._entries['kept.wav'].message == 'Hola'
+    assert reloaded._entries['kept.wav'].pinned
+    assert not reloaded.contains('gone.wav')
+    assert reloaded.contains('external.wav')
+
+
+def test_bundle_round_trip(cache_dir, tmp_path):
+    cache = make_cache(cache_dir, 10 ** 6)
+    cache.pin(['core.wav'])
+    cache.add(write_wav(cache_dir, 'core.wav'), message='Listo')
+    cache.add(write_wav(cache_dir, 'other.wav'))
+    bundle = str(tmp_path / 'bundle.zip')
+    assert cache.export_bundle(bundle) == 1
+
+    target_dir = tmp_path / 'new_server'
+    target_dir.mkdir()
+    target = make_cache(target_dir, 10 ** 6)
+    assert target.import_bundle(bundle) == 1
+    assert target._entries['core.wav'].message == 'Listo'
+    assert not target.contains('other.wav')
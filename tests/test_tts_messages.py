@@ -0,0 +1,57 @@
+"""
+Tests del banco de frases TTS (TTSMessages en app/services/tts_service.py)
+
+Ejecutar:
+    python -m pytest tests/test_tts_messages.py -q
+"""
+
+import pytest
+
+from app.services.tts_service import TTSMessages
+
+
+@pytest.mark.parametrize('value, expected', [
+    (0, ['cero']),
+    (1, ['un']),
+    (21, ['veintiún']),
+    (29, ['veintinueve']),
+    (30, ['treinta']),
+    (45, ['cuarenta y cinco']),
+    (100, ['cien']),
+    (101, ['ciento', 'un']),
+    (145, ['ciento', 'cuarenta y cinco']),
+    (200, ['doscientos']),
+    (999, ['novecientos', 'noventa y nueve']),
+    (-12, ['menos', 'doce']),
+    (44.6, ['cuarenta y cinco']),
+    (1500, ['novecientos', 'noventa y nueve']),
+])
+def test_number_fragments(value, expected):
+    assert TTSMessages.number_fragments(value) == expected
+
+
+def test_every_result_fragment_is_in_the_phrase_bank():
+    bank = set(TTSMessages.phrase_bank())
+    classifications = set(TTSMessages.CLASSIFICATION_SPOKEN)
+
+    for value in range(-999, 1000):
+        assert set(TTSMessages.number_fragments(value)) <= bank, value
+    for classification in classifications:
+        assert set(TTSMessages.completed_result_fragments(145.2, classification)) <= bank
+        assert set(TTSMessages.completed_result_fragments(0, classification, 87, 91)) <= bank
+
+
+def test_result_fragments_order():
+    assert TTSMessages.completed_result_fragments(145, 'Normal') == [
+        'Rango de', 'ciento', 'cuarenta y cinco', 'grados.', 'Rango normal'
+    ]
+    assert TTSMessages.completed_result_fragments(0, 'OPTIMAL', left_rom=21, right_rom=100) == [
+        'Lado izquierdo', 'veintiún', 'grados.', 'Lado derecho', 'cien', 'grados.', 'Óptimo'
+    ]
+
+
+def test_core_messages_are_unique_and_include_instructions():
+    messages = TTSMessages.core_messages()
+    assert len(messages) == len(set(messages))
+    assert TTSMessages.INSTRUCTION_KNEE_FLEXION in messages
+    assert TTSMessages.COUNTDOWN_3 in messages
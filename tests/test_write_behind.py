@@ -0,0 +1,103 @@
+"""
+Tests de la cola de escritura diferida (database/write_behind.py)
+
+Ejecutar:
+    python -m pytest tests/test_write_behind.py -q
+"""
+
+from datetime import datetime
+
+from database.write_behind import WriteBehindQueue
+
+
+class RecordingWriter:
+    """write_batch falso: registra los lotes y falla según `fail`"""
+
+    def __init__(self, fail=lambda logs, logins: False):
+        self.fail = fail
+        self.calls = []
+        self.logs = []
+        self.logins = {}
+
+    def __call__(self, logs, logins):
+        self.calls.append((list(logs), dict(logins)))
+        if self.fail(logs, logins):
+            raise RuntimeError("database is locked")
+        self.logs.extend(logs)
+        self.logins.update(logins)
+
+
+def make_queue(writer, **kwargs):
+    kwargs.setdefault('flush_interval', 60.0)
+    kwargs.setdefault('retry_delay', 0.0)
+    return WriteBehindQueue(writer, **kwargs)
+
+
+def test_flush_writes_one_batch_and_coalesces_logins():
+    writer = RecordingWriter()
+    wbq = make_queue(writer)
+    wbq.log('login', user_id=1)
+    wbq.log('logout', user_id=1)
+    wbq.touch_last_login(1, datetime(2025, 1, 1))
+    wbq.touch_last_login(1, datetime(2025, 1, 2))
+
+    assert wbq.flush()
+    wbq.close()
+
+    assert len(writer.calls) == 1
+    assert [log['action'] for log in writer.logs] == ['login', 'logout']
+    assert writer.logins == {1: datetime(2025, 1, 2)}
+    stats = wbq.stats()
+    assert stats['written_logs'] == 2 and stats['written_logins'] == 1
+    assert stats['coalesced_logins'] == 1
+
+
+def test_batch_is_retried_after_transient_error():
+    attempts = []
+
+    def fail_first(logs, logins):
+        attempts.append(1)
+        return len(attempts) == 1
+
+    writer = RecordingWriter(fail_first)
+    wbq = make_queue(writer)
+    wbq.log('login', user_id=1)
+    wbq.log('logout', user_id=2)
+    assert wbq.flush()
+    wbq.close()
+
+    assert [log['action'] for log in writer.logs] == ['login', 'logout']
+    assert wbq.stats()['retried'] == 1
+    assert wbq.stats()['dropped'] == 0
+
+
+def test_failed_batch_falls_back_to_rows_and_only_drops_bad_rows():
+    # Cualquier lote con la fila 'bad' falla: el lote completo y sus reintentos
+    writer = RecordingWriter(lambda logs, logins: any(log['action'] == 'bad' for log in logs))
+    wbq = make_queue(writer, retries=1)
+    wbq.log('login', user_id=1)
+    wbq.log('bad', user_id=2)
+    wbq.log('logout', user_id=1)
+    wbq.touch_last_login(3, datetime(2025, 1, 1))
+    assert wbq.flush()
+    wbq.close()
+
+    assert [log['action'] for log in writer.logs] == ['login', 'logout']
+    assert writer.logins == {3: datetime(2025, 1, 1)}
+    stats = wbq.stats()
+    assert stats['retried'] == 1
+    assert stats['row_fallbacks'] == 1
+    assert stats['dropped'] == 1
+    assert stats['written_logs'] == 2 and stats['written_logins'] == 1
+
+
+def test_full_queue_writes_synchronously():
+    writer = RecordingWriter()
+    wbq = make_queue(writer, max_queue=1, batch_size=100)
+    # Sin hilo escritor en marcha la cola se llena con el primer elemento
+    wbq._ensure_thread = lambda: None
+    wbq.log('first')
+    wbq.log('second')
+
+    assert [log['action'] for log in writer.logs] == ['second']
+    assert wbq.stats()['sync_fallbacks'] == 1